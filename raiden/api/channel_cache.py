@@ -0,0 +1,139 @@
+""" Serialized channels of the REST API, cached by the version of the channel.
+
+The version of a channel is the identifier of the last state change which
+changed it. The `ChannelCache` follows the dispatches of the `WriteAheadLog`
+to keep the versions up to date, so that the channels are serialized only
+after they change, and the channel lists are tagged without serializing them.
+"""
+import json
+from hashlib import sha256
+
+from raiden.api.stream import changed_channels
+from raiden.storage.sqlite import LOW_STATECHANGE_ULID, EventID, StateChangeID
+from raiden.storage.wal import WriteAheadLog
+from raiden.transfer import views
+from raiden.transfer.architecture import Event, StateChange
+from raiden.transfer.identifiers import CanonicalIdentifier
+from raiden.transfer.state import ChainState, NettingChannelState
+from raiden.utils.typing import (
+    Any,
+    Callable,
+    ChannelID,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    TokenNetworkAddress,
+    Tuple,
+)
+
+# Order of the pages of the channel lists
+ChannelListKey = Tuple[TokenNetworkAddress, ChannelID]
+
+
+def channel_list_key(channel_state: NettingChannelState) -> ChannelListKey:
+    canonical_identifier = channel_state.canonical_identifier
+    return canonical_identifier.token_network_address, canonical_identifier.channel_identifier
+
+
+def encode_channel_list_cursor(key: ChannelListKey) -> str:
+    """ The cursor of the page after the channel with `key`. """
+    token_network_address, channel_identifier = key
+    return token_network_address.hex() + channel_identifier.to_bytes(32, "big").hex()
+
+
+def decode_channel_list_cursor(cursor: str) -> Optional[ChannelListKey]:
+    try:
+        data = bytes.fromhex(cursor)
+    except ValueError:
+        return None
+
+    if len(data) != 52:
+        return None
+
+    return TokenNetworkAddress(data[:20]), ChannelID(int.from_bytes(data[20:], "big"))
+
+
+class ChannelCache:
+    def __init__(self, serialize: Callable[[NettingChannelState], Dict[str, Any]]) -> None:
+        self.serialize = serialize
+        self.wal: Optional[WriteAheadLog] = None
+
+        # The channels which did not change since the cache follows the WAL
+        # have the version of the latest state change at that time
+        self.base_version = LOW_STATECHANGE_ULID
+        self.versions: Dict[CanonicalIdentifier, StateChangeID] = dict()
+        self.serialized: Dict[CanonicalIdentifier, Tuple[StateChangeID, str]] = dict()
+
+    def follow(self, wal: WriteAheadLog) -> None:
+        """ Track the versions of the channels with the dispatches of `wal`. """
+        self.wal = wal
+        self.base_version = (
+            wal.storage.get_latest_state_change_identifier() or LOW_STATECHANGE_ULID
+        )
+        self.versions.clear()
+        self.serialized.clear()
+        wal.register_callback(self.on_dispatch)
+
+    def on_dispatch(
+        self,
+        state_changes: List[StateChange],
+        chain_state: ChainState,
+        events: List[Tuple[EventID, Event]],
+    ) -> None:
+        """ `WriteAheadLog` callback, bumps the versions of the changed channels. """
+        assert self.wal is not None, "on_dispatch called before follow"
+        version = self.wal.saved_state.state_change_id
+
+        for canonical_identifier in changed_channels(
+            state_changes, (event for _, event in events)
+        ):
+            self.serialized.pop(canonical_identifier, None)
+
+            # The versions of the settled channels are not needed anymore
+            channel_state = views.get_channelstate_by_canonical_identifier(
+                chain_state, canonical_identifier
+            )
+            if channel_state is None:
+                self.versions.pop(canonical_identifier, None)
+            else:
+                self.versions[canonical_identifier] = version
+
+    def version(self, channel_state: NettingChannelState) -> StateChangeID:
+        return self.versions.get(channel_state.canonical_identifier, self.base_version)
+
+    def etag(self, channel_states: Iterable[NettingChannelState]) -> Optional[str]:
+        """ Entity tag of the list of `channel_states`, it changes if a channel
+        is added, removed or changed.
+        """
+        if self.wal is None:
+            return None
+
+        digest = sha256()
+        for channel_state in channel_states:
+            canonical_identifier = channel_state.canonical_identifier
+            digest.update(canonical_identifier.token_network_address)
+            digest.update(canonical_identifier.channel_identifier.to_bytes(32, "big"))
+            digest.update(self.version(channel_state).identifier)
+        return digest.hexdigest()
+
+    def dump_json(self, channel_state: NettingChannelState) -> str:
+        """ The JSON serialization of `channel_state`.
+
+        `channel_state` must be from the current chain state, otherwise an
+        outdated serialization would be cached for the current version.
+        """
+        # Without following the WAL the changes are not known
+        if self.wal is None:
+            return json.dumps(self.serialize(channel_state))
+
+        canonical_identifier = channel_state.canonical_identifier
+        version = self.version(channel_state)
+
+        cached = self.serialized.get(canonical_identifier)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        data = json.dumps(self.serialize(channel_state))
+        self.serialized[canonical_identifier] = (version, data)
+        return data
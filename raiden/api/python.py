@@ -8,6 +8,7 @@
 from raiden.constants import (
     BLOCK_ID_LATEST,
     GENESIS_BLOCK_NUMBER,
+    MAX_PAYMENT_BATCH_SIZE,
     NULL_ADDRESS_BYTES,
     UINT64_MAX,
     UINT256_MAX,
@@ -27,7 +28,9 @@
     InvalidSecretHash,
     InvalidSettleTimeout,
     InvalidTokenAddress,
+    RaidenError,
     RaidenRecoverableError,
+    RaidenValidationError,
     SamePeerAddress,
     TokenNetworkDeprecated,
     TokenNotRegistered,
@@ -57,7 +60,7 @@
 from raiden.transfer.views import get_token_network_by_address
 from raiden.utils.formatting import to_checksum_address
 from raiden.utils.gas_reserve import has_enough_gas_reserve
-from raiden.utils.transfers import create_default_identifier
+from raiden.utils.transfers import TransferRequest, create_default_identifier
 from raiden.utils.typing import (
     TYPE_CHECKING,
     Address,
@@ -82,6 +85,7 @@
     TokenAmount,
     TokenNetworkAddress,
     TokenNetworkRegistryAddress,
+    Union,
     WithdrawAmount,
 )
 
@@ -1049,6 +1053,69 @@ def transfer_async(
         secrethash: SecretHash = None,
         lock_timeout: BlockTimeout = None,
     ) -> "PaymentStatus":
+        transfer = self._validate_transfer(
+            registry_address=registry_address,
+            token_address=token_address,
+            amount=amount,
+            target=target,
+            identifier=identifier,
+            secret=secret,
+            secrethash=secrethash,
+            lock_timeout=lock_timeout,
+        )
+
+        payment_status = self.raiden.mediated_transfer_async(
+            token_network_address=transfer.token_network_address,
+            amount=transfer.amount,
+            target=transfer.target,
+            identifier=transfer.identifier,
+            secret=transfer.secret,
+            secrethash=transfer.secrethash,
+            lock_timeout=transfer.lock_timeout,
+        )
+        return payment_status
+
+    def transfer_batch_async(
+        self, registry_address: TokenNetworkRegistryAddress, payments: List[Dict[str, Any]]
+    ) -> List[Union["PaymentStatus", RaidenError]]:
+        """ Start the `payments` without waiting for them to complete.
+
+        Every payment is a dictionary with the arguments of `transfer_async`.
+        The transfers of all valid payments are started together, see
+        `RaidenService.mediated_transfers_async`. The result for a payment is
+        either its `PaymentStatus`, or the error which rejected it. The
+        payments are routed in the background, at most
+        `MAX_PAYMENT_BATCH_SIZE` are accepted at once.
+        """
+        if len(payments) > MAX_PAYMENT_BATCH_SIZE:
+            raise RaidenValidationError(
+                f"A batch has at most {MAX_PAYMENT_BATCH_SIZE} payments, got {len(payments)}"
+            )
+
+        results: List[Union["PaymentStatus", RaidenError, None]] = list()
+        transfers: List[TransferRequest] = list()
+        for payment in payments:
+            try:
+                transfers.append(self._validate_transfer(registry_address, **payment))
+            except RaidenError as e:
+                results.append(e)
+            else:
+                results.append(None)
+
+        started = iter(self.raiden.mediated_transfers_async(transfers))
+        return [next(started) if result is None else result for result in results]
+
+    def _validate_transfer(
+        self,
+        registry_address: TokenNetworkRegistryAddress,
+        token_address: TokenAddress,
+        amount: PaymentAmount,
+        target: TargetAddress,
+        identifier: PaymentID = None,
+        secret: Secret = None,
+        secrethash: SecretHash = None,
+        lock_timeout: BlockTimeout = None,
+    ) -> TransferRequest:
         current_state = views.state_from_raiden(self.raiden)
         token_network_registry_address = self.raiden.default_registry.address
 
@@ -1115,7 +1182,7 @@ def transfer_async(
                 f"with the network {to_checksum_address(registry_address)}."
             )
 
-        payment_status = self.raiden.mediated_transfer_async(
+        return TransferRequest(
             token_network_address=token_network_address,
             amount=amount,
             target=target,
@@ -1124,7 +1191,6 @@ def transfer_async(
             secrethash=secrethash,
             lock_timeout=lock_timeout,
         )
-        return payment_status
 
     def get_raiden_events_payment_history_with_timestamps(
         self,
@@ -1,12 +1,15 @@
 import errno
+import json
 import logging
 import socket
+from bisect import bisect_right
 from hashlib import sha256
 from http import HTTPStatus
 
 import gevent
 import gevent.pool
 import structlog
+from cachetools import LRUCache
 from eth_utils import encode_hex
 from flask import Flask, Request, Response, request, send_from_directory, url_for
 from flask.json import jsonify
@@ -18,13 +21,21 @@
 from marshmallow import Schema
 from raiden_webui import RAIDEN_WEBUI_PATH
 from webargs.flaskparser import parser
+from werkzeug.datastructures import ETags
 from werkzeug.exceptions import NotFound
 from werkzeug.routing import BaseConverter
 
+from raiden.api.channel_cache import (
+    ChannelCache,
+    channel_list_key,
+    decode_channel_list_cursor,
+    encode_channel_list_cursor,
+)
 from raiden.api.exceptions import ChannelNotFound, NonexistingChannel
 from raiden.api.objects import AddressList, PartnersPerTokenList
 from raiden.api.python import RaidenAPI
 from raiden.api.rest_utils import api_error, api_response
+from raiden.api.stream import EventStream, StreamItem
 from raiden.api.v1.encoding import (
     AddressListSchema,
     ChannelStateSchema,
@@ -46,9 +57,12 @@
     ChannelsResourceByTokenAndPartnerAddress,
     ConnectionsInfoResource,
     ConnectionsResource,
+    EventStreamResource,
     MintTokenResource,
     PartnersResourceByTokenAddress,
+    PaymentBatchResource,
     PaymentResource,
+    PaymentStatusResource,
     PendingTransfersResource,
     PendingTransfersResourceByTokenAddress,
     PendingTransfersResourceByTokenAndPartnerAddress,
@@ -86,6 +100,7 @@
     MaxTokenNetworkNumberReached,
     MintFailed,
     PaymentConflict,
+    RaidenError,
     RaidenRecoverableError,
     SamePeerAddress,
     TokenNetworkDeprecated,
@@ -96,28 +111,34 @@
 )
 from raiden.network.rpc.client import JSONRPCClient
 from raiden.settings import RestApiConfig
+from raiden.storage.sqlite import EventID
+from raiden.storage.ulid import ULID
+from raiden.storage.utils import TimestampedEvent
 from raiden.transfer import channel, views
 from raiden.transfer.events import (
     EventPaymentReceivedSuccess,
     EventPaymentSentFailed,
     EventPaymentSentSuccess,
 )
-from raiden.transfer.state import ChannelState, NettingChannelState
+from raiden.transfer.state import ChainState, ChannelState, NettingChannelState
 from raiden.ui.sync import blocks_to_sync
 from raiden.utils.formatting import optional_address_to_string, to_checksum_address
 from raiden.utils.gevent import spawn_named
 from raiden.utils.http import split_endpoint
+from raiden.utils.metrics import REGISTRY
 from raiden.utils.runnable import Runnable
 from raiden.utils.system import get_system_spec
 from raiden.utils.transfers import create_default_identifier
 from raiden.utils.typing import (
     MYPY_ANNOTATION,
+    TYPE_CHECKING,
     Address,
     Any,
     BlockIdentifier,
     BlockTimeout,
     Dict,
     Endpoint,
+    Iterator,
     List,
     Optional,
     PaymentAmount,
@@ -133,8 +154,23 @@
     typecheck,
 )
 
+if TYPE_CHECKING:
+    from raiden.raiden_service import PaymentStatus
+
 log = structlog.get_logger(__name__)
 
+# Number of payments started through the batch endpoint which can be polled.
+# The statuses are kept after the payments complete, so the oldest ones are
+# evicted.
+PAYMENT_STATUS_CACHE_SIZE = 10_000
+
+# Seconds without updates after which a comment is sent to the clients of the
+# event stream, so that idle connections are not closed by proxies
+STREAM_KEEPALIVE = 15
+
+# Number of channels per page of the channel lists, if only a cursor is given
+CHANNEL_PAGE_SIZE = 100
+
 URLS_V1 = [
     ("/address", AddressResource),
     ("/version", VersionResource),
@@ -147,12 +183,17 @@
     ("/connections/<hexaddress:token_address>", ConnectionsResource),
     ("/connections", ConnectionsInfoResource),
     ("/payments", PaymentResource),
+    ("/payments/batch", PaymentBatchResource),
     ("/payments/<hexaddress:token_address>", PaymentResource, "token_paymentresource"),
     (
         "/payments/<hexaddress:token_address>/<hexaddress:target_address>",
         PaymentResource,
         "token_target_paymentresource",
     ),
+    (
+        "/payments/<hexaddress:token_address>/<hexaddress:target_address>/<int:identifier>",
+        PaymentStatusResource,
+    ),
     ("/tokens", TokensResource),
     ("/tokens/<hexaddress:token_address>/partners", PartnersResourceByTokenAddress),
     ("/tokens/<hexaddress:token_address>", RegisterTokenResource),
@@ -168,6 +209,7 @@
         "pending_transfers_resource_by_token_and_partner",
     ),
     ("/status", StatusResource),
+    ("/stream", EventStreamResource),
     ("/shutdown", ShutdownResource),
     ("/_debug/blockchain_events/network", BlockchainEventsNetworkResource),
     ("/_debug/blockchain_events/tokens/<hexaddress:token_address>", BlockchainEventsTokenResource),
@@ -344,6 +386,10 @@ def __init__(
         # or else, it'll replace it with a E500 response
         self.flask_app.config["PROPAGATE_EXCEPTIONS"] = True
 
+        self.flask_app.add_url_rule(
+            "/metrics", "metrics", view_func=self._serve_metrics, methods=("GET",)
+        )
+
         if config.web_ui_enabled:
             for route in ("/ui/<path:file_name>", "/ui", "/ui/", "/index.html", "/"):
                 self.flask_app.add_url_rule(
@@ -358,6 +404,10 @@ def _check_shutdown_before_handle_request(self) -> Optional[Response]:
 
         return None
 
+    @staticmethod
+    def _serve_metrics() -> Response:
+        return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
     def _serve_webui(self, file_name: str = "index.html") -> Response:
         try:
             if not file_name:
@@ -506,6 +556,11 @@ def __init__(self, raiden_api: RaidenAPI = None, rpc_client: JSONRPCClient = Non
         self.received_success_payment_schema = EventPaymentReceivedSuccessSchema()
         self.failed_payment_schema = EventPaymentSentFailedSchema()
 
+        # Statuses of the batch payments by (token_address, target_address, identifier)
+        self.payment_statuses: LRUCache = LRUCache(PAYMENT_STATUS_CACHE_SIZE)
+        self.event_stream = EventStream()
+        self.channel_cache = ChannelCache(self.channel_schema.dump)
+
     @property
     def rpc_client(self) -> JSONRPCClient:
         assert self._rpc_client is not None, "rpc_client accessed but not initialized."
@@ -813,23 +868,71 @@ def get_channel_list(
         registry_address: TokenNetworkRegistryAddress,
         token_address: TokenAddress = None,
         partner_address: Address = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        if_none_match: Optional[ETags] = None,
     ) -> Response:
+        """ The channels as a JSON list, paginated if a `limit` or a `cursor`
+        is given.
+
+        The pages are ordered by token network and channel identifier, the
+        link to the next page is sent in the `Link` header. The response is
+        tagged with the versions of the channels, and is not sent again if
+        it matches `if_none_match`.
+        """
         log.debug(
             "Getting channel list",
             node=self.checksum_address,
             registry_address=to_checksum_address(registry_address),
             token_address=optional_address_to_string(token_address),
             partner_address=optional_address_to_string(partner_address),
+            limit=limit,
+            cursor=cursor,
         )
         raiden_service_result = self.raiden_api.get_channel_list(
             registry_address, token_address, partner_address
         )
         typecheck(raiden_service_result, list)
 
-        result = [
-            self.channel_schema.dump(channel_schema) for channel_schema in raiden_service_result
-        ]
-        return api_response(result=result)
+        channel_states: List[NettingChannelState] = raiden_service_result
+        headers: Dict[str, str] = dict()
+
+        if limit is not None or cursor is not None:
+            if limit is None:
+                limit = CHANNEL_PAGE_SIZE
+
+            if limit < 1:
+                return api_error(
+                    errors=f"Invalid limit {limit}", status_code=HTTPStatus.BAD_REQUEST
+                )
+
+            channel_states = sorted(channel_states, key=channel_list_key)
+            if cursor is not None:
+                after = decode_channel_list_cursor(cursor)
+                if after is None:
+                    return api_error(
+                        errors=f"Invalid cursor {cursor}", status_code=HTTPStatus.BAD_REQUEST
+                    )
+                start = bisect_right([channel_list_key(state) for state in channel_states], after)
+                channel_states = channel_states[start:]
+
+            if len(channel_states) > limit:
+                channel_states = channel_states[:limit]
+                next_cursor = encode_channel_list_cursor(channel_list_key(channel_states[-1]))
+                headers[
+                    "Link"
+                ] = f'<{request.path}?limit={limit}&cursor={next_cursor}>; rel="next"'
+
+        etag = self.channel_cache.etag(channel_states)
+        if etag is not None:
+            headers["ETag"] = f'"{etag}"'
+            if if_none_match is not None and if_none_match.contains(etag):
+                return Response(status=HTTPStatus.NOT_MODIFIED, headers=headers)
+
+        # The serialized channels are cached, the list is built from them
+        # instead of dumping it again
+        result = ",".join(self.channel_cache.dump_json(state) for state in channel_states)
+        return Response(f"[{result}]", mimetype="application/json", headers=headers)
 
     def get_tokens_list(self, registry_address: TokenNetworkRegistryAddress) -> Response:
         log.debug(
@@ -936,27 +1039,83 @@ def get_raiden_events_payment_history_with_timestamps(
         result = []
         chain_state = views.state_from_raiden(self.raiden_api.raiden)
         for event in service_result:
-            if isinstance(event.wrapped_event, EventPaymentSentSuccess):
-                serialized_event = self.sent_success_payment_schema.serialize(
-                    chain_state=chain_state, event=event
-                )
-            elif isinstance(event.wrapped_event, EventPaymentSentFailed):
-                serialized_event = self.failed_payment_schema.serialize(
-                    chain_state=chain_state, event=event
-                )
-            elif isinstance(event.wrapped_event, EventPaymentReceivedSuccess):
-                serialized_event = self.received_success_payment_schema.serialize(
-                    chain_state=chain_state, event=event
-                )
-            else:
-                log.warning(
-                    "Unexpected event",
-                    node=self.checksum_address,
-                    unexpected_event=event.wrapped_event,
+            serialized_event = self._serialize_payment_event(chain_state, event)
+            if serialized_event is not None:
+                result.append(serialized_event)
+        return api_response(result=result)
+
+    def _serialize_payment_event(
+        self, chain_state: ChainState, event: TimestampedEvent
+    ) -> Optional[Dict[str, Any]]:
+        if isinstance(event.wrapped_event, EventPaymentSentSuccess):
+            return self.sent_success_payment_schema.serialize(chain_state=chain_state, event=event)
+        if isinstance(event.wrapped_event, EventPaymentSentFailed):
+            return self.failed_payment_schema.serialize(chain_state=chain_state, event=event)
+        if isinstance(event.wrapped_event, EventPaymentReceivedSuccess):
+            return self.received_success_payment_schema.serialize(
+                chain_state=chain_state, event=event
+            )
+
+        log.warning(
+            "Unexpected event", node=self.checksum_address, unexpected_event=event.wrapped_event
+        )
+        return None
+
+    def stream_events(self, cursor: Optional[str]) -> Response:
+        """ Stream the payment events and the channel updates as server-sent
+        events.
+
+        Every update has the identifier of the last payment event sent, which
+        is used as the `cursor` to resume the stream.
+        """
+        event_identifier = None
+        if cursor is not None:
+            try:
+                identifier = bytes.fromhex(cursor)
+            except ValueError:
+                identifier = b""
+
+            if len(identifier) != 16:
+                return api_error(
+                    errors=f"Invalid cursor {cursor}", status_code=HTTPStatus.BAD_REQUEST
                 )
+            event_identifier = EventID(ULID(identifier))
+
+        raiden = self.raiden_api.raiden
+        assert raiden.wal, "Raiden Service has to be initialized"
+        updates = self.event_stream.stream(
+            storage=raiden.wal.storage,
+            get_chain_state=lambda: views.state_from_raiden(raiden),
+            cursor=event_identifier,
+            keepalive=STREAM_KEEPALIVE,
+        )
+        return Response(
+            self._format_server_sent_events(updates),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache"},
+        )
 
-            result.append(serialized_event)
-        return api_response(result=result)
+    def _format_server_sent_events(self, updates: Iterator[Optional[StreamItem]]) -> Iterator[str]:
+        for update in updates:
+            if update is None:
+                yield ": keep-alive\n\n"
+                continue
+
+            if isinstance(update.data, NettingChannelState):
+                event_type = "channel"
+                data = self.channel_schema.dump(update.data)
+            else:
+                event_type = "payment"
+                chain_state = views.state_from_raiden(self.raiden_api.raiden)
+                data = self._serialize_payment_event(chain_state, update.data)
+                if data is None:
+                    continue
+
+            yield (
+                f"id: {update.cursor.identifier.hex()}\n"
+                f"event: {event_type}\n"
+                f"data: {json.dumps(data)}\n\n"
+            )
 
     def get_raiden_internal_events_with_timestamps(
         self, limit: Optional[int], offset: Optional[int]
@@ -1017,8 +1176,8 @@ def get_channel(
                 token_address=token_address,
                 partner_address=partner_address,
             )
-            result = self.channel_schema.dump(channel_state)
-            return api_response(result=result)
+            result = self.channel_cache.dump_json(channel_state)
+            return Response(result, mimetype="application/json")
         except ChannelNotFound as e:
             return api_error(errors=str(e), status_code=HTTPStatus.NOT_FOUND)
 
@@ -1130,6 +1289,111 @@ def initiate_payment(
         result = self.payment_schema.dump(payment)
         return api_response(result=result)
 
+    def initiate_payment_batch(
+        self, registry_address: TokenNetworkRegistryAddress, payments: List[Dict[str, Any]]
+    ) -> Response:
+        """ Start the `payments` and return without waiting for them to complete.
+
+        The response has a handle for every payment, in the order of the
+        request. A payment which is not started has the status `rejected`,
+        otherwise the handle identifies the payment for `get_payment_status`.
+        """
+        log.debug(
+            "Initiating payment batch",
+            node=self.checksum_address,
+            registry_address=to_checksum_address(registry_address),
+            number_of_payments=len(payments),
+        )
+
+        transfers = [
+            dict(
+                token_address=payment["token_address"],
+                target=payment["target_address"],
+                amount=payment["amount"],
+                identifier=(
+                    create_default_identifier()
+                    if payment["identifier"] is None
+                    else payment["identifier"]
+                ),
+                secret=payment["secret"],
+                secrethash=payment["secret_hash"],
+                lock_timeout=payment["lock_timeout"],
+            )
+            for payment in payments
+        ]
+        results = self.raiden_api.transfer_batch_async(
+            registry_address=registry_address, payments=transfers
+        )
+
+        handles = list()
+        for transfer, result in zip(transfers, results):
+            if isinstance(result, RaidenError):
+                handle = self.payment_schema.dump(
+                    {
+                        "initiator_address": self.checksum_address,
+                        "token_address": transfer["token_address"],
+                        "target_address": transfer["target"],
+                        "amount": transfer["amount"],
+                        "identifier": transfer["identifier"],
+                    }
+                )
+                handle["status"] = "rejected"
+                handle["errors"] = str(result)
+            else:
+                key = (transfer["token_address"], transfer["target"], transfer["identifier"])
+                self.payment_statuses[key] = result
+                handle = self._dump_payment_status(
+                    transfer["token_address"], transfer["target"], result
+                )
+            handles.append(handle)
+
+        return api_response(result=dict(payments=handles), status_code=HTTPStatus.ACCEPTED)
+
+    def get_payment_status(
+        self, token_address: TokenAddress, target_address: TargetAddress, identifier: PaymentID
+    ) -> Response:
+        payment_status = self.payment_statuses.get((token_address, target_address, identifier))
+        if payment_status is None:
+            return api_error(
+                errors=f"Payment {identifier} to {to_checksum_address(target_address)} is unknown",
+                status_code=HTTPStatus.NOT_FOUND,
+            )
+
+        return api_response(
+            result=self._dump_payment_status(token_address, target_address, payment_status)
+        )
+
+    def _dump_payment_status(
+        self,
+        token_address: TokenAddress,
+        target_address: TargetAddress,
+        payment_status: "PaymentStatus",
+    ) -> Dict[str, Any]:
+        payment: Dict[str, Any] = {
+            "initiator_address": self.checksum_address,
+            "token_address": token_address,
+            "target_address": target_address,
+            "amount": payment_status.amount,
+            "identifier": payment_status.payment_identifier,
+        }
+
+        result = payment_status.payment_done.get() if payment_status.payment_done.ready() else None
+        if isinstance(result, EventPaymentSentSuccess):
+            payment["secret"] = result.secret
+            payment["secret_hash"] = sha256(result.secret).digest()
+
+        dumped = self.payment_schema.dump(payment)
+        if result is None:
+            dumped["status"] = "pending"
+        elif isinstance(result, EventPaymentSentSuccess):
+            dumped["status"] = "success"
+        else:
+            assert isinstance(result, EventPaymentSentFailed), MYPY_ANNOTATION
+            dumped["status"] = "failed"
+            dumped["errors"] = f"Payment couldn't be completed because: {result.reason}"
+
+        return dumped
+
     def _deposit(
         self,
         registry_address: TokenNetworkRegistryAddress,
@@ -0,0 +1,197 @@
+""" Payment events and channel updates for the event stream of the REST API.
+
+The `EventStream` follows the dispatches of the `WriteAheadLog`, and pushes
+the payment events and the state of the channels changed by a dispatch to
+every client of the stream. A client resumes the stream with the identifier
+of the last payment event it received, the payment events written while it
+was disconnected are read from the database.
+"""
+from datetime import datetime
+
+from gevent.queue import Empty, Full, Queue
+
+from raiden.storage.sqlite import EventID, SerializedSQLiteStorage
+from raiden.storage.ulid import ULID
+from raiden.storage.utils import TimestampedEvent
+from raiden.storage.wal import WriteAheadLog
+from raiden.transfer import views
+from raiden.transfer.architecture import Event, StateChange
+from raiden.transfer.events import (
+    EventPaymentReceivedSuccess,
+    EventPaymentSentFailed,
+    EventPaymentSentSuccess,
+)
+from raiden.transfer.identifiers import CanonicalIdentifier
+from raiden.transfer.state import ChainState, NettingChannelState
+from raiden.utils.typing import (
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+from raiden.waiting import state_change_keys
+
+# Number of updates buffered for a client. A client which does not keep up is
+# disconnected, and resumes from the last payment event it received.
+STREAM_QUEUE_SIZE = 1_000
+BACKFILL_BATCH_SIZE = 1_000
+
+LOW_EVENT_ULID = EventID(ULID((0).to_bytes(16, "big")))
+
+PAYMENT_EVENTS = (EventPaymentSentSuccess, EventPaymentSentFailed, EventPaymentReceivedSuccess)
+PAYMENT_EVENT_TYPES = [f"{event.__module__}.{event.__name__}" for event in PAYMENT_EVENTS]
+
+# A payment event with its identifier, or the new state of a channel
+QueuedUpdate = Union[Tuple[EventID, TimestampedEvent], NettingChannelState]
+
+
+class StreamItem(NamedTuple):
+    """ An update of the stream.
+
+    `cursor` is the identifier of the last payment event sent with or before
+    this update, the stream is resumed from it.
+    """
+
+    cursor: EventID
+    data: Union[TimestampedEvent, NettingChannelState]
+
+
+def changed_channels(
+    state_changes: List[StateChange], events: Iterable[Event]
+) -> Iterator[CanonicalIdentifier]:
+    """ The channels which may have been changed by `state_changes`. """
+    for state_change in state_changes:
+        for key in state_change_keys(state_change):
+            if isinstance(key, CanonicalIdentifier):
+                yield key
+
+    # The events of locally initiated actions, e.g. the locked transfer sent
+    # for an `ActionInitInitiator`
+    for event in events:
+        canonical_identifier = getattr(event, "canonical_identifier", None)
+        if canonical_identifier is not None:
+            yield canonical_identifier
+
+
+class EventStreamSubscription:
+    def __init__(self, queue_size: int) -> None:
+        self.queue: Queue = Queue(queue_size)
+        self.overflowed = False
+
+    def put(self, items: List[QueuedUpdate]) -> None:
+        for item in items:
+            try:
+                self.queue.put_nowait(item)
+            except Full:
+                self.overflowed = True
+                return
+
+
+class EventStream:
+    def __init__(self, queue_size: int = STREAM_QUEUE_SIZE) -> None:
+        self.queue_size = queue_size
+        self.subscriptions: Set[EventStreamSubscription] = set()
+        self.last_event_id = LOW_EVENT_ULID
+
+    def follow(self, wal: WriteAheadLog) -> None:
+        """ Push the updates of the dispatches of `wal`. """
+        self.last_event_id = wal.storage.get_latest_event_identifier() or LOW_EVENT_ULID
+        wal.register_callback(self.on_dispatch)
+
+    def on_dispatch(
+        self,
+        state_changes: List[StateChange],
+        chain_state: ChainState,
+        events: List[Tuple[EventID, Event]],
+    ) -> None:
+        """ `WriteAheadLog` callback, queues the updates for the subscribers. """
+        if events:
+            self.last_event_id = events[-1][0]
+
+        if not self.subscriptions:
+            return
+
+        log_time = datetime.utcnow()
+        items: List[QueuedUpdate] = [
+            (event_id, TimestampedEvent(event, log_time))
+            for event_id, event in events
+            if isinstance(event, PAYMENT_EVENTS)
+        ]
+
+        # The chain state is not mutated by later dispatches, so the channel
+        # states are serialized lazily by the clients
+        canonical_identifiers = dict.fromkeys(
+            changed_channels(state_changes, (event for _, event in events))
+        )
+        for canonical_identifier in canonical_identifiers:
+            channel_state = views.get_channelstate_by_canonical_identifier(
+                chain_state, canonical_identifier
+            )
+            if channel_state is not None:
+                items.append(channel_state)
+
+        if not items:
+            return
+
+        for subscription in list(self.subscriptions):
+            subscription.put(items)
+            if subscription.overflowed:
+                self.subscriptions.discard(subscription)
+
+    def stream(
+        self,
+        storage: SerializedSQLiteStorage,
+        get_chain_state: Callable[[], ChainState],
+        cursor: Optional[EventID],
+        keepalive: float,
+    ) -> Iterator[Optional[StreamItem]]:
+        """ Yield the payment events written after `cursor`, the state of all
+        channels, and then the updates as they are dispatched.
+
+        Without a `cursor` only the new payment events are sent. `None` is
+        yielded if there was no update for `keepalive` seconds. The stream
+        ends if the client does not keep up with the updates.
+        """
+        subscription = EventStreamSubscription(self.queue_size)
+        self.subscriptions.add(subscription)
+
+        try:
+            # Subscribe before reading the database, so that no payment event
+            # is missed. The events which are read from the database and are
+            # queued as well are skipped.
+            delivered = self.last_event_id if cursor is None else cursor
+
+            if cursor is not None:
+                while True:
+                    records = storage.get_events_with_timestamps_after(
+                        delivered, PAYMENT_EVENT_TYPES, BACKFILL_BATCH_SIZE
+                    )
+                    if not records:
+                        break
+
+                    for event_id, event in records:
+                        delivered = event_id
+                        yield StreamItem(delivered, event)
+
+            for channel_state in views.list_all_channelstate(get_chain_state()):
+                yield StreamItem(delivered, channel_state)
+
+            while not (subscription.overflowed and subscription.queue.empty()):
+                try:
+                    item = subscription.queue.get(timeout=keepalive)
+                except Empty:
+                    yield None
+                    continue
+
+                if isinstance(item, NettingChannelState):
+                    yield StreamItem(delivered, item)
+                elif item[0] > delivered:
+                    delivered, event = item
+                    yield StreamItem(delivered, event)
+        finally:
+            self.subscriptions.discard(subscription)
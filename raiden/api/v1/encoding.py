@@ -17,6 +17,7 @@
 
 from raiden.api.objects import Address, AddressList, PartnersPerToken, PartnersPerTokenList
 from raiden.constants import (
+    MAX_PAYMENT_BATCH_SIZE,
     NULL_ADDRESS_BYTES,
     NULL_ADDRESS_HEX,
     SECRET_LENGTH,
@@ -358,6 +359,50 @@ class Meta:
         decoding_class = dict
 
 
+class BatchPaymentSchema(BaseSchema):
+    token_address = AddressField(required=True)
+    target_address = AddressField(required=True)
+    amount = IntegerToStringField(required=True)
+    identifier = IntegerToStringField(missing=None)
+    secret = SecretField(missing=None)
+    secret_hash = SecretHashField(missing=None)
+    lock_timeout = IntegerToStringField(missing=None)
+
+    class Meta:
+        strict = True
+        decoding_class = dict
+
+
+class PaymentBatchSchema(BaseSchema):
+    payments = fields.Nested(
+        BatchPaymentSchema,
+        many=True,
+        required=True,
+        validate=validate.Length(min=1, max=MAX_PAYMENT_BATCH_SIZE),
+    )
+
+    class Meta:
+        strict = True
+        decoding_class = dict
+
+
+class ChannelListRequestSchema(BaseSchema):
+    limit = IntegerToStringField(missing=None)
+    cursor = fields.String(missing=None)
+
+    class Meta:
+        strict = True
+        decoding_class = dict
+
+
+class EventStreamRequestSchema(BaseSchema):
+    cursor = fields.String(missing=None)
+
+    class Meta:
+        strict = True
+        decoding_class = dict
+
+
 class ConnectionsConnectSchema(BaseSchema):
     funds = IntegerToStringField(required=True)
     initial_channel_target = IntegerToStringField(missing=DEFAULT_INITIAL_CHANNEL_TARGET)
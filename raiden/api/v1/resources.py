@@ -1,15 +1,18 @@
-from flask import Blueprint, Response
+from flask import Blueprint, Response, request
 from flask_restful import Resource
 from webargs.flaskparser import use_kwargs
 
 from raiden.api.rest_utils import if_api_available
 from raiden.api.v1.encoding import (
     BlockchainEventsRequestSchema,
+    ChannelListRequestSchema,
     ChannelPatchSchema,
     ChannelPutSchema,
     ConnectionsConnectSchema,
     ConnectionsLeaveSchema,
+    EventStreamRequestSchema,
     MintTokenSchema,
+    PaymentBatchSchema,
     PaymentSchema,
     RaidenEventsRequestSchema,
 )
@@ -20,6 +23,8 @@
     Any,
     BlockIdentifier,
     BlockTimeout,
+    Dict,
+    List,
     PaymentAmount,
     PaymentID,
     Secret,
@@ -60,15 +65,19 @@ def get(self) -> Response:
 
 class ChannelsResource(BaseResource):
 
+    get_schema = ChannelListRequestSchema()
     put_schema = ChannelPutSchema
 
+    @use_kwargs(get_schema, locations=("query",))
     @if_api_available
-    def get(self) -> Response:
+    def get(self, **kwargs: Any) -> Response:
         """
         this translates to 'get all channels the node is connected with'
         """
         return self.rest_api.get_channel_list(
-            self.rest_api.raiden_api.raiden.default_registry.address
+            self.rest_api.raiden_api.raiden.default_registry.address,
+            if_none_match=request.if_none_match,
+            **kwargs,
         )
 
     @use_kwargs(put_schema, locations=("json",))
@@ -80,13 +89,19 @@ def put(self, **kwargs: Any) -> Response:
 
 
 class ChannelsResourceByTokenAddress(BaseResource):
+
+    get_schema = ChannelListRequestSchema()
+
+    @use_kwargs(get_schema, locations=("query",))
     @if_api_available
     def get(self, **kwargs: Any) -> Response:
         """
         this translates to 'get all channels the node is connected to for the given token address'
         """
         return self.rest_api.get_channel_list(
-            registry_address=self.rest_api.raiden_api.raiden.default_registry.address, **kwargs
+            registry_address=self.rest_api.raiden_api.raiden.default_registry.address,
+            if_none_match=request.if_none_match,
+            **kwargs,
         )
 
 
@@ -301,6 +316,31 @@ def post(
         )
 
 
+class PaymentBatchResource(BaseResource):
+
+    post_schema = PaymentBatchSchema()
+
+    @use_kwargs(post_schema, locations=("json",))
+    @if_api_available
+    def post(self, payments: List[Dict[str, Any]]) -> Response:
+        return self.rest_api.initiate_payment_batch(
+            registry_address=self.rest_api.raiden_api.raiden.default_registry.address,
+            payments=payments,
+        )
+
+
+class PaymentStatusResource(BaseResource):
+    @if_api_available
+    def get(
+        self, token_address: TokenAddress, target_address: TargetAddress, identifier: int
+    ) -> Response:
+        return self.rest_api.get_payment_status(
+            token_address=token_address,
+            target_address=target_address,
+            identifier=PaymentID(identifier),
+        )
+
+
 class PendingTransfersResource(BaseResource):
     @if_api_available
     def get(self) -> Response:
@@ -328,3 +368,15 @@ class ShutdownResource(BaseResource):
     @if_api_available
     def post(self) -> Response:
         return self.rest_api.shutdown()
+
+
+class EventStreamResource(BaseResource):
+
+    get_schema = EventStreamRequestSchema()
+
+    @use_kwargs(get_schema, locations=("query",))
+    @if_api_available
+    def get(self, cursor: str = None) -> Response:
+        # Clients reconnect with the identifier of the last received event
+        cursor = request.headers.get("Last-Event-ID", cursor)
+        return self.rest_api.stream_events(cursor=cursor)
@@ -22,6 +22,7 @@
 from raiden.exceptions import InvalidBlockNumberInput
 from raiden.network.proxies.proxy_manager import ProxyManager
 from raiden.settings import BlockBatchSizeConfig
+from raiden.utils.metrics import REGISTRY
 from raiden.utils.typing import (
     ABI,
     Address,
@@ -52,6 +53,10 @@
 
 log = structlog.get_logger(__name__)
 
+GET_LOGS_DURATION = REGISTRY.histogram(
+    "raiden_eth_get_logs_seconds", "Time to fetch a batch of smart contract events"
+)
+
 # `new_filter` uses None to signal the absence of topics filters
 ALL_EVENTS = None
 
@@ -597,6 +602,7 @@ def _query_and_track(
                     RPCEndpoint("eth_getLogs"), [filter_params]
                 )
                 request_duration = time.monotonic() - start
+                GET_LOGS_DURATION.observe(request_duration)
             except ReadTimeout as ex:
                 # The request timed out while waiting for a response (as opposed to a
                 # ConnectTimeout).
@@ -0,0 +1,175 @@
+import time
+
+import gevent.lock
+from eth_utils import event_abi_to_log_topic, to_hex
+from web3 import Web3
+from web3.types import BlockData, RPCEndpoint
+
+from raiden.constants import GENESIS_BLOCK_NUMBER
+from raiden.utils.formatting import to_checksum_address
+from raiden.utils.typing import (
+    BlockNumber,
+    BlockTimeout,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    SecretHash,
+    SecretRegistryAddress,
+    Tuple,
+)
+from raiden_contracts.constants import CONTRACT_SECRET_REGISTRY, EVENT_SECRET_REVEALED
+from raiden_contracts.contract_manager import ContractManager
+
+
+class SecretRegistryMirror:
+    """ In-memory set of the secrets registered in the secret registry in the
+    last `retention_blocks`, up to the latest block.
+
+    This replaces the `eth_call` to the secret registry which is necessary
+    for every locked transfer, the mirror is updated by polling the
+    `SecretRevealed` events once per block, and the lookups are local.
+
+    Like the check against the latest block, a secret is considered known
+    once it is revealed in any block, even if the block is later forked
+    away. To not miss registrations of a fork which replaced polled blocks,
+    the last `confirmation_blocks` are queried again on every poll.
+
+    If the mirror was not updated in the last `max_staleness` seconds, e.g.
+    because the alarm task is lagging, it is synchronized with the latest
+    block before answering. With a `max_staleness` of 0 every lookup is
+    checked against the latest block.
+
+    Only the secrets registered in the last `retention_blocks` are kept, and
+    the first synchronization starts at most `retention_blocks` before the
+    latest block, so the memory and the startup time do not grow with the age
+    of the node. This should cover the expiration of the locks, secrets
+    registered before the window are not known.
+    """
+
+    def __init__(
+        self,
+        web3: Web3,
+        contract_manager: ContractManager,
+        secret_registry_address: SecretRegistryAddress,
+        start_block: BlockNumber,
+        confirmation_blocks: BlockTimeout,
+        max_staleness: float,
+        batch_size: BlockNumber,
+        retention_blocks: BlockTimeout,
+    ) -> None:
+        self.web3 = web3
+        self.secret_registry_address = secret_registry_address
+        self.confirmation_blocks = confirmation_blocks
+        self.max_staleness = max_staleness
+        self.batch_size = batch_size
+        self.retention_blocks = retention_blocks
+
+        event_abi = contract_manager.get_event_abi(CONTRACT_SECRET_REGISTRY, EVENT_SECRET_REVEALED)
+        self.topic = to_hex(event_abi_to_log_topic(event_abi))  # type: ignore
+
+        self.synced_block_number = BlockNumber(start_block - 1)
+        self.synced_at: Optional[float] = None
+        # The block in which each secret was first seen registered, ordered by
+        # block number, since the blocks are synchronized in order
+        self.registered_secrethashes: Dict[SecretHash, BlockNumber] = dict()
+
+        self._lock = gevent.lock.Semaphore()
+
+    def __repr__(self) -> str:
+        return (
+            f"<{self.__class__.__name__} "
+            f"address:{to_checksum_address(self.secret_registry_address)} "
+            f"synced_block_number:{self.synced_block_number}>"
+        )
+
+    def is_stale(self) -> bool:
+        return self.synced_at is None or time.monotonic() - self.synced_at >= self.max_staleness
+
+    def on_new_block(self, latest_block: BlockData) -> None:
+        """ AlarmTask callback to follow the latest block. """
+        self.synchronize(latest_block["number"])
+
+    def synchronize(self, latest_block_number: Optional[BlockNumber] = None) -> None:
+        """ Fetch the secrets registered until `latest_block_number`, or until
+        the latest block if it is not given.
+        """
+        with self._lock:
+            self._synchronize(latest_block_number)
+
+    def synchronize_if_stale(self) -> None:
+        """ Synchronize with the latest block if the mirror is stale.
+
+        Concurrent callers wait for a single synchronization, so the lookups
+        for a batch of messages are done with one request.
+        """
+        if self.is_stale():
+            with self._lock:
+                if self.is_stale():
+                    self._synchronize(None)
+
+    def is_secret_registered(self, secrethash: SecretHash) -> bool:
+        """ True if the secret for `secrethash` is registered at the latest
+        block, or was registered in a block which was forked away.
+        """
+        self.synchronize_if_stale()
+        return secrethash in self.registered_secrethashes
+
+    def _synchronize(self, latest_block_number: Optional[BlockNumber]) -> None:
+        if latest_block_number is None:
+            latest_block_number = self.web3.eth.blockNumber
+
+        synced_at = time.monotonic()
+
+        # The last `confirmation_blocks` are queried again, since they may have
+        # been replaced by a fork
+        oldest_retained_block = BlockNumber(latest_block_number - self.retention_blocks + 1)
+        from_block = BlockNumber(
+            max(
+                self.synced_block_number - self.confirmation_blocks + 1,
+                oldest_retained_block,
+                GENESIS_BLOCK_NUMBER,
+            )
+        )
+        while from_block <= latest_block_number:
+            to_block = BlockNumber(min(from_block + self.batch_size - 1, latest_block_number))
+            for secrethash, block_number in self._fetch(from_block, to_block):
+                self.registered_secrethashes.setdefault(secrethash, block_number)
+            from_block = BlockNumber(to_block + 1)
+
+        self._prune(oldest_retained_block)
+
+        self.synced_block_number = max(self.synced_block_number, latest_block_number)
+        self.synced_at = synced_at
+
+    def _prune(self, oldest_retained_block: BlockNumber) -> None:
+        """ Forget the secrets registered before `oldest_retained_block`, the
+        oldest secrets are first in the dictionary.
+        """
+        registered_secrethashes = self.registered_secrethashes
+        while registered_secrethashes:
+            secrethash = next(iter(registered_secrethashes))
+            if registered_secrethashes[secrethash] >= oldest_retained_block:
+                break
+            del registered_secrethashes[secrethash]
+
+    def _fetch(
+        self, from_block: BlockNumber, to_block: BlockNumber
+    ) -> List[Tuple[SecretHash, BlockNumber]]:
+        # The events are queried directly, because the only value of interest
+        # is the indexed secrethash and the events do not need to be decoded.
+        events: Iterable = self.web3.manager.request_blocking(
+            RPCEndpoint("eth_getLogs"),
+            [
+                {
+                    "fromBlock": from_block,
+                    "toBlock": to_block,
+                    "address": to_checksum_address(self.secret_registry_address),
+                    "topics": [self.topic],
+                }
+            ],
+        )
+        return [
+            (SecretHash(bytes(event["topics"][1])), BlockNumber(event["blockNumber"]))
+            for event in events
+        ]
@@ -118,6 +118,14 @@ class EthClient(Enum):
 
 
 SNAPSHOT_STATE_CHANGES_COUNT = 500
+# Maximum number of state changes archived after a snapshot, this is larger
+# than the snapshot interval so that the archiving of an existing database
+# catches up
+ARCHIVE_STATE_CHANGES_BATCH_SIZE = 5_000
+
+# The payments of a batch are routed one after the other, the limit bounds the
+# time until the last one is started
+MAX_PAYMENT_BATCH_SIZE = 1_000
 
 # An arbitrary limit for transaction size in Raiden, added in PR #1990
 TRANSACTION_GAS_LIMIT_UPPER_BOUND = int(0.4 * 3_141_592)
@@ -246,6 +246,12 @@ class EthNodeInterfaceError(RaidenError):
     """ Raised when the underlying ETH node does not support an rpc interface"""
 
 
+class JSONRPCBatchRejected(RaidenError):
+    """ Raised when the ETH node rejects a JSON-RPC batch as a whole, e.g.
+    because it does not support batches.
+    """
+
+
 class AddressWithoutCode(RaidenError):
     """Raised on attempt to execute contract on address without a code."""
 
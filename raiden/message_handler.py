@@ -1,10 +1,11 @@
+from functools import partial
+
 import structlog
 from eth_utils import to_hex
-from gevent import joinall
-from gevent.pool import Pool
+from gevent import Greenlet, joinall
 
 from raiden import routing
-from raiden.constants import ABSENT_SECRET, BLOCK_ID_LATEST
+from raiden.constants import ABSENT_SECRET
 from raiden.messages.abstract import Message
 from raiden.messages.decode import balanceproof_from_envelope, lockedtransfersigned_from_message
 from raiden.messages.synchronization import Delivered, Processed
@@ -40,6 +41,7 @@
     ReceiveWithdrawExpired,
     ReceiveWithdrawRequest,
 )
+from raiden.utils.scheduler import Priority
 from raiden.utils.transfers import random_secret
 from raiden.utils.typing import (
     MYPY_ANNOTATION,
@@ -68,58 +70,66 @@ def on_messages(self, raiden: "RaidenService", messages: List[Message]) -> None:
         # just make the problem worse.
         unique_messages: Set[Message] = set(messages)
 
-        pool = Pool()
+        # Every locked transfer is checked against the secret registry, if the
+        # mirror is stale it is synchronized once for the whole batch.
+        if any(type(message) == LockedTransfer for message in unique_messages):
+            raiden.secret_registry_mirror.synchronize_if_stale()
+
+        # The handlers run in a bounded pool, so that a burst of messages does
+        # not delay the transactions of the node
+        spawn = partial(raiden.scheduler.spawn, Priority.PROTOCOL, "mh-handle_message")
+        greenlets: List[Greenlet] = list()
 
         for message in unique_messages:
             if type(message) == SecretRequest:
                 assert isinstance(message, SecretRequest), MYPY_ANNOTATION
-                pool.apply_async(self.handle_message_secretrequest, (raiden, message))
+                greenlets.append(spawn(self.handle_message_secretrequest, raiden, message))
 
             elif type(message) == RevealSecret:
                 assert isinstance(message, RevealSecret), MYPY_ANNOTATION
-                pool.apply_async(self.handle_message_revealsecret, (raiden, message))
+                greenlets.append(spawn(self.handle_message_revealsecret, raiden, message))
 
             elif type(message) == Unlock:
                 assert isinstance(message, Unlock), MYPY_ANNOTATION
-                pool.apply_async(self.handle_message_unlock, (raiden, message))
+                greenlets.append(spawn(self.handle_message_unlock, raiden, message))
 
             elif type(message) == LockExpired:
                 assert isinstance(message, LockExpired), MYPY_ANNOTATION
-                pool.apply_async(self.handle_message_lockexpired, (raiden, message))
+                greenlets.append(spawn(self.handle_message_lockexpired, raiden, message))
 
             elif type(message) == RefundTransfer:
                 assert isinstance(message, RefundTransfer), MYPY_ANNOTATION
-                pool.apply_async(self.handle_message_refundtransfer, (raiden, message))
+                greenlets.append(spawn(self.handle_message_refundtransfer, raiden, message))
 
             elif type(message) == LockedTransfer:
                 assert isinstance(message, LockedTransfer), MYPY_ANNOTATION
-                pool.apply_async(self.handle_message_lockedtransfer, (raiden, message))
+                greenlets.append(spawn(self.handle_message_lockedtransfer, raiden, message))
 
             elif type(message) == WithdrawRequest:
                 assert isinstance(message, WithdrawRequest), MYPY_ANNOTATION
-                pool.apply_async(self.handle_message_withdrawrequest, (raiden, message))
+                greenlets.append(spawn(self.handle_message_withdrawrequest, raiden, message))
 
             elif type(message) == WithdrawConfirmation:
                 assert isinstance(message, WithdrawConfirmation), MYPY_ANNOTATION
-                pool.apply_async(self.handle_message_withdraw_confirmation, (raiden, message))
+                greenlets.append(spawn(self.handle_message_withdraw_confirmation, raiden, message))
 
             elif type(message) == WithdrawExpired:
                 assert isinstance(message, WithdrawExpired), MYPY_ANNOTATION
-                pool.apply_async(self.handle_message_withdraw_expired, (raiden, message))
+                greenlets.append(spawn(self.handle_message_withdraw_expired, raiden, message))
 
             elif type(message) == Delivered:
                 assert isinstance(message, Delivered), MYPY_ANNOTATION
-                pool.apply_async(self.handle_message_delivered, (raiden, message))
+                greenlets.append(spawn(self.handle_message_delivered, raiden, message))
 
             elif type(message) == Processed:
                 assert isinstance(message, Processed), MYPY_ANNOTATION
-                pool.apply_async(self.handle_message_processed, (raiden, message))
+                greenlets.append(spawn(self.handle_message_processed, raiden, message))
 
             else:
                 log.error(f"Unknown message cmdid {message.cmdid}")
 
         all_state_changes: List[StateChange] = list()
-        for greenlet in joinall(set(pool), raise_error=True):
+        for greenlet in joinall(set(greenlets), raise_error=True):
             all_state_changes.extend(greenlet.get())
 
         if all_state_changes:
@@ -317,9 +327,7 @@ def handle_message_lockedtransfer(
         # For this particular case, it's preferable to use `latest` instead of
         # having a specific block_hash, because it's preferable to know if the secret
         # was ever known, rather than having a consistent view of the blockchain.
-        registered = raiden.default_secret_registry.is_secret_registered(
-            secrethash=secrethash, block_identifier=BLOCK_ID_LATEST
-        )
+        registered = raiden.secret_registry_mirror.is_secret_registered(secrethash)
         if registered:
             log.warning(
                 f"Ignoring received locked transfer with secrethash {to_hex(secrethash)} "
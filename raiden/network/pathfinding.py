@@ -1,6 +1,6 @@
 import json
 import random
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from datetime import datetime
 from uuid import UUID
 
@@ -9,6 +9,7 @@
 import requests
 import structlog
 from eth_utils import decode_hex, encode_hex, to_canonical_address, to_hex
+from gevent.lock import Semaphore
 from web3 import Web3
 
 from raiden.constants import (
@@ -52,7 +53,6 @@
 from raiden_contracts.utils.proofs import sign_one_to_n_iou
 
 log = structlog.get_logger(__name__)
-iou_semaphore = gevent.lock.BoundedSemaphore()
 
 
 @dataclass(frozen=True)
@@ -472,6 +472,88 @@ def create_current_iou(
         return update_iou(iou=latest_iou, privkey=privkey, added_amount=added_amount)
 
 
+class IOUAllocator:
+    """ Hands out monotonically increasing IOUs for concurrent PFS requests.
+
+    The IOU amount for a PFS must increase with every request, which used to
+    force all path queries through a single semaphore held for the whole
+    network round trip. The allocator instead remembers the latest IOU signed
+    for each (sender, receiver, one_to_n_address) triple and reserves the next
+    increment, so every request gets its own IOU and the requests to the PFS
+    can be in flight at the same time. The allocator is shared by all nodes of
+    the process, hence the sender in the key. Only the reservations of the
+    same triple wait for each other, while the latest IOU is fetched from the
+    PFS.
+
+    Because the requests can reach the PFS out of order, an IOU may be
+    rejected. In that case the request is retried with a fresh reservation,
+    which is rebased on top of the latest IOU handed out so far, or, if the PFS
+    disagrees with the local view, after the local view has been dropped and
+    fetched again from the PFS (`invalidate`).
+    """
+
+    def __init__(self) -> None:
+        self._locks: Dict[Tuple[Address, Address, OneToNAddress], Semaphore] = dict()
+        self._latest_ious: Dict[Tuple[Address, Address, OneToNAddress], IOU] = dict()
+
+    def reserve(
+        self,
+        pfs_config: PFSConfig,
+        token_network_address: TokenNetworkAddress,
+        one_to_n_address: OneToNAddress,
+        our_address: Address,
+        privkey: bytes,
+        block_number: BlockNumber,
+        chain_id: ChainID,
+        offered_fee: TokenAmount,
+        scrap_existing_iou: bool = False,
+    ) -> IOU:
+        """ Returns a new signed IOU which is `offered_fee` above the latest one.
+
+        The latest IOU is only fetched from the PFS if there is no local
+        knowledge about it, the lock is never held while the IOU is in use.
+        """
+        key = (our_address, pfs_config.info.payment_address, one_to_n_address)
+
+        with self._locks.setdefault(key, Semaphore()):
+            latest_iou = self._latest_ious.get(key)
+
+            if latest_iou is None or scrap_existing_iou:
+                new_iou = create_current_iou(
+                    pfs_config=pfs_config,
+                    token_network_address=token_network_address,
+                    one_to_n_address=one_to_n_address,
+                    our_address=our_address,
+                    privkey=privkey,
+                    block_number=block_number,
+                    chain_id=chain_id,
+                    offered_fee=offered_fee,
+                    scrap_existing_iou=scrap_existing_iou,
+                )
+            else:
+                new_iou = replace(latest_iou, amount=TokenAmount(latest_iou.amount + offered_fee))
+                new_iou.sign(privkey)
+
+            self._latest_ious[key] = new_iou
+
+        return replace(new_iou)
+
+    def invalidate(self, iou: IOU) -> None:
+        """ Drop the local view of the IOUs for the receiver of `iou`.
+
+        Used when the PFS disagrees with the local state, the next reservation
+        will fetch the latest IOU from the PFS again.
+        """
+        key = (iou.sender, iou.receiver, iou.one_to_n_address)
+        self._latest_ious.pop(key, None)
+
+    def clear(self) -> None:
+        self._latest_ious.clear()
+
+
+iou_allocator = IOUAllocator()
+
+
 def post_pfs_paths(
     url: str, token_network_address: TokenNetworkAddress, payload: Dict[str, Any]
 ) -> Tuple[List[Dict[str, Any]], UUID]:
@@ -555,75 +637,78 @@ def query_paths(
         current_info = get_pfs_info(pfs_config.info.url)
 
     for retries in reversed(range(MAX_PATHS_QUERY_ATTEMPTS)):
-        # Since the IOU amount is monotonically increasing, only a single
-        # greenlet can be in charge of increasing it at the same time. Using a
-        # semaphore in this primitive way limits the speed at which we can do
-        # simultaneous transfers.
+        # The IOU amount is monotonically increasing, the allocator reserves
+        # the increment for this request without blocking concurrent requests
+        # for the duration of the network call.
         # See https://github.com/raiden-network/raiden/issues/5647
-        with iou_semaphore:
-            if offered_fee > 0:
-                new_iou = create_current_iou(
-                    pfs_config=pfs_config,
-                    token_network_address=token_network_address,
-                    one_to_n_address=one_to_n_address,
-                    our_address=our_address,
-                    privkey=privkey,
-                    chain_id=chain_id,
-                    block_number=current_block_number,
-                    offered_fee=offered_fee,
-                    scrap_existing_iou=scrap_existing_iou,
-                )
-                payload["iou"] = new_iou.as_json()
+        new_iou = None
+        if offered_fee > 0:
+            new_iou = iou_allocator.reserve(
+                pfs_config=pfs_config,
+                token_network_address=token_network_address,
+                one_to_n_address=one_to_n_address,
+                our_address=our_address,
+                privkey=privkey,
+                chain_id=chain_id,
+                block_number=current_block_number,
+                offered_fee=offered_fee,
+                scrap_existing_iou=scrap_existing_iou,
+            )
+            payload["iou"] = new_iou.as_json()
+            scrap_existing_iou = False
 
-            log.info(
-                "Requesting paths from Pathfinding Service",
+        log.info(
+            "Requesting paths from Pathfinding Service",
+            url=pfs_config.info.url,
+            token_network_address=to_checksum_address(token_network_address),
+            payload=payload,
+        )
+
+        try:
+            return post_pfs_paths(
                 url=pfs_config.info.url,
-                token_network_address=to_checksum_address(token_network_address),
+                token_network_address=token_network_address,
                 payload=payload,
             )
+        except ServiceRequestIOURejected as error:
+            code = error.error_code
+            log.debug("Pathfinding Service rejected IOU", error=error, details=error.error_details)
+
+            if retries == 0 or code in (PFSError.WRONG_IOU_RECIPIENT, PFSError.DEPOSIT_TOO_LOW):
+                raise
+            elif code in (PFSError.IOU_ALREADY_CLAIMED, PFSError.IOU_EXPIRED_TOO_EARLY):
+                scrap_existing_iou = True
+            elif code == PFSError.INSUFFICIENT_SERVICE_PAYMENT:
+                try:
+                    new_info = get_pfs_info(pfs_config.info.url)
+                except ServiceRequestFailed:
+                    raise ServiceRequestFailed(
+                        "Could not get updated fee information from Pathfinding Service."
+                    )
+                if new_info.price > pfs_config.maximum_fee:
+                    raise ServiceRequestFailed("PFS fees too high.")
+                if new_info.price > pfs_config.info.price:
+                    log.info(f"Pathfinding Service increased fees", new_price=new_info.price)
+                    pfs_config.info = new_info
+                else:
+                    # A concurrent request with a larger IOU reached the PFS
+                    # first. The next reservation is rebased on top of the
+                    # latest IOU, which is larger than all IOUs sent so far.
+                    log.debug(
+                        "IOU overtaken by concurrent Pathfinding Service request",
+                        amount=new_iou.amount if new_iou else None,
+                    )
+            elif code == PFSError.NO_ROUTE_FOUND:
+                log.info(f"Pathfinding Service can not find a route: {error}.")
+                return list(), None
+            elif new_iou is not None:
+                # The PFS does not agree with the local view of the IOUs, fetch
+                # the latest IOU from the PFS for the next attempt.
+                iou_allocator.invalidate(new_iou)
 
-            try:
-                return post_pfs_paths(
-                    url=pfs_config.info.url,
-                    token_network_address=token_network_address,
-                    payload=payload,
-                )
-            except ServiceRequestIOURejected as error:
-                code = error.error_code
-                log.debug(
-                    "Pathfinding Service rejected IOU", error=error, details=error.error_details
-                )
-
-                if retries == 0 or code in (
-                    PFSError.WRONG_IOU_RECIPIENT,
-                    PFSError.DEPOSIT_TOO_LOW,
-                ):
-                    raise
-                elif code in (PFSError.IOU_ALREADY_CLAIMED, PFSError.IOU_EXPIRED_TOO_EARLY):
-                    scrap_existing_iou = True
-                elif code == PFSError.INSUFFICIENT_SERVICE_PAYMENT:
-                    try:
-                        new_info = get_pfs_info(pfs_config.info.url)
-                    except ServiceRequestFailed:
-                        raise ServiceRequestFailed(
-                            "Could not get updated fee information from Pathfinding Service."
-                        )
-                    if new_info.price > pfs_config.maximum_fee:
-                        raise ServiceRequestFailed("PFS fees too high.")
-                    if new_info.price > pfs_config.info.price:
-                        log.info(f"Pathfinding Service increased fees", new_price=new_info.price)
-                        pfs_config.info = new_info
-                    else:
-                        log.error(
-                            f"Concurrent Pathfinding Service requests by same node",
-                            value=str(iou_semaphore),
-                        )
-                elif code == PFSError.NO_ROUTE_FOUND:
-                    log.info(f"Pathfinding Service can not find a route: {error}.")
-                    return list(), None
-                log.info(
-                    f"Pathfinding Service rejected our payment. Reason: {error}. Attempting again."
-                )
+            log.info(
+                f"Pathfinding Service rejected our payment. Reason: {error}. Attempting again."
+            )
 
     # If we got no results after MAX_PATHS_QUERY_ATTEMPTS return empty list of paths
     return list(), None
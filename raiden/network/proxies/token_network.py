@@ -4,6 +4,7 @@
 import structlog
 from eth_utils import encode_hex, is_binary_address, to_canonical_address, to_hex
 from gevent.lock import RLock
+from web3.contract import ContractFunction
 from web3.exceptions import BadFunctionCallOutput
 
 from raiden.constants import (
@@ -60,6 +61,7 @@
     NamedTuple,
     Nonce,
     Optional,
+    Sequence,
     Signature,
     T_ChannelID,
     TokenAddress,
@@ -97,6 +99,13 @@ def raise_if_invalid_address_pair(address1: Address, address2: Address) -> None:
         raise SamePeerAddress("Using the same address for both participants is forbiden.")
 
 
+def raise_if_invalid_channel_identifier(channel_identifier: ChannelID) -> None:
+    if not isinstance(channel_identifier, T_ChannelID):  # pragma: no unittest
+        raise InvalidChannelID("channel_identifier must be of type T_ChannelID")
+    if channel_identifier <= 0 or channel_identifier > UINT256_MAX:
+        raise InvalidChannelID("channel_identifier must be larger then 0 and smaller then uint256")
+
+
 class ChannelData(NamedTuple):
     channel_identifier: ChannelID
     settle_block_number: BlockNumber
@@ -114,6 +123,27 @@ class ParticipantDetails(NamedTuple):
     locked_amount: LockedAmount
 
 
+def make_channel_data(channel_identifier: ChannelID, data: Sequence[Any]) -> ChannelData:
+    return ChannelData(
+        channel_identifier=channel_identifier,
+        settle_block_number=data[ChannelInfoIndex.SETTLE_BLOCK],
+        state=data[ChannelInfoIndex.STATE],
+    )
+
+
+def make_participant_details(address: Address, data: Sequence[Any]) -> ParticipantDetails:
+    return ParticipantDetails(
+        address=address,
+        deposit=data[ParticipantInfoIndex.DEPOSIT],
+        withdrawn=data[ParticipantInfoIndex.WITHDRAWN],
+        is_closer=data[ParticipantInfoIndex.IS_CLOSER],
+        balance_hash=data[ParticipantInfoIndex.BALANCE_HASH],
+        nonce=data[ParticipantInfoIndex.NONCE],
+        locksroot=data[ParticipantInfoIndex.LOCKSROOT],
+        locked_amount=data[ParticipantInfoIndex.LOCKED_AMOUNT],
+    )
+
+
 class ParticipantsDetails(NamedTuple):
     our_details: ParticipantDetails
     partner_details: ParticipantDetails
@@ -418,6 +448,27 @@ def get_channel_identifier_or_none(
         except RaidenRecoverableError:
             return None
 
+    def _participant_info(
+        self, channel_identifier: ChannelID, detail_for: Address, partner: Address
+    ) -> ContractFunction:
+        raise_if_invalid_address_pair(detail_for, partner)
+
+        return self.proxy.functions.getChannelParticipantInfo(
+            channel_identifier=channel_identifier, participant=detail_for, partner=partner
+        )
+
+    def _channel_info(
+        self, participant1: Address, participant2: Address, channel_identifier: ChannelID
+    ) -> ContractFunction:
+        raise_if_invalid_address_pair(participant1, participant2)
+        raise_if_invalid_channel_identifier(channel_identifier)
+
+        return self.proxy.functions.getChannelInfo(
+            channel_identifier=channel_identifier,
+            participant1=participant1,
+            participant2=participant2,
+        )
+
     def _detail_participant(
         self,
         channel_identifier: ChannelID,
@@ -426,22 +477,11 @@ def _detail_participant(
         block_identifier: BlockIdentifier,
     ) -> ParticipantDetails:
         """ Returns a dictionary with the channel participant information. """
-        raise_if_invalid_address_pair(detail_for, partner)
-
-        data = self.proxy.functions.getChannelParticipantInfo(
-            channel_identifier=channel_identifier, participant=detail_for, partner=partner
+        data = self._participant_info(
+            channel_identifier=channel_identifier, detail_for=detail_for, partner=partner
         ).call(block_identifier=block_identifier)
 
-        return ParticipantDetails(
-            address=detail_for,
-            deposit=data[ParticipantInfoIndex.DEPOSIT],
-            withdrawn=data[ParticipantInfoIndex.WITHDRAWN],
-            is_closer=data[ParticipantInfoIndex.IS_CLOSER],
-            balance_hash=data[ParticipantInfoIndex.BALANCE_HASH],
-            nonce=data[ParticipantInfoIndex.NONCE],
-            locksroot=data[ParticipantInfoIndex.LOCKSROOT],
-            locked_amount=data[ParticipantInfoIndex.LOCKED_AMOUNT],
-        )
+        return make_participant_details(detail_for, data)
 
     def _detail_channel(
         self,
@@ -464,23 +504,61 @@ def _detail_channel(
                 participant2=participant2,
                 block_identifier=block_identifier,
             )
-        elif not isinstance(channel_identifier, T_ChannelID):  # pragma: no unittest
-            raise InvalidChannelID("channel_identifier must be of type T_ChannelID")
-        elif channel_identifier <= 0 or channel_identifier > UINT256_MAX:
-            raise InvalidChannelID(
-                "channel_identifier must be larger then 0 and smaller then uint256"
-            )
 
-        channel_data = self.proxy.functions.getChannelInfo(
-            channel_identifier=channel_identifier,
+        channel_data = self._channel_info(
             participant1=participant1,
             participant2=participant2,
+            channel_identifier=channel_identifier,
         ).call(block_identifier=block_identifier)
 
-        return ChannelData(
-            channel_identifier=channel_identifier,
-            settle_block_number=channel_data[ChannelInfoIndex.SETTLE_BLOCK],
-            state=channel_data[ChannelInfoIndex.STATE],
+        return make_channel_data(channel_identifier, channel_data)
+
+    def _detail_participants(
+        self,
+        channel_identifier: ChannelID,
+        participant1: Address,
+        participant2: Address,
+        block_identifier: BlockIdentifier,
+    ) -> Tuple[ParticipantDetails, ParticipantDetails]:
+        """ Returns the details of both participants, queried with a single
+        request to the Ethereum node.
+        """
+        data1, data2 = self.client.batch_call(
+            [
+                self._participant_info(channel_identifier, participant1, participant2),
+                self._participant_info(channel_identifier, participant2, participant1),
+            ],
+            block_identifier=block_identifier,
+        )
+
+        return (
+            make_participant_details(participant1, data1),
+            make_participant_details(participant2, data2),
+        )
+
+    def _detail_channel_and_participants(
+        self,
+        participant1: Address,
+        participant2: Address,
+        block_identifier: BlockIdentifier,
+        channel_identifier: ChannelID,
+    ) -> Tuple[ChannelData, ParticipantDetails, ParticipantDetails]:
+        """ Returns the channel information and the details of both
+        participants, queried with a single request to the Ethereum node.
+        """
+        channel_data, data1, data2 = self.client.batch_call(
+            [
+                self._channel_info(participant1, participant2, channel_identifier),
+                self._participant_info(channel_identifier, participant1, participant2),
+                self._participant_info(channel_identifier, participant2, participant1),
+            ],
+            block_identifier=block_identifier,
+        )
+
+        return (
+            make_channel_data(channel_identifier, channel_data),
+            make_participant_details(participant1, data1),
+            make_participant_details(participant2, data2),
         )
 
     def detail_participants(
@@ -508,23 +586,13 @@ def detail_participants(
                 participant2=participant2,
                 block_identifier=block_identifier,
             )
-        elif not isinstance(channel_identifier, T_ChannelID):  # pragma: no unittest
-            raise InvalidChannelID("channel_identifier must be of type T_ChannelID")
-        elif channel_identifier <= 0 or channel_identifier > UINT256_MAX:
-            raise InvalidChannelID(
-                "channel_identifier must be larger then 0 and smaller then uint256"
-            )
+        else:
+            raise_if_invalid_channel_identifier(channel_identifier)
 
-        our_data = self._detail_participant(
-            channel_identifier=channel_identifier,
-            detail_for=participant1,
-            partner=participant2,
-            block_identifier=block_identifier,
-        )
-        partner_data = self._detail_participant(
+        our_data, partner_data = self._detail_participants(
             channel_identifier=channel_identifier,
-            detail_for=participant2,
-            partner=participant1,
+            participant1=participant1,
+            participant2=participant2,
             block_identifier=block_identifier,
         )
         return ParticipantsDetails(our_details=our_data, partner_details=partner_data)
@@ -548,25 +616,28 @@ def detail(
         if self.node_address == participant2:
             participant1, participant2 = participant2, participant1
 
-        channel_data = self._detail_channel(
+        if channel_identifier is None:
+            channel_identifier = self.get_channel_identifier(
+                participant1=participant1,
+                participant2=participant2,
+                block_identifier=block_identifier,
+            )
+
+        channel_data, our_data, partner_data = self._detail_channel_and_participants(
             participant1=participant1,
             participant2=participant2,
             block_identifier=block_identifier,
             channel_identifier=channel_identifier,
         )
-        participants_data = self.detail_participants(
-            participant1=participant1,
-            participant2=participant2,
-            block_identifier=block_identifier,
-            channel_identifier=channel_data.channel_identifier,
-        )
         chain_id = self.chain_id()
 
         return ChannelDetails(
             chain_id=chain_id,
             token_address=self.token_address(),
             channel_data=channel_data,
-            participants_data=participants_data,
+            participants_data=ParticipantsDetails(
+                our_details=our_data, partner_details=partner_data
+            ),
         )
 
     def settlement_timeout_min(self) -> int:
@@ -737,24 +808,16 @@ def approve_and_set_total_deposit(
                     participant2=partner,
                     block_identifier=given_block_identifier,
                 )
-                channel_onchain_detail = self._detail_channel(
+                (
+                    channel_onchain_detail,
+                    our_details,
+                    partner_details,
+                ) = self._detail_channel_and_participants(
                     participant1=self.node_address,
                     participant2=partner,
                     block_identifier=given_block_identifier,
                     channel_identifier=channel_identifier,
                 )
-                our_details = self._detail_participant(
-                    channel_identifier=channel_identifier,
-                    detail_for=self.node_address,
-                    partner=partner,
-                    block_identifier=given_block_identifier,
-                )
-                partner_details = self._detail_participant(
-                    channel_identifier=channel_identifier,
-                    detail_for=partner,
-                    partner=self.node_address,
-                    block_identifier=given_block_identifier,
-                )
                 current_balance = self.token.balance_of(
                     address=self.node_address, block_identifier=given_block_identifier
                 )
@@ -1198,24 +1261,16 @@ def set_total_withdraw(
         # operations. E.g. this withdraw and a close.
         with self.channel_operations_lock[partner]:
             try:
-                channel_onchain_detail = self._detail_channel(
+                (
+                    channel_onchain_detail,
+                    our_details,
+                    partner_details,
+                ) = self._detail_channel_and_participants(
                     participant1=participant,
                     participant2=partner,
                     block_identifier=given_block_identifier,
                     channel_identifier=channel_identifier,
                 )
-                our_details = self._detail_participant(
-                    channel_identifier=channel_identifier,
-                    detail_for=participant,
-                    partner=partner,
-                    block_identifier=given_block_identifier,
-                )
-                partner_details = self._detail_participant(
-                    channel_identifier=channel_identifier,
-                    detail_for=partner,
-                    partner=participant,
-                    block_identifier=given_block_identifier,
-                )
                 given_block_number = self.client.get_block(given_block_identifier)["number"]
             except ValueError:
                 # If `given_block_identifier` has been pruned the checks cannot be
@@ -1373,16 +1428,10 @@ def _set_total_withdraw(
                     block_identifier=failed_at_blockhash,
                     channel_identifier=channel_identifier,
                 )
-                our_details = self._detail_participant(
+                our_details, partner_details = self._detail_participants(
                     channel_identifier=channel_identifier,
-                    detail_for=participant,
-                    partner=partner,
-                    block_identifier=failed_at_blockhash,
-                )
-                partner_details = self._detail_participant(
-                    channel_identifier=channel_identifier,
-                    detail_for=partner,
-                    partner=participant,
+                    participant1=participant,
+                    participant2=partner,
                     block_identifier=failed_at_blockhash,
                 )
 
@@ -2210,24 +2259,16 @@ def settle(
         # operations. E.g. this settle and a channel open.
         with self.channel_operations_lock[partner]:
             try:
-                channel_onchain_detail = self._detail_channel(
+                (
+                    channel_onchain_detail,
+                    our_details,
+                    partner_details,
+                ) = self._detail_channel_and_participants(
                     participant1=self.node_address,
                     participant2=partner,
                     block_identifier=given_block_identifier,
                     channel_identifier=channel_identifier,
                 )
-                our_details = self._detail_participant(
-                    channel_identifier=channel_identifier,
-                    detail_for=self.node_address,
-                    partner=partner,
-                    block_identifier=given_block_identifier,
-                )
-                partner_details = self._detail_participant(
-                    channel_identifier=channel_identifier,
-                    detail_for=partner,
-                    partner=self.node_address,
-                    block_identifier=given_block_identifier,
-                )
                 given_block_number = self.client.get_block(given_block_identifier)["number"]
             except ValueError:
                 # If `given_block_identifier` has been pruned the checks cannot be
@@ -2360,24 +2401,16 @@ def _settle(
                     block_identifier=failed_at_blocknumber,
                 )
 
-                channel_onchain_detail = self._detail_channel(
+                (
+                    channel_onchain_detail,
+                    our_details,
+                    partner_details,
+                ) = self._detail_channel_and_participants(
                     participant1=self.node_address,
                     participant2=partner,
                     block_identifier=failed_at_blockhash,
                     channel_identifier=channel_identifier,
                 )
-                our_details = self._detail_participant(
-                    channel_identifier=channel_identifier,
-                    detail_for=self.node_address,
-                    partner=partner,
-                    block_identifier=failed_at_blockhash,
-                )
-                partner_details = self._detail_participant(
-                    channel_identifier=channel_identifier,
-                    detail_for=partner,
-                    partner=self.node_address,
-                    block_identifier=failed_at_blockhash,
-                )
 
                 our_balance_hash = hash_balance_data(
                     transferred_amount=transferred_amount,
@@ -2430,24 +2463,16 @@ def _settle(
             failed_at_blockhash = encode_hex(failed_at["hash"])
             failed_at_blocknumber = failed_at["number"]
 
-            channel_onchain_detail = self._detail_channel(
+            (
+                channel_onchain_detail,
+                our_details,
+                partner_details,
+            ) = self._detail_channel_and_participants(
                 participant1=self.node_address,
                 participant2=partner,
                 block_identifier=failed_at_blockhash,
                 channel_identifier=channel_identifier,
             )
-            our_details = self._detail_participant(
-                channel_identifier=channel_identifier,
-                detail_for=self.node_address,
-                partner=partner,
-                block_identifier=failed_at_blockhash,
-            )
-            partner_details = self._detail_participant(
-                channel_identifier=channel_identifier,
-                detail_for=partner,
-                partner=self.node_address,
-                block_identifier=failed_at_blockhash,
-            )
 
             our_balance_hash = hash_balance_data(
                 transferred_amount=transferred_amount,
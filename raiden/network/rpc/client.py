@@ -1,42 +1,52 @@
+import bisect
 import json
+import time
 from abc import ABC
 from dataclasses import dataclass
 from enum import Enum
-from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
 from uuid import uuid4
 
 import gevent
 import structlog
+from eth_abi.exceptions import DecodingError
 from eth_utils import (
     decode_hex,
     encode_hex,
     is_bytes,
     is_checksum_address,
+    to_bytes,
     to_canonical_address,
     to_hex,
+    to_text,
 )
 from eth_utils.toolz import assoc
+from gevent import Greenlet
 from gevent.lock import Semaphore
 from hexbytes import HexBytes
+from requests import HTTPError, Session
 from requests.exceptions import ReadTimeout
-from web3 import Web3
+from web3 import HTTPProvider, Web3
+from web3._utils.abi import get_abi_output_types, map_abi_data
 from web3._utils.contracts import (
     encode_transaction_data,
     find_matching_fn_abi,
     prepare_transaction,
 )
 from web3._utils.empty import empty
-from web3.contract import Contract, ContractFunction
+from web3.contract import Contract, ContractFunction, parse_block_identifier
 from web3.eth import Eth
-from web3.exceptions import TransactionNotFound
+from web3.exceptions import BadFunctionCallOutput, TransactionNotFound
 from web3.gas_strategies.rpc import rpc_gas_price_strategy
 from web3.middleware import geth_poa_middleware
 from web3.types import (
     ABIFunction,
     BlockData,
     FilterParams,
+    GasPriceStrategy,
     LogReceipt,
     RPCEndpoint,
+    RPCResponse,
     TxParams,
     TxReceipt,
     Wei,
@@ -58,13 +68,22 @@
     EthereumNonceTooLow,
     EthNodeInterfaceError,
     InsufficientEth,
+    JSONRPCBatchRejected,
     RaidenError,
     RaidenUnrecoverableError,
     ReplacementTransactionUnderpriced,
 )
-from raiden.network.rpc.middleware import block_hash_cache_middleware
+from raiden.network.rpc.middleware import (
+    RPC_REQUEST_DURATION,
+    block_hash_cache_middleware,
+    block_hash_call_cache_middleware,
+    is_block_hash,
+    rpc_latency_middleware,
+    to_hex_block_hash,
+)
 from raiden.utils.ethereum_clients import is_supported_client
 from raiden.utils.formatting import to_checksum_address
+from raiden.utils.gevent import spawn_named
 from raiden.utils.keys import privatekey_to_address
 from raiden.utils.smart_contracts import safe_gas_limit
 from raiden.utils.typing import (
@@ -92,6 +111,10 @@
 GETH_REQUIRE_OPCODE = "Missing opcode 0xfe"
 PARITY_REQUIRE_ERROR = "Bad instruction"
 
+# Same as the default of the web3 `HTTPProvider`
+BATCH_REQUEST_TIMEOUT = 10
+BATCH_SESSION = Session()
+
 
 def logs_blocks_sanity_check(from_block: BlockIdentifier, to_block: BlockIdentifier) -> None:
     """Checks that the from/to blocks passed onto log calls contain only appropriate types"""
@@ -328,6 +351,86 @@ def discover_next_available_nonce(web3: Web3, eth_node: EthClient, address: Addr
     return available_nonce
 
 
+class NonceAllocator:
+    """ Hands out the nonces for the transactions of a single account.
+
+    A nonce is reserved atomically before the transaction is signed and sent,
+    so that concurrent transactions do not have to wait for the round trip to
+    the Ethereum node of each other. Once the node answered, the reservation
+    is either confirmed, if the transaction used the nonce, or released.
+
+    A released nonce that is lower than the nonce of a transaction already
+    sent leaves a gap, the transactions after the gap are not mined until it
+    is filled. Released nonces are therefore handed out again before any new
+    one, so the next transaction recovers from the gap, and `reserve_gap`
+    allows the gap to be filled without waiting for the next transaction.
+    """
+
+    def __init__(self, available_nonce: Nonce) -> None:
+        self._lock = Semaphore()
+        self._next_nonce = available_nonce
+        self._released: List[Nonce] = list()
+        self._pending: Set[Nonce] = set()
+
+    @property
+    def available_nonce(self) -> Nonce:
+        """ The nonce that will be used by the next transaction. """
+        if self._released:
+            return self._released[0]
+        return self._next_nonce
+
+    @property
+    def pending(self) -> int:
+        """ Number of reserved nonces which are not confirmed nor released. """
+        return len(self._pending)
+
+    def gaps(self) -> List[Nonce]:
+        """ The released nonces that the transactions already sent depend on. """
+        return list(self._released)
+
+    def reserve(self) -> Nonce:
+        with self._lock:
+            if self._released:
+                nonce = self._released.pop(0)
+            else:
+                nonce = self._next_nonce
+                self._next_nonce = Nonce(nonce + 1)
+
+            self._pending.add(nonce)
+            return nonce
+
+    def reserve_gap(self) -> Optional[Nonce]:
+        """ Reserve the lowest gap, if there is still one. """
+        with self._lock:
+            if not self._released:
+                return None
+
+            nonce = self._released.pop(0)
+            self._pending.add(nonce)
+            return nonce
+
+    def confirm(self, nonce: Nonce) -> None:
+        """ The transaction with `nonce` was accepted by the node. """
+        with self._lock:
+            self._pending.remove(nonce)
+
+    def release(self, nonce: Nonce) -> bool:
+        """ The transaction with `nonce` was not accepted by the node, so the
+        nonce has to be used by another transaction.
+
+        Returns True if this left a gap in the account's transactions.
+        """
+        with self._lock:
+            self._pending.remove(nonce)
+            bisect.insort(self._released, nonce)
+
+            # Released nonces at the end of the range are not gaps
+            while self._released and self._released[-1] + 1 == self._next_nonce:
+                self._next_nonce = self._released.pop()
+
+            return nonce in self._released
+
+
 def check_address_has_code(
     client: "JSONRPCClient",
     address: Address,
@@ -604,6 +707,214 @@ def patched_web3_eth_call(
     return HexBytes(result)
 
 
+def post_json_rpc_batch(provider: HTTPProvider, data: bytes) -> bytes:
+    """ Sends the encoded batch `data` to the node of `provider`, with the
+    provider's request arguments.
+    """
+    assert provider.endpoint_uri, MYPY_ANNOTATION
+    request_kwargs = provider.get_request_kwargs()
+    request_kwargs.setdefault("timeout", BATCH_REQUEST_TIMEOUT)
+
+    response = BATCH_SESSION.post(provider.endpoint_uri, data=data, **request_kwargs)
+    response.raise_for_status()
+    return response.content
+
+
+def make_batch_request(
+    provider: HTTPProvider, requests: Sequence[Tuple[RPCEndpoint, Any]]
+) -> List[RPCResponse]:
+    """ Sends `requests` to the node as a single JSON-RPC batch.
+
+    The responses are returned in the same order as the requests. Note that
+    the requests do not go through the web3 middlewares, so the parameters
+    must already be JSON serializable. The duration of the batch is observed
+    into `RPC_REQUEST_DURATION` with the method `batch`.
+
+    Raises:
+        JSONRPCBatchRejected: If the node did not answer the batch with a
+            response for every request, e.g. because it does not support
+            batches.
+    """
+    payload = [
+        {"jsonrpc": "2.0", "method": method, "params": params, "id": request_id}
+        for request_id, (method, params) in enumerate(requests)
+    ]
+    start = time.monotonic()
+    try:
+        raw_response = post_json_rpc_batch(provider, to_bytes(text=json.dumps(payload)))
+    except HTTPError as e:
+        raise JSONRPCBatchRejected(f"The batch was rejected: {e}") from e
+    finally:
+        RPC_REQUEST_DURATION.labels("batch").observe(time.monotonic() - start)
+
+    try:
+        responses = json.loads(to_text(raw_response))
+    except ValueError as e:
+        raise JSONRPCBatchRejected("The batch response is not valid JSON") from e
+
+    # Nodes without batch support answer with a single error object
+    if not isinstance(responses, list):
+        error = responses.get("error", responses) if isinstance(responses, dict) else responses
+        raise JSONRPCBatchRejected(f"The batch was rejected: {error}")
+
+    # The specification allows the responses to be sent in any order
+    responses_by_id: Dict[Any, Any] = {
+        response.get("id"): response for response in responses if isinstance(response, dict)
+    }
+    if any(request_id not in responses_by_id for request_id in range(len(payload))):
+        raise JSONRPCBatchRejected("The batch response is missing responses")
+
+    return [responses_by_id[request_id] for request_id in range(len(payload))]
+
+
+def prepare_contract_call(function: ContractFunction) -> TxParams:
+    """ Returns the `eth_call` transaction for `function`, the same one used
+    by `ContractFunction.call`.
+
+    The proxies are created with binary addresses, these are converted here
+    because the transaction is not formatted by the web3 middlewares.
+    """
+    address = function.address
+    if is_bytes(address):
+        address = to_checksum_address(address)  # type: ignore
+
+    transaction: TxParams = {"to": address}
+    default_account = function.web3.eth.defaultAccount
+    if is_checksum_address(default_account):
+        transaction["from"] = default_account  # type: ignore
+
+    return prepare_transaction(
+        address,
+        function.web3,
+        fn_identifier=function.function_identifier,
+        contract_abi=function.contract_abi,
+        fn_abi=function.abi,
+        transaction=transaction,
+        fn_args=function.args,
+        fn_kwargs=function.kwargs,
+    )
+
+
+def checksum_address_normalizer(type_str: str, data: Any) -> Tuple[str, Any]:
+    """ Returns the addresses checksummed, like the return values of
+    `ContractFunction.call`.
+    """
+    if type_str == "address":
+        return type_str, to_checksum_address(to_canonical_address(data))
+    return type_str, data
+
+
+def decode_contract_call(function: ContractFunction, return_data: bytes) -> Any:
+    """ Decodes the `eth_call` result of `function` like `ContractFunction.call`.
+
+    Raises:
+        BadFunctionCallOutput: If the data could not be decoded, e.g. because
+            the call was reverted or the contract was not deployed.
+    """
+    output_types = get_abi_output_types(function.abi)
+    try:
+        output_data = function.web3.codec.decode_abi(output_types, return_data)
+    except DecodingError as e:
+        msg = (
+            f"Could not decode contract function call {function.function_identifier} "
+            f"return data {return_data!r} for output_types {output_types}"
+        )
+        raise BadFunctionCallOutput(msg) from e
+
+    normalized_data = map_abi_data([checksum_address_normalizer], output_types, output_data)
+
+    if len(normalized_data) == 1:
+        return normalized_data[0]
+
+    return normalized_data
+
+
+def batch_contract_calls(
+    web3: Web3, calls: Sequence[ContractFunction], block_identifier: BlockIdentifier
+) -> List[Any]:
+    """ Executes the read only `calls` with a single JSON-RPC batch request
+    and returns the decoded results, in the same order as `calls`.
+
+    This saves a round trip per call when the Ethereum node is remote.
+    Providers without batch support, like the one used with `eth-tester`, and
+    nodes which reject the batch do one request per call. For a block hash,
+    the results are cached by the `block_hash_call_cache_middleware` of
+    `web3`, and only the calls which are not cached are sent.
+
+    Raises:
+        ValueError: If one of the calls failed, e.g. because the state of
+            `block_identifier` has been pruned.
+        BadFunctionCallOutput: If the result of a call could not be decoded.
+    """
+    if len(calls) < 2 or not isinstance(web3.provider, HTTPProvider):
+        return [call.call(block_identifier=block_identifier) for call in calls]
+
+    eth_call = RPCEndpoint("eth_call")
+    transactions = [prepare_contract_call(call) for call in calls]
+
+    # The batch does not go through the middlewares, so the cache is used here
+    cache_keys: List[Optional[str]] = [None] * len(calls)
+    responses: List[Optional[RPCResponse]] = [None] * len(calls)
+    cache = block_hash_call_cache_middleware
+    installed = cache in web3.middleware_onion  # type: ignore
+    if installed and is_block_hash(block_identifier):
+        cache_keys = [
+            cache.cache_key(eth_call, [transaction, block_identifier])
+            for transaction in transactions
+        ]
+        responses = [None if key is None else cache.get(key) for key in cache_keys]
+
+    cached = any(cache_key is not None for cache_key in cache_keys)
+    missing = [position for position, response in enumerate(responses) if response is None]
+    if missing:
+        block_id: Any
+        if cached and cache.supports_block_hash_params(web3):
+            block_id = {"blockHash": to_hex_block_hash(block_identifier)}
+        else:
+            # Resolve block hashes exactly as `ContractFunction.call` does, since
+            # not every supported client accepts a block hash for `eth_call`.
+            block_id = parse_block_identifier(web3, block_identifier)
+
+        block_number = block_id if isinstance(block_id, int) else None
+        if block_number is not None:
+            block_id = hex(block_number)
+
+        try:
+            missing_responses = make_batch_request(
+                web3.provider,
+                [(eth_call, [transactions[position], block_id]) for position in missing],
+            )
+        except JSONRPCBatchRejected as e:
+            log.warning("JSON-RPC batch rejected, doing the calls one by one", error=str(e))
+            return [call.call(block_identifier=block_identifier) for call in calls]
+
+        # The block number may have been reorged away from the block hash
+        if cached and block_number is not None:
+            canonical_hash = web3.eth.getBlock(BlockNumber(block_number))["hash"]
+            cached = to_hex_block_hash(canonical_hash) == to_hex_block_hash(block_identifier)
+
+        for position, batch_response in zip(missing, missing_responses):
+            responses[position] = batch_response
+            cache_key = cache_keys[position]
+            if cached and cache_key is not None:
+                cache.put(cache_key, batch_response)
+
+    results = list()
+    for call, response in zip(calls, responses):
+        assert response is not None, MYPY_ANNOTATION
+        if "error" in response:
+            error = ValueError(response["error"])
+            if not check_value_error_for_parity(error, ParityCallType.CALL):
+                raise error
+            return_data = HexBytes("")
+        else:
+            return_data = HexBytes(response["result"])
+
+        results.append(decode_contract_call(call, return_data))
+
+    return results
+
+
 def estimate_gas_for_function(
     address: Address,
     web3: Web3,
@@ -680,10 +991,17 @@ def patched_contractfunction_estimateGas(
     )
 
 
-def monkey_patch_web3(web3: Web3, gas_price_strategy: Callable) -> None:
+def monkey_patch_web3(web3: Web3, gas_price_strategy: GasPriceStrategy) -> None:
     try:
         # install caching middleware
         web3.middleware_onion.add(block_hash_cache_middleware)
+        # added last to be the outermost layer, so that it also sees the
+        # `eth_getBlockByHash` responses which are served from the cache
+        web3.middleware_onion.add(block_hash_call_cache_middleware)
+
+        # the request durations are observed closest to the provider, so that
+        # cache hits are not counted
+        web3.middleware_onion.inject(rpc_latency_middleware, layer=0)
 
         # set gas price strategy
         web3.eth.setGasPriceStrategy(gas_price_strategy)
@@ -930,7 +1248,7 @@ def __init__(
         self,
         web3: Web3,
         privkey: PrivateKey,
-        gas_price_strategy: Callable = rpc_gas_price_strategy,
+        gas_price_strategy: GasPriceStrategy = rpc_gas_price_strategy,
         block_num_confirmations: int = 0,
     ) -> None:
         if len(privkey) != 32:
@@ -954,13 +1272,17 @@ def __init__(
         self.privkey = privkey
         self.address = address
         self.web3 = web3
+        self.gas_price_strategy = gas_price_strategy
         self.default_block_num_confirmations = block_num_confirmations
 
         # Ask for the chain id only once and store it here
         self.chain_id = ChainID(self.web3.eth.chainId)
 
-        self._available_nonce = available_nonce
-        self._nonce_lock = Semaphore()
+        self._nonces = NonceAllocator(available_nonce)
+
+        # Receives the greenlets the client spawns in the background, the node
+        # uses it to crash on their errors
+        self.add_pending_greenlet: Optional[Callable[[Greenlet], None]] = None
 
         log.debug(
             "JSONRPCClient created",
@@ -976,6 +1298,77 @@ def __repr__(self) -> str:
             f">"
         )
 
+    @property
+    def _available_nonce(self) -> Nonce:
+        return self._nonces.available_nonce
+
+    def _release_nonce(self, nonce: Nonce) -> None:
+        if self._nonces.release(nonce):
+            log.warning(
+                "Nonce gap, the transactions sent afterwards are stalled until it is used",
+                node=to_checksum_address(self.address),
+                nonce=nonce,
+                gaps=self._nonces.gaps(),
+            )
+            greenlet = spawn_named("rpc-fill_nonce_gap", self._fill_nonce_gap)
+            if self.add_pending_greenlet is not None:
+                self.add_pending_greenlet(greenlet)
+
+    def _fill_nonce_gap(self) -> None:
+        """ Send an empty ether transfer to ourselves with the lowest released
+        nonce, so that the transactions after the gap are mined even if no
+        other transaction is sent.
+
+        Nothing is sent if another transaction used the nonce in the meantime.
+        A failure leaves the gap to the next transaction.
+
+        The transaction reaches the node after the transactions with higher
+        nonces, the transaction pool of the node holds those until the gap is
+        filled.
+        """
+        gas_price = gas_price_for_fast_transaction(self.web3)
+        nonce = self._nonces.reserve_gap()
+        if nonce is None:
+            return
+
+        transaction_data = {
+            "to": to_checksum_address(self.address),
+            "gas": TRANSACTION_INTRINSIC_GAS,
+            "nonce": nonce,
+            "value": 0,
+            "gasPrice": gas_price,
+        }
+        try:
+            signed_txn = self.web3.eth.account.sign_transaction(transaction_data, self.privkey)
+            tx_hash = self.web3.eth.sendRawTransaction(signed_txn.rawTransaction)
+        except ValueError as e:
+            action = inspect_client_error(e, self.eth_node)
+
+            # The transaction which released the nonce reached the node after all
+            if action in THE_NONCE_WAS_REUSED or (
+                action == ClientErrorInspectResult.TRANSACTION_UNDERPRICED
+            ):
+                self._nonces.confirm(nonce)
+            else:
+                self._nonces.release(nonce)
+                log.error(
+                    "Nonce gap could not be filled",
+                    node=to_checksum_address(self.address),
+                    nonce=nonce,
+                    error=str(e),
+                )
+        except BaseException:
+            self._nonces.release(nonce)
+            raise
+        else:
+            self._nonces.confirm(nonce)
+            log.info(
+                "Nonce gap filled",
+                node=to_checksum_address(self.address),
+                nonce=nonce,
+                transaction_hash=encode_hex(tx_hash),
+            )
+
     def block_number(self) -> BlockNumber:
         """ Return the most recent block. """
         return self.web3.eth.blockNumber
@@ -1153,93 +1546,82 @@ def to_log_details(self) -> Dict[str, Any]:
                 )
                 return log_details
 
+        # The nonce is reserved instead of holding a lock until the node
+        # answered, this allows concurrent transactions to be sent without
+        # waiting for each other.
+        available_nonce = self._nonces.reserve()
         try:
-            with self._nonce_lock:
-                # This value can only be updated after the transaction is sent, the
-                # lock has to be held until then.
-                available_nonce = self._available_nonce
-
-                # A EthTransfer doesn't need gas estimation, it should always
-                # use the `TRANSACTION_INTRINSIC_GAS`. This is why it has a
-                # special case.
-                if isinstance(transaction, EthTransfer):
-                    slot = TransactionSlot(
-                        from_address=self.address,
-                        eth_node=self.eth_node,
-                        data=transaction,
-                        extra_log_details={},
-                        startgas=TRANSACTION_INTRINSIC_GAS,
-                        gas_price=transaction.gas_price,
-                        nonce=available_nonce,
-                    )
-                else:
-                    slot = TransactionSlot(
-                        from_address=transaction.from_address,
-                        eth_node=transaction.eth_node,
-                        data=transaction.data,
-                        extra_log_details=transaction.extra_log_details,
-                        startgas=transaction.estimated_gas,
-                        gas_price=transaction.gas_price,
-                        nonce=available_nonce,
-                    )
 
-                log_details = slot.to_log_details()
+            # A EthTransfer doesn't need gas estimation, it should always
+            # use the `TRANSACTION_INTRINSIC_GAS`. This is why it has a
+            # special case.
+            if isinstance(transaction, EthTransfer):
+                slot = TransactionSlot(
+                    from_address=self.address,
+                    eth_node=self.eth_node,
+                    data=transaction,
+                    extra_log_details={},
+                    startgas=TRANSACTION_INTRINSIC_GAS,
+                    gas_price=transaction.gas_price,
+                    nonce=available_nonce,
+                )
+            else:
+                slot = TransactionSlot(
+                    from_address=transaction.from_address,
+                    eth_node=transaction.eth_node,
+                    data=transaction.data,
+                    extra_log_details=transaction.extra_log_details,
+                    startgas=transaction.estimated_gas,
+                    gas_price=transaction.gas_price,
+                    nonce=available_nonce,
+                )
 
-                if isinstance(slot.data, SmartContractCall):
-                    function_call = slot.data
-                    data = get_transaction_data(
-                        web3=function_call.contract.web3,
-                        abi=function_call.contract.abi,
-                        function_name=function_call.function,
-                        args=function_call.args,
-                        kwargs=function_call.kwargs,
-                    )
-                    transaction_data = {
-                        "data": decode_hex(data),
-                        "gas": slot.startgas,
-                        "nonce": slot.nonce,
-                        "value": slot.data.value,
-                        "to": function_call.contract.address,
-                        "gasPrice": slot.gas_price,
-                    }
+            log_details = slot.to_log_details()
 
-                    log.debug(
-                        "Transaction to call smart contract function will be sent", **log_details
-                    )
-                elif isinstance(slot.data, EthTransfer):
-                    transaction_data = {
-                        "to": to_checksum_address(slot.data.to_address),
-                        "gas": slot.startgas,
-                        "nonce": slot.nonce,
-                        "value": slot.data.value,
-                        "gasPrice": slot.gas_price,
-                    }
+            if isinstance(slot.data, SmartContractCall):
+                function_call = slot.data
+                data = get_transaction_data(
+                    web3=function_call.contract.web3,
+                    abi=function_call.contract.abi,
+                    function_name=function_call.function,
+                    args=function_call.args,
+                    kwargs=function_call.kwargs,
+                )
+                transaction_data = {
+                    "data": decode_hex(data),
+                    "gas": slot.startgas,
+                    "nonce": slot.nonce,
+                    "value": slot.data.value,
+                    "to": function_call.contract.address,
+                    "gasPrice": slot.gas_price,
+                }
 
-                    log.debug("Transaction to transfer ether will be sent", **log_details)
-                else:
-                    transaction_data = {
-                        "data": slot.data.bytecode,
-                        "gas": slot.startgas,
-                        "nonce": slot.nonce,
-                        "value": 0,
-                        "gasPrice": slot.gas_price,
-                    }
+                log.debug(
+                    "Transaction to call smart contract function will be sent", **log_details
+                )
+            elif isinstance(slot.data, EthTransfer):
+                transaction_data = {
+                    "to": to_checksum_address(slot.data.to_address),
+                    "gas": slot.startgas,
+                    "nonce": slot.nonce,
+                    "value": slot.data.value,
+                    "gasPrice": slot.gas_price,
+                }
 
-                    log.debug("Transaction to deploy smart contract will be sent", **log_details)
+                log.debug("Transaction to transfer ether will be sent", **log_details)
+            else:
+                transaction_data = {
+                    "data": slot.data.bytecode,
+                    "gas": slot.startgas,
+                    "nonce": slot.nonce,
+                    "value": 0,
+                    "gasPrice": slot.gas_price,
+                }
 
-                signed_txn = client.web3.eth.account.sign_transaction(
-                    transaction_data, client.privkey
-                )
-                tx_hash = client.web3.eth.sendRawTransaction(signed_txn.rawTransaction)
+                log.debug("Transaction to deploy smart contract will be sent", **log_details)
 
-                # Increase the `nonce` only after sending the transaction. This
-                # is necessary because the send itself can fail, e.g. because
-                # of an invalid value which leads to a `ValueError` or if the
-                # received node rejects the transaction. When this happens, the
-                # `_available_nonce` must not be incremented, since that may
-                # lead to gaps in the account's transactions, effectivelly
-                # stalling all transactions until the spare nonce is used.
-                self._available_nonce = Nonce(self._available_nonce + 1)
+            signed_txn = client.web3.eth.account.sign_transaction(transaction_data, client.privkey)
+            tx_hash = client.web3.eth.sendRawTransaction(signed_txn.rawTransaction)
 
         except ValueError as e:
             if isinstance(slot.data, SmartContractCall):
@@ -1251,6 +1633,16 @@ def to_log_details(self) -> Dict[str, Any]:
 
             action = inspect_client_error(e, self.eth_node)
 
+            # The send can fail, e.g. because of an invalid value or if the
+            # node rejects the transaction. When this happens the nonce was not
+            # used and must be given to another transaction, otherwise all
+            # the following transactions are stalled. The exception is the
+            # reuse of a nonce, which is then used by another transaction.
+            if action in THE_NONCE_WAS_REUSED:
+                self._nonces.confirm(available_nonce)
+            else:
+                self._release_nonce(available_nonce)
+
             if action == ClientErrorInspectResult.INSUFFICIENT_FUNDS:
                 reason = (
                     "Transaction failed due to insufficient ETH balance. "
@@ -1283,6 +1675,11 @@ def to_log_details(self) -> Dict[str, Any]:
             reason = f"Unexpected error in underlying Ethereum node: {str(e)}"
             log.critical(error_msg, **log_details, reason=reason)
             raise RaidenUnrecoverableError(reason)
+        except BaseException:
+            self._release_nonce(available_nonce)
+            raise
+        else:
+            self._nonces.confirm(available_nonce)
 
         transaction_sent = TransactionSentImplementation(
             from_address=slot.from_address,
@@ -1297,6 +1694,14 @@ def to_log_details(self) -> Dict[str, Any]:
         log.debug("Transaction sent", **transaction_sent.to_log_details())
         return transaction_sent
 
+    def batch_call(
+        self, calls: Sequence[ContractFunction], block_identifier: BlockIdentifier
+    ) -> List[Any]:
+        """ Executes the read only `calls` at `block_identifier` with a single
+        request to the Ethereum node. See `batch_contract_calls`.
+        """
+        return batch_contract_calls(self.web3, calls, block_identifier)
+
     def new_contract_proxy(self, abi: ABI, contract_address: Address) -> Contract:
         return self.web3.eth.contract(abi=abi, address=contract_address)
 
@@ -1,12 +1,70 @@
 import functools
+import json
+import math
+import operator
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from weakref import WeakKeyDictionary
 
+import gevent
+import structlog
 from cachetools import LRUCache
+from eth_typing import HexStr
+from eth_utils import is_0x_prefixed, is_hex, to_hex
+from requests.exceptions import RequestException
+from web3 import Web3
+from web3._utils.caching import generate_cache_key
+from web3.exceptions import BlockNotFound
 from web3.gas_strategies.time_based import construct_time_based_gas_price_strategy
 from web3.middleware.cache import construct_simple_cache_middleware
-from web3.types import RPCEndpoint
+from web3.types import (
+    BlockData,
+    BlockIdentifier,
+    GasPriceStrategy,
+    RPCEndpoint,
+    RPCResponse,
+    TxParams,
+    Wei,
+)
+
+from raiden.constants import EthClient
+from raiden.utils.ethereum_clients import is_supported_client
+from raiden.utils.metrics import REGISTRY
+from raiden.utils.typing import (
+    Any,
+    BlockNumber,
+    Callable,
+    Collection,
+    Deque,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+log = structlog.get_logger(__name__)
 
 BLOCK_HASH_CACHE_RPC_WHITELIST = {RPCEndpoint("eth_getBlockByHash")}
 
+# Requests whose last parameter is the block identifier, their result is
+# immutable once the block identifier is a block hash.
+BLOCK_HASH_CALL_CACHE_RPC_WHITELIST = {
+    RPCEndpoint("eth_call"),
+    RPCEndpoint("eth_getCode"),
+    RPCEndpoint("eth_getBalance"),
+}
+BLOCK_HASH_CALL_CACHE_SIZE = 1024
+
+RPC_REQUEST_DURATION = REGISTRY.histogram(
+    "raiden_rpc_request_seconds",
+    "Time to do a JSON-RPC request to the Ethereum client",
+    ["method"],
+)
+
 
 block_hash_cache_middleware = construct_simple_cache_middleware(
     # default sample size of gas price strategies is 120
@@ -17,3 +75,543 @@
 faster_gas_price_strategy = construct_time_based_gas_price_strategy(
     max_wait_seconds=15, sample_size=120, probability=99
 )
+
+
+def is_block_hash(block_identifier: Any) -> bool:
+    """ True if `block_identifier` is a block hash, either as bytes or hex
+    encoded. Block numbers and tags like `latest` are not.
+    """
+    if isinstance(block_identifier, bytes):
+        return len(block_identifier) == 32
+
+    if isinstance(block_identifier, str):
+        return (
+            len(block_identifier) == 66
+            and is_0x_prefixed(block_identifier)
+            and is_hex(block_identifier)
+        )
+
+    return False
+
+
+def to_hex_block_hash(block_hash: Any) -> str:
+    if isinstance(block_hash, str):
+        return block_hash.lower()
+    return to_hex(block_hash)
+
+
+class BlockHashCallCacheMiddleware:
+    """ Caches the result of requests pinned to a block hash.
+
+    The proxies do many identical `eth_call`s at the same confirmed block
+    while handling a batch of blockchain events. The result of these calls
+    can not change, so they are served from a bounded LRU cache. Requests for
+    a block number or a tag like `latest` are always forwarded, since these
+    can be affected by reorgs.
+
+    The contract proxies of web3 resolve a block hash to its number before
+    doing the `eth_call`, through an `eth_getBlockByHash` request. The number
+    returned for that request is remembered for the current greenlet, and the
+    following request for that number is keyed by the hash it was resolved
+    from. Only that request is, a block number which is requested directly can
+    still be affected by reorgs. The number may have been reorged away from
+    the hash in the meantime, so the request is sent for the hash instead
+    (EIP-1898) if the client supports it. Otherwise its result is only cached
+    if the hash is still the canonical block of that number afterwards.
+
+    The cache is shared by every web3 instance the middleware is added to,
+    this is safe because the block hash is part of the key.
+    """
+
+    def __init__(
+        self,
+        size: int = BLOCK_HASH_CALL_CACHE_SIZE,
+        rpc_whitelist: Collection[RPCEndpoint] = BLOCK_HASH_CALL_CACHE_RPC_WHITELIST,
+    ) -> None:
+        self.size = size
+        self.rpc_whitelist = rpc_whitelist
+        self.cache: LRUCache = LRUCache(size)
+        # The block number and hash of the last `eth_getBlockByHash` response
+        # of each greenlet, these are only used for the next request.
+        self.resolved_block_hashes: WeakKeyDictionary = WeakKeyDictionary()
+        # Whether the client of each web3 instance accepts a block hash as the
+        # block parameter
+        self.block_hash_params_support: WeakKeyDictionary = WeakKeyDictionary()
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self) -> None:
+        self.cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def generate_report(self) -> Dict[str, int]:
+        return {"size": len(self.cache), "hits": self.hits, "misses": self.misses}
+
+    def cache_key(self, method: RPCEndpoint, params: Any, block_hash: Any = None) -> Optional[str]:
+        """ The key of the request in the cache, or None if its result can
+        change. `block_hash` is the hash the block number of the request was
+        resolved from, if any.
+        """
+        if method not in self.rpc_whitelist or not params:
+            return None
+
+        block_identifier = params[-1] if block_hash is None else block_hash
+        if not is_block_hash(block_identifier):
+            return None
+
+        if isinstance(block_identifier, bytes):
+            block_identifier = to_hex(block_identifier)
+
+        return generate_cache_key((method, [*params[:-1], block_identifier]))
+
+    def supports_block_hash_params(self, web3: Web3) -> bool:
+        """ True if the client accepts `{"blockHash": ...}` as the block
+        parameter of the cached requests, as specified by EIP-1898.
+        """
+        supported = self.block_hash_params_support.get(web3)
+        if supported is None:
+            _, eth_node, _ = is_supported_client(web3.clientVersion)
+            supported = eth_node == EthClient.GETH
+            self.block_hash_params_support[web3] = supported
+        return supported
+
+    @staticmethod
+    def is_canonical(
+        make_request: Callable[[RPCEndpoint, Any], RPCResponse], block_number: Any, block_hash: Any
+    ) -> bool:
+        """ True if `block_hash` is the block with `block_number` in the chain
+        of the client.
+        """
+        response = make_request(RPCEndpoint("eth_getBlockByNumber"), [block_number, False])
+        block = response.get("result")
+        if "error" in response or block is None:
+            return False
+        return to_hex_block_hash(block["hash"]) == to_hex_block_hash(block_hash)
+
+    def get(self, cache_key: str) -> Optional[RPCResponse]:
+        response = self.cache.get(cache_key)
+        if response is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return response
+
+    def put(self, cache_key: str, response: RPCResponse) -> None:
+        if "error" not in response and response.get("result") is not None:
+            self.cache[cache_key] = response
+
+    def __call__(
+        self, make_request: Callable[[RPCEndpoint, Any], RPCResponse], web3: Web3
+    ) -> Callable[[RPCEndpoint, Any], RPCResponse]:
+        def middleware(method: RPCEndpoint, params: Any) -> RPCResponse:
+            if method == RPCEndpoint("eth_getBlockByHash"):
+                block_response = make_request(method, params)
+                block = block_response.get("result")
+                if "error" not in block_response and block is not None:
+                    self.resolved_block_hashes[gevent.getcurrent()] = (
+                        block["number"],
+                        block["hash"],
+                    )
+                return block_response
+
+            resolved = self.resolved_block_hashes.pop(gevent.getcurrent(), None)
+            block_hash = None
+            if resolved is not None and params and resolved[0] == params[-1]:
+                block_hash = resolved[1]
+
+            cache_key = self.cache_key(method, params, block_hash)
+            if cache_key is None:
+                return make_request(method, params)
+
+            response = self.get(cache_key)
+            if response is not None:
+                return response
+
+            if block_hash is None:
+                response = make_request(method, params)
+                self.put(cache_key, response)
+            elif self.supports_block_hash_params(web3):
+                block_param = {"blockHash": to_hex_block_hash(block_hash)}
+                response = make_request(method, [*params[:-1], block_param])
+                self.put(cache_key, response)
+            else:
+                response = make_request(method, params)
+                if self.is_canonical(make_request, params[-1], block_hash):
+                    self.put(cache_key, response)
+
+            return response
+
+        return middleware
+
+
+block_hash_call_cache_middleware = BlockHashCallCacheMiddleware()
+
+
+def rpc_latency_middleware(
+    make_request: Callable[[RPCEndpoint, Any], RPCResponse], web3: Web3  # pylint: disable=W0613
+) -> Callable[[RPCEndpoint, Any], RPCResponse]:
+    """ Observes the duration of the requests which reach the Ethereum client,
+    per JSON-RPC method, into `RPC_REQUEST_DURATION`.
+    """
+
+    def middleware(method: RPCEndpoint, params: Any) -> RPCResponse:
+        start = time.monotonic()
+        try:
+            return make_request(method, params)
+        finally:
+            RPC_REQUEST_DURATION.labels(method).observe(time.monotonic() - start)
+
+    return middleware
+
+
+class BlockGasPrices(NamedTuple):
+    number: BlockNumber
+    block_hash: str
+    timestamp: int
+    miner: str
+    gas_prices: Tuple[int, ...]
+
+
+class MinerData(NamedTuple):
+    miner: str
+    num_blocks: int
+    min_gas_price: int
+    low_percentile_gas_price: float
+
+
+class Probability(NamedTuple):
+    gas_price: float
+    prob: float
+
+
+# The functions below are copied from web3's time based gas price strategy,
+# since they are private there and may change with any release.
+
+
+def _percentile(values: Collection[int], percentile: float) -> float:
+    """ The simplified weighted average percentile of web3.
+
+    Raises:
+        ValueError: If `values` is empty.
+    """
+    if not values:
+        raise ValueError("Expected a sequence of at least 1 integers")
+
+    sorted_values = sorted(values)
+
+    rank = len(values) * percentile / 100
+    if rank > 0:
+        index = rank - 1
+        if index < 0:
+            return sorted_values[0]
+    else:
+        index = rank
+
+    if index % 1 == 0:
+        return sorted_values[int(index)]
+
+    fractional = index % 1
+    integer = int(index - fractional)
+    lower = sorted_values[integer]
+    higher = sorted_values[integer + 1]
+    return lower + fractional * (higher - lower)
+
+
+def _aggregate_miner_data(blocks: Collection[BlockGasPrices]) -> List[MinerData]:
+    """ The gas prices accepted by each miner, blocks without transactions
+    are not counted.
+    """
+    block_hashes: Dict[str, Set[str]] = defaultdict(set)
+    gas_prices: Dict[str, Set[int]] = defaultdict(set)
+    for block in blocks:
+        if block.gas_prices:
+            block_hashes[block.miner].add(block.block_hash)
+            gas_prices[block.miner].update(block.gas_prices)
+
+    return [
+        MinerData(
+            miner=miner,
+            num_blocks=len(block_hashes[miner]),
+            min_gas_price=min(miner_gas_prices),
+            low_percentile_gas_price=_percentile(miner_gas_prices, percentile=20),
+        )
+        for miner, miner_gas_prices in gas_prices.items()
+    ]
+
+
+def _compute_probabilities(
+    miner_data: Collection[MinerData], wait_blocks: int, sample_size: int
+) -> List[Probability]:
+    """ The probabilities that a transaction is accepted at each of the gas
+    prices accepted by the miners, sorted by decreasing gas price.
+    """
+    miner_data_by_price = sorted(
+        miner_data, key=operator.attrgetter("low_percentile_gas_price"), reverse=True
+    )
+
+    probabilities = list()
+    for idx, data in enumerate(miner_data_by_price):
+        num_blocks_accepting_price = sum(m.num_blocks for m in miner_data_by_price[idx:])
+        inv_prob_per_block = (sample_size - num_blocks_accepting_price) / sample_size
+        probability_accepted = 1 - inv_prob_per_block ** wait_blocks
+        probabilities.append(Probability(data.low_percentile_gas_price, probability_accepted))
+
+    return probabilities
+
+
+def _compute_gas_price(probabilities: Sequence[Probability], desired_probability: float) -> Wei:
+    """ The gas price at which `desired_probability` falls within
+    `probabilities`, interpolated between the two closest probabilities.
+    """
+    first = probabilities[0]
+    last = probabilities[-1]
+
+    if desired_probability >= first.prob:
+        return Wei(int(first.gas_price))
+    if desired_probability <= last.prob:
+        return Wei(int(last.gas_price))
+
+    for left, right in zip(probabilities, probabilities[1:]):
+        if desired_probability < right.prob:
+            continue
+
+        assert desired_probability <= left.prob, "probabilities must be sorted"
+
+        adj_prob = desired_probability - right.prob
+        window_size = left.prob - right.prob
+        position = adj_prob / window_size
+        gas_window_size = left.gas_price - right.gas_price
+        return Wei(int(math.ceil(right.gas_price + gas_window_size * position)))
+
+    raise AssertionError("probabilities must be sorted")
+
+
+class GasPriceOracle:
+    """ A time based gas price strategy fed by the alarm task.
+
+    It computes the same gas price as web3's time based strategy, but instead
+    of fetching the `sample_size` most recent blocks for every transaction,
+    each new block is fetched once by the alarm task callback `ingest`. The
+    gas price is recomputed once per block, so the strategy itself is O(1).
+
+    Until enough blocks are known the `fallback` strategy is used, by default
+    web3's time based strategy with the same parameters. At most
+    `blocks_per_ingest` blocks are fetched per call, so that filling the window
+    after a start does not delay the other alarm task callbacks, the window is
+    filled over the next blocks instead.
+
+    The window of blocks can be persisted with `load` and `save`, so that it
+    does not have to be fetched again after a restart. If more blocks than a
+    call can fetch were missed, they are backfilled over the next calls, up
+    to `sample_size` blocks, while the gas price of the previous window is
+    used.
+    """
+
+    def __init__(
+        self,
+        max_wait_seconds: int,
+        sample_size: int = 120,
+        probability: int = 98,
+        fallback: Optional[GasPriceStrategy] = None,
+        blocks_per_ingest: int = 10,
+    ) -> None:
+        if fallback is None:
+            fallback = construct_time_based_gas_price_strategy(
+                max_wait_seconds=max_wait_seconds, sample_size=sample_size, probability=probability
+            )
+
+        self.max_wait_seconds = max_wait_seconds
+        self.sample_size = sample_size
+        self.blocks_per_ingest = blocks_per_ingest
+        self.probability = probability
+        self.fallback = fallback
+        self.path: Optional[Path] = None
+
+        self._window: Deque[BlockGasPrices] = deque(maxlen=sample_size)
+        self._gas_price: Optional[Wei] = None
+
+        # The blocks newer than the window which are not connected to it yet,
+        # newest first, and the hash of the parent of the oldest one.
+        self._backfill: List[BlockGasPrices] = list()
+        self._backfill_parent: Optional[HexStr] = None
+
+    def __call__(self, web3: Web3, transaction_params: TxParams) -> Wei:
+        if self._gas_price is None:
+            return self.fallback(web3, transaction_params)
+        return self._gas_price
+
+    @property
+    def gas_price(self) -> Optional[Wei]:
+        return self._gas_price
+
+    @property
+    def window(self) -> List[BlockGasPrices]:
+        return list(self._window)
+
+    def ingest(self, web3: Web3, latest_block: BlockData) -> None:
+        """ Adds `latest_block` and the blocks missed since the previous call
+        to the window. Blocks which were reorged away are replaced.
+
+        This is an alarm task callback, a failed request is logged and the
+        window is updated with the next block.
+        """
+        try:
+            self._ingest(web3, latest_block)
+        except (RequestException, BlockNotFound, ValueError) as e:
+            log.warning("Could not update the gas price window", error=str(e))
+
+    @staticmethod
+    def _fetch_block(
+        web3: Web3, block_identifier: BlockIdentifier
+    ) -> Tuple[BlockGasPrices, HexStr]:
+        """ The gas prices of the block and the hash of its parent. """
+        block = web3.eth.getBlock(block_identifier, full_transactions=True)
+        gas_prices = BlockGasPrices(
+            number=block["number"],
+            block_hash=to_hex(block["hash"]),
+            timestamp=block["timestamp"],
+            miner=block["miner"],
+            gas_prices=tuple(
+                transaction["gasPrice"] for transaction in block["transactions"]  # type: ignore
+            ),
+        )
+        return gas_prices, to_hex(block["parentHash"])
+
+    def _connect_backfill(self) -> None:
+        """ Moves the backfilled blocks to the window, replacing the reorged
+        blocks of the window.
+        """
+        oldest_new_block = self._backfill[-1].number
+        while self._window and self._window[-1].number >= oldest_new_block:
+            self._window.pop()
+
+        self._window.extend(reversed(self._backfill))
+        self._backfill = list()
+        self._backfill_parent = None
+
+    def _ingest(self, web3: Web3, latest_block: BlockData) -> None:
+        known_hashes = {block.block_hash for block in self._window}
+        backfill_hashes = [block.block_hash for block in self._backfill]
+        fetched = 0
+
+        # Walk back from the latest block to the window or the backfilled blocks
+        new_blocks: List[BlockGasPrices] = list()
+        block_hash = to_hex(latest_block["hash"])
+        while (
+            block_hash not in known_hashes
+            and block_hash not in backfill_hashes
+            and fetched < self.blocks_per_ingest
+        ):
+            block, parent_hash = self._fetch_block(web3, block_hash)
+            new_blocks.append(block)
+            fetched += 1
+
+            if block.number == 0:
+                break
+            block_hash = parent_hash
+
+        if new_blocks:
+            if block_hash in backfill_hashes:
+                # The backfilled blocks newer than `block_hash` were reorged away
+                index = backfill_hashes.index(block_hash)
+                self._backfill = new_blocks + self._backfill[index:]
+            else:
+                # Either connected to the window, or the backfilled blocks
+                # were reorged away or are too old to be connected
+                self._backfill = new_blocks
+                self._backfill_parent = block_hash
+
+        # Walk back from the backfilled blocks to the window, a window filled
+        # only with the backfilled blocks is complete as well
+        while self._backfill:
+            reached_window = self._backfill_parent in known_hashes or not self._window
+            is_complete = len(self._backfill) >= self.sample_size or self._backfill[-1].number == 0
+            if is_complete:
+                self._window.clear()
+            if reached_window or is_complete:
+                self._connect_backfill()
+                break
+
+            if fetched >= self.blocks_per_ingest:
+                break
+
+            assert self._backfill_parent is not None, "the parent of the backfill must be set"
+            block, self._backfill_parent = self._fetch_block(web3, self._backfill_parent)
+            self._backfill.append(block)
+            fetched += 1
+
+        # Fill the window with the older blocks, a few per call
+        while (
+            fetched < self.blocks_per_ingest
+            and not self._backfill
+            and self._window
+            and len(self._window) < self.sample_size
+            and self._window[0].number > 0
+        ):
+            block, _ = self._fetch_block(web3, BlockNumber(self._window[0].number - 1))
+            self._window.appendleft(block)
+            fetched += 1
+
+        if fetched:
+            self._update_gas_price()
+
+    def _update_gas_price(self) -> None:
+        self._gas_price = None
+
+        if len(self._window) < 2:
+            return
+
+        elapsed = self._window[-1].timestamp - self._window[0].timestamp
+        average_block_time = elapsed / (len(self._window) - 1)
+        if average_block_time <= 0:
+            return
+
+        miner_data = _aggregate_miner_data(self._window)
+        if not miner_data:
+            return
+
+        probabilities = _compute_probabilities(
+            miner_data,
+            wait_blocks=int(math.ceil(self.max_wait_seconds / average_block_time)),
+            sample_size=len(self._window),
+        )
+        self._gas_price = _compute_gas_price(probabilities, self.probability / 100)
+
+    def load(self, path: Path) -> None:
+        """ Restores the window saved at `path`, and uses it for `save`. """
+        self.path = path
+
+        try:
+            data = json.loads(path.read_text())
+            blocks = [
+                BlockGasPrices(
+                    number=BlockNumber(block["number"]),
+                    block_hash=block["block_hash"],
+                    timestamp=block["timestamp"],
+                    miner=block["miner"],
+                    gas_prices=tuple(block["gas_prices"]),
+                )
+                for block in data["blocks"]
+            ]
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            log.warning("Could not restore the gas price window", path=str(path), error=str(e))
+            return
+
+        self._window.clear()
+        self._window.extend(blocks)
+        self._backfill = list()
+        self._backfill_parent = None
+        self._update_gas_price()
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+
+        data = {"blocks": [block._asdict() for block in self._window]}
+        try:
+            self.path.write_text(json.dumps(data))
+        except OSError as e:
+            log.warning("Could not save the gas price window", path=str(self.path), error=str(e))
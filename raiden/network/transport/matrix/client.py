@@ -1,9 +1,22 @@
 import itertools
+import json
+import logging
 import time
 from datetime import datetime
 from functools import wraps
 from itertools import repeat
-from typing import Any, Callable, Container, Dict, Iterable, Iterator, List, Optional, Tuple
+from typing import (
+    Any,
+    Callable,
+    Container,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
 from urllib.parse import quote, urlparse
 from uuid import UUID, uuid4
 
@@ -26,6 +39,7 @@
 from raiden.network.transport.matrix.sync_progress import SyncProgress
 from raiden.utils.datastructures import merge_dict
 from raiden.utils.debugging import IDLE
+from raiden.utils.metrics import REGISTRY
 from raiden.utils.notifying_queue import NotifyingQueue
 from raiden.utils.typing import AddressHex
 
@@ -34,12 +48,125 @@
 SHUTDOWN_TIMEOUT = 35
 MSG_QUEUE_MAX_SIZE = 10  # This are matrix sync batches, not messages
 
+SYNC_LAG = REGISTRY.histogram(
+    "raiden_matrix_sync_lag_seconds",
+    "Time a Matrix sync response waited in the queue before being handled",
+)
+SYNC_HANDLING_DURATION = REGISTRY.histogram(
+    "raiden_matrix_sync_handling_seconds",
+    "Time the hub was blocked handling the queued Matrix sync responses",
+)
+
 MatrixMessage = Dict[str, Any]
 MatrixRoomMessages = Tuple["Room", List[MatrixMessage]]
 MatrixSyncMessages = List[MatrixRoomMessages]
 JSONResponse = Dict[str, Any]
 
 
+class JoinedRoomEvents(NamedTuple):
+    """ The events of a joined room in a sync response, tagged with the room id. """
+
+    room_id: str
+    prev_batch: str
+    state_events: List[MatrixMessage]
+    timeline_events: List[MatrixMessage]
+    messages: List[MatrixMessage]
+    ephemeral_events: List[MatrixMessage]
+
+
+def extract_joined_room_events(response: JSONResponse) -> List[JoinedRoomEvents]:
+    """ Extract the events of the joined rooms from a sync response. """
+    joined_rooms = []
+    for room_id, sync_room in response["rooms"]["join"].items():
+        state_events = sync_room["state"]["events"]
+        timeline_events = sync_room["timeline"]["events"]
+        ephemeral_events = sync_room["ephemeral"]["events"]
+        for event in itertools.chain(state_events, timeline_events, ephemeral_events):
+            event["room_id"] = room_id
+
+        joined_rooms.append(
+            JoinedRoomEvents(
+                room_id=room_id,
+                prev_batch=sync_room["timeline"]["prev_batch"],
+                state_events=state_events,
+                timeline_events=timeline_events,
+                messages=[
+                    message for message in timeline_events if message["type"] == "m.room.message"
+                ],
+                ephemeral_events=ephemeral_events,
+            )
+        )
+    return joined_rooms
+
+
+def summarize_sync_response(response: JSONResponse) -> Dict[str, int]:
+    """ Count the events of a sync response, used for logging. """
+    joined_rooms = response["rooms"]["join"].values()
+    return {
+        "presence_events_qty": len(response["presence"]["events"]),
+        "to_device_events_qty": len(response["to_device"]["events"]),
+        "rooms_invites_qty": len(response["rooms"]["invite"]),
+        "rooms_leaves_qty": len(response["rooms"]["leave"]),
+        "rooms_joined_member_count": sum(
+            room["summary"].get("m.joined_member_count", 0) for room in joined_rooms
+        ),
+        "rooms_invited_member_count": sum(
+            room["summary"].get("m.invited_member_count", 0) for room in joined_rooms
+        ),
+        "rooms_join_state_qty": sum(len(room["state"]) for room in joined_rooms),
+        "rooms_join_timeline_events_qty": sum(
+            len(room["timeline"]["events"]) for room in joined_rooms
+        ),
+        "rooms_join_state_events_qty": sum(len(room["state"]["events"]) for room in joined_rooms),
+        "rooms_join_ephemeral_events_qty": sum(
+            len(room["ephemeral"]["events"]) for room in joined_rooms
+        ),
+        "rooms_join_account_data_events_qty": sum(
+            len(room["account_data"]["events"]) for room in joined_rooms
+        ),
+    }
+
+
+class SyncResponse(NamedTuple):
+    """ The parts of a sync response which are handled by the client. """
+
+    next_batch: str
+    presence_events: List[MatrixMessage]
+    to_device_events: List[MatrixMessage]
+    invited_rooms: Dict[str, JSONResponse]
+    left_rooms: Dict[str, JSONResponse]
+    joined_rooms: List[JoinedRoomEvents]
+    # Only computed if the debug level is enabled, it walks the whole response
+    summary: Optional[Dict[str, int]]
+
+
+def parse_sync_response(response: JSONResponse) -> SyncResponse:
+    """ Extract the parts of the decoded sync `response` handled by the client.
+
+    This does not touch any client state, so it can run outside of the hub.
+    """
+    summary = None
+    if logging.getLogger(__name__).isEnabledFor(logging.DEBUG):
+        summary = summarize_sync_response(response)
+
+    return SyncResponse(
+        next_batch=response["next_batch"],
+        presence_events=response["presence"]["events"],
+        to_device_events=response["to_device"]["events"],
+        invited_rooms={
+            room_id: invite_room["invite_state"]
+            for room_id, invite_room in response["rooms"]["invite"].items()
+        },
+        left_rooms=response["rooms"]["leave"],
+        joined_rooms=extract_joined_room_events(response),
+        summary=summary,
+    )
+
+
+def decode_sync_response(content: bytes) -> SyncResponse:
+    return parse_sync_response(json.loads(content))
+
+
 def node_address_from_userid(user_id: Optional[str]) -> Optional[AddressHex]:
     if user_id:
         return AddressHex(HexStr(user_id.split(":", 1)[0][1:]))
@@ -126,6 +253,9 @@ class GMatrixHttpApi(MatrixHttpApi):
         pool_maxsize: max size of underlying/session connection pool
         retry_timeout: for how long should a single request be retried if it errors
         retry_delay: callable which returns an iterable of delays
+        sync_offload_threshold: sync responses with a body of at least this
+            many bytes are decoded and parsed in a worker thread, None
+            disables it
     """
 
     def __init__(
@@ -136,17 +266,21 @@ def __init__(
         retry_delay: Callable[[], Iterable[float]] = None,
         long_paths: Container[str] = (),
         user_agent: str = None,
+        sync_offload_threshold: Optional[int] = None,
         **kwargs: Any,
     ) -> None:
         super().__init__(*args, **kwargs)
 
         self.server_ident: Optional[str] = None
+        self.sync_offload_threshold = sync_offload_threshold
 
         http_adapter = HTTPAdapter(pool_maxsize=pool_maxsize)
         https_adapter = HTTPAdapter(pool_maxsize=pool_maxsize)
         self.session.mount("http://", http_adapter)
         self.session.mount("https://", https_adapter)
         self.session.hooks["response"].append(self._record_server_ident)
+        if sync_offload_threshold is not None:
+            self.session.hooks["response"].append(self._offload_sync_decoding)
         if user_agent:
             self.session.headers.update({"User-Agent": user_agent})
 
@@ -202,6 +336,32 @@ def _record_server_ident(
     ) -> None:
         self.server_ident = response.headers.get("Server")
 
+    def _offload_sync_decoding(
+        self, response: Response, *args: Any, **kwargs: Any  # pylint: disable=unused-argument
+    ) -> None:
+        """ Decode and parse large sync responses in the hub's thread pool.
+
+        `MatrixHttpApi._send` calls `response.json()`, which for a full `/sync`
+        with hundreds of rooms blocks the hub for a long time. The response is
+        decoded and its events extracted by a worker thread while this
+        greenlet waits, only the resulting `SyncResponse` is handed back, and
+        `response.json` is replaced to return it.
+        """
+        assert self.sync_offload_threshold is not None, "sync_offload_threshold must be set"
+        is_sync = urlparse(response.url).path.endswith("/sync")
+        if not is_sync or not response.ok or len(response.content) < self.sync_offload_threshold:
+            return
+
+        parsed = gevent.get_hub().threadpool.apply(decode_sync_response, (response.content,))
+        response.json = lambda **_kwargs: parsed  # type: ignore
+
+    def sync(self, *args: Any, **kwargs: Any) -> SyncResponse:  # pylint: disable=arguments-differ
+        """ Perform a /sync and return the parts handled by the client. """
+        response = super().sync(*args, **kwargs)
+        if isinstance(response, SyncResponse):
+            return response
+        return parse_sync_response(response)
+
     def get_room_state_type(self, room_id: str, event_type: str, state_key: str) -> Dict[str, Any]:
         """ Perform GET /rooms/$room_id/state/$event_type/$state_key """
         return self._send("GET", f"/rooms/{room_id}/state/{event_type}/{state_key}")
@@ -234,6 +394,7 @@ class GMatrixClient(MatrixClient):
     sync_worker: Optional[Greenlet] = None
     message_worker: Optional[Greenlet] = None
     last_sync: float = float("inf")
+    sync_token: Optional[str] = None
 
     def __init__(
         self,
@@ -250,13 +411,14 @@ def __init__(
         http_retry_delay: Callable[[], Iterable[float]] = lambda: repeat(1),
         environment: Environment = Environment.PRODUCTION,
         user_agent: str = None,
+        sync_offload_threshold: Optional[int] = None,
     ) -> None:
 
         self.token: Optional[str] = None
         self.environment = environment
         self.handle_messages_callback = handle_messages_callback
         self._handle_member_join_callback = handle_member_join_callback
-        self.response_queue: NotifyingQueue[Tuple[UUID, JSONResponse, datetime]] = NotifyingQueue()
+        self.response_queue: NotifyingQueue[Tuple[UUID, SyncResponse, datetime]] = NotifyingQueue()
         self.stop_event = Event()
 
         super().__init__(
@@ -270,6 +432,7 @@ def __init__(
             retry_delay=http_retry_delay,
             long_paths=("/sync",),
             user_agent=user_agent,
+            sync_offload_threshold=sync_offload_threshold,
         )
         self.api.validate_certificate(valid_cert_check)
 
@@ -531,6 +694,28 @@ def _mkroom(self, room_id: str) -> Room:
             room.update_local_aliases()
         return room
 
+    def dump_rooms(self) -> Dict[str, Any]:
+        """ The aliases and joined members of the rooms, to be restored with `load_rooms`. """
+        return {
+            room_id: {
+                "aliases": room.aliases,
+                "members": {user_id: user.displayname for user_id, user in room._members.items()},
+            }
+            for room_id, room in self.rooms.items()
+        }
+
+    def load_rooms(self, rooms: Dict[str, Any]) -> None:
+        """ Restore the rooms from `dump_rooms` without querying the server.
+
+        An incremental sync afterwards applies the changes since the dump.
+        """
+        for room_id, room_data in rooms.items():
+            room = Room(self, room_id)
+            room.aliases = room_data["aliases"]
+            for user_id, displayname in room_data["members"].items():
+                room._mkmembers(User(self.api, user_id, displayname))
+            self.rooms[room_id] = room
+
     def get_user_presence(self, user_id: str) -> Optional[str]:
         return self.api.get_presence(user_id).get("presence")
 
@@ -565,6 +750,7 @@ def blocking_sync(self, timeout_ms: int, latency_ms: int) -> None:
         assert all(pending_queue), "Sync returned, None and empty are invalid values."
 
         self._handle_responses(pending_queue)
+        self.sync_progress.processed_sync_token = self.sync_token
 
     def _sync(self, timeout_ms: int, latency_ms: int) -> None:
         """ Reimplements MatrixClient._sync """
@@ -633,45 +819,18 @@ def _sync(self, timeout_ms: int, latency_ms: int) -> None:
                 token=token,
                 elapsed=time_after_sync - time_before_sync,
                 current_user=self.user_id,
-                presence_events_qty=len(response["presence"]["events"]),
-                to_device_events_qty=len(response["to_device"]["events"]),
-                rooms_invites_qty=len(response["rooms"]["invite"]),
-                rooms_leaves_qty=len(response["rooms"]["leave"]),
-                rooms_joined_member_count=sum(
-                    room["summary"].get("m.joined_member_count", 0)
-                    for room in response["rooms"]["join"].values()
-                ),
-                rooms_invited_member_count=sum(
-                    room["summary"].get("m.invited_member_count", 0)
-                    for room in response["rooms"]["join"].values()
-                ),
-                rooms_join_state_qty=sum(
-                    len(room["state"]) for room in response["rooms"]["join"].values()
-                ),
-                rooms_join_timeline_events_qty=sum(
-                    len(room["timeline"]["events"]) for room in response["rooms"]["join"].values()
-                ),
-                rooms_join_state_events_qty=sum(
-                    len(room["state"]["events"]) for room in response["rooms"]["join"].values()
-                ),
-                rooms_join_ephemeral_events_qty=sum(
-                    len(room["ephemeral"]["events"]) for room in response["rooms"]["join"].values()
-                ),
-                rooms_join_account_data_events_qty=sum(
-                    len(room["account_data"]["events"])
-                    for room in response["rooms"]["join"].values()
-                ),
+                **(response.summary or {}),
             )
 
             # Updating the sync token should only be done after the response is
             # saved in the queue, otherwise the data can be lost in a stop/start.
             self.response_queue.put((token, response, datetime.now()))
-            self.sync_token = response["next_batch"]
+            self.sync_token = response.next_batch
             self.sync_progress.set_synced(token)
 
     def _handle_message(
         self,
-        response_queue: NotifyingQueue[Tuple[UUID, JSONResponse, datetime]],
+        response_queue: NotifyingQueue[Tuple[UUID, SyncResponse, datetime]],
         stop_event: Event,
     ) -> None:
         """ Worker to process network messages from the asynchronous transport.
@@ -696,12 +855,14 @@ def _handle_message(
             for token, response, received_at in response_queue.queue.queue:
                 assert response is not None, "None is not a valid value for a Matrix response."
 
+                processing_lag = datetime.now() - received_at
+                SYNC_LAG.observe(processing_lag.total_seconds())
                 log.debug(
                     "Handling Matrix response",
                     token=token,
                     node=node_address_from_userid(self.user_id),
                     current_size=len(response_queue),
-                    processing_lag=datetime.now() - received_at,
+                    processing_lag=processing_lag,
                 )
                 currently_queued_response_tokens.append(token)
                 currently_queued_responses.append(response)
@@ -729,62 +890,55 @@ def _handle_message(
             for _ in currently_queued_responses:
                 response_queue.get(block=False)
 
-            self.sync_progress.set_processed(currently_queued_response_tokens)
+            self.sync_progress.set_processed(
+                currently_queued_response_tokens,
+                sync_token=currently_queued_responses[-1].next_batch,
+            )
 
-    def _handle_responses(self, currently_queued_responses: List[JSONResponse]) -> None:
+    def _handle_responses(self, currently_queued_responses: List[SyncResponse]) -> None:
+        started = time.monotonic()
 
         all_messages: MatrixSyncMessages = []
         for response in currently_queued_responses:
-            for presence_update in response["presence"]["events"]:
+            for presence_update in response.presence_events:
                 for callback in list(self.presence_listeners.values()):
                     callback(presence_update, next(self._presence_update_ids))
 
-            for to_device_message in response["to_device"]["events"]:
+            for to_device_message in response.to_device_events:
                 for listener in self.listeners[:]:
                     if listener["event_type"] == "to_device":
                         listener["callback"](to_device_message)
 
-            for room_id, invite_room in response["rooms"]["invite"].items():
+            for room_id, invite_state in response.invited_rooms.items():
                 for listener in self.invite_listeners[:]:
-                    listener(room_id, invite_room["invite_state"])
+                    listener(room_id, invite_state)
 
-            for room_id, left_room in response["rooms"]["leave"].items():
+            for room_id, left_room in response.left_rooms.items():
                 for listener in self.left_listeners[:]:
                     listener(room_id, left_room)
                 if room_id in self.rooms:
                     del self.rooms[room_id]
 
-            for room_id, sync_room in response["rooms"]["join"].items():
+            for joined_room in response.joined_rooms:
+                room_id = joined_room.room_id
                 if room_id not in self.rooms:
                     self._mkroom(room_id)
 
                 room = self.rooms[room_id]
-                room.prev_batch = sync_room["timeline"]["prev_batch"]
+                room.prev_batch = joined_room.prev_batch
                 room_members_count = len(room._members)
 
-                for event in sync_room["state"]["events"]:
-                    event["room_id"] = room_id
+                for event in joined_room.state_events:
                     room._process_state_event(event)
-                for event in sync_room["timeline"]["events"]:
-                    event["room_id"] = room_id
+                for event in joined_room.timeline_events:
                     room._put_event(event)
 
                 # number of members changed. Verify validity of room
                 if room_members_count != len(room._members):
                     self._handle_member_join_callback(room)
-                all_messages.append(
-                    (
-                        room,
-                        [
-                            message
-                            for message in sync_room["timeline"]["events"]
-                            if message["type"] == "m.room.message"
-                        ],
-                    )
-                )
+                all_messages.append((room, joined_room.messages))
 
-                for event in sync_room["ephemeral"]["events"]:
-                    event["room_id"] = room_id
+                for event in joined_room.ephemeral_events:
                     room._put_ephemeral_event(event)
 
                     for listener in self.ephemeral_listeners:
@@ -798,6 +952,8 @@ def _handle_responses(self, currently_queued_responses: List[JSONResponse]) -> N
         if len(all_messages) > 0:
             self.handle_messages_callback(all_messages)
 
+        SYNC_HANDLING_DURATION.observe(time.monotonic() - started)
+
     def set_access_token(self, user_id: str, token: Optional[str]) -> None:
         self.user_id = user_id
         self.token = self.api.token = token
@@ -4,9 +4,10 @@
 from gevent.event import Event
 
 from raiden.utils.notifying_queue import NotifyingQueue
-from raiden.utils.typing import Any, Dict, List, Optional, Tuple
+from raiden.utils.typing import TYPE_CHECKING, List, Optional, Tuple
 
-JSONResponse = Dict[str, Any]
+if TYPE_CHECKING:
+    from raiden.network.transport.matrix.client import SyncResponse  # noqa: F401
 
 
 class SyncEvent(Event):
@@ -49,7 +50,7 @@ class SyncProgress:
     """
 
     def __init__(
-        self, response_queue: NotifyingQueue[Tuple[UUID, JSONResponse, datetime]]
+        self, response_queue: NotifyingQueue[Tuple[UUID, "SyncResponse", datetime]]
     ) -> None:
         self.synced_event = SyncEvent()
         self.processed_event = SyncEvent()
@@ -57,6 +58,9 @@ def __init__(
         self.processed_iteration = 0
         self.last_synced: Optional[UUID] = None
         self.last_processed: Optional[UUID] = None
+        # The Matrix `next_batch` token of the last processed response, a
+        # sync from it will not skip any unprocessed response.
+        self.processed_sync_token: Optional[str] = None
         self.response_queue = response_queue
 
     def set_synced(self, token: UUID) -> None:
@@ -65,9 +69,11 @@ def set_synced(self, token: UUID) -> None:
         self.synced_event.set([token])
         self.synced_event.clear()
 
-    def set_processed(self, tokens: List[UUID]) -> None:
+    def set_processed(self, tokens: List[UUID], sync_token: Optional[str] = None) -> None:
         self.processed_iteration += len(tokens)
         self.last_processed = tokens[-1]
+        if sync_token is not None:
+            self.processed_sync_token = sync_token
         self.processed_event.set(tokens)
         self.processed_event.clear()
 
@@ -31,11 +31,14 @@
 )
 from raiden.network.transport.matrix.utils import (
     JOIN_RETRIES,
+    MATRIX_MAX_BATCH_SIZE,
     USER_PRESENCE_REACHABLE_STATES,
     AddressReachability,
     DisplayNameCache,
     MessageAckTimingKeeper,
+    MessageBatchStatistics,
     UserAddressManager,
+    UserDirectoryResolver,
     UserPresence,
     join_broadcast_room,
     login,
@@ -56,6 +59,7 @@
 from raiden.transfer.state_change import ActionChangeNodeNetworkState
 from raiden.utils.formatting import to_checksum_address, to_hex_address
 from raiden.utils.logging import redact_secret
+from raiden.utils.metrics import REGISTRY
 from raiden.utils.notifying_queue import NotifyingQueue
 from raiden.utils.runnable import Runnable
 from raiden.utils.typing import (
@@ -89,6 +93,12 @@
 # A RetryQueue is considered idle after this many iterations without a message
 RETRY_QUEUE_IDLE_AFTER = 10
 
+RETRY_QUEUE_DEPTH = REGISTRY.gauge(
+    "raiden_matrix_retry_queue_messages",
+    "Messages in the retry queues waiting to be sent or acknowledged",
+    labelnames=("node",),
+)
+
 
 @dataclass
 class MessagesQueue:
@@ -115,6 +125,11 @@ def __init__(self, transport: "MatrixTransport", receiver: Address) -> None:
         self._notify_event = gevent.event.Event()
         self._lock = gevent.lock.Semaphore()
         self._idle_since: int = 0  # Counter of idle iterations
+        # Size of the messages enqueued since the last batch was sent, and the
+        # event set once it is enough for a full batch
+        self._unsent_size: int = 0
+        self._batch_full_event = gevent.event.Event()
+        self._last_batch_sent_at: float = 0.0
         super().__init__()
         self.greenlet.name = f"RetryQueue recipient:{to_checksum_address(self.receiver)}"
 
@@ -122,6 +137,10 @@ def __init__(self, transport: "MatrixTransport", receiver: Address) -> None:
     def log(self) -> Any:
         return self.transport.log
 
+    @property
+    def queue_size(self) -> int:
+        return len(self._message_queue)
+
     @staticmethod
     def _expiration_generator(
         timeout_generator: Iterable[float], now: Callable[[], float] = time.time
@@ -178,9 +197,13 @@ def enqueue(self, queue_identifier: QueueIdentifier, messages: List[Message]) ->
                         expiration_generator=expiration_generator,
                     )
                     encoded_messages.append(data)
+                    self._unsent_size += len(data.text)
 
             self._message_queue.extend(encoded_messages)
 
+            if self._unsent_size >= MATRIX_MAX_BATCH_SIZE:
+                self._batch_full_event.set()
+
         self.notify()
 
     def enqueue_unordered(self, message: Message) -> None:
@@ -289,6 +312,29 @@ def message_is_in_queue(message_data: _RetryQueue._MessageData) -> bool:
             )
             for message_batch in make_message_batches(message_texts):
                 self.transport._send_raw(self.receiver, message_batch)
+                # Serialized messages don't contain newlines, they are only
+                # used as the separator of the batch
+                self.transport._batch_statistics.add_batch(message_batch.count("\n") + 1)
+
+            self._last_batch_sent_at = time.monotonic()
+
+        self._unsent_size = 0
+        self._batch_full_event.clear()
+
+    def _wait_for_batch(self) -> None:
+        """ Hold back the messages while they are arriving in a burst.
+
+        If the previous batch was sent less than `send_coalesce_interval`
+        seconds ago, wait for the rest of the interval, or until there are
+        enough messages for a full batch, so that the messages are sent with a
+        single request to the Matrix server instead of one request each. The
+        first message after a quiet period is sent without delay.
+        """
+        coalesce_interval = self.transport._config.send_coalesce_interval
+        remaining = self._last_batch_sent_at + coalesce_interval - time.monotonic()
+
+        if remaining > 0 and not self._batch_full_event.is_set():
+            self._batch_full_event.wait(remaining)
 
     def _run(self) -> None:  # type: ignore
         msg = (
@@ -304,6 +350,8 @@ def _run(self) -> None:  # type: ignore
         )
         # run while transport parent is running
         while not self.transport._stop_event.ready():
+            self._wait_for_batch()
+
             # once entered the critical section, block any other enqueue or notify attempt
             with self._lock:
                 self._notify_event.clear()
@@ -373,6 +421,7 @@ def _http_retry_delay() -> Iterable[float]:
             http_retry_delay=_http_retry_delay,
             environment=environment,
             user_agent=f"Raiden {version}",
+            sync_offload_threshold=config.sync_offload_threshold,
         )
         self._server_url = self._client.api.base_url
         self._server_name = urlparse(self._server_url).netloc
@@ -381,6 +430,7 @@ def _http_retry_delay() -> Iterable[float]:
 
         self._address_to_retrier: Dict[Address, _RetryQueue] = dict()
         self._displayname_cache = DisplayNameCache()
+        self._user_resolver = UserDirectoryResolver(self._client, self._displayname_cache)
 
         self._broadcast_rooms: Dict[str, Room] = dict()
         self._broadcast_queue: JoinableQueue[Tuple[str, Message]] = JoinableQueue()
@@ -406,6 +456,11 @@ def _http_retry_delay() -> Iterable[float]:
         )
 
         self._address_to_room_ids: Dict[Address, List[RoomID]] = defaultdict(list)
+        # Index of a room with an online peer for each address, to avoid
+        # scanning the rooms and their members on every send. An entry is
+        # dropped when the presence of the peer's users, the rooms of the
+        # address, or the members of the room change.
+        self._address_to_online_room: Dict[Address, Room] = dict()
         self._client.add_invite_listener(self._handle_invite)
 
         # Forbids concurrent room creation.
@@ -413,6 +468,7 @@ def _http_retry_delay() -> Iterable[float]:
 
         self._counters: Dict[str, CounterType[Tuple[str, MessageID]]] = {}
         self._message_timing_keeper: Optional[MessageAckTimingKeeper] = None
+        self._batch_statistics = MessageBatchStatistics()
         if environment is Environment.DEVELOPMENT:
             self._counters["send"] = Counter()
             self._counters["retry"] = Counter()
@@ -474,6 +530,8 @@ def start(  # type: ignore
                 self.log.debug("Starting retrier", retrier=retrier)
                 retrier.start()
 
+        RETRY_QUEUE_DEPTH.labels(self._node_label).set_function(self._retry_queue_depth)
+
         super().start()  # start greenlet
         self._starting = False
         self._started = True
@@ -510,6 +568,14 @@ def _run(self) -> None:  # type: ignore
             self.stop()  # ensure cleanup and wait on subtasks
             raise
 
+    @property
+    def _node_label(self) -> str:
+        assert self._raiden_service is not None, "_raiden_service not set"
+        return to_checksum_address(self._raiden_service.address)
+
+    def _retry_queue_depth(self) -> int:
+        return sum(retrier.queue_size for retrier in self._address_to_retrier.values())
+
     def stop(self) -> None:
         """ Try to gracefully stop the greenlet synchronously
 
@@ -536,6 +602,8 @@ def stop(self) -> None:
             {r.greenlet for r in self._address_to_retrier.values() if r.greenlet}
         )
         self._address_to_retrier = {}
+        # Don't keep the transport alive, or report the depth of a stopped node
+        RETRY_QUEUE_DEPTH.labels(self._node_label).set_function(None)
 
         self._address_mgr.stop()
         self._client.stop()  # stop sync_thread, wait on client's greenlets
@@ -544,6 +612,8 @@ def stop(self) -> None:
         # re-raised because of the `link_exception`
         gevent.wait(self.greenlets)  # pylint: disable=gevent-disable-wait
 
+        self._store_sync_state()
+
         self._client.set_presence_state(UserPresence.OFFLINE.value)
 
         # Ensure keep-alive http connections are closed
@@ -559,6 +629,7 @@ def stop(self) -> None:
                 "Transport performance report",
                 counters=counters_most_common,
                 message_ack_durations=self._message_timing_keeper.generate_report(),
+                message_batches=self._batch_statistics.generate_report(),
             )
 
         self.log.debug("Matrix stopped", config=self._config)
@@ -571,13 +642,7 @@ def stop(self) -> None:
         # we don't call it here to avoid deadlock when self crashes and calls stop() on finally
 
     def get_user_ids_for_address(self, address: Address) -> Set[str]:
-        address_hex = to_normalized_address(address)
-        candidates = self._client.search_user_directory(address_hex)
-        self._displayname_cache.warm_users(candidates)
-        user_ids = {
-            user.user_id for user in candidates if validate_userid_signature(user) == address
-        }
-        return user_ids
+        return self._user_resolver.get_user_ids(address)
 
     def force_check_address_reachability(self, address: Address) -> AddressReachability:
         """Force checks an address's reachability bypassing the whitelisting"""
@@ -784,11 +849,32 @@ def _initialize_first_sync(self) -> None:
             not_rooms=self._broadcast_rooms.values(), limit=0
         )
         prev_sync_filter_id = self._client.set_sync_filter_id(filter_id)
+
+        # Resume from the sync of the previous run, this is an incremental
+        # sync instead of fetching the state of every room.
+        restored_room_ids = self._restore_sync_state()
+
         # Need to reset this here, otherwise we might run into problems after a restart
         self._client.last_sync = float("inf")
-        self._client.blocking_sync(
-            timeout_ms=self._config.sync_timeout, latency_ms=self._config.sync_latency
-        )
+        try:
+            self._client.blocking_sync(
+                timeout_ms=self._config.sync_timeout, latency_ms=self._config.sync_latency
+            )
+        except MatrixRequestError as ex:
+            if not restored_room_ids or ex.code >= 500:
+                raise
+
+            self.log.warning(
+                "Persisted sync token rejected, doing a full sync", _exception=str(ex)
+            )
+            for room_id in restored_room_ids:
+                self._client.rooms.pop(room_id, None)
+            self._client.sync_token = None
+            self._client.last_sync = float("inf")
+            self._client.blocking_sync(
+                timeout_ms=self._config.sync_timeout, latency_ms=self._config.sync_latency
+            )
+
         # Restore the filter to start fetching the messages
         self._client.set_sync_filter_id(prev_sync_filter_id)
 
@@ -809,6 +895,60 @@ def _initialize_first_sync(self) -> None:
                 "Found room", room=room, aliases=room.aliases, members=room.get_joined_members()
             )
 
+    def _restore_sync_state(self) -> List[RoomID]:
+        """ Restore the sync token, the rooms and the cached users saved by
+        `_store_sync_state`.
+
+        The saved state is removed from the database, if the node crashes
+        before it is stored again the next start falls back to a full sync.
+
+        Returns:
+            The ids of the restored rooms.
+        """
+        assert self._raiden_service is not None, "_raiden_service not set"
+        assert self._user_id, "The Matrix client must be authenticated"
+
+        assert self._raiden_service.wal is not None, "RaidenService has not been started"
+
+        if self._client.sync_token is not None:
+            return []
+
+        storage = self._raiden_service.wal.storage
+        sync_state = storage.get_matrix_sync_state(self._user_id)
+        if sync_state is None:
+            return []
+
+        storage.delete_matrix_sync_state(self._user_id)
+        self._client.load_rooms(sync_state["rooms"])
+        self._client.sync_token = sync_state["sync_token"]
+        self._user_resolver.load_users(sync_state.get("user_directory", {}))
+
+        self.log.debug(
+            "Restored Matrix sync state",
+            sync_token=sync_state["sync_token"],
+            rooms=len(sync_state["rooms"]),
+        )
+        return list(sync_state["rooms"])
+
+    def _store_sync_state(self) -> None:
+        """ Save the last processed sync token, the rooms and the cached users
+        of the user directory, to resume from them on the next start.
+        """
+        assert self._raiden_service is not None, "_raiden_service not set"
+
+        sync_token = self._client.sync_progress.processed_sync_token
+        if not self._user_id or sync_token is None or self._raiden_service.wal is None:
+            return
+
+        self._raiden_service.wal.storage.write_matrix_sync_state(
+            self._user_id,
+            {
+                "sync_token": sync_token,
+                "rooms": self._client.dump_rooms(),
+                "user_directory": self._user_resolver.dump_users(),
+            },
+        )
+
     def _leave_unexpected_rooms(
         self, rooms_to_leave: List[Room], reason: str = "No reason given"
     ) -> None:
@@ -840,6 +980,7 @@ def to_string_representation(partner: Optional[Address]) -> str:
                 self._address_to_room_ids[valid_partner] = [
                     room_id for room_id in address_to_room_ids if room_id != room.room_id
                 ]
+                self._address_to_online_room.pop(valid_partner, None)
 
     def _initialize_broadcast_rooms(self) -> None:
         msg = "To join the broadcast rooms the Matrix client to be properly authenticated."
@@ -914,6 +1055,12 @@ def _initialize_health_check(self, health_check_list: List[Address]) -> None:
         )
         assert self._client.sync_iteration >= 1, msg
 
+        started = time.monotonic()
+
+        # Find the users of all addresses first, the health checks below then
+        # use the cached results instead of one directory search each.
+        self._user_resolver.prefetch(health_check_list)
+
         pool = Pool(size=10)
         greenlets = set(
             pool.apply_async(self.immediate_health_check_for, [address])
@@ -921,6 +1068,14 @@ def _initialize_health_check(self, health_check_list: List[Address]) -> None:
         )
         gevent.joinall(greenlets, raise_error=True)
 
+        self.log.debug(
+            "Health check initialized",
+            addresses=len(health_check_list),
+            elapsed=time.monotonic() - started,
+            directory_lookups=self._user_resolver.lookups,
+            directory_cache_hits=self._user_resolver.hits,
+        )
+
     def _extract_addresses(self, room: Room) -> List[Optional[Address]]:
         """
         returns list of address of room members.
@@ -1058,6 +1213,9 @@ def _handle_member_join(self, room: Room) -> None:
                 f"Should be joined to: {self._config.broadcast_rooms}"
             )
 
+        # The members of the room changed, a peer may have left it
+        self._invalidate_online_room(room.room_id)
+
         if self._has_multiple_partner_addresses(room):
             self._leave_unexpected_rooms(
                 [room], "Users from more than one address joined the room"
@@ -1218,6 +1376,11 @@ def _get_room_for_address(
         )
         assert address and self._address_mgr.is_address_known(address), msg
 
+        if require_online_peer:
+            room = self._address_to_online_room.get(address)
+            if room is not None and room.room_id in self._client.rooms:
+                return room
+
         room_candidates = []
         room_ids = self._get_room_ids_for_address(address)
         if room_ids:
@@ -1264,10 +1427,21 @@ def _get_room_for_address(
                             members=room.get_joined_members(),
                             require_online_peer=require_online_peer,
                         )
+                        self._address_to_online_room[address] = room
                         return room
 
         return None
 
+    def _invalidate_online_room(self, room_id: RoomID) -> None:
+        """ Drop the index entries pointing to the room `room_id`. """
+        stale_addresses = [
+            address
+            for address, room in self._address_to_online_room.items()
+            if room.room_id == room_id
+        ]
+        for address in stale_addresses:
+            del self._address_to_online_room[address]
+
     def _maybe_create_room_for_address(self, address: Address) -> None:
         if self._stop_event.ready():
             return None
@@ -1296,12 +1470,7 @@ def _maybe_create_room_for_address(self, address: Address) -> None:
             return None
 
         with self.room_creation_lock[address]:
-            candidates = self._client.search_user_directory(to_normalized_address(address))
-            self._displayname_cache.warm_users(candidates)
-
-            partner_users = [
-                user for user in candidates if validate_userid_signature(user) == address
-            ]
+            partner_users = self._user_resolver.get_users(address)
             partner_user_ids = [user.user_id for user in partner_users]
 
             if not partner_users:
@@ -1369,6 +1538,13 @@ def _is_broadcast_room(self, room: Room) -> bool:
         )
 
     def _user_presence_changed(self, user: User, _presence: UserPresence) -> None:
+        # The user may have been the online peer of the indexed room, or be a
+        # new user of the address
+        address = validate_userid_signature(user)
+        if address is not None:
+            self._address_to_online_room.pop(address, None)
+            self._user_resolver.user_seen(address, user.user_id)
+
         # maybe inviting user used to also possibly invite user's from presence changes
         assert self._raiden_service is not None, "_raiden_service not set"
         greenlet = self._schedule_new_greenlet(self._maybe_invite_user, user)
@@ -1473,6 +1649,7 @@ def _set_room_id_for_address(self, address: Address, room_id: RoomID) -> None:
         # push to front
         room_ids = [room_id] + [r for r in room_ids if r != room_id]
         self._address_to_room_ids[address] = room_ids
+        self._address_to_online_room.pop(address, None)
 
     def _get_room_ids_for_address(self, address: Address) -> List[RoomID]:
         address_hex: AddressHex = to_hex_address(address)
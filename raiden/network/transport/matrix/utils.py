@@ -19,6 +19,7 @@
     Optional,
     Sequence,
     Set,
+    Tuple,
     Union,
 )
 from urllib.parse import urlparse
@@ -34,8 +35,9 @@
     to_checksum_address,
     to_normalized_address,
 )
-from gevent.event import Event
+from gevent.event import AsyncResult, Event
 from gevent.lock import Semaphore
+from gevent.pool import Pool
 from matrix_client.errors import MatrixError, MatrixRequestError
 from structlog._config import BoundLoggerLazyProxy
 
@@ -72,6 +74,12 @@
 # The maximum matrix event size is 65 kB. Since events are larger than just the message
 # content we chose a conservative value
 MATRIX_MAX_BATCH_SIZE = 50_000
+# The signature of a user id never changes, the cache must fit the users of
+# all partners and of the broadcast rooms
+USERID_SIGNATURE_CACHE_SIZE = 16_384
+# For how long the users found in the user directory for an address are reused
+USER_DIRECTORY_CACHE_TTL = 60.0
+USER_DIRECTORY_CONCURRENT_LOOKUPS = 10
 JSONResponse = Dict[str, Any]
 
 
@@ -530,6 +538,142 @@ def generate_report(self) -> List[float]:
         return sorted(self._durations)
 
 
+class MessageBatchStatistics:
+    """ Keeps track of the message batches sent to the partners. """
+
+    def __init__(self) -> None:
+        self._started_at = time.monotonic()
+        self.batches = 0
+        self.messages = 0
+
+    def add_batch(self, message_count: int) -> None:
+        self.batches += 1
+        self.messages += message_count
+
+    @property
+    def batches_per_second(self) -> float:
+        elapsed = time.monotonic() - self._started_at
+        return self.batches / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def messages_per_batch(self) -> float:
+        return self.messages / self.batches if self.batches else 0.0
+
+    def generate_report(self) -> Dict[str, float]:
+        return {
+            "batches": self.batches,
+            "messages": self.messages,
+            "batches_per_second": self.batches_per_second,
+            "messages_per_batch": self.messages_per_batch,
+        }
+
+
+class UserDirectoryResolver:
+    """ Finds the Matrix users of an address through the user directory.
+
+    The transport looks up the same address for the health check, the room
+    creation and the reachability checks. The validated users are cached for
+    `ttl` seconds, and concurrent lookups of the same address share a single
+    request. Empty results are not cached, the partner may not have logged in
+    yet.
+    """
+
+    def __init__(
+        self,
+        client: GMatrixClient,
+        displayname_cache: DisplayNameCache,
+        ttl: float = USER_DIRECTORY_CACHE_TTL,
+        concurrent_lookups: int = USER_DIRECTORY_CONCURRENT_LOOKUPS,
+    ) -> None:
+        self._client = client
+        self._displayname_cache = displayname_cache
+        self._ttl = ttl
+        self._concurrent_lookups = concurrent_lookups
+        self._address_to_users: Dict[Address, Tuple[float, List[User]]] = dict()
+        self._pending_lookups: Dict[Address, AsyncResult] = dict()
+        self.lookups = 0
+        self.hits = 0
+
+    def get_users(self, address: Address) -> List[User]:
+        """ The users of the directory with a valid signature for `address`. """
+        cached_users = self._address_to_users.get(address)
+        if cached_users is not None and cached_users[0] > time.monotonic():
+            self.hits += 1
+            return cached_users[1]
+
+        pending_lookup = self._pending_lookups.get(address)
+        if pending_lookup is not None:
+            self.hits += 1
+            return pending_lookup.get()
+
+        lookup = AsyncResult()
+        self._pending_lookups[address] = lookup
+        try:
+            self.lookups += 1
+            candidates = self._client.search_user_directory(to_normalized_address(address))
+            self._displayname_cache.warm_users(candidates)
+            users = [user for user in candidates if validate_userid_signature(user) == address]
+        except BaseException as ex:  # pylint: disable=broad-except
+            # Also wake up the waiters if this greenlet is killed
+            lookup.set_exception(ex)
+            raise
+        finally:
+            del self._pending_lookups[address]
+
+        if users:
+            self._address_to_users[address] = (time.monotonic() + self._ttl, users)
+        lookup.set(users)
+        return users
+
+    def get_user_ids(self, address: Address) -> Set[str]:
+        return {user.user_id for user in self.get_users(address)}
+
+    def prefetch(self, addresses: Iterable[Address]) -> None:
+        """ Look up `addresses` concurrently, bounded by `concurrent_lookups`. """
+        pool = Pool(size=self._concurrent_lookups)
+        greenlets = set(pool.apply_async(self.get_users, [address]) for address in set(addresses))
+        gevent.joinall(greenlets, raise_error=True)
+
+    def user_seen(self, address: Address, user_id: str) -> None:
+        """ Drop the cached users of `address` if `user_id` is not one of them. """
+        cached_users = self._address_to_users.get(address)
+        if cached_users is not None and all(user.user_id != user_id for user in cached_users[1]):
+            del self._address_to_users[address]
+
+    def dump_users(self) -> Dict[str, Any]:
+        """ The unexpired cached users, to be restored with `load_users`.
+
+        The expiration is saved as a wall clock time, the monotonic clock does
+        not survive a restart.
+        """
+        now = time.monotonic()
+        wall_clock = time.time()
+        return {
+            to_checksum_address(address): {
+                "expires_at": wall_clock + expires_at - now,
+                "users": {user.user_id: user.displayname for user in users},
+            }
+            for address, (expires_at, users) in self._address_to_users.items()
+            if expires_at > now
+        }
+
+    def load_users(self, users: Dict[str, Any]) -> None:
+        """ Restore the cached users from `dump_users`, skipping the expired ones. """
+        now = time.monotonic()
+        wall_clock = time.time()
+        for address, address_data in users.items():
+            ttl = address_data["expires_at"] - wall_clock
+            if ttl <= 0:
+                continue
+
+            restored_users = [
+                User(self._client.api, user_id, displayname)
+                for user_id, displayname in address_data["users"].items()
+            ]
+            self._displayname_cache.warm_users(restored_users)
+            self._address_to_users[to_canonical_address(address)] = (now + ttl, restored_users)
+
+
 def join_broadcast_room(client: GMatrixClient, broadcast_room_alias: str) -> Room:
     """ Join the public broadcast through the alias `broadcast_room_alias`.
 
@@ -695,7 +839,11 @@ def login(client: GMatrixClient, signer: Signer, prev_auth_data: Optional[str] =
     return first_login(client, signer, username)
 
 
-@cached(cache=LRUCache(128), key=attrgetter("user_id", "displayname"), lock=Semaphore())
+@cached(
+    cache=LRUCache(USERID_SIGNATURE_CACHE_SIZE),
+    key=attrgetter("user_id", "displayname"),
+    lock=Semaphore(),
+)
 def validate_userid_signature(user: User) -> Optional[Address]:
     """ Validate a userId format and signature on displayName, and return its address"""
     # display_name should be an address in the USERID_RE format
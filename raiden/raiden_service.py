@@ -1,10 +1,12 @@
 # pylint: disable=too-many-lines
+import math
 import os
 import random
 import time
 from collections import defaultdict
 from enum import Enum
-from typing import Any, Dict, List, NamedTuple, Set, Tuple, cast
+from functools import partial
+from typing import Any, Dict, List, NamedTuple, Set, Tuple, Union, cast
 from uuid import UUID
 
 import filelock
@@ -26,10 +28,12 @@
     token_network_events,
     token_network_registry_events,
 )
+from raiden.blockchain.secret_registry import SecretRegistryMirror
 from raiden.blockchain_events_handler import after_blockchain_statechange
 from raiden.connection_manager import ConnectionManager
 from raiden.constants import (
     ABSENT_SECRET,
+    ARCHIVE_STATE_CHANGES_BATCH_SIZE,
     BLOCK_ID_LATEST,
     EMPTY_TRANSACTION_HASH,
     GENESIS_BLOCK_NUMBER,
@@ -45,6 +49,7 @@
     InvalidSecret,
     InvalidSecretHash,
     PaymentConflict,
+    RaidenError,
     RaidenRecoverableError,
     RaidenUnrecoverableError,
     SerializationError,
@@ -58,6 +63,7 @@
 from raiden.network.proxies.token_network_registry import TokenNetworkRegistry
 from raiden.network.proxies.user_deposit import UserDeposit
 from raiden.network.rpc.client import JSONRPCClient
+from raiden.network.rpc.middleware import GasPriceOracle
 from raiden.network.transport.matrix.transport import MatrixTransport, MessagesQueue
 from raiden.raiden_event_handler import EventHandler
 from raiden.services import send_pfs_update, update_monitoring_service_from_balance_proof
@@ -70,13 +76,19 @@
 from raiden.transfer.architecture import (
     BalanceProofSignedState,
     ContractSendEvent,
+    ContractSendExpirableEvent,
     Event as RaidenEvent,
+    SendMessageEvent,
     StateChange,
 )
 from raiden.transfer.channel import get_capacity
 from raiden.transfer.events import EventPaymentSentFailed
 from raiden.transfer.identifiers import CanonicalIdentifier
-from raiden.transfer.mediated_transfer.events import SendLockedTransfer, SendUnlock
+from raiden.transfer.mediated_transfer.events import (
+    EventRouteFailed,
+    SendLockedTransfer,
+    SendUnlock,
+)
 from raiden.transfer.mediated_transfer.mediation_fee import (
     FeeScheduleState,
     calculate_imbalance_fees,
@@ -92,12 +104,17 @@
 from raiden.transfer.state import ChainState, NetworkState, TokenNetworkRegistryState
 from raiden.transfer.state_change import (
     ActionChangeNodeNetworkState,
+    ActionChannelClose,
     ActionChannelSetRevealTimeout,
     ActionChannelWithdraw,
     ActionInitChain,
     BalanceProofStateChange,
     Block,
+    ContractReceiveChannelClosed,
     ContractReceiveChannelDeposit,
+    ContractReceiveChannelNew,
+    ContractReceiveChannelSettled,
+    ContractReceiveChannelWithdraw,
     ContractReceiveNewTokenNetworkRegistry,
     ReceiveUnlock,
     ReceiveWithdrawConfirmation,
@@ -105,12 +122,12 @@
     ReceiveWithdrawRequest,
 )
 from raiden.utils.formatting import lpex, to_checksum_address
-from raiden.utils.gevent import spawn_named
 from raiden.utils.logging import redact_secret
 from raiden.utils.runnable import Runnable
+from raiden.utils.scheduler import Priority, Scheduler
 from raiden.utils.secrethash import sha256_secrethash
 from raiden.utils.signer import LocalSigner, Signer
-from raiden.utils.transfers import random_secret
+from raiden.utils.transfers import TransferRequest, random_secret
 from raiden.utils.typing import (
     MYPY_ANNOTATION,
     Address,
@@ -133,6 +150,7 @@
     typecheck,
 )
 from raiden.utils.upgrades import UpgradeManager
+from raiden.waiting import StateChangeNotifier
 from raiden_contracts.contract_manager import ContractManager
 
 log = structlog.get_logger(__name__)
@@ -156,6 +174,20 @@
     # ActionChannelWithdraw | Upd. triggered by ReceiveWithdrawConfirmation/ReceiveWithdrawExpired
 )
 PFS_UPDATE_EVENTS = (SendUnlock, SendLockedTransfer)
+# State changes which change the status or the capacity of a channel, other
+# than the balance proofs which are checked when the cached route is used, or
+# the reachability of a node
+ROUTE_CACHE_INVALIDATING_STATE_CHANGES = (
+    ActionChangeNodeNetworkState,
+    ActionChannelClose,
+    ContractReceiveChannelClosed,
+    ContractReceiveChannelSettled,
+    ContractReceiveChannelDeposit,
+    ContractReceiveChannelWithdraw,
+    ReceiveWithdrawRequest,
+    ReceiveWithdrawConfirmation,
+    ReceiveWithdrawExpired,
+)
 
 
 def initiator_init(
@@ -190,6 +222,7 @@ def initiator_init(
         previous_address=None,
         pfs_config=raiden.config.pfs_config,
         privkey=raiden.privkey,
+        route_cache=raiden.route_cache,
     )
 
     # Only prepare feedback when token is available
@@ -224,6 +257,18 @@ def smart_contract_filters_from_node_state(
     return listeners
 
 
+def event_priority(event: RaidenEvent) -> Priority:
+    """ The priority class of the greenlet which handles `event`. """
+    if isinstance(event, ContractSendEvent):
+        return Priority.SAFETY
+    if isinstance(event, SendMessageEvent):
+        return Priority.PROTOCOL
+    # The failed routes are reported to the pathfinding service
+    if isinstance(event, EventRouteFailed):
+        return Priority.SERVICES
+    return Priority.BOOKKEEPING
+
+
 class PaymentStatus(NamedTuple):
     """Value type for RaidenService.targets_to_identifiers_to_statuses.
 
@@ -318,6 +363,7 @@ def __init__(
         self.raiden_event_handler = raiden_event_handler
         self.message_handler = message_handler
         self.blockchain_events: Optional[BlockchainEvents] = None
+        self.state_change_notifier = StateChangeNotifier()
 
         self.api_server: Optional[APIServer] = api_server
         self.raiden_api: Optional[RaidenAPI] = None
@@ -329,11 +375,28 @@ def __init__(
         self.stop_event = Event()
         self.stop_event.set()  # inits as stopped
         self.greenlets: List[Greenlet] = list()
+        self.scheduler = Scheduler()
+
+        # The gaps in the nonces are filled outside of the scheduler, the
+        # transactions waiting for the gap may hold all of its slots
+        self.rpc_client.add_pending_greenlet = self.add_pending_greenlet
 
         self.last_log_time = time.monotonic()
         self.last_log_block = BlockNumber(0)
 
         self.contract_manager = ContractManager(config.contracts_path)
+        self.secret_registry_mirror = SecretRegistryMirror(
+            web3=rpc_client.web3,
+            contract_manager=self.contract_manager,
+            secret_registry_address=default_secret_registry.address,
+            start_block=query_start_block,
+            confirmation_blocks=config.blockchain.confirmation_blocks,
+            max_staleness=config.blockchain.secret_registry_max_staleness,
+            batch_size=config.blockchain.block_batch_size_config.max,
+            retention_blocks=BlockTimeout(
+                max(config.blockchain.secret_registry_retention_blocks, config.settle_timeout)
+            ),
+        )
         self.wal: Optional[WriteAheadLog] = None
 
         if self.config.database_path != ":memory:":
@@ -364,6 +427,7 @@ def __init__(
 
         # A list is not hashable, so use tuple as key here
         self.route_to_feedback_token: Dict[Tuple[Address, ...], UUID] = dict()
+        self.route_cache = routing.RouteCache(ttl=self.config.services.route_cache_ttl)
 
         # Flag used to skip the processing of all Raiden events during the
         # startup.
@@ -455,6 +519,12 @@ def stop(self) -> None:
         self.transport.greenlet.join()
         self.alarm.greenlet.join()
 
+        # The pending transactions and messages are restored on restart
+        self.scheduler.kill_queued()
+
+        if isinstance(self.rpc_client.gas_price_strategy, GasPriceOracle):
+            self.rpc_client.gas_price_strategy.save()
+
         assert (
             self.blockchain_events
         ), f"The blockchain_events has to be set by the start. node:{self!r}"
@@ -537,6 +607,9 @@ def _initialize_wal(self) -> None:
         storage.update_version()
         storage.log_run()
 
+        if self.config.archive_database_path is not None:
+            storage.attach_archive(self.config.archive_database_path)
+
         try:
             (
                 state_change_qty_snapshot,
@@ -706,6 +779,16 @@ def _synchronize_with_blockchain(self) -> None:
 
         self.alarm.register_callback(self._best_effort_synchronize)
 
+        # The locked transfers are checked against the secrets registered at
+        # the latest block, this must be initialized before the transport is
+        # started.
+        self.secret_registry_mirror.synchronize()
+        self.alarm.register_callback(self.secret_registry_mirror.on_new_block)
+
+        gas_price_strategy = self.rpc_client.gas_price_strategy
+        if isinstance(gas_price_strategy, GasPriceOracle):
+            self.alarm.register_callback(partial(gas_price_strategy.ingest, self.rpc_client.web3))
+
     def _start_alarm_task(self) -> None:
         """Start the alarm task.
 
@@ -720,6 +803,9 @@ def _start_alarm_task(self) -> None:
     def _set_rest_api_service_available(self) -> None:
         if self.raiden_api:
             assert self.rest_api, "api enabled in config but self.rest_api not initialized"
+            assert self.wal, f"WAL not restored. node:{self!r}"
+            self.rest_api.event_stream.follow(self.wal)
+            self.rest_api.channel_cache.follow(self.wal)
             self.rest_api.raiden_api = self.raiden_api
             print("Synchronization complete, REST API services now available.")
 
@@ -783,6 +869,7 @@ def handle_state_changes(self, state_changes: List[StateChange]) -> List[Greenle
 
         old_state = views.state_from_raiden(self)
         new_state, raiden_event_list = self.wal.log_and_dispatch(state_changes)
+        self.state_change_notifier.notify(state_changes)
 
         # For safety of the mediation the monitoring service must be updated
         # before the balance proof is sent. Otherwise a timing attack would be
@@ -828,9 +915,19 @@ def handle_state_changes(self, state_changes: List[StateChange]) -> List[Greenle
                 else:
                     pfs_capacity_updates.add(canonical_identifier)
 
+            if isinstance(state_change, ROUTE_CACHE_INVALIDATING_STATE_CHANGES):
+                if isinstance(state_change, ActionChangeNodeNetworkState):
+                    self.route_cache.invalidate_node(state_change.node_address)
+                else:
+                    self.route_cache.invalidate_channel(state_change.canonical_identifier)
+            elif isinstance(state_change, ContractReceiveChannelNew):
+                self.route_cache.invalidate_token_network(state_change.token_network_address)
+
         for event in raiden_event_list:
             if isinstance(event, PFS_UPDATE_EVENTS):
                 pfs_capacity_updates.add(event.balance_proof.canonical_identifier)
+            elif isinstance(event, EventRouteFailed):
+                self.route_cache.invalidate_route(event.token_network_address, event.route)
 
         for monitoring_update in monitoring_updates.values():
             update_monitoring_service_from_balance_proof(
@@ -876,12 +973,20 @@ def snapshot(self) -> None:
         self.wal.snapshot(self.state_change_qty)
         self.state_change_qty_snapshot = self.state_change_qty
 
+        if self.config.archive_database_path is not None:
+            archived = self.wal.storage.archive_before_latest_snapshot(
+                ARCHIVE_STATE_CHANGES_BATCH_SIZE
+            )
+            log.debug(
+                "Archived state changes", archived=archived, node=to_checksum_address(self.address)
+            )
+
     def async_handle_events(
         self, chain_state: ChainState, raiden_events: List[RaidenEvent]
     ) -> List[Greenlet]:
-        """Spawn a new thread to handle a Raiden event.
+        """Schedule new threads to handle the Raiden events.
 
-        This will spawn a new greenlet to handle each event, which is
+        This will schedule a new greenlet to handle each transaction, which is
         important for two reasons:
 
         - Blockchain transactions can be queued without interfering with each
@@ -891,28 +996,47 @@ def async_handle_events(
           node to send transactions when a given Block is reached (e.g.
           registering a secret or settling a channel).
 
+        The other events are handled by one greenlet per priority class, so
+        that e.g. a slow pathfinding service does not delay the protocol
+        messages. The transactions with a deadline are started first if the
+        scheduler is busy.
+
         Important:
 
-            This is spawning a new greenlet for /each/ transaction. It's
+            This is scheduling a new greenlet for /each/ transaction. It's
             therefore /required/ that there is *NO* order among these.
         """
         typecheck(chain_state, ChainState)
 
-        non_transaction_events = list()
+        batches: Dict[Priority, List[RaidenEvent]] = defaultdict(list)
         greenlets: List[Greenlet] = list()
 
         for event in raiden_events:
             if isinstance(event, ContractSendEvent):
+                deadline = (
+                    event.expiration if isinstance(event, ContractSendExpirableEvent) else math.inf
+                )
                 greenlets.append(
-                    spawn_named("rs-handle_events", self._handle_events, chain_state, [event])
+                    self.scheduler.spawn(
+                        Priority.SAFETY,
+                        "rs-handle_events",
+                        self._handle_events,
+                        chain_state,
+                        [event],
+                        deadline=deadline,
+                    )
                 )
             else:
-                non_transaction_events.append(event)
+                batches[event_priority(event)].append(event)
 
-        if non_transaction_events:
+        for priority in sorted(batches):
             greenlets.append(
-                spawn_named(
-                    "rs-handle_events", self._handle_events, chain_state, non_transaction_events
+                self.scheduler.spawn(
+                    priority,
+                    "rs-handle_events",
+                    self._handle_events,
+                    chain_state,
+                    batches[priority],
                 )
             )
 
@@ -1438,15 +1562,136 @@ def start_mediated_transfer_with_secret(
         secrethash: SecretHash = None,
         lock_timeout: BlockTimeout = None,
     ) -> PaymentStatus:
+        payment_status, init_initiator_statechange = self._initiate_mediated_transfer(
+            token_network_address=token_network_address,
+            amount=amount,
+            target=target,
+            identifier=identifier,
+            secret=secret,
+            secrethash=secrethash,
+            lock_timeout=lock_timeout,
+        )
 
+        if init_initiator_statechange is not None:
+            self.handle_and_track_state_changes([init_initiator_statechange])
+
+        return payment_status
+
+    def mediated_transfers_async(
+        self, transfers: List[TransferRequest]
+    ) -> List[Union[PaymentStatus, RaidenError]]:
+        """ Register the `transfers` and start them in the background.
+
+        The payment statuses are returned without waiting for the routes, a
+        transfer which cannot be registered does not affect the others, the
+        error is returned in its position. The routes of the registered
+        transfers are computed and their `ActionInitInitiator` state changes
+        dispatched one by one, in order, so that the route of a transfer
+        accounts for the capacity locked by the previous ones.
+        """
+        # Synchronize once for the whole batch, instead of on the first lookup
+        self.secret_registry_mirror.synchronize_if_stale()
+
+        results: List[Union[PaymentStatus, RaidenError]] = list()
+        registered: List[Tuple[PaymentStatus, TargetAddress, Secret, SecretHash]] = list()
+        for transfer in transfers:
+            secret = transfer.secret
+            if secret is None:
+                secret = random_secret() if transfer.secrethash is None else ABSENT_SECRET
+
+            try:
+                secrethash = self._validate_secret(secret, transfer.secrethash)
+                payment_status, is_new = self._register_payment(
+                    token_network_address=transfer.token_network_address,
+                    amount=transfer.amount,
+                    target=transfer.target,
+                    identifier=transfer.identifier,
+                    secrethash=secrethash,
+                    lock_timeout=transfer.lock_timeout,
+                )
+            except RaidenError as e:
+                results.append(e)
+                continue
+
+            results.append(payment_status)
+            if is_new:
+                registered.append((payment_status, transfer.target, secret, secrethash))
+
+        if registered:
+            greenlet = self.scheduler.spawn(
+                Priority.PROTOCOL, "rs-start_transfers", self._start_transfers, registered
+            )
+            self.add_pending_greenlet(greenlet)
+
+        return results
+
+    def _start_transfers(
+        self, registered: List[Tuple[PaymentStatus, TargetAddress, Secret, SecretHash]]
+    ) -> None:
+        for payment_status, target, secret, secrethash in registered:
+            init_initiator_statechange = self._init_initiator(
+                payment_status, target, secret, secrethash
+            )
+            if init_initiator_statechange is not None:
+                self.handle_and_track_state_changes([init_initiator_statechange])
+
+    def _initiate_mediated_transfer(
+        self,
+        token_network_address: TokenNetworkAddress,
+        amount: PaymentAmount,
+        target: TargetAddress,
+        identifier: PaymentID,
+        secret: Secret,
+        secrethash: SecretHash = None,
+        lock_timeout: BlockTimeout = None,
+    ) -> Tuple[PaymentStatus, Optional[ActionInitInitiator]]:
+        """ Validate the transfer, register its payment status and find a route.
+
+        Returns the `ActionInitInitiator` which must be dispatched to start
+        the transfer, or None if the transfer failed or it is a retry of a
+        payment in flight.
+        """
+        secrethash = self._validate_secret(secret, secrethash)
+        payment_status, is_new = self._register_payment(
+            token_network_address=token_network_address,
+            amount=amount,
+            target=target,
+            identifier=identifier,
+            secrethash=secrethash,
+            lock_timeout=lock_timeout,
+        )
+        if not is_new:
+            return payment_status, None
+
+        return payment_status, self._init_initiator(payment_status, target, secret, secrethash)
+
+    @staticmethod
+    def _validate_secret(secret: Secret, secrethash: Optional[SecretHash]) -> SecretHash:
         if secrethash is None:
-            secrethash = sha256_secrethash(secret)
-        elif secret != ABSENT_SECRET:
+            return sha256_secrethash(secret)
+
+        if secret != ABSENT_SECRET:
             if secrethash != sha256_secrethash(secret):
                 raise InvalidSecretHash("provided secret and secret_hash do not match.")
             if len(secret) != SECRET_LENGTH:
                 raise InvalidSecret("secret of invalid length.")
 
+        return secrethash
+
+    def _register_payment(
+        self,
+        token_network_address: TokenNetworkAddress,
+        amount: PaymentAmount,
+        target: TargetAddress,
+        identifier: PaymentID,
+        secrethash: SecretHash,
+        lock_timeout: Optional[BlockTimeout],
+    ) -> Tuple[PaymentStatus, bool]:
+        """ Register the payment status of the transfer.
+
+        Returns the status and whether it is new, False if the transfer is a
+        retry of a payment in flight.
+        """
         log.debug(
             "Mediated transfer",
             node=to_checksum_address(self.address),
@@ -1465,9 +1710,7 @@ def start_mediated_transfer_with_secret(
         # For this particular case, it's preferable to use `latest` instead of
         # having a specific block_hash, because it's preferable to know if the secret
         # was ever known, rather than having a consistent view of the blockchain.
-        secret_registered = self.default_secret_registry.is_secret_registered(
-            secrethash=secrethash, block_identifier=BLOCK_ID_LATEST
-        )
+        secret_registered = self.secret_registry_mirror.is_secret_registered(secrethash)
         if secret_registered:
             raise RaidenUnrecoverableError(
                 f"Attempted to initiate a locked transfer with secrethash {to_hex(secrethash)}."
@@ -1489,7 +1732,7 @@ def start_mediated_transfer_with_secret(
                 if not payment_status_matches:
                     raise PaymentConflict("Another payment with the same id is in flight")
 
-                return payment_status
+                return payment_status, False
 
             payment_status = PaymentStatus(
                 payment_identifier=identifier,
@@ -1500,22 +1743,35 @@ def start_mediated_transfer_with_secret(
             )
             self.targets_to_identifiers_to_statuses[target][identifier] = payment_status
 
+        return payment_status, True
+
+    def _init_initiator(
+        self,
+        payment_status: PaymentStatus,
+        target: TargetAddress,
+        secret: Secret,
+        secrethash: SecretHash,
+    ) -> Optional[ActionInitInitiator]:
+        """ Find a route for the registered payment.
+
+        Returns None and fails the payment if there is no usable route.
+        """
+        token_network_address = payment_status.token_network_address
+        identifier = payment_status.payment_identifier
         error_msg, init_initiator_statechange = initiator_init(
             raiden=self,
             transfer_identifier=identifier,
-            transfer_amount=amount,
+            transfer_amount=payment_status.amount,
             transfer_secret=secret,
             transfer_secrethash=secrethash,
             token_network_address=token_network_address,
             target_address=target,
-            lock_timeout=lock_timeout,
+            lock_timeout=payment_status.lock_timeout,
         )
 
         # FIXME: Dispatch the state change even if there are no routes to
         # create the WAL entry.
-        if error_msg is None:
-            self.handle_and_track_state_changes([init_initiator_statechange])
-        else:
+        if error_msg is not None:
             failed = EventPaymentSentFailed(
                 token_network_registry_address=self.default_registry.address,
                 token_network_address=token_network_address,
@@ -1524,8 +1780,9 @@ def start_mediated_transfer_with_secret(
                 reason=error_msg,
             )
             payment_status.payment_done.set(failed)
+            return None
 
-        return payment_status
+        return init_initiator_statechange
 
     def withdraw(
         self, canonical_identifier: CanonicalIdentifier, total_withdraw: WithdrawAmount
@@ -1,3 +1,5 @@
+import time
+from dataclasses import replace
 from heapq import heappop, heappush
 from uuid import UUID
 
@@ -10,12 +12,17 @@
 from raiden.network.pathfinding import PFSConfig, query_paths
 from raiden.settings import INTERNAL_ROUTING_DEFAULT_FEE_PERC
 from raiden.transfer import channel, views
+from raiden.transfer.identifiers import CanonicalIdentifier
 from raiden.transfer.state import ChainState, ChannelState, NetworkState, RouteState
 from raiden.utils.formatting import to_checksum_address
+from raiden.utils.metrics import REGISTRY
 from raiden.utils.typing import (
+    MYPY_ANNOTATION,
     Address,
     BlockNumber,
+    Callable,
     ChannelID,
+    Dict,
     FeeAmount,
     InitiatorAddress,
     List,
@@ -25,12 +32,223 @@
     PaymentAmount,
     PaymentWithFeeAmount,
     TargetAddress,
+    TokenAmount,
     TokenNetworkAddress,
     Tuple,
 )
 
 log = structlog.get_logger(__name__)
 
+RouteCacheKey = Tuple[TokenNetworkAddress, TargetAddress, int]
+
+ROUTE_CACHE_LOOKUPS = REGISTRY.counter(
+    "raiden_route_cache_lookups", "Lookups of the route cache, by result", ["result"]
+)
+ROUTE_CACHE_HITS = ROUTE_CACHE_LOOKUPS.labels("hit")
+ROUTE_CACHE_MISSES = ROUTE_CACHE_LOOKUPS.labels("miss")
+ROUTE_CACHE_SAVED_PFS_FEES = REGISTRY.counter(
+    "raiden_route_cache_saved_pfs_fees",
+    "PFS fees which were not paid because the routes were found in the route cache",
+)
+
+
+class CachedRoutes(NamedTuple):
+    routes: List[RouteState]
+    amount: PaymentAmount
+    pfs_fee: TokenAmount
+    expires_at: float
+
+
+class RouteCache:
+    """ Routes found for recent payments, reused for payments to the same target.
+
+    Entries are keyed by the token network, the target and the bucket of the
+    payment amount (powers of two), so a single PFS request or graph search
+    serves all payments of a similar size to the same target.
+
+    Cached routes are only a hint, before they are used each route is
+    revalidated against the local state of its forward channel and the
+    reachability of the partner, routes that can not be used for the payment
+    are skipped. Entries are invalidated after `ttl` seconds, when the state
+    of a channel or the reachability of a node used by them changes, and when
+    one of their routes failed.
+
+    The feedback token of the PFS request is not cached, the PFS expects the
+    feedback for a token once, for the payment which requested the routes.
+    """
+
+    def __init__(self, ttl: float, max_size: int = 1024) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: Dict[RouteCacheKey, CachedRoutes] = dict()
+
+        self.hits = 0
+        self.misses = 0
+        self.saved_pfs_fees = TokenAmount(0)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    @staticmethod
+    def _key(
+        token_network_address: TokenNetworkAddress,
+        to_address: TargetAddress,
+        amount: PaymentAmount,
+    ) -> RouteCacheKey:
+        return token_network_address, to_address, amount.bit_length()
+
+    def get(
+        self,
+        chain_state: ChainState,
+        token_network_address: TokenNetworkAddress,
+        to_address: TargetAddress,
+        amount: PaymentAmount,
+    ) -> Optional[List[RouteState]]:
+        """ Returns the cached routes which are usable for a payment of `amount`. """
+        if self.ttl <= 0:
+            return None
+
+        key = self._key(token_network_address, to_address, amount)
+        entry = self._entries.get(key)
+
+        if entry is not None and entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            entry = None
+
+        # The entry is kept if its routes can not carry this payment, they may
+        # still be usable for a smaller payment of the same bucket
+        routes: List[RouteState] = list()
+        if entry is not None:
+            routes = self._usable_routes(chain_state, token_network_address, entry, amount)
+
+        if entry is None or not routes:
+            self.misses += 1
+            ROUTE_CACHE_MISSES.inc()
+            return None
+
+        self.hits += 1
+        self.saved_pfs_fees = TokenAmount(self.saved_pfs_fees + entry.pfs_fee)
+        ROUTE_CACHE_HITS.inc()
+        ROUTE_CACHE_SAVED_PFS_FEES.inc(entry.pfs_fee)
+        log.debug(
+            "Using cached routes",
+            target=to_checksum_address(to_address),
+            amount=amount,
+            routes=routes,
+            hit_rate=self.hit_rate,
+            saved_pfs_fees=self.saved_pfs_fees,
+        )
+        return routes
+
+    @staticmethod
+    def _usable_routes(
+        chain_state: ChainState,
+        token_network_address: TokenNetworkAddress,
+        entry: CachedRoutes,
+        amount: PaymentAmount,
+    ) -> List[RouteState]:
+        token_network = views.get_token_network_by_address(chain_state, token_network_address)
+        if token_network is None:
+            return list()
+
+        routes = list()
+        for route_state in entry.routes:
+            channel_state = token_network.channelidentifiers_to_channels.get(
+                route_state.forward_channel_id
+            )
+            if channel_state is None:
+                continue
+
+            network_status = views.get_node_network_status(
+                chain_state, channel_state.partner_state.address
+            )
+            if network_status != NetworkState.REACHABLE:
+                continue
+
+            # The fees were estimated for the amount of the original request.
+            # Never offer less than that, and scale it up for larger payments.
+            estimated_fee = FeeAmount(
+                max(
+                    route_state.estimated_fee,
+                    -(-route_state.estimated_fee * amount // entry.amount),
+                )
+            )
+            is_usable = channel.is_channel_usable_for_new_transfer(
+                channel_state, PaymentWithFeeAmount(amount + estimated_fee), None
+            )
+            if is_usable is channel.ChannelUsability.USABLE:
+                routes.append(
+                    replace(
+                        route_state, route=list(route_state.route), estimated_fee=estimated_fee
+                    )
+                )
+
+        return routes
+
+    def put(
+        self,
+        token_network_address: TokenNetworkAddress,
+        to_address: TargetAddress,
+        amount: PaymentAmount,
+        routes: List[RouteState],
+        pfs_fee: TokenAmount,
+    ) -> None:
+        if self.ttl <= 0 or not routes:
+            return
+
+        if len(self._entries) >= self.max_size:
+            # dicts are ordered by insertion, drop the oldest entry
+            del self._entries[next(iter(self._entries))]
+
+        key = self._key(token_network_address, to_address, amount)
+        self._entries[key] = CachedRoutes(
+            routes=routes, amount=amount, pfs_fee=pfs_fee, expires_at=time.monotonic() + self.ttl
+        )
+
+    def _invalidate_if(
+        self, token_network_address: TokenNetworkAddress, predicate: Callable[[RouteState], bool]
+    ) -> None:
+        stale_keys = [
+            key
+            for key, entry in self._entries.items()
+            if key[0] == token_network_address
+            and any(predicate(route_state) for route_state in entry.routes)
+        ]
+        for key in stale_keys:
+            del self._entries[key]
+
+    def invalidate_channel(self, canonical_identifier: CanonicalIdentifier) -> None:
+        """ Drop the entries which use the channel as the first hop. """
+        channel_identifier = canonical_identifier.channel_identifier
+        self._invalidate_if(
+            TokenNetworkAddress(canonical_identifier.token_network_address),
+            lambda route_state: route_state.forward_channel_id == channel_identifier,
+        )
+
+    def invalidate_route(
+        self, token_network_address: TokenNetworkAddress, route: List[Address]
+    ) -> None:
+        """ Drop the entries which contain the failed `route`. """
+        self._invalidate_if(token_network_address, lambda route_state: route_state.route == route)
+
+    def invalidate_node(self, node_address: Address) -> None:
+        """ Drop the entries which route through the node, e.g. because its
+        reachability changed.
+        """
+        stale_keys = [
+            key
+            for key, entry in self._entries.items()
+            if any(node_address in route_state.route for route_state in entry.routes)
+        ]
+        for key in stale_keys:
+            del self._entries[key]
+
+    def invalidate_token_network(self, token_network_address: TokenNetworkAddress) -> None:
+        """ Drop all entries of the token network, e.g. because of a new channel. """
+        self._invalidate_if(token_network_address, lambda route_state: True)
+
 
 def get_best_routes(
     chain_state: ChainState,
@@ -42,6 +260,7 @@ def get_best_routes(
     previous_address: Optional[Address],
     pfs_config: Optional[PFSConfig],
     privkey: bytes,
+    route_cache: Optional[RouteCache] = None,
 ) -> Tuple[Optional[str], List[RouteState], Optional[UUID]]:
 
     token_network = views.get_token_network_by_address(chain_state, token_network_address)
@@ -98,6 +317,19 @@ def get_best_routes(
 
             error_direct = is_usable
 
+    # Routes are only cached for the initiator, mediators must not route back
+    use_route_cache = route_cache is not None and previous_address is None
+    if use_route_cache:
+        assert route_cache, MYPY_ANNOTATION
+        cached_routes = route_cache.get(
+            chain_state=chain_state,
+            token_network_address=token_network_address,
+            to_address=to_address,
+            amount=amount,
+        )
+        if cached_routes is not None:
+            return (None, cached_routes, None)
+
     latest_channel_opened_at = BlockNumber(0)
     for partner_address in all_neighbors:
         for channel_id in token_network.partneraddresses_to_channelidentifiers[partner_address]:
@@ -197,6 +429,15 @@ def get_best_routes(
             log.info(
                 "Received route(s) from PFS", routes=pfs_routes, feedback_token=pfs_feedback_token
             )
+            if use_route_cache:
+                assert route_cache, MYPY_ANNOTATION
+                route_cache.put(
+                    token_network_address=token_network_address,
+                    to_address=to_address,
+                    amount=amount,
+                    routes=pfs_routes,
+                    pfs_fee=pfs_config.info.price,
+                )
             return (pfs_error_msg, pfs_routes, pfs_feedback_token)
 
         log.warning(
@@ -228,6 +469,16 @@ def get_best_routes(
                 )
             )
 
+        if use_route_cache:
+            assert route_cache, MYPY_ANNOTATION
+            route_cache.put(
+                token_network_address=token_network_address,
+                to_address=to_address,
+                amount=amount,
+                routes=available_routes,
+                pfs_fee=TokenAmount(0),
+            )
+
         return (None, available_routes, None)
 
 
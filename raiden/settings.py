@@ -11,8 +11,8 @@
     PATH_FINDING_BROADCASTING_ROOM,
     Environment,
 )
-from raiden.network.pathfinding import PFSConfig
 from raiden.utils.typing import (
+    TYPE_CHECKING,
     Address,
     BlockTimeout,
     ChainID,
@@ -30,6 +30,10 @@
 )
 from raiden_contracts.contract_manager import contracts_precompiled_path
 
+if TYPE_CHECKING:
+    # pylint: disable=unused-import
+    from raiden.network.pathfinding import PFSConfig  # noqa: F401
+
 CACHE_TTL = 60
 GAS_LIMIT = 10 * 10 ** 6
 GAS_LIMIT_HEX = to_hex(GAS_LIMIT)
@@ -47,6 +51,12 @@
 # - Network latency
 # - The Raiden node might not be able to process the messages immediately
 DEFAULT_TRANSPORT_MATRIX_SYNC_LATENCY = 15_000
+# Messages to the same partner which are sent within this many seconds after
+# the previous batch are held back and sent together in a single batch.
+DEFAULT_TRANSPORT_MATRIX_SEND_COALESCE_INTERVAL = 0.005
+# Sync responses of at least this many bytes are decoded, and their events
+# extracted, in worker threads instead of on the gevent hub. None disables it.
+DEFAULT_TRANSPORT_MATRIX_SYNC_OFFLOAD_THRESHOLD = 512 * 1024
 DEFAULT_MATRIX_KNOWN_SERVERS = {
     # FIXME, XXX: Change to new mainet known servers file after mainnet testing is done!
     Environment.PRODUCTION: (
@@ -63,6 +73,8 @@
 DEFAULT_SETTLE_TIMEOUT = BlockTimeout(500)
 DEFAULT_RETRY_TIMEOUT = NetworkTimeout(0.5)
 DEFAULT_BLOCKCHAIN_QUERY_INTERVAL = 5.0
+DEFAULT_SECRET_REGISTRY_MAX_STALENESS = 2 * DEFAULT_BLOCKCHAIN_QUERY_INTERVAL
+DEFAULT_SECRET_REGISTRY_RETENTION_BLOCKS = DEFAULT_SETTLE_TIMEOUT
 DEFAULT_JOINABLE_FUNDS_TARGET = 0.4
 DEFAULT_INITIAL_CHANNEL_TARGET = 3
 DEFAULT_WAIT_FOR_SETTLE = True
@@ -79,6 +91,8 @@
 DEFAULT_PATHFINDING_MAX_FEE = TokenAmount(5 * 10 ** 16)  # about .01$
 # PFS has 200 000 blocks (~40days) to cash in
 DEFAULT_PATHFINDING_IOU_TIMEOUT = BlockTimeout(2 * 10 ** 5)
+# Seconds for which the routes to a payment target are reused
+DEFAULT_ROUTE_CACHE_TTL = 60.0
 
 DEFAULT_MEDIATION_FLAT_FEE = FeeAmount(0)
 DEFAULT_MEDIATION_PROPORTIONAL_FEE = ProportionalFeeAmount(4000)  # 0.4% in parts per million
@@ -141,6 +155,8 @@ class MatrixTransportConfig:
     available_servers: List[str]
     sync_timeout: int = DEFAULT_TRANSPORT_MATRIX_SYNC_TIMEOUT
     sync_latency: int = DEFAULT_TRANSPORT_MATRIX_SYNC_LATENCY
+    send_coalesce_interval: float = DEFAULT_TRANSPORT_MATRIX_SEND_COALESCE_INTERVAL
+    sync_offload_threshold: Optional[int] = DEFAULT_TRANSPORT_MATRIX_SYNC_OFFLOAD_THRESHOLD
 
 
 @dataclass
@@ -149,6 +165,7 @@ class ServiceConfig:
     pathfinding_max_paths: int = DEFAULT_PATHFINDING_MAX_PATHS
     pathfinding_max_fee: TokenAmount = DEFAULT_PATHFINDING_MAX_FEE
     pathfinding_iou_timeout: BlockTimeout = DEFAULT_PATHFINDING_IOU_TIMEOUT
+    route_cache_ttl: float = DEFAULT_ROUTE_CACHE_TTL
     monitoring_enabled: bool = False
 
 
@@ -166,6 +183,12 @@ class BlockchainConfig:
     query_interval: float = DEFAULT_BLOCKCHAIN_QUERY_INTERVAL
     timeout_before_block_pruned: float = DEFAULT_TIMEOUT_BEFORE_BLOCK_PRUNED
     block_batch_size_config: BlockBatchSizeConfig = BlockBatchSizeConfig()
+    # Seconds without an update after which the secret registry mirror is
+    # synchronized with the latest block before a lookup
+    secret_registry_max_staleness: float = DEFAULT_SECRET_REGISTRY_MAX_STALENESS
+    # Blocks for which the registered secrets are kept by the mirror, the
+    # locks are bound to expire within the settlement window of their channel
+    secret_registry_retention_blocks: BlockTimeout = DEFAULT_SECRET_REGISTRY_RETENTION_BLOCKS
 
 
 @dataclass
@@ -190,6 +213,9 @@ class RaidenConfig:
 
     contracts_path: Path = contracts_precompiled_path(RAIDEN_CONTRACT_VERSION)
     database_path: DatabasePath = ":memory:"
+    # Database where the write-ahead-log older than the latest snapshot is
+    # moved to, the write-ahead-log is not archived if this is not set
+    archive_database_path: Optional[DatabasePath] = None
 
     blockchain: BlockchainConfig = BlockchainConfig()
     mediation_fees: MediationFeeConfig = MediationFeeConfig()
@@ -218,4 +244,4 @@ class RaidenConfig:
     console: bool = False
     resolver_endpoint: Optional[str] = None
 
-    pfs_config: Optional[PFSConfig] = None
+    pfs_config: Optional["PFSConfig"] = None
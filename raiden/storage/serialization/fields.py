@@ -53,6 +53,20 @@ def _deserialize(
             raise self.make_error("validator_failed", input=value)
 
 
+class BytesTupleField(marshmallow.fields.List):
+    """ Used for `Tuple[bytes, ...]` in the dataclass, serialized like a list
+    of `bytes`
+    """
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(BytesField(), **kwargs)
+
+    def _deserialize(  # type: ignore
+        self, value: Any, attr: Any, data: Any, **kwargs: Any
+    ) -> Tuple[bytes, ...]:
+        return tuple(super()._deserialize(value, attr, data, **kwargs))
+
+
 class AddressField(marshmallow.fields.Field):
     """ Converts addresses from bytes to hex and vice versa """
 
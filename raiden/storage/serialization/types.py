@@ -6,6 +6,7 @@
 from raiden.storage.serialization.fields import (
     AddressField,
     BytesField,
+    BytesTupleField,
     CallablePolyField,
     IntegerToStringField,
     NetworkXGraphField,
@@ -77,6 +78,7 @@
     TokenNetworkRegistryAddress,
     TransactionHash,
     TransferID,
+    Tuple,
     Union,
     UserDepositAddress,
     WithdrawAmount,
@@ -130,6 +132,7 @@
         SecretHash: BytesField,
         Signature: BytesField,
         TransactionHash: BytesField,
+        Tuple[EncodedData, ...]: BytesTupleField,
         # Ints
         BlockExpiration: IntegerToStringField,
         BlockNumber: IntegerToStringField,
@@ -1,4 +1,5 @@
 import sqlite3
+import zlib
 from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime
@@ -12,7 +13,11 @@
 from raiden.exceptions import InvalidDBData, InvalidNumberInput
 from raiden.storage.serialization import SerializationBase
 from raiden.storage.ulid import ULID, ULIDMonotonicFactory
-from raiden.storage.utils import DB_SCRIPT_CREATE_TABLES, TimestampedEvent
+from raiden.storage.utils import (
+    DB_SCRIPT_CREATE_ARCHIVE,
+    DB_SCRIPT_CREATE_TABLES,
+    TimestampedEvent,
+)
 from raiden.transfer.architecture import Event, State, StateChange
 from raiden.utils.system import get_system_spec
 from raiden.utils.typing import (
@@ -32,6 +37,9 @@
     Union,
 )
 
+# Value of `PRAGMA auto_vacuum` for the incremental vacuum
+INCREMENTAL_AUTO_VACUUM = 2
+
 StateChangeID = NewType("StateChangeID", ULID)
 SnapshotID = NewType("SnapshotID", ULID)
 EventID = NewType("EventID", ULID)
@@ -128,6 +136,18 @@ def convert_ulid_identifier(data: bytes) -> ULID:
     return ULID(identifier=data)
 
 
+def _compress(data: Optional[str]) -> Optional[bytes]:
+    if data is None:
+        return None
+    return zlib.compress(data.encode())
+
+
+def _decompress(data: Optional[bytes]) -> Optional[str]:
+    if data is None:
+        return None
+    return zlib.decompress(data).decode()
+
+
 def _sanitize_limit_and_offset(
     limit: Optional[int] = None, offset: Optional[int] = None
 ) -> Tuple[int, int]:
@@ -241,6 +261,7 @@ def __init__(self, database_path: DatabasePath):
 
         self.conn = conn
         self.in_transaction = False
+        self.archive_attached = False
 
         # Dict[Type[ID], ULIDMonotonicFactory[ID]] is not supported yet.
         # Reference: https://github.com/python/mypy/issues/4928
@@ -405,14 +426,17 @@ def get_snapshot_before_state_change(
         if not isinstance(state_change_identifier, ULID):  # pragma: no unittest
             raise ValueError("from_identifier must be an ULID")
 
-        cursor = self.conn.execute(
-            "SELECT identifier, statechange_qty, statechange_id, data FROM state_snapshot "
-            "WHERE statechange_id <= ? "
-            "ORDER BY identifier DESC LIMIT 1",
-            (state_change_identifier,),
-        )
-
-        rows = cursor.fetchall()
+        rows: List[Tuple[Any, ...]] = list()
+        for table in self._tables("state_snapshot"):
+            cursor = self.conn.execute(
+                f"SELECT identifier, statechange_qty, statechange_id, data FROM {table} "
+                f"WHERE statechange_id <= ? "
+                f"ORDER BY identifier DESC LIMIT 1",
+                (state_change_identifier,),
+            )
+            rows = cursor.fetchall()
+            if rows:
+                break
 
         result: Optional[SnapshotEncodedRecord] = None
         if rows:
@@ -431,20 +455,21 @@ def get_latest_event_by_data_field(
         self, query: FilteredDBQuery
     ) -> Optional[EventEncodedRecord]:
         """ Return the latest event filtered query."""
-        cursor = self.conn.cursor()
-
         query_str, args = _query_to_string(query)
 
-        cursor.execute(
-            f"SELECT identifier, source_statechange_id, data FROM state_events WHERE "
-            f"{query_str}"
-            f"ORDER BY identifier DESC LIMIT 1",
-            args,
-        )
+        row = None
+        for table in self._tables("state_events"):
+            cursor = self.conn.execute(
+                f"SELECT identifier, source_statechange_id, data FROM {table} WHERE "
+                f"{query_str}"
+                f"ORDER BY identifier DESC LIMIT 1",
+                args,
+            )
+            row = cursor.fetchone()
+            if row:
+                break
 
         result = None
-
-        row = cursor.fetchone()
         if row:
             event_id = row[0]
             state_change_identifier = row[1]
@@ -491,21 +516,22 @@ def get_latest_state_change_by_data_field(
         self, query: FilteredDBQuery
     ) -> Optional[StateChangeEncodedRecord]:
         """ Return all state changes filtered by a named field and value."""
-        cursor = self.conn.cursor()
-
         query_str, args = _query_to_string(query)
 
-        sql = (
-            f"SELECT identifier, data "
-            f"FROM state_changes "
-            f"WHERE {query_str} "
-            f"ORDER BY identifier "
-            f"DESC LIMIT 1"
-        )
-        cursor.execute(sql, args)
+        row = None
+        for table in self._tables("state_changes"):
+            sql = (
+                f"SELECT identifier, data "
+                f"FROM {table} "
+                f"WHERE {query_str} "
+                f"ORDER BY identifier "
+                f"DESC LIMIT 1"
+            )
+            row = self.conn.execute(sql, args).fetchone()
+            if row:
+                break
 
         result = None
-        row = cursor.fetchone()
         if row:
             state_change_identifier = row[0]
             state_change = row[1]
@@ -578,11 +604,11 @@ def get_statechanges_records_by_range(
         cursor = self.conn.cursor()
 
         query = (
-            "SELECT identifier, data "
-            "FROM state_changes "
-            "WHERE identifier "
-            "BETWEEN ? AND ? "
-            "ORDER BY identifier ASC"
+            f"SELECT identifier, data "
+            f"FROM {self._combined_table('state_changes')} "
+            f"WHERE identifier "
+            f"BETWEEN ? AND ? "
+            f"ORDER BY identifier ASC"
         )
         cursor.execute(query, (db_range.first, db_range.last))
 
@@ -599,7 +625,7 @@ def _query_events(
         logical_and: bool = True,
     ) -> List[Tuple[str, datetime]]:
         cursor = self._form_and_execute_json_query(
-            query="SELECT data, timestamp FROM state_events ",
+            query=f"SELECT data, timestamp FROM {self._combined_table('state_events')} ",
             limit=limit,
             offset=offset,
             filters=filters,
@@ -676,6 +702,38 @@ def get_events_with_timestamps(
 
         return [TimestampedEvent(entry[0], entry[1]) for entry in entries]
 
+    def get_events_with_timestamps_after(
+        self, event_identifier: EventID, event_types: List[str], limit: int
+    ) -> List[Tuple[EventID, TimestampedEvent]]:
+        """ Return the first `limit` events of one of the `event_types`
+        written after `event_identifier`.
+
+        The events are looked up with the primary key, only the events after
+        `event_identifier` are decoded to check the type.
+        """
+        placeholders = ", ".join("?" for _ in event_types)
+        cursor = self.conn.execute(
+            f"SELECT identifier, data, timestamp FROM {self._combined_table('state_events')} "
+            f"WHERE identifier > ? AND json_extract(data, '$._type') IN ({placeholders}) "
+            f"ORDER BY identifier ASC LIMIT ?",
+            (event_identifier, *event_types, limit),
+        )
+        return [(row[0], TimestampedEvent(row[1], row[2])) for row in cursor]
+
+    def get_latest_event_identifier(self) -> Optional[EventID]:
+        cursor = self.conn.execute(
+            "SELECT identifier FROM state_events ORDER BY identifier DESC LIMIT 1"
+        )
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def get_latest_state_change_identifier(self) -> Optional[StateChangeID]:
+        cursor = self.conn.execute(
+            "SELECT identifier FROM state_changes ORDER BY identifier DESC LIMIT 1"
+        )
+        row = cursor.fetchone()
+        return row[0] if row else None
+
     def get_events(self, limit: int = None, offset: int = None) -> List[str]:
         entries = self._query_events(limit, offset)
         return [entry[0] for entry in entries]
@@ -712,6 +770,132 @@ def update_snapshots(self, snapshots_data: List[Tuple[str, SnapshotID]]) -> None
         cursor.executemany("UPDATE state_snapshot SET data=? WHERE identifier=?", snapshots_data)
         self.maybe_commit()
 
+    def get_matrix_sync_state(self, user_id: str) -> Optional[str]:
+        cursor = self.conn.cursor()
+        query = cursor.execute("SELECT data FROM matrix_sync WHERE user_id=?", (user_id,))
+        result = query.fetchone()
+
+        if result is None:
+            return None
+
+        return result[0]
+
+    def write_matrix_sync_state(self, user_id: str, data: str) -> None:
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "INSERT OR REPLACE INTO matrix_sync(user_id, data) VALUES(?, ?)", (user_id, data)
+        )
+        self.maybe_commit()
+
+    def delete_matrix_sync_state(self, user_id: str) -> None:
+        cursor = self.conn.cursor()
+        cursor.execute("DELETE FROM matrix_sync WHERE user_id=?", (user_id,))
+        self.maybe_commit()
+
+    def attach_archive(self, archive_path: DatabasePath) -> None:
+        """ Attach the archive database at `archive_path`.
+
+        The rows moved by `archive_before_latest_snapshot` are still returned
+        by the lookups of balance proofs and transfers, the payment history,
+        and by the restore of the state at an older state change. The batch
+        queries used by the upgrades read only the main database, so the
+        archive is tied to the version of the database.
+
+        Existing databases are vacuumed once, to enable the incremental
+        vacuum after the rows are archived.
+        """
+        self.conn.create_function("archive_compress", 1, _compress)
+        self.conn.create_function("archive_decompress", 1, _decompress)
+
+        auto_vacuum = self.conn.execute("PRAGMA main.auto_vacuum").fetchone()[0]
+        if auto_vacuum != INCREMENTAL_AUTO_VACUUM:
+            self.conn.execute("PRAGMA main.auto_vacuum=INCREMENTAL")
+            self.conn.execute("VACUUM")
+
+        self.conn.execute("ATTACH DATABASE ? AS archive", (str(archive_path),))
+        with self.conn:
+            self.conn.executescript(DB_SCRIPT_CREATE_ARCHIVE)
+
+        self.archive_attached = True
+
+    def archive_before_latest_snapshot(self, limit: int) -> int:
+        """ Move up to `limit` state changes older than the latest snapshot,
+        with their events and snapshots, to the archive database.
+
+        The state changes after the latest snapshot are needed to restore the
+        node and are never moved. Returns the number of archived state
+        changes, the archiving is done when it returns less than `limit`.
+        """
+        assert self.archive_attached, "The archive database is not attached"
+
+        row = self.conn.execute(
+            "SELECT statechange_id FROM state_snapshot ORDER BY identifier DESC LIMIT 1"
+        ).fetchone()
+        if row is None:
+            return 0
+
+        # The identifier of the last state change of the batch
+        batch = self.conn.execute(
+            "SELECT COUNT(1), MAX(identifier) FROM ("
+            "   SELECT identifier FROM state_changes WHERE identifier < ? "
+            "   ORDER BY identifier ASC LIMIT ?"
+            ")",
+            (row[0], limit),
+        ).fetchone()
+        archived_count, last_identifier = batch
+        if archived_count == 0:
+            return 0
+
+        # The events and snapshots reference the state changes, they are
+        # deleted first
+        with self.transaction():
+            self.conn.execute(
+                "INSERT INTO archive.state_changes "
+                "SELECT identifier, data, timestamp FROM main.state_changes "
+                "WHERE identifier <= ?",
+                (last_identifier,),
+            )
+            self.conn.execute(
+                "INSERT INTO archive.state_events "
+                "SELECT identifier, source_statechange_id, data, timestamp "
+                "FROM main.state_events WHERE source_statechange_id <= ?",
+                (last_identifier,),
+            )
+            self.conn.execute(
+                "INSERT INTO archive.state_snapshot "
+                "SELECT identifier, statechange_id, statechange_qty, archive_compress(data), "
+                "timestamp FROM main.state_snapshot WHERE statechange_id <= ?",
+                (last_identifier,),
+            )
+            self.conn.execute(
+                "DELETE FROM main.state_events WHERE source_statechange_id <= ?",
+                (last_identifier,),
+            )
+            self.conn.execute(
+                "DELETE FROM main.state_snapshot WHERE statechange_id <= ?", (last_identifier,)
+            )
+            self.conn.execute(
+                "DELETE FROM main.state_changes WHERE identifier <= ?", (last_identifier,)
+            )
+
+        # Return the pages freed by this batch to the file system. The pragma
+        # frees one page per step, so the cursor must be exhausted.
+        self.conn.execute("PRAGMA main.incremental_vacuum").fetchall()
+
+        return archived_count
+
+    def _tables(self, table: str) -> List[str]:
+        """ The tables to look `table` up, the archive is looked up last. """
+        if self.archive_attached:
+            return [f"main.{table}", f"temp.archived_{table}"]
+        return [table]
+
+    def _combined_table(self, table: str) -> str:
+        """ The table or view with the rows of `table` and of the archive. """
+        if self.archive_attached:
+            return f"temp.all_{table}"
+        return table
+
     def maybe_commit(self) -> None:
         if not self.in_transaction:
             self.conn.commit()
@@ -885,6 +1069,26 @@ def get_events_with_timestamps(
             for event in events
         ]
 
+    def get_events_with_timestamps_after(
+        self, event_identifier: EventID, event_types: List[str], limit: int
+    ) -> List[Tuple[EventID, TimestampedEvent]]:
+        events = self.database.get_events_with_timestamps_after(
+            event_identifier=event_identifier, event_types=event_types, limit=limit
+        )
+        return [
+            (
+                event_identifier,
+                TimestampedEvent(self.serializer.deserialize(event.wrapped_event), event.log_time),
+            )
+            for event_identifier, event in events
+        ]
+
+    def get_latest_event_identifier(self) -> Optional[EventID]:
+        return self.database.get_latest_event_identifier()
+
+    def get_latest_state_change_identifier(self) -> Optional[StateChangeID]:
+        return self.database.get_latest_state_change_identifier()
+
     def get_events(self, limit: int = None, offset: int = None) -> List[Event]:
         events = self.database.get_events(limit, offset)
         return [self.serializer.deserialize(event) for event in events]
@@ -899,5 +1103,24 @@ def get_state_changes_stream(
 
             gevent.sleep(retry_timeout)
 
+    def attach_archive(self, archive_path: DatabasePath) -> None:
+        self.database.attach_archive(archive_path)
+
+    def archive_before_latest_snapshot(self, limit: int) -> int:
+        return self.database.archive_before_latest_snapshot(limit)
+
+    def get_matrix_sync_state(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """ The Matrix sync token and rooms saved by the transport of `user_id`. """
+        data = self.database.get_matrix_sync_state(user_id)
+        if data is None:
+            return None
+        return self.serializer.deserialize(data)
+
+    def write_matrix_sync_state(self, user_id: str, sync_state: Dict[str, Any]) -> None:
+        self.database.write_matrix_sync_state(user_id, self.serializer.serialize(sync_state))
+
+    def delete_matrix_sync_state(self, user_id: str) -> None:
+        self.database.delete_matrix_sync_state(user_id)
+
     def close(self) -> None:
         self.database.close()
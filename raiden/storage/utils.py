@@ -92,10 +92,17 @@ def __getattr__(self, item: str) -> Event:
 );
 """
 
+DB_CREATE_MATRIX_SYNC = """
+CREATE TABLE IF NOT EXISTS matrix_sync (
+    user_id TEXT PRIMARY KEY NOT NULL,
+    data JSON NOT NULL
+);
+"""
+
 DB_SCRIPT_CREATE_TABLES = """
 PRAGMA foreign_keys=off;
 BEGIN TRANSACTION;
-{}{}{}{}{}
+{}{}{}{}{}{}
 COMMIT;
 PRAGMA foreign_keys=on;
 """.format(
@@ -104,4 +111,51 @@ def __getattr__(self, item: str) -> Event:
     DB_CREATE_SNAPSHOT,
     DB_CREATE_STATE_EVENTS,
     DB_CREATE_RUNS,
+    DB_CREATE_MATRIX_SYNC,
 )
+
+# The archive database is attached as the `archive` schema. It has the tables
+# of the write-ahead-log, the temporary views combine the archive with the main
+# tables. The state changes and events are filtered by their JSON data, so
+# they are stored uncompressed. Only the snapshots, which are looked up by the
+# state change identifier, are compressed and decompressed by their view.
+DB_SCRIPT_CREATE_ARCHIVE = """
+CREATE TABLE IF NOT EXISTS archive.state_changes (
+    identifier ULID PRIMARY KEY NOT NULL,
+    data JSON,
+    timestamp TIMESTAMP NOT NULL
+);
+CREATE TABLE IF NOT EXISTS archive.state_snapshot (
+    identifier ULID PRIMARY KEY NOT NULL,
+    statechange_id ULID NOT NULL,
+    statechange_qty INTEGER,
+    data BLOB,
+    timestamp TIMESTAMP NOT NULL
+);
+CREATE TABLE IF NOT EXISTS archive.state_events (
+    identifier ULID PRIMARY KEY NOT NULL,
+    source_statechange_id ULID NOT NULL,
+    data JSON,
+    timestamp TIMESTAMP NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS main.state_events_source_statechange_id
+    ON state_events(source_statechange_id);
+
+CREATE TEMP VIEW IF NOT EXISTS archived_state_changes AS
+    SELECT identifier, data, timestamp FROM archive.state_changes;
+CREATE TEMP VIEW IF NOT EXISTS archived_state_snapshot AS
+    SELECT identifier, statechange_id, statechange_qty, archive_decompress(data) AS data, timestamp
+    FROM archive.state_snapshot;
+CREATE TEMP VIEW IF NOT EXISTS archived_state_events AS
+    SELECT identifier, source_statechange_id, data, timestamp FROM archive.state_events;
+
+CREATE TEMP VIEW IF NOT EXISTS all_state_changes AS
+    SELECT identifier, data, timestamp FROM archived_state_changes
+    UNION ALL
+    SELECT identifier, data, timestamp FROM main.state_changes;
+CREATE TEMP VIEW IF NOT EXISTS all_state_events AS
+    SELECT identifier, source_statechange_id, data, timestamp FROM archived_state_events
+    UNION ALL
+    SELECT identifier, source_statechange_id, data, timestamp FROM main.state_events;
+"""
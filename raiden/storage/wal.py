@@ -1,3 +1,4 @@
+import time
 from dataclasses import dataclass
 
 import gevent.lock
@@ -6,6 +7,7 @@
 from raiden.storage.serialization import DictSerializer
 from raiden.storage.sqlite import (
     LOW_STATECHANGE_ULID,
+    EventID,
     Range,
     SerializedSQLiteStorage,
     StateChangeID,
@@ -13,6 +15,7 @@
 from raiden.transfer.architecture import Event, State, StateChange, StateManager
 from raiden.utils.formatting import to_checksum_address
 from raiden.utils.logging import redact_secret
+from raiden.utils.metrics import REGISTRY
 from raiden.utils.typing import (
     Address,
     Callable,
@@ -26,6 +29,14 @@
 
 log = structlog.get_logger(__name__)
 
+WRITE_DURATION = REGISTRY.histogram(
+    "raiden_wal_write_seconds",
+    "Time to write a batch of state changes and their events to the database",
+)
+SNAPSHOT_DURATION = REGISTRY.histogram(
+    "raiden_wal_snapshot_seconds", "Time to write a state snapshot to the database"
+)
+
 
 def restore_to_state_change(
     transition_function: Callable,
@@ -95,12 +106,18 @@ class SavedState(Generic[ST]):
     state: ST
 
 
+# Called with the dispatched state changes, the new state, and the events
+# produced by the state changes together with their identifiers
+DispatchCallback = Callable[[List[StateChange], ST, List[Tuple[EventID, Event]]], None]
+
+
 class WriteAheadLog(Generic[ST]):
     saved_state: SavedState[ST]
 
     def __init__(self, state_manager: StateManager[ST], storage: SerializedSQLiteStorage) -> None:
         self.state_manager = state_manager
         self.storage = storage
+        self.callbacks: List[DispatchCallback] = list()
 
         # The state changes must be applied in the same order as they are saved
         # to the WAL. Because writing to the database context switches, and the
@@ -119,7 +136,9 @@ def log_and_dispatch(self, state_changes: List[StateChange]) -> Tuple[ST, List[E
         """
 
         with self._lock:
+            before_write = time.monotonic()
             all_state_change_ids = self.storage.write_state_changes(state_changes)
+            write_duration = time.monotonic() - before_write
 
             latest_state, all_events = self.state_manager.dispatch(state_changes)
             latest_state_change_id = all_state_change_ids[-1]
@@ -135,10 +154,27 @@ def log_and_dispatch(self, state_changes: List[StateChange]) -> Tuple[ST, List[E
                 for event in events:
                     event_data.append((state_change_id, event))
 
-            self.storage.write_events(event_data)
+            before_write = time.monotonic()
+            event_ids = self.storage.write_events(event_data)
+            WRITE_DURATION.observe(write_duration + time.monotonic() - before_write)
+
+            # The callbacks are called with the lock held, so that they see
+            # the dispatches in order
+            if self.callbacks:
+                identified_events = list(zip(event_ids, flattened_events))
+                for callback in self.callbacks:
+                    callback(state_changes, latest_state, identified_events)
 
         return latest_state, flattened_events
 
+    def register_callback(self, callback: DispatchCallback) -> None:
+        """ Register `callback` to be called after every dispatch.
+
+        The callback must not block nor switch to other greenlets, since the
+        other dispatches wait for it.
+        """
+        self.callbacks.append(callback)
+
     def snapshot(self, statechange_qty: int) -> None:
         """ Snapshot the application state.
 
@@ -151,7 +187,9 @@ def snapshot(self, statechange_qty: int) -> None:
 
             # otherwise no state change was dispatched
             if state_change_id and current_state is not None:
+                before_snapshot = time.monotonic()
                 self.storage.write_state_snapshot(current_state, state_change_id, statechange_qty)
+                SNAPSHOT_DURATION.observe(time.monotonic() - before_snapshot)
 
     @property
     def version(self) -> RaidenDBVersion:
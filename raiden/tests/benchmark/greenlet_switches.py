@@ -0,0 +1,48 @@
+""" Benchmark the overhead of `track_greenlet_switches` per greenlet switch.
+
+Two greenlets yield to the hub in a loop, so that every iteration is two
+switches from a greenlet to the hub and two back, as many as for a message
+which is received and then handled in its own greenlet.
+"""
+import argparse
+import time
+
+import gevent
+
+from raiden.utils.metrics import GreenletSwitchTracking
+
+
+def yield_to_the_hub(iterations: int) -> None:
+    for _ in range(iterations):
+        gevent.sleep(0)
+
+
+def measure(name: str, iterations: int) -> float:
+    start = time.monotonic()
+    greenlets = set(gevent.spawn(yield_to_the_hub, iterations) for _ in range(2))
+    gevent.joinall(greenlets, raise_error=True)
+    elapsed = time.monotonic() - start
+
+    per_switch = elapsed / (iterations * 4) * 1_000_000
+    print(f"{name:<10} {iterations:>8} iterations  {per_switch:6.2f}us/switch")
+    return per_switch
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200_000)
+    args = parser.parse_args()
+
+    untracked = measure("untracked", args.iterations)
+
+    tracking = GreenletSwitchTracking()
+    try:
+        tracked = measure("tracked", args.iterations)
+    finally:
+        tracking.stop()
+
+    print(f"overhead   {tracked - untracked:6.2f}us/switch")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+""" Benchmark the pending locks bookkeeping of a channel end.
+
+Every lock is added and then removed, computing the new locksroot each time,
+as done for a locked transfer and its unlock. The naive implementation scans
+and re-hashes all locks for each operation, and is shown for comparison.
+
+The `dispatch` variants do every operation in a state transition of a
+`StateManager`, which includes the copy of the state done for each dispatch.
+"""
+import argparse
+import time
+from dataclasses import dataclass
+
+from eth_utils import keccak
+
+from raiden.log_config import configure_logging
+from raiden.transfer.architecture import State, StateChange, StateManager, TransitionResult
+from raiden.transfer.channel import compute_locks_with, compute_locks_without, compute_locksroot
+from raiden.transfer.state import (
+    HashTimeLockState,
+    PendingLocksState,
+    make_empty_pending_locks_state,
+)
+from raiden.utils.typing import (
+    Any,
+    BlockExpiration,
+    Callable,
+    EncodedData,
+    List,
+    Optional,
+    PaymentWithFeeAmount,
+    SecretHash,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+
+def make_locks(count: int) -> List[HashTimeLockState]:
+    return [
+        HashTimeLockState(
+            amount=PaymentWithFeeAmount(1),
+            expiration=BlockExpiration(100),
+            secrethash=SecretHash(keccak(index.to_bytes(32, "big"))),
+        )
+        for index in range(count)
+    ]
+
+
+def add_pending_locks(locks: List[HashTimeLockState]) -> PendingLocksState:
+    pending_locks = make_empty_pending_locks_state()
+    for lock in locks:
+        new_pending_locks = compute_locks_with(pending_locks, lock)
+        assert new_pending_locks, "locks are unique"
+        pending_locks = new_pending_locks
+        compute_locksroot(pending_locks)
+    return pending_locks
+
+
+def remove_pending_locks(locks: List[HashTimeLockState], pending_locks: PendingLocksState) -> None:
+    for lock in locks:
+        new_pending_locks = compute_locks_without(pending_locks, EncodedData(lock.encoded))
+        assert new_pending_locks, "locks are pending"
+        pending_locks = new_pending_locks
+        compute_locksroot(pending_locks)
+
+
+def add_naive(locks: List[HashTimeLockState]) -> List[EncodedData]:
+    pending_locks: List[EncodedData] = list()
+    for lock in locks:
+        assert lock.encoded not in pending_locks, "locks are unique"
+        pending_locks = pending_locks + [lock.encoded]
+        keccak(b"".join(pending_locks))
+    return pending_locks
+
+
+def remove_naive(locks: List[HashTimeLockState], pending_locks: List[EncodedData]) -> None:
+    for lock in locks:
+        assert lock.encoded in pending_locks, "locks are pending"
+        pending_locks = list(pending_locks)
+        pending_locks.remove(lock.encoded)
+        keccak(b"".join(pending_locks))
+
+
+@dataclass
+class PendingLocksHolder(State):
+    pending_locks: Any
+
+
+@dataclass
+class AddLock(StateChange):
+    lock: HashTimeLockState
+
+
+@dataclass
+class RemoveLock(StateChange):
+    lock: HashTimeLockState
+
+
+def pending_locks_transition(
+    state: Optional[PendingLocksHolder], state_change: StateChange
+) -> TransitionResult[Optional[PendingLocksHolder]]:
+    assert state is not None, "the state is initialized"
+    if isinstance(state_change, AddLock):
+        new_pending_locks = compute_locks_with(state.pending_locks, state_change.lock)
+        assert new_pending_locks, "locks are unique"
+    else:
+        assert isinstance(state_change, RemoveLock), "only locks are added and removed"
+        new_pending_locks = compute_locks_without(
+            state.pending_locks, EncodedData(state_change.lock.encoded)
+        )
+        assert new_pending_locks, "locks are pending"
+    state.pending_locks = new_pending_locks
+    compute_locksroot(new_pending_locks)
+    return TransitionResult(state, list())
+
+
+def naive_transition(
+    state: Optional[PendingLocksHolder], state_change: StateChange
+) -> TransitionResult[Optional[PendingLocksHolder]]:
+    assert state is not None, "the state is initialized"
+    if isinstance(state_change, AddLock):
+        assert state_change.lock.encoded not in state.pending_locks, "locks are unique"
+        state.pending_locks = state.pending_locks + [state_change.lock.encoded]
+    else:
+        assert isinstance(state_change, RemoveLock), "only locks are added and removed"
+        assert state_change.lock.encoded in state.pending_locks, "locks are pending"
+        state.pending_locks = list(state.pending_locks)
+        state.pending_locks.remove(state_change.lock.encoded)
+    keccak(b"".join(state.pending_locks))
+    return TransitionResult(state, list())
+
+
+def add_dispatched(
+    transition: Any, pending_locks: Any
+) -> Callable[[List[HashTimeLockState]], StateManager]:
+    def add(locks: List[HashTimeLockState]) -> StateManager:
+        state_manager = StateManager(transition, PendingLocksHolder(pending_locks))
+        for lock in locks:
+            state_manager.dispatch([AddLock(lock)])
+        return state_manager
+
+    return add
+
+
+def remove_dispatched(locks: List[HashTimeLockState], state_manager: StateManager) -> None:
+    for lock in locks:
+        state_manager.dispatch([RemoveLock(lock)])
+
+
+def measure(
+    name: str,
+    add: Callable[[List[HashTimeLockState]], T],
+    remove: Callable[[List[HashTimeLockState], T], None],
+    count: int,
+) -> None:
+    locks = make_locks(count)
+
+    start = time.monotonic()
+    pending_locks = add(locks)
+    added = time.monotonic()
+    remove(locks, pending_locks)
+    removed = time.monotonic()
+
+    print(
+        f"{name:<14} {count:>6} locks  "
+        f"add {(added - start) / count * 1_000_000:8.1f}us/lock  "
+        f"remove {(removed - added) / count * 1_000_000:8.1f}us/lock"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--counts", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--skip-naive", action="store_true", default=False)
+    args = parser.parse_args()
+
+    configure_logging({"": "WARNING"}, disable_debug_logfile=True)
+
+    for count in args.counts:
+        measure("pending_locks", add_pending_locks, remove_pending_locks, count)
+        measure(
+            "dispatch",
+            add_dispatched(pending_locks_transition, make_empty_pending_locks_state()),
+            remove_dispatched,
+            count,
+        )
+        if not args.skip_naive:
+            measure("naive", add_naive, remove_naive, count)
+            measure(
+                "naive dispatch",
+                add_dispatched(naive_transition, list()),
+                remove_dispatched,
+                count,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+""" Benchmark the state machine and the write-ahead-log with synthetic chain states.
+
+For every combination of channel and mediator task counts a chain state is
+built offline, and `Block` state changes are dispatched through the
+`WriteAheadLog`, as done by the alarm task of a running node. The dispatch
+latency percentiles, the serialization throughput of the chain state, the
+time to snapshot and to restore it, and the size of the database are
+reported.
+
+The results can be stored as JSON with `--output`, and compared against a
+previous run with `--baseline`. The process exits with a non-zero status if
+any timing is slower than the baseline by more than `--threshold`, which
+allows a CI job to fail on performance regressions.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from hashlib import sha256
+from pathlib import Path
+
+from raiden.constants import MAXIMUM_PENDING_TRANSFERS
+from raiden.log_config import configure_logging
+from raiden.storage.serialization import JSONSerializer
+from raiden.storage.sqlite import HIGH_STATECHANGE_ULID, SerializedSQLiteStorage
+from raiden.storage.wal import WriteAheadLog, restore_to_state_change
+from raiden.tests.utils import factories
+from raiden.transfer import channel, node
+from raiden.transfer.architecture import StateManager
+from raiden.transfer.mediated_transfer.state import MediationPairState, MediatorTransferState
+from raiden.transfer.state import HashTimeLockState, RouteState, TokenNetworkGraphState
+from raiden.transfer.state_change import Block
+from raiden.utils.typing import (
+    Any,
+    BlockExpiration,
+    BlockGasLimit,
+    BlockNumber,
+    Dict,
+    InitiatorAddress,
+    List,
+    MessageID,
+    PaymentID,
+    PaymentWithFeeAmount,
+    Secret,
+    SecretHash,
+    TargetAddress,
+    TokenAmount,
+)
+
+# Metrics which are durations, a larger value is a regression
+TIMING_METRICS = (
+    "dispatch_p50",
+    "dispatch_p90",
+    "dispatch_p99",
+    "serialize",
+    "deserialize",
+    "snapshot",
+    "restore",
+)
+
+# Locks of the mediator tasks must not expire while the blocks are dispatched
+LOCK_EXPIRATION = BlockExpiration(10_000_000)
+LOCK_AMOUNT = TokenAmount(1)
+# Enough to lock the amount of every mediator task in a single channel
+CHANNEL_BALANCE = TokenAmount(1_000_000)
+
+
+def percentile(samples: List[float], percent: int) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, (len(ordered) * percent) // 100)
+    return ordered[index]
+
+
+def make_chain_state(number_of_channels: int) -> factories.ContainerForChainStateTests:
+    """ Create a chain state which, unlike the unit test one, can be serialized,
+    and with the keys of the partners to receive transfers from them.
+    """
+    # The unit test default for the registry is not a valid address
+    token_network_registry_address = factories.make_token_network_registry_address()
+    properties = list()
+    for _ in range(number_of_channels):
+        privatekey, address = factories.make_privkey_address()
+        properties.append(
+            factories.NettingChannelStateProperties(
+                token_network_registry_address=token_network_registry_address,
+                our_state=factories.NettingChannelEndStateProperties(balance=CHANNEL_BALANCE),
+                partner_state=factories.NettingChannelEndStateProperties(
+                    address=address, privatekey=privatekey, balance=CHANNEL_BALANCE
+                ),
+            )
+        )
+    container = factories.make_chain_state(number_of_channels, properties)
+
+    token_network = container.token_network
+    network_graph = TokenNetworkGraphState(token_network.address)
+    for channel_state in container.channels:
+        participants = (channel_state.our_state.address, channel_state.partner_state.address)
+        network_graph.network.add_edge(*participants)  # pylint: disable=no-member
+        network_graph.channel_identifier_to_participants[channel_state.identifier] = participants
+    token_network.network_graph = network_graph
+
+    return container
+
+
+def add_mediator_tasks(
+    container: factories.ContainerForChainStateTests, number_of_tasks: int
+) -> None:
+    """ Add `number_of_tasks` mediated transfers waiting for the secret.
+
+    Each transfer is received from the partner of one channel and forwarded to
+    the partner of the next one, with the locks pending in both channels.
+    """
+    channel_set = container.channel_set
+    number_of_channels = len(channel_set.channels)
+    our_address = container.our_address
+
+    for index in range(number_of_tasks):
+        payer_index = index % number_of_channels
+        payee_index = (index + 1) % number_of_channels
+        payer_channel = channel_set.channels[payer_index]
+        payee_channel = channel_set.channels[payee_index]
+        secret = Secret(index.to_bytes(32, "big"))
+        secrethash = SecretHash(sha256(secret).digest())
+
+        lock = HashTimeLockState(PaymentWithFeeAmount(LOCK_AMOUNT), LOCK_EXPIRATION, secrethash)
+        pending_locks = channel.compute_locks_with(payer_channel.partner_state.pending_locks, lock)
+        assert pending_locks, "secrets are unique"
+        _, _, transferred_amount, locked_amount = channel.get_current_balanceproof(
+            payer_channel.partner_state
+        )
+        payer_transfer = factories.create(
+            factories.LockedTransferSignedStateProperties(
+                nonce=channel.get_next_nonce(payer_channel.partner_state),
+                transferred_amount=transferred_amount,
+                locked_amount=TokenAmount(locked_amount + LOCK_AMOUNT),
+                locksroot=channel.compute_locksroot(pending_locks),
+                canonical_identifier=payer_channel.canonical_identifier,
+                amount=LOCK_AMOUNT,
+                expiration=LOCK_EXPIRATION,
+                payment_identifier=PaymentID(index),
+                secret=secret,
+                sender=InitiatorAddress(channel_set.partner_address(payer_index)),
+                recipient=TargetAddress(our_address),
+                pkey=channel_set.partner_privatekeys[payer_index],
+            )
+        )
+        is_valid, _, msg = channel.handle_receive_lockedtransfer(payer_channel, payer_transfer)
+        assert is_valid, msg
+
+        route_states = [
+            RouteState(
+                route=[our_address, payee_channel.partner_state.address],
+                forward_channel_id=payee_channel.identifier,
+            )
+        ]
+        send_event = channel.send_lockedtransfer(
+            channel_state=payee_channel,
+            initiator=payer_transfer.initiator,
+            target=payer_transfer.target,
+            amount=PaymentWithFeeAmount(LOCK_AMOUNT),
+            message_identifier=MessageID(index),
+            payment_identifier=PaymentID(index),
+            expiration=LOCK_EXPIRATION,
+            secrethash=secrethash,
+            route_states=route_states,
+        )
+
+        mediator_state = MediatorTransferState(
+            secrethash=secrethash,
+            routes=route_states,
+            transfers_pair=[
+                MediationPairState(
+                    payer_transfer=payer_transfer,
+                    payee_address=send_event.recipient,
+                    payee_transfer=send_event.transfer,
+                )
+            ],
+        )
+        container.chain_state.payment_mapping.secrethashes_to_task[secrethash] = node.MediatorTask(
+            token_network_address=container.token_network_address, mediator_state=mediator_state
+        )
+
+
+def make_block(block_number: int) -> Block:
+    return Block(
+        block_number=BlockNumber(block_number),
+        gas_limit=BlockGasLimit(1),
+        block_hash=factories.make_block_hash(),
+    )
+
+
+def measure(
+    number_of_channels: int, number_of_tasks: int, number_of_blocks: int, directory: str
+) -> Dict[str, float]:
+    container = make_chain_state(number_of_channels)
+    add_mediator_tasks(container, number_of_tasks)
+    chain_state = container.chain_state
+
+    serializer = JSONSerializer()
+    # The schemas are created on first use, which must not be measured
+    serializer.deserialize(serializer.serialize(chain_state))
+
+    start = time.monotonic()
+    serialized = serializer.serialize(chain_state)
+    serialized_at = time.monotonic()
+    serializer.deserialize(serialized)
+    deserialized_at = time.monotonic()
+
+    database_path = Path(directory) / f"{number_of_channels}_{number_of_tasks}.db"
+    storage = SerializedSQLiteStorage(database_path, serializer)
+    wal = WriteAheadLog(StateManager(node.state_transition, chain_state), storage)
+
+    # The first block is dispatched before the snapshot, the remaining blocks
+    # have to be replayed on restore.
+    first_block = chain_state.block_number + 1
+    wal.log_and_dispatch([make_block(first_block)])
+
+    snapshot_start = time.monotonic()
+    wal.snapshot(1)
+    snapshot_time = time.monotonic() - snapshot_start
+
+    latencies = list()
+    for block_number in range(first_block + 1, first_block + number_of_blocks):
+        dispatch_start = time.monotonic()
+        wal.log_and_dispatch([make_block(block_number)])
+        latencies.append(time.monotonic() - dispatch_start)
+
+    current_state = wal.state_manager.current_state
+    assert current_state is not None
+    assert len(current_state.payment_mapping.secrethashes_to_task) == number_of_tasks
+
+    restore_start = time.monotonic()
+    restore_to_state_change(
+        node.state_transition, storage, HIGH_STATECHANGE_ULID, container.our_address
+    )
+    restore_time = time.monotonic() - restore_start
+
+    storage.close()
+
+    state_size = len(serialized)
+    return {
+        "dispatch_p50": percentile(latencies, 50),
+        "dispatch_p90": percentile(latencies, 90),
+        "dispatch_p99": percentile(latencies, 99),
+        "serialize": serialized_at - start,
+        "deserialize": deserialized_at - serialized_at,
+        "serialize_throughput": state_size / (serialized_at - start),
+        "state_size": state_size,
+        "snapshot": snapshot_time,
+        "restore": restore_time,
+        "db_size": os.path.getsize(database_path),
+    }
+
+
+def find_regressions(
+    baseline: Dict[str, Dict[str, float]], results: Dict[str, Dict[str, float]], threshold: float
+) -> List[str]:
+    """ Return a description of every timing in `results` which is slower than
+    the same timing in `baseline` by more than `threshold`.
+
+    Scenarios and metrics which are not present in both runs are ignored.
+    """
+    regressions = list()
+    for scenario, metrics in results.items():
+        baseline_metrics = baseline.get(scenario, {})
+        for metric in TIMING_METRICS:
+            if metric not in metrics or metric not in baseline_metrics:
+                continue
+
+            limit = baseline_metrics[metric] * (1 + threshold)
+            if metrics[metric] > limit:
+                regressions.append(
+                    f"{scenario} {metric}: {metrics[metric]:.6f}s, "
+                    f"baseline {baseline_metrics[metric]:.6f}s"
+                )
+    return regressions
+
+
+def print_results(scenario: str, metrics: Dict[str, float]) -> None:
+    print(
+        f"{scenario:<28} "
+        f"dispatch p50 {metrics['dispatch_p50'] * 1_000:8.2f}ms "
+        f"p90 {metrics['dispatch_p90'] * 1_000:8.2f}ms "
+        f"p99 {metrics['dispatch_p99'] * 1_000:8.2f}ms  "
+        f"serialize {metrics['serialize_throughput'] / 1_000_000:6.2f}MB/s  "
+        f"snapshot {metrics['snapshot'] * 1_000:8.2f}ms  "
+        f"restore {metrics['restore'] * 1_000:8.2f}ms  "
+        f"db {metrics['db_size'] / 1_000_000:7.2f}MB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--channels", type=int, nargs="+", default=[10, 1_000, 10_000])
+    parser.add_argument("--mediator-tasks", type=int, nargs="+", default=[0, 100, 1_000])
+    parser.add_argument("--blocks", type=int, default=50)
+    parser.add_argument("--output", help="File to store the results as JSON")
+    parser.add_argument("--baseline", help="Results of a previous run to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Allowed slowdown relative to the baseline, 0.2 is 20%%",
+    )
+    args = parser.parse_args()
+
+    if args.blocks < 2:
+        parser.error("--blocks must be at least 2")
+    if min(args.channels) < 2:
+        parser.error("--channels must be at least 2 to mediate transfers")
+
+    configure_logging({"": "WARNING"}, disable_debug_logfile=True)
+
+    results: Dict[str, Dict[str, Any]] = dict()
+    with tempfile.TemporaryDirectory() as directory:
+        for number_of_channels in args.channels:
+            for number_of_tasks in args.mediator_tasks:
+                scenario = f"channels={number_of_channels},tasks={number_of_tasks}"
+                if number_of_tasks > number_of_channels * MAXIMUM_PENDING_TRANSFERS:
+                    print(f"{scenario:<28} skipped, too many pending transfers per channel")
+                    continue
+
+                metrics = measure(number_of_channels, number_of_tasks, args.blocks, directory)
+                print_results(scenario, metrics)
+                results[scenario] = metrics
+
+    if args.output:
+        with open(args.output, "w") as handler:
+            json.dump(results, handler, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as handler:
+            baseline = json.load(handler)
+
+        regressions = find_regressions(baseline, results, args.threshold)
+        for regression in regressions:
+            print(f"Regression {regression}")
+
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
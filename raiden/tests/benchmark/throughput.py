@@ -0,0 +1,573 @@
+""" Measure the payment throughput of in-process nodes.
+
+`tools/debugging/stress_test_transfers.py` needs running Raiden nodes, a
+Matrix server and an Ethereum client. This benchmark instead wires the state
+machines of a few nodes together in a single process:
+
+- `SimulatedNode` replaces the `RaidenService`, it uses the real
+  `MessageHandler` and `WriteAheadLog`, and turns the events of the state
+  machine into messages.
+- `InMemoryTransport` replaces the `MatrixTransport`, messages are
+  serialized, signed and parsed as done by the Matrix transport, and every
+  retrieable message is acknowledged with a `Delivered`.
+- `SimulatedChain` replaces the `AlarmTask`, the `BlockchainEvents` and the
+  `SecretRegistryMirror`, a block is mined every time the network is idle,
+  and secrets registered by the nodes are reported in the next block.
+
+The routes are given by the workload, the pathfinding is not exercised.
+Transactions other than secret registrations are not simulated, which is
+enough for the supported workloads:
+
+- direct: payments to a partner.
+- 3-hop: payments mediated by two nodes.
+- refund: the mediator has no capacity to forward and refunds the transfer.
+- expiry: the target is offline and the lock of the initiator expires.
+
+The payments per second, and the latency for the locked transfer to reach
+every hop of the route, are reported.
+"""
+import argparse
+import random
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+
+import gevent
+
+from raiden.constants import EMPTY_SIGNATURE
+from raiden.log_config import configure_logging
+from raiden.message_handler import MessageHandler
+from raiden.messages.abstract import Message, SignedMessage, SignedRetrieableMessage
+from raiden.messages.encode import message_from_sendevent
+from raiden.messages.synchronization import Delivered, Processed
+from raiden.messages.transfers import LockedTransfer, RefundTransfer
+from raiden.network.transport.matrix.utils import validate_and_parse_message
+from raiden.storage.serialization import JSONSerializer
+from raiden.storage.serialization.serializer import MessageSerializer
+from raiden.storage.sqlite import SerializedSQLiteStorage
+from raiden.storage.wal import WriteAheadLog
+from raiden.tests.utils import factories
+from raiden.transfer import node, views
+from raiden.transfer.architecture import Event, SendMessageEvent, StateChange, StateManager
+from raiden.transfer.events import (
+    ContractSendSecretReveal,
+    EventPaymentReceivedSuccess,
+    EventPaymentSentFailed,
+    EventPaymentSentSuccess,
+)
+from raiden.transfer.identifiers import CanonicalIdentifier
+from raiden.transfer.mediated_transfer.mediation_fee import FeeScheduleState
+from raiden.transfer.mediated_transfer.state import TransferDescriptionWithSecretState
+from raiden.transfer.mediated_transfer.state_change import ActionInitInitiator
+from raiden.transfer.state import (
+    ChainState,
+    NettingChannelEndState,
+    NettingChannelState,
+    NetworkState,
+    RouteState,
+    SuccessfulTransactionState,
+    TokenNetworkGraphState,
+    TokenNetworkRegistryState,
+    TokenNetworkState,
+)
+from raiden.transfer.state_change import (
+    ActionChangeNodeNetworkState,
+    ActionInitChain,
+    Block,
+    ContractReceiveChannelNew,
+    ContractReceiveNewTokenNetwork,
+    ContractReceiveNewTokenNetworkRegistry,
+    ContractReceiveSecretReveal,
+)
+from raiden.utils.scheduler import Scheduler
+from raiden.utils.secrethash import sha256_secrethash
+from raiden.utils.signer import LocalSigner
+from raiden.utils.transfers import random_secret
+from raiden.utils.typing import (
+    Address,
+    Balance,
+    BlockGasLimit,
+    BlockNumber,
+    BlockTimeout,
+    Callable,
+    ChainID,
+    ChannelID,
+    Deque,
+    Dict,
+    InitiatorAddress,
+    List,
+    Optional,
+    PaymentAmount,
+    PaymentID,
+    Secret,
+    SecretHash,
+    SecretRegistryAddress,
+    Set,
+    TargetAddress,
+    Tuple,
+)
+
+CHAIN_ID = ChainID(337)
+SETTLE_TIMEOUT = BlockTimeout(500)
+REVEAL_TIMEOUT = BlockTimeout(50)
+LOCK_TIMEOUT = BlockTimeout(2 * REVEAL_TIMEOUT)
+DEPOSIT = Balance(10 ** 18)
+
+
+class SimulatedChain:
+    """ Stand-in for the blockchain, a block is mined on request. """
+
+    def __init__(self) -> None:
+        self.block_number = BlockNumber(1)
+        self.block_hash = factories.make_block_hash()
+        self.secret_registry_address = SecretRegistryAddress(factories.make_address())
+        self.registered_secrets: Set[SecretHash] = set()
+        self.pending_secrets: List[Secret] = list()
+
+    def register_secret(self, secret: Secret) -> None:
+        self.pending_secrets.append(secret)
+
+    def synchronize_if_stale(self) -> None:
+        pass
+
+    def is_secret_registered(self, secrethash: SecretHash) -> bool:
+        return secrethash in self.registered_secrets
+
+    def mine(self) -> List[StateChange]:
+        """ Mine a new block and return the state changes for it. """
+        self.block_number = BlockNumber(self.block_number + 1)
+        self.block_hash = factories.make_block_hash()
+
+        state_changes: List[StateChange] = [
+            Block(
+                block_number=self.block_number,
+                gas_limit=BlockGasLimit(1),
+                block_hash=self.block_hash,
+            )
+        ]
+        for secret in self.pending_secrets:
+            secrethash = sha256_secrethash(secret)
+            if secrethash in self.registered_secrets:
+                continue
+
+            self.registered_secrets.add(secrethash)
+            state_changes.append(
+                ContractReceiveSecretReveal(
+                    transaction_hash=factories.make_transaction_hash(),
+                    secret_registry_address=self.secret_registry_address,
+                    secrethash=secrethash,
+                    secret=secret,
+                    block_number=self.block_number,
+                    block_hash=self.block_hash,
+                )
+            )
+        self.pending_secrets = list()
+
+        return state_changes
+
+
+class InMemoryTransport:
+    """ Stand-in for the Matrix transport, messages are queued in memory. """
+
+    def __init__(self) -> None:
+        self.nodes: Dict[Address, "SimulatedNode"] = dict()
+        self.offline: Set[Address] = set()
+        self.queue: Deque[Tuple[Address, Address, str]] = deque()
+        self.on_receive: List[Callable[[Address, Message], None]] = list()
+
+    def send(self, sender: "SimulatedNode", receiver: Address, message: Message) -> None:
+        sender.sign(message)
+        self.queue.append((sender.address, receiver, MessageSerializer.serialize(message)))
+
+    def deliver(self) -> bool:
+        """ Deliver the queued messages, grouped per receiver as a sync would.
+
+        Returns False if there was nothing to deliver.
+        """
+        if not self.queue:
+            return False
+
+        batches: Dict[Address, List[Message]] = defaultdict(list)
+        while self.queue:
+            sender, receiver, data = self.queue.popleft()
+            if receiver in self.offline:
+                continue
+
+            for message in validate_and_parse_message(data, sender):
+                batches[receiver].append(message)
+
+        for receiver, messages in batches.items():
+            receiving_node = self.nodes[receiver]
+            for message in messages:
+                # Same as the Matrix transport, retrieable messages are
+                # acknowledged on receipt.
+                if isinstance(message, (Processed, SignedRetrieableMessage)):
+                    assert message.sender, "parsed messages are signed"
+                    delivered = Delivered(
+                        delivered_message_identifier=message.message_identifier,
+                        signature=EMPTY_SIGNATURE,
+                    )
+                    self.send(receiving_node, message.sender, delivered)
+
+                for callback in self.on_receive:
+                    callback(receiver, message)
+
+            receiving_node.on_messages(messages)
+
+        return True
+
+
+class SimulatedNode:
+    """ Stand-in for the `RaidenService`, with the attributes used by the
+    `MessageHandler`.
+    """
+
+    def __init__(
+        self, chain: SimulatedChain, transport: InMemoryTransport, harness: "Harness"
+    ) -> None:
+        self.privkey, self.address = factories.make_privkey_address()
+        self.signer = LocalSigner(self.privkey)
+        self.default_secret_registry = chain
+        self.secret_registry_mirror = chain
+        self.transport = transport
+        self.harness = harness
+        self.message_handler = MessageHandler()
+        self.scheduler = Scheduler()
+
+        state_manager: StateManager[ChainState] = StateManager(node.state_transition, None)
+        storage = SerializedSQLiteStorage(":memory:", JSONSerializer())
+        self.wal = WriteAheadLog(state_manager, storage)
+
+        transport.nodes[self.address] = self
+
+    def sign(self, message: Message) -> None:
+        if not isinstance(message, SignedMessage):
+            raise ValueError("{} is not signable.".format(repr(message)))
+
+        message.sign(self.signer)
+
+    def immediate_health_check_for(self, node_address: Address) -> None:
+        pass
+
+    def on_messages(self, messages: List[Message]) -> None:
+        self.message_handler.on_messages(self, messages)  # type: ignore
+
+    def handle_and_track_state_changes(self, state_changes: List[StateChange]) -> None:
+        if not state_changes:
+            return
+
+        _, events = self.wal.log_and_dispatch(state_changes)
+        for event in events:
+            self.handle_event(event)
+
+    def handle_event(self, event: Event) -> None:
+        if isinstance(event, SendMessageEvent):
+            message = message_from_sendevent(event)
+            self.transport.send(self, event.recipient, message)
+        elif isinstance(event, ContractSendSecretReveal):
+            self.default_secret_registry.register_secret(event.secret)
+        elif isinstance(event, EventPaymentSentSuccess):
+            self.harness.payment_finished(event.identifier, "success")
+        elif isinstance(event, EventPaymentSentFailed):
+            self.harness.payment_finished(event.identifier, f"failed: {event.reason}")
+        elif isinstance(event, EventPaymentReceivedSuccess):
+            self.harness.payment_received(event.identifier)
+
+    def stop(self) -> None:
+        self.wal.storage.close()
+
+
+@dataclass
+class Payment:
+    identifier: PaymentID
+    route: List[Address]
+    started: float
+    hops: Dict[int, float] = field(default_factory=dict)
+    received: Optional[float] = None
+    finished: Optional[float] = None
+    result: Optional[str] = None
+
+
+@dataclass
+class Workload:
+    """ Channels to open, given as pairs of node indexes and the deposit of
+    each side, and the route of the payments.
+    """
+
+    number_of_nodes: int
+    channels: List[Tuple[int, int, Balance, Balance]]
+    route: List[int]
+    offline: List[int] = field(default_factory=list)
+
+
+WORKLOADS = {
+    "direct": Workload(number_of_nodes=2, channels=[(0, 1, DEPOSIT, DEPOSIT)], route=[0, 1]),
+    "3-hop": Workload(
+        number_of_nodes=4,
+        channels=[(0, 1, DEPOSIT, DEPOSIT), (1, 2, DEPOSIT, DEPOSIT), (2, 3, DEPOSIT, DEPOSIT)],
+        route=[0, 1, 2, 3],
+    ),
+    "refund": Workload(
+        number_of_nodes=3,
+        channels=[(0, 1, DEPOSIT, DEPOSIT), (1, 2, Balance(0), DEPOSIT)],
+        route=[0, 1, 2],
+    ),
+    "expiry": Workload(
+        number_of_nodes=2, channels=[(0, 1, DEPOSIT, DEPOSIT)], route=[0, 1], offline=[1]
+    ),
+}
+
+
+class Harness:
+    def __init__(self, workload: Workload) -> None:
+        self.chain = SimulatedChain()
+        self.transport = InMemoryTransport()
+        self.transport.on_receive.append(self.message_received)
+        self.nodes = [
+            SimulatedNode(self.chain, self.transport, self)
+            for _ in range(workload.number_of_nodes)
+        ]
+        self.token_network_registry_address = factories.make_token_network_registry_address()
+        self.token_network_address = factories.make_token_network_address()
+        self.route = [self.nodes[index].address for index in workload.route]
+        self.channel_identifiers: Dict[Tuple[Address, Address], ChannelID] = dict()
+        self.payments: Dict[PaymentID, Payment] = dict()
+        self.in_flight: Set[PaymentID] = set()
+
+        self._setup(workload)
+        for index in workload.offline:
+            self.transport.offline.add(self.nodes[index].address)
+
+    def _setup(self, workload: Workload) -> None:
+        """ Dispatch the state changes to open and fund the channels, as the
+        blockchain events would.
+        """
+        token_address = factories.make_token_address()
+        block_number = self.chain.block_number
+        block_hash = self.chain.block_hash
+        state_changes: Dict[Address, List[StateChange]] = {
+            simulated_node.address: [
+                ActionInitChain(
+                    pseudo_random_generator=random.Random(),
+                    block_number=block_number,
+                    block_hash=block_hash,
+                    our_address=simulated_node.address,
+                    chain_id=CHAIN_ID,
+                ),
+                ContractReceiveNewTokenNetworkRegistry(
+                    transaction_hash=factories.make_transaction_hash(),
+                    token_network_registry=TokenNetworkRegistryState(
+                        self.token_network_registry_address, []
+                    ),
+                    block_number=block_number,
+                    block_hash=block_hash,
+                ),
+                ContractReceiveNewTokenNetwork(
+                    transaction_hash=factories.make_transaction_hash(),
+                    token_network_registry_address=self.token_network_registry_address,
+                    token_network=TokenNetworkState(
+                        address=self.token_network_address,
+                        token_address=token_address,
+                        network_graph=TokenNetworkGraphState(self.token_network_address),
+                    ),
+                    block_number=block_number,
+                    block_hash=block_hash,
+                ),
+            ]
+            for simulated_node in self.nodes
+        }
+
+        for channel_identifier, (index1, index2, deposit1, deposit2) in enumerate(
+            workload.channels, start=1
+        ):
+            participants = [(self.nodes[index1], deposit1), (self.nodes[index2], deposit2)]
+            for (our_node, our_deposit), (partner_node, partner_deposit) in (
+                participants,
+                participants[::-1],
+            ):
+                self.channel_identifiers[(our_node.address, partner_node.address)] = ChannelID(
+                    channel_identifier
+                )
+                channel_state = NettingChannelState(
+                    canonical_identifier=CanonicalIdentifier(
+                        chain_identifier=CHAIN_ID,
+                        token_network_address=self.token_network_address,
+                        channel_identifier=ChannelID(channel_identifier),
+                    ),
+                    token_address=token_address,
+                    token_network_registry_address=self.token_network_registry_address,
+                    reveal_timeout=REVEAL_TIMEOUT,
+                    settle_timeout=SETTLE_TIMEOUT,
+                    fee_schedule=FeeScheduleState(),
+                    our_state=NettingChannelEndState(our_node.address, our_deposit),
+                    partner_state=NettingChannelEndState(partner_node.address, partner_deposit),
+                    open_transaction=SuccessfulTransactionState(block_number),
+                )
+                state_changes[our_node.address].append(
+                    ContractReceiveChannelNew(
+                        transaction_hash=factories.make_transaction_hash(),
+                        channel_state=channel_state,
+                        block_number=block_number,
+                        block_hash=block_hash,
+                    )
+                )
+
+        for simulated_node in self.nodes:
+            # The nodes are reachable as if the health check succeeded, an
+            # offline node went away afterwards.
+            for other_node in self.nodes:
+                if other_node is not simulated_node:
+                    state_changes[simulated_node.address].append(
+                        ActionChangeNodeNetworkState(other_node.address, NetworkState.REACHABLE)
+                    )
+
+            simulated_node.handle_and_track_state_changes(state_changes[simulated_node.address])
+
+    def start_payment(self, identifier: PaymentID) -> None:
+        initiator = self.nodes[0]
+        initiator_state = views.state_from_raiden(initiator)  # type: ignore
+        secret = random_secret()
+        transfer = TransferDescriptionWithSecretState(
+            token_network_registry_address=self.token_network_registry_address,
+            payment_identifier=identifier,
+            amount=PaymentAmount(1),
+            token_network_address=self.token_network_address,
+            initiator=InitiatorAddress(initiator.address),
+            target=TargetAddress(self.route[-1]),
+            secret=secret,
+            secrethash=sha256_secrethash(secret),
+            lock_timeout=LOCK_TIMEOUT,
+        )
+        route_state = RouteState(
+            route=self.route,
+            forward_channel_id=self.channel_identifiers[(self.route[0], self.route[1])],
+        )
+        assert initiator_state.block_number == self.chain.block_number
+
+        self.payments[identifier] = Payment(identifier, self.route, time.monotonic())
+        self.in_flight.add(identifier)
+        initiator.handle_and_track_state_changes([ActionInitInitiator(transfer, [route_state])])
+
+    def message_received(self, receiver: Address, message: Message) -> None:
+        if isinstance(message, (LockedTransfer, RefundTransfer)):
+            payment = self.payments.get(message.payment_identifier)
+            if payment is not None and receiver in payment.route:
+                hop = payment.route.index(receiver)
+                payment.hops.setdefault(hop, time.monotonic() - payment.started)
+
+    def payment_received(self, identifier: PaymentID) -> None:
+        payment = self.payments.get(identifier)
+        if payment is not None:
+            payment.received = time.monotonic() - payment.started
+
+    def payment_finished(self, identifier: PaymentID, result: str) -> None:
+        payment = self.payments.get(identifier)
+        if payment is not None and payment.finished is None:
+            payment.finished = time.monotonic() - payment.started
+            payment.result = result
+            self.in_flight.discard(identifier)
+
+    def mine(self) -> None:
+        state_changes = self.chain.mine()
+        for simulated_node in self.nodes:
+            simulated_node.handle_and_track_state_changes(state_changes)
+
+    def run(self, number_of_payments: int, concurrency: int) -> float:
+        """ Run the payments, keeping `concurrency` of them in flight, and
+        return the elapsed time.
+        """
+        start = time.monotonic()
+        started = 0
+        while started < number_of_payments or self.in_flight:
+            while started < number_of_payments and len(self.in_flight) < concurrency:
+                started += 1
+                self.start_payment(PaymentID(started))
+
+            # Time only passes on the chain when the network is idle
+            if not self.transport.deliver():
+                self.mine()
+
+            # The message handler processes the messages in greenlets
+            gevent.idle()
+
+        return time.monotonic() - start
+
+    def stop(self) -> None:
+        for simulated_node in self.nodes:
+            simulated_node.stop()
+
+
+def percentile(samples: List[float], percent: int) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, (len(ordered) * percent) // 100)
+    return ordered[index]
+
+
+def print_histogram(name: str, samples: List[float]) -> None:
+    """ Print the percentiles and a histogram of `samples`, with buckets that
+    double in size starting at 1ms.
+    """
+    if not samples:
+        print(f"{name:<12} no samples")
+        return
+
+    print(
+        f"{name:<12} p50 {percentile(samples, 50) * 1_000:8.2f}ms  "
+        f"p90 {percentile(samples, 90) * 1_000:8.2f}ms  "
+        f"p99 {percentile(samples, 99) * 1_000:8.2f}ms  "
+        f"max {max(samples) * 1_000:8.2f}ms"
+    )
+
+    buckets: Dict[int, int] = defaultdict(int)
+    for sample in samples:
+        bucket = 1
+        while sample * 1_000 > bucket:
+            bucket *= 2
+        buckets[bucket] += 1
+
+    for bucket in sorted(buckets):
+        count = buckets[bucket]
+        bar = "#" * max(1, count * 50 // len(samples))
+        print(f"{'':<12} <= {bucket:>6}ms {count:>7} {bar}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workloads", nargs="+", choices=list(WORKLOADS), default=["3-hop"])
+    parser.add_argument("--payments", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    configure_logging({"": "WARNING"}, disable_debug_logfile=True)
+
+    for name in args.workloads:
+        harness = Harness(WORKLOADS[name])
+        elapsed = harness.run(args.payments, args.concurrency)
+        harness.stop()
+
+        results: Dict[str, int] = defaultdict(int)
+        hops: Dict[int, List[float]] = defaultdict(list)
+        for payment in harness.payments.values():
+            assert payment.result, "run only returns once every payment is finished"
+            results[payment.result] += 1
+            for hop, latency in payment.hops.items():
+                hops[hop].append(latency)
+
+        print(
+            f"{name}: {args.payments} payments in {elapsed:.2f}s, "
+            f"{args.payments / elapsed:.2f} payments/s, "
+            f"{harness.chain.block_number} blocks"
+        )
+        for result, count in sorted(results.items()):
+            print(f"  {count:>7} {result}")
+
+        for hop in sorted(hops):
+            print_histogram(f"  hop {hop}", hops[hop])
+        print_histogram(
+            "  payment",
+            [payment.finished for payment in harness.payments.values()],  # type: ignore
+        )
+
+
+if __name__ == "__main__":
+    main()
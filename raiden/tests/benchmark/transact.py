@@ -0,0 +1,60 @@
+""" Measure the throughput of concurrent `JSONRPCClient.transact` calls.
+
+This needs an Ethereum node of a local test chain and the private key of a
+funded account, e.g. the one of the development chain. Every transaction is
+an Ether transfer of 1 wei to a random address. The time reported is the time
+to send all transactions, optionally including the time until they are mined.
+"""
+from gevent import monkey  # isort:skip
+
+monkey.patch_all()  # isort:skip
+
+import argparse
+import time
+
+from eth_utils import decode_hex
+from gevent.pool import Pool
+from web3 import HTTPProvider, Web3
+
+from raiden.network.rpc.client import EthTransfer, JSONRPCClient, TransactionSent
+from raiden.tests.utils.factories import make_address
+from raiden.utils.typing import PrivateKey
+
+
+def transfer(client: JSONRPCClient, gas_price: int) -> TransactionSent:
+    return client.transact(EthTransfer(to_address=make_address(), value=1, gas_price=gas_price))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--eth-rpc-endpoint", default="http://127.0.0.1:8545")
+    parser.add_argument("--privatekey", required=True, help="Hex encoded key of a funded account")
+    parser.add_argument("--transactions", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--wait-for-mining", action="store_true", default=False)
+    args = parser.parse_args()
+
+    web3 = Web3(HTTPProvider(args.eth_rpc_endpoint))
+    client = JSONRPCClient(web3, PrivateKey(decode_hex(args.privatekey)))
+    gas_price = web3.eth.gasPrice  # pylint: disable=no-member
+
+    for concurrency in args.concurrency:
+        pool = Pool(concurrency)
+
+        start = time.monotonic()
+        sent = pool.map(lambda _: transfer(client, gas_price), range(args.transactions))
+        submitted = time.monotonic()
+
+        if args.wait_for_mining:
+            pool.map(client.poll_transaction, sent)
+        mined = time.monotonic()
+
+        print(
+            f"concurrency {concurrency:>4}  "
+            f"sent {args.transactions / (submitted - start):8.1f}tx/s  "
+            f"mined after {mined - start:6.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -39,6 +39,7 @@
     EthClient,
 )
 from raiden.log_config import configure_logging  # isort:skip
+from raiden.transfer import node  # isort:skip
 from raiden.tests.fixtures.blockchain import *  # noqa: F401,F403  # isort:skip
 from raiden.tests.fixtures.variables import *  # noqa: F401,F403  # isort:skip
 from raiden.tests.utils.transport import make_requests_insecure  # isort:skip
@@ -280,6 +281,12 @@ def insecure_tls():
     make_requests_insecure()
 
 
+@pytest.fixture(scope="session", autouse=True)
+def check_chain_state_indexes():
+    """ Check the indexes of the chain state after every state transition. """
+    node.CHECK_INDEXES = True
+
+
 @contextlib.contextmanager
 def timeout_for_setup_and_call(item):
     """Sets a timeout up to `item.remaining_timeout`, if the timeout is reached
@@ -1,4 +1,5 @@
 from http import HTTPStatus
+from urllib.parse import urljoin
 
 import gevent
 import grequests
@@ -882,3 +883,57 @@ def test_api_channel_deposit_limit(
         json_response["errors"]
         == "Deposit of 75000000000000001 is larger than the channel participant deposit limit"
     )
+
+
+@raise_on_failure
+@pytest.mark.parametrize("number_of_nodes", [2])
+@pytest.mark.parametrize("number_of_tokens", [2])
+@pytest.mark.parametrize("enable_rest_api", [True])
+def test_api_channel_list_pagination_and_etag(
+    api_server_test_instance: APIServer, raiden_network, token_addresses
+):
+    app0, _ = raiden_network
+    url = api_url_for(api_server_test_instance, "channelsresource")
+
+    response = grequests.get(url).send().response
+    assert_proper_response(response)
+    all_channels = get_json_response(response)
+    assert len(all_channels) == 2
+    etag = response.headers["ETag"]
+
+    response = grequests.get(url, headers={"If-None-Match": etag}).send().response
+    assert_response_with_code(response, HTTPStatus.NOT_MODIFIED)
+
+    response = grequests.get(url, params={"limit": 1}).send().response
+    assert_proper_response(response)
+    first_page = get_json_response(response)
+    assert response.links["next"]
+
+    next_url = urljoin(url, response.links["next"]["url"])
+    response = grequests.get(next_url).send().response
+    assert_proper_response(response)
+    second_page = get_json_response(response)
+    assert "next" not in response.links
+    assert sorted(first_page + second_page, key=lambda channel: channel["token_address"]) == (
+        sorted(all_channels, key=lambda channel: channel["token_address"])
+    )
+
+    response = grequests.get(url, params={"cursor": "0x"}).send().response
+    assert_response_with_error(response, HTTPStatus.BAD_REQUEST)
+
+    # A change of a channel changes the tag of the list
+    token_address = token_addresses[0]
+    request = grequests.patch(
+        api_url_for(
+            api_server_test_instance,
+            "channelsresourcebytokenandpartneraddress",
+            token_address=token_address,
+            partner_address=raiden_network[1].raiden.address,
+        ),
+        json=dict(reveal_timeout=app0.raiden.config.reveal_timeout + 1),
+    )
+    assert_response_with_code(request.send().response, HTTPStatus.OK)
+
+    response = grequests.get(url, headers={"If-None-Match": etag}).send().response
+    assert_proper_response(response)
+    assert response.headers["ETag"] != etag
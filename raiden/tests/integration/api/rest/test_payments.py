@@ -6,7 +6,7 @@
 from eth_utils import decode_hex, encode_hex, to_bytes, to_checksum_address, to_hex
 
 from raiden.api.rest import APIServer
-from raiden.constants import UINT64_MAX
+from raiden.constants import MAX_PAYMENT_BATCH_SIZE, UINT64_MAX
 from raiden.settings import DEFAULT_NUMBER_OF_BLOCK_CONFIRMATIONS
 from raiden.tests.integration.api.rest.utils import (
     api_url_for,
@@ -476,6 +476,73 @@ def test_api_payments_conflicts(
     assert all(response.status_code == HTTPStatus.OK for response in responses)
 
 
+@raise_on_failure
+@pytest.mark.parametrize("number_of_nodes", [2])
+@pytest.mark.parametrize("enable_rest_api", [True])
+def test_api_payments_batch(api_server_test_instance: APIServer, raiden_network, token_addresses):
+    _, app1 = raiden_network
+    token_address = to_checksum_address(token_addresses[0])
+    target_address = to_checksum_address(app1.raiden.address)
+
+    def payment(amount, identifier):
+        return {
+            "token_address": token_address,
+            "target_address": target_address,
+            "amount": str(amount),
+            "identifier": str(identifier),
+        }
+
+    def status_url(identifier):
+        return api_url_for(
+            api_server_test_instance,
+            "paymentstatusresource",
+            token_address=token_address,
+            target_address=target_address,
+            identifier=identifier,
+        )
+
+    request = grequests.post(
+        api_url_for(api_server_test_instance, "paymentbatchresource"),
+        json={"payments": [payment(10, 1), payment(0, 2), payment(20, 3)]},
+    )
+    with watch_for_unlock_failures(*raiden_network):
+        response = request.send().response
+        assert_proper_response(response, status_code=HTTPStatus.ACCEPTED)
+        handles = get_json_response(response)["payments"]
+
+        # The handles are in the order of the request
+        assert [handle["identifier"] for handle in handles] == ["1", "2", "3"]
+        assert handles[1]["status"] == "rejected"
+        assert "errors" in handles[1]
+
+        for handle in (handles[0], handles[2]):
+            assert handle["status"] in ("pending", "success")
+            key = (token_addresses[0], app1.raiden.address, int(handle["identifier"]))
+            api_server_test_instance.rest_api.payment_statuses[key].payment_done.wait()
+
+    for handle in (handles[0], handles[2]):
+        response = grequests.get(status_url(int(handle["identifier"]))).send().response
+        assert_proper_response(response)
+        json_response = get_json_response(response)
+        assert json_response["status"] == "success"
+        assert json_response["amount"] == handle["amount"]
+        assert to_bytes(hexstr=json_response["secret_hash"]) == sha256_secrethash(
+            Secret(to_bytes(hexstr=json_response["secret"]))
+        )
+
+    # Rejected payments are not tracked
+    response = grequests.get(status_url(2)).send().response
+    assert_response_with_error(response, status_code=HTTPStatus.NOT_FOUND)
+
+    too_many_payments = [payment(1, 100 + i) for i in range(MAX_PAYMENT_BATCH_SIZE + 1)]
+    request = grequests.post(
+        api_url_for(api_server_test_instance, "paymentbatchresource"),
+        json={"payments": too_many_payments},
+    )
+    response = request.send().response
+    assert_response_with_error(response, status_code=HTTPStatus.BAD_REQUEST)
+
+
 @raise_on_failure
 @pytest.mark.parametrize("number_of_nodes", [2])
 @pytest.mark.parametrize("enable_rest_api", [True])
@@ -23,7 +23,7 @@
 from raiden.exceptions import InsufficientEth
 from raiden.messages.path_finding_service import PFSFeeUpdate
 from raiden.messages.synchronization import Delivered, Processed
-from raiden.network.transport.matrix.client import Room
+from raiden.network.transport.matrix.client import Room, SyncResponse
 from raiden.network.transport.matrix.transport import MatrixTransport, MessagesQueue, _RetryQueue
 from raiden.network.transport.matrix.utils import (
     AddressReachability,
@@ -724,6 +724,80 @@ def test_matrix_invite_private_room_happy_case(matrix_transports):
     assert room_state1 is not None
 
 
+@pytest.mark.parametrize("number_of_transports", [2])
+@pytest.mark.parametrize("matrix_server_count", [2])
+def test_matrix_online_room_index(matrix_transports):
+    """ The room with an online peer is indexed, and dropped when the peer goes offline. """
+    raiden_service0 = MockRaidenService(None)
+    raiden_service1 = MockRaidenService(None)
+    transport0, transport1 = matrix_transports
+    transport0.start(raiden_service0, [], None)
+    transport1.start(raiden_service1, [], None)
+
+    transport0.immediate_health_check_for(raiden_service1.address)
+    transport1.immediate_health_check_for(raiden_service0.address)
+    wait_for_room_with_address(transport0, raiden_service1.address)
+    wait_for_peer_reachable(transport0, raiden_service1.address)
+
+    with Timeout(TIMEOUT_MESSAGE_RECEIVE):
+        room = None
+        while room is None:
+            gevent.sleep(0.1)
+            room = transport0._get_room_for_address(
+                raiden_service1.address, require_online_peer=True
+            )
+
+    assert transport0._address_to_online_room[raiden_service1.address] is room
+    assert (
+        transport0._get_room_for_address(raiden_service1.address, require_online_peer=True) is room
+    )
+
+    transport1.stop()
+    wait_for_peer_unreachable(transport0, raiden_service1.address)
+
+    assert raiden_service1.address not in transport0._address_to_online_room
+    assert (
+        transport0._get_room_for_address(raiden_service1.address, require_online_peer=True) is None
+    )
+
+    transport0.stop()
+
+
+@pytest.mark.parametrize("number_of_transports", [2])
+@pytest.mark.parametrize("matrix_server_count", [1])
+def test_matrix_sync_state_is_restored(matrix_transports):
+    """ A restarted transport resumes from the sync token and rooms of the previous run. """
+    raiden_service0 = MockRaidenService(None)
+    raiden_service1 = MockRaidenService(None)
+    transport0, transport1 = matrix_transports
+    transport0.start(raiden_service0, [], None)
+    transport1.start(raiden_service1, [], None)
+
+    transport0.immediate_health_check_for(raiden_service1.address)
+    transport1.immediate_health_check_for(raiden_service0.address)
+    wait_for_room_with_address(transport0, raiden_service1.address)
+    room_id = transport0._get_room_for_address(raiden_service1.address).room_id
+
+    user_id = transport0._user_id
+    transport0.stop()
+
+    storage = raiden_service0.wal.storage
+    sync_state = storage.get_matrix_sync_state(user_id)
+    assert sync_state is not None
+    assert room_id in sync_state["rooms"]
+
+    restarted_transport = MatrixTransport(
+        config=transport0._config, environment=Environment.DEVELOPMENT
+    )
+    restarted_transport.start(raiden_service0, [], None)
+
+    assert restarted_transport._user_id == user_id
+    assert storage.get_matrix_sync_state(user_id) is None, "must be removed on start"
+    assert restarted_transport._get_room_ids_for_address(raiden_service1.address) == [room_id]
+
+    restarted_transport.stop()
+
+
 @pytest.mark.parametrize("matrix_server_count", [2])
 @pytest.mark.parametrize("number_of_transports", [2])
 def test_matrix_invite_retry_with_offline_invitee(
@@ -1088,16 +1162,11 @@ def test_transport_does_not_receive_broadcast_rooms_updates(matrix_transports):
     received_sync_events: Dict[str, List[Dict[str, Any]]] = {"t1": [], "t2": []}
 
     def _handle_responses(
-        name: str, responses: List[Dict[str, Any]], first_sync: bool = False
+        name: str, responses: List[SyncResponse], first_sync: bool = False
     ):  # pylint: disable=unused-argument
         for response in responses:
-            joined_rooms = response.get("rooms", {}).get("join", {})
-            for joined_room in joined_rooms.values():
-                timeline_events = joined_room.get("timeline").get("events", [])
-                message_events = [
-                    event for event in timeline_events if event["type"] == "m.room.message"
-                ]
-                received_sync_events[name].extend(message_events)
+            for joined_room in response.joined_rooms:
+                received_sync_events[name].extend(joined_room.messages)
 
     # Replace the transport's handle_response method
     # Should be able to detect if sync delivered a message
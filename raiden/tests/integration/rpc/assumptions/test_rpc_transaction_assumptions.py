@@ -1,11 +1,14 @@
+import gevent
 import pytest
 
 from raiden.constants import BLOCK_ID_LATEST, TRANSACTION_INTRINSIC_GAS
 from raiden.exceptions import InsufficientEth
 from raiden.network.rpc.client import (
+    EthTransfer,
     JSONRPCClient,
     SmartContractCall,
     TransactionEstimated,
+    TransactionSent,
     discover_next_available_nonce,
     gas_price_for_fast_transaction,
     was_transaction_successfully_mined,
@@ -15,7 +18,7 @@
 from raiden.tests.utils.smartcontracts import deploy_rpc_test_contract
 from raiden.utils.formatting import to_checksum_address
 from raiden.utils.smart_contracts import safe_gas_limit
-from raiden.utils.typing import Nonce
+from raiden.utils.typing import List, Nonce, Union
 
 
 def test_transact_opcode(deploy_client: JSONRPCClient) -> None:
@@ -175,3 +178,82 @@ def test_discover_next_available_nonce(deploy_client: JSONRPCClient) -> None:
         assert available_nonce != skip_nonce, msg
 
         skip_nonce = Nonce(skip_nonce + 1)
+
+
+def test_concurrent_transact_uses_consecutive_nonces(deploy_client: JSONRPCClient) -> None:
+    """ Concurrent transactions are sent without waiting for each other and
+    use consecutive nonces, also when one of them is rejected by the node.
+    """
+    web3 = deploy_client.web3
+    gas_price = web3.eth.gasPrice  # pylint: disable=no-member
+    nonces = deploy_client._nonces  # pylint: disable=protected-access
+
+    QTY_TRANSACTIONS = 50
+
+    def transfer(value: int) -> Union[TransactionSent, InsufficientEth]:
+        try:
+            return deploy_client.transact(
+                EthTransfer(to_address=make_address(), value=value, gas_price=gas_price)
+            )
+        except InsufficientEth as e:
+            return e
+
+    # The transfer with a value larger than the balance is rejected, its nonce
+    # must be reused to not stall the other transactions.
+    balance = deploy_client.balance(deploy_client.address)
+    values = [1] * QTY_TRANSACTIONS
+    values[QTY_TRANSACTIONS // 2] = balance * 2
+
+    greenlets = [gevent.spawn(transfer, value) for value in values]
+    gevent.joinall(set(greenlets), raise_error=True)
+
+    results = [greenlet.get() for greenlet in greenlets]
+    sent = [result for result in results if not isinstance(result, InsufficientEth)]
+    assert len(sent) == QTY_TRANSACTIONS - 1, "only the transfer above the balance must fail"
+
+    # A gap left by the rejected transfer is filled in the background
+    with gevent.Timeout(10):
+        while nonces.gaps() or nonces.pending:
+            gevent.sleep(0.1)
+
+    sent_nonces = {transaction.nonce for transaction in sent}
+    assert len(sent_nonces) == len(sent), "a nonce must not be used twice"
+
+    last = deploy_client.transact(
+        EthTransfer(to_address=make_address(), value=1, gas_price=gas_price)
+    )
+    for transaction in sent + [last]:
+        receipt = deploy_client.poll_transaction(transaction)
+        assert was_transaction_successfully_mined(receipt), "the transactions must be mined"
+
+    mined = web3.eth.getTransactionCount(deploy_client.address)  # pylint: disable=no-member
+    assert mined == last.nonce + 1, "the nonces up to the last transaction must be used"
+
+
+def test_nonce_gap_filled_after_the_higher_nonces_is_mined(deploy_client: JSONRPCClient) -> None:
+    """ The transaction which fills a nonce gap reaches the node after the
+    transactions with higher nonces. Their order is left to the transaction
+    pool of the node, which must hold them until the gap is filled.
+    """
+    web3 = deploy_client.web3
+    gas_price = web3.eth.gasPrice  # pylint: disable=no-member
+    nonces = deploy_client._nonces  # pylint: disable=protected-access
+    fillers: List[gevent.Greenlet] = list()
+    deploy_client.add_pending_greenlet = fillers.append
+
+    gap = nonces.reserve()
+    after_gap = deploy_client.transact(
+        EthTransfer(to_address=make_address(), value=1, gas_price=gas_price)
+    )
+    assert after_gap.nonce == gap + 1, "the transfer must be sent after the gap"
+
+    deploy_client._release_nonce(gap)  # pylint: disable=protected-access
+    assert len(fillers) == 1, "the gap must be filled by a supervised greenlet"
+    gevent.joinall(set(fillers), raise_error=True)
+    assert not nonces.gaps(), "the gap must be filled"
+
+    receipt = deploy_client.poll_transaction(after_gap)
+    assert was_transaction_successfully_mined(receipt), "the transfer must be mined"
+
+    mined = web3.eth.getTransactionCount(deploy_client.address)  # pylint: disable=no-member
+    assert mined == after_gap.nonce + 1, "the gap and the transfer must be mined"
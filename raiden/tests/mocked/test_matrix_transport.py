@@ -12,7 +12,7 @@
 from raiden.messages.transfers import SecretRequest
 from raiden.network.transport import MatrixTransport
 from raiden.network.transport.matrix import AddressReachability
-from raiden.network.transport.matrix.client import GMatrixHttpApi, Room
+from raiden.network.transport.matrix.client import GMatrixHttpApi, Room, parse_sync_response
 from raiden.network.transport.matrix.transport import RETRY_QUEUE_IDLE_AFTER, _RetryQueue
 from raiden.network.transport.matrix.utils import UserAddressManager
 from raiden.settings import MatrixTransportConfig
@@ -277,6 +277,7 @@ def test_leave_after_member_join(mock_matrix, room_with_members):
         "content": {"membership": "join", "displayname": user.displayname},
     }
     response = {
+        "next_batch": "NEXT_SYNC_TOKEN",
         "presence": {"events": {}},
         "to_device": {"events": {}},
         "rooms": {
@@ -284,14 +285,16 @@ def test_leave_after_member_join(mock_matrix, room_with_members):
             "leave": {},
             "join": {
                 room.room_id: {
+                    "summary": {},
                     "state": {"events": {}},
                     "ephemeral": {"events": {}},
+                    "account_data": {"events": {}},
                     "timeline": {"prev_batch": "PREV_SYNC_TOKEN", "events": [member_join]},
                 }
             },
         },
     }
-    response_list.append(response)
+    response_list.append(parse_sync_response(response))
     mock_matrix._client._handle_responses(response_list)
 
 
@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from raiden.api.channel_cache import (
+    ChannelCache,
+    channel_list_key,
+    decode_channel_list_cursor,
+    encode_channel_list_cursor,
+)
+from raiden.tests.unit.api.test_stream import EventsWAL, payment_failed
+from raiden.tests.utils import factories
+from raiden.transfer import views
+from raiden.transfer.events import SendProcessed
+from raiden.transfer.state import NettingChannelState
+from raiden.utils.typing import List, MessageID
+
+
+@pytest.fixture
+def events_wal(chain_state, netting_channel_state):  # pylint: disable=unused-argument
+    return EventsWAL(chain_state)
+
+
+def test_channel_cache_serializes_channels_once_per_version(events_wal, netting_channel_state):
+    serialized: List[NettingChannelState] = list()
+
+    def serialize(channel_state):
+        serialized.append(channel_state)
+        return {"identifier": channel_state.identifier}
+
+    cache = ChannelCache(serialize)
+    cache.follow(events_wal.wal)
+
+    def current_channels():
+        return views.list_all_channelstate(events_wal.wal.state_manager.current_state)
+
+    etag = cache.etag(current_channels())
+    (channel_state,) = current_channels()
+    assert json.loads(cache.dump_json(channel_state)) == {
+        "identifier": netting_channel_state.identifier
+    }
+
+    # Dispatches which do not affect the channel keep the cached version
+    events_wal.dispatch(payment_failed(1))
+    (channel_state,) = current_channels()
+    cache.dump_json(channel_state)
+    assert len(serialized) == 1
+    assert cache.etag(current_channels()) == etag
+
+    processed = SendProcessed(
+        recipient=factories.make_address(),
+        canonical_identifier=netting_channel_state.canonical_identifier,
+        message_identifier=MessageID(1),
+    )
+    events_wal.dispatch(processed)
+    assert cache.version(channel_state) == events_wal.wal.saved_state.state_change_id
+    assert cache.etag(current_channels()) != etag
+
+    (channel_state,) = current_channels()
+    cache.dump_json(channel_state)
+    assert len(serialized) == 2
+    assert cache.etag([]) != cache.etag(current_channels())
+
+
+def test_channel_list_cursor(netting_channel_state):
+    key = channel_list_key(netting_channel_state)
+    assert decode_channel_list_cursor(encode_channel_list_cursor(key)) == key
+
+    assert decode_channel_list_cursor("not hex") is None
+    assert decode_channel_list_cursor("00" * 51) is None
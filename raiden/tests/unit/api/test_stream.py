@@ -0,0 +1,149 @@
+import pytest
+
+from raiden.api.stream import EventStream
+from raiden.storage.serialization import JSONSerializer
+from raiden.storage.sqlite import EventID, SerializedSQLiteStorage
+from raiden.storage.wal import WriteAheadLog
+from raiden.tests.utils import factories
+from raiden.transfer.architecture import Event, StateManager, TransitionResult
+from raiden.transfer.events import EventPaymentSentFailed, SendProcessed
+from raiden.transfer.state import NettingChannelState
+from raiden.transfer.state_change import Block
+from raiden.utils.typing import BlockGasLimit, BlockNumber, List, MessageID, PaymentID, Tuple
+
+
+class EventsWAL:
+    """ A WAL which dispatches blocks, the events to be produced by the next
+    dispatch are set in `next_events`.
+    """
+
+    def __init__(self, chain_state):
+        self.next_events: List[Event] = list()
+        self.dispatched_ids: List[EventID] = list()
+
+        def state_transition(state, state_change):  # pylint: disable=unused-argument
+            events, self.next_events = self.next_events, list()
+            return TransitionResult(state, events)
+
+        self.wal = WriteAheadLog(
+            StateManager(state_transition, chain_state),
+            SerializedSQLiteStorage(":memory:", JSONSerializer()),
+        )
+        self.wal.register_callback(
+            lambda state_changes, state, events: self.dispatched_ids.extend(
+                event_id for event_id, _ in events
+            )
+        )
+
+    def dispatch(self, *events):
+        self.next_events = list(events)
+        block = Block(
+            block_number=BlockNumber(1),
+            gas_limit=BlockGasLimit(1),
+            block_hash=factories.make_block_hash(),
+        )
+        self.wal.log_and_dispatch([block])
+        return self.dispatched_ids[-len(events) :]
+
+    def stream(self, event_stream, cursor):
+        return event_stream.stream(
+            storage=self.wal.storage,
+            get_chain_state=lambda: self.wal.state_manager.current_state,
+            cursor=cursor,
+            keepalive=0,
+        )
+
+
+def payment_failed(identifier):
+    return EventPaymentSentFailed(
+        token_network_registry_address=factories.make_token_network_registry_address(),
+        token_network_address=factories.make_token_network_address(),
+        identifier=PaymentID(identifier),
+        target=factories.make_target_address(),
+        reason="no route",
+    )
+
+
+def take_until_idle(updates):
+    """ The updates until the stream is idle, as (cursor, payment identifier
+    or channel identifier) pairs.
+    """
+    result: List[Tuple[EventID, int]] = list()
+    for update in updates:
+        if update is None:
+            return result
+
+        if isinstance(update.data, NettingChannelState):
+            result.append((update.cursor, update.data.identifier))
+        else:
+            result.append((update.cursor, update.data.wrapped_event.identifier))
+    return result
+
+
+@pytest.fixture
+def events_wal(chain_state, netting_channel_state):  # pylint: disable=unused-argument
+    return EventsWAL(chain_state)
+
+
+def test_write_ahead_log_callback_has_the_event_identifiers(events_wal):
+    first, second = events_wal.dispatch(payment_failed(1), payment_failed(2))
+    assert first < second
+    assert events_wal.wal.storage.get_latest_event_identifier() == second
+
+    records = events_wal.wal.storage.get_events_with_timestamps_after(
+        first, ["raiden.transfer.events.EventPaymentSentFailed"], limit=10
+    )
+    assert [(event_id, event.wrapped_event.identifier) for event_id, event in records] == [
+        (second, 2)
+    ]
+
+
+def test_event_stream_pushes_payments_and_channel_updates(events_wal, netting_channel_state):
+    channel_id = netting_channel_state.identifier
+    event_stream = EventStream()
+
+    first, second = events_wal.dispatch(payment_failed(1), payment_failed(2))
+    event_stream.follow(events_wal.wal)
+
+    # A new client receives the state of the channels, and the new payments
+    updates = events_wal.stream(event_stream, cursor=None)
+    assert take_until_idle(updates) == [(second, channel_id)]
+
+    # The channel is updated because of the event of the same dispatch
+    processed = SendProcessed(
+        recipient=factories.make_address(),
+        canonical_identifier=netting_channel_state.canonical_identifier,
+        message_identifier=MessageID(1),
+    )
+    third, _ = events_wal.dispatch(payment_failed(3), processed)
+    assert take_until_idle(updates) == [(third, 3), (third, channel_id)]
+
+    updates.close()
+    assert not event_stream.subscriptions
+
+    # A client resumes from the last payment event it received
+    updates = events_wal.stream(event_stream, cursor=first)
+    assert next(updates).data.wrapped_event.identifier == 2
+
+    # A payment written while the client is catching up is sent once
+    (fourth,) = events_wal.dispatch(payment_failed(4))
+    assert take_until_idle(updates) == [(third, 3), (fourth, 4), (fourth, channel_id)]
+
+
+def test_event_stream_ends_for_slow_clients(events_wal, netting_channel_state):
+    event_stream = EventStream(queue_size=1)
+    event_stream.follow(events_wal.wal)
+
+    updates = events_wal.stream(event_stream, cursor=None)
+    assert take_until_idle(updates) == [
+        (event_stream.last_event_id, netting_channel_state.identifier)
+    ]
+
+    first, _ = events_wal.dispatch(payment_failed(1), payment_failed(2))
+    assert not event_stream.subscriptions
+
+    # The queued updates are sent before the stream ends, the client resumes
+    # from the last one
+    assert [(update.cursor, update.data.wrapped_event.identifier) for update in updates] == [
+        (first, 1)
+    ]
@@ -119,6 +119,7 @@ def netting_channel_state(chain_state, token_network_state, token_network_regist
     channel_id = canonical_identifier.channel_identifier
     token_network_state.partneraddresses_to_channelidentifiers[partner].append(channel_id)
     token_network_state.channelidentifiers_to_channels[channel_id] = channel_state
+    chain_state.index_channel(channel_state)
 
     return channel_state
 
@@ -1,10 +1,30 @@
+import json
+
 import pytest
+from eth_abi import encode_abi
 from eth_typing import URI
+from eth_utils import encode_hex
+from requests import HTTPError
 from requests.exceptions import ConnectionError as RequestsConnectionError
 from web3 import HTTPProvider, Web3
+from web3.contract import ContractFunction
+from web3.exceptions import BadFunctionCallOutput
 
-from raiden.network.rpc.client import JSONRPCClient
-from raiden.tests.utils.factories import make_privatekey_bin
+from raiden.constants import BLOCK_ID_LATEST
+from raiden.network.rpc import client
+from raiden.network.rpc.client import JSONRPCClient, NonceAllocator, batch_contract_calls
+from raiden.network.rpc.middleware import (
+    RPC_REQUEST_DURATION,
+    block_hash_call_cache_middleware,
+    is_block_hash,
+)
+from raiden.tests.utils.factories import (
+    make_address,
+    make_block_hash,
+    make_checksum_address,
+    make_privatekey_bin,
+)
+from raiden.utils.typing import BlockNumber, Nonce
 
 
 def test_connection_issues() -> None:
@@ -20,3 +40,259 @@ def test_connection_issues() -> None:
 
     with pytest.raises(RequestsConnectionError):
         JSONRPCClient(web3=web3, privkey=make_privatekey_bin())
+
+
+def test_batch_contract_calls(monkeypatch) -> None:
+    abi = [
+        {
+            "constant": True,
+            "inputs": [{"name": "owner", "type": "address"}],
+            "name": "balanceOf",
+            "outputs": [{"name": "", "type": "uint256"}],
+            "stateMutability": "view",
+            "type": "function",
+        },
+        {
+            "constant": True,
+            "inputs": [],
+            "name": "info",
+            "outputs": [{"name": "", "type": "uint256"}, {"name": "", "type": "bool"}],
+            "stateMutability": "view",
+            "type": "function",
+        },
+    ]
+    web3 = Web3(HTTPProvider(URI("http://localhost:641")))
+    owner = make_checksum_address()
+    contract = web3.eth.contract(address=make_address(), abi=abi)
+    calls = [contract.functions.balanceOf(owner), contract.functions.info()]
+    results = [encode_abi(["uint256"], [10]), encode_abi(["uint256", "bool"], [7, True])]
+    requests = list()
+
+    def post_json_rpc_batch(provider, data):  # pylint: disable=unused-argument
+        payload = json.loads(data)
+        requests.append(payload)
+        # The responses of a batch can be in any order
+        responses = [
+            {"jsonrpc": "2.0", "id": request["id"], "result": encode_hex(results[request["id"]])}
+            for request in reversed(payload)
+        ]
+        return json.dumps(responses).encode()
+
+    monkeypatch.setattr(client, "post_json_rpc_batch", post_json_rpc_batch)
+
+    assert batch_contract_calls(web3, calls, BLOCK_ID_LATEST) == [10, [7, True]]
+    assert len(requests) == 1, "the calls must be sent in a single request"
+    assert [request["method"] for request in requests[0]] == ["eth_call", "eth_call"]
+    assert [request["params"][1] for request in requests[0]] == ["latest", "latest"]
+    assert requests[0][0]["params"][0]["data"] == contract.encodeABI("balanceOf", args=[owner])
+
+    assert batch_contract_calls(web3, calls, BlockNumber(16))
+    assert [request["params"][1] for request in requests[1]] == ["0x10", "0x10"]
+
+    parity_revert = {"code": -32015, "message": "VM execution error."}
+
+    def post_json_rpc_batch_with_error(provider, data):  # pylint: disable=unused-argument
+        return json.dumps(
+            [
+                {"jsonrpc": "2.0", "id": 0, "result": encode_hex(results[0])},
+                {"jsonrpc": "2.0", "id": 1, "error": parity_revert},
+            ]
+        ).encode()
+
+    monkeypatch.setattr(client, "post_json_rpc_batch", post_json_rpc_batch_with_error)
+    with pytest.raises(BadFunctionCallOutput):
+        batch_contract_calls(web3, calls, BLOCK_ID_LATEST)
+
+    parity_revert["code"] = -32000
+    with pytest.raises(ValueError):
+        batch_contract_calls(web3, calls, BLOCK_ID_LATEST)
+
+
+def test_batch_contract_calls_fall_back_to_single_calls(monkeypatch) -> None:
+    abi = [
+        {
+            "constant": True,
+            "inputs": [],
+            "name": "owner",
+            "outputs": [{"name": "", "type": "address"}],
+            "stateMutability": "view",
+            "type": "function",
+        }
+    ]
+    web3 = Web3(HTTPProvider(URI("http://localhost:641")))
+    contract = web3.eth.contract(address=make_address(), abi=abi)
+    calls = [contract.functions.owner(), contract.functions.owner()]
+    owner = make_checksum_address()
+    single_calls = list()
+
+    def call(function, block_identifier):  # pylint: disable=unused-argument
+        single_calls.append(block_identifier)
+        return owner
+
+    monkeypatch.setattr(ContractFunction, "call", call)
+
+    def post_json_rpc_batch(provider, data):  # pylint: disable=unused-argument
+        return json.dumps(
+            {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Invalid request"}}
+        ).encode()
+
+    # A node without batch support answers with a single error
+    monkeypatch.setattr(client, "post_json_rpc_batch", post_json_rpc_batch)
+    assert batch_contract_calls(web3, calls, BlockNumber(16)) == [owner, owner]
+    assert single_calls == [16, 16]
+
+    def post_json_rpc_batch_rejected(provider, data):  # pylint: disable=unused-argument
+        raise HTTPError("405 Client Error: Method Not Allowed")
+
+    monkeypatch.setattr(client, "post_json_rpc_batch", post_json_rpc_batch_rejected)
+    assert batch_contract_calls(web3, calls, BlockNumber(16)) == [owner, owner]
+    assert len(single_calls) == 4
+
+    # The addresses are checksummed like the results of `ContractFunction.call`
+    def post_json_rpc_batch_supported(provider, data):  # pylint: disable=unused-argument
+        result = encode_hex(encode_abi(["address"], [owner]))
+        return json.dumps(
+            [
+                {"jsonrpc": "2.0", "id": request["id"], "result": result}
+                for request in json.loads(data)
+            ]
+        ).encode()
+
+    monkeypatch.setattr(client, "post_json_rpc_batch", post_json_rpc_batch_supported)
+    assert batch_contract_calls(web3, calls, BlockNumber(16)) == [owner, owner]
+    assert len(single_calls) == 4
+
+
+@pytest.mark.parametrize("block_hash_params", [True, False])
+def test_batch_contract_calls_use_the_block_hash_call_cache(
+    monkeypatch, block_hash_params: bool
+) -> None:
+    abi = [
+        {
+            "constant": True,
+            "inputs": [{"name": "owner", "type": "address"}],
+            "name": "balanceOf",
+            "outputs": [{"name": "", "type": "uint256"}],
+            "stateMutability": "view",
+            "type": "function",
+        }
+    ]
+    web3 = Web3(HTTPProvider(URI("http://localhost:641")))
+    web3.middleware_onion.add(block_hash_call_cache_middleware)
+    block_hash_call_cache_middleware.clear()
+    contract = web3.eth.contract(address=make_address(), abi=abi)
+    owners = [make_checksum_address() for _ in range(3)]
+    calls = [contract.functions.balanceOf(owner) for owner in owners]
+    requests = list()
+
+    def post_json_rpc_batch(provider, data):  # pylint: disable=unused-argument
+        payload = json.loads(data)
+        requests.append(payload)
+        responses = [
+            {
+                "jsonrpc": "2.0",
+                "id": request["id"],
+                "result": encode_hex(encode_abi(["uint256"], [7])),
+            }
+            for request in payload
+        ]
+        return json.dumps(responses).encode()
+
+    block_hash = make_block_hash()
+    canonical_hashes = {16: block_hash}
+
+    def get_block(block_identifier):
+        if is_block_hash(block_identifier):
+            return {"number": 16, "hash": block_identifier}
+        return {"number": block_identifier, "hash": canonical_hashes[block_identifier]}
+
+    monkeypatch.setattr(client, "post_json_rpc_batch", post_json_rpc_batch)
+    monkeypatch.setattr(web3.eth, "getBlock", get_block)
+    block_hash_call_cache_middleware.block_hash_params_support[web3] = block_hash_params
+
+    batches = RPC_REQUEST_DURATION.labels("batch")
+    batches_before = batches.count
+
+    try:
+        assert batch_contract_calls(web3, calls[:2], block_hash) == [7, 7]
+        assert batches.count == batches_before + 1
+
+        # The calls are done at the block hash if the client supports it
+        block_param = {"blockHash": encode_hex(block_hash)} if block_hash_params else "0x10"
+        assert [request["params"][1] for request in requests[0]] == [block_param] * 2
+
+        # Only the call which is not cached is sent
+        assert batch_contract_calls(web3, calls, block_hash) == [7, 7, 7]
+        assert len(requests) == 2
+        assert len(requests[1]) == 1
+        assert requests[1][0]["params"][0]["data"] == calls[2]._encode_transaction_data()
+
+        assert batch_contract_calls(web3, calls, block_hash) == [7, 7, 7]
+        assert len(requests) == 2
+        assert block_hash_call_cache_middleware.generate_report()["hits"] == 5
+
+        # Calls at a block number are not cached
+        batch_contract_calls(web3, calls, BlockNumber(16))
+        batch_contract_calls(web3, calls, BlockNumber(16))
+        assert len(requests) == 4
+
+        # The results for a number which was reorged away from the hash are
+        # not cached
+        if not block_hash_params:
+            canonical_hashes[16] = make_block_hash()
+            block_hash_call_cache_middleware.clear()
+            batch_contract_calls(web3, calls, block_hash)
+            batch_contract_calls(web3, calls, block_hash)
+            assert len(requests) == 6
+            assert block_hash_call_cache_middleware.generate_report()["size"] == 0
+    finally:
+        block_hash_call_cache_middleware.clear()
+
+
+def test_nonce_allocator() -> None:
+    nonces = NonceAllocator(Nonce(5))
+
+    first, second, third = nonces.reserve(), nonces.reserve(), nonces.reserve()
+    assert (first, second, third) == (5, 6, 7)
+    assert nonces.pending == 3
+    assert nonces.available_nonce == 8
+
+    nonces.confirm(first)
+    assert nonces.pending == 2
+
+    # Releasing the last nonce does not leave a gap
+    assert not nonces.release(third)
+    assert nonces.available_nonce == 7
+    assert nonces.gaps() == []
+
+    fourth = nonces.reserve()
+    assert fourth == 7
+
+    # The transaction with `fourth` was sent, releasing `second` leaves a gap
+    # which has to be filled by the next transaction
+    assert nonces.release(second)
+    assert nonces.gaps() == [6]
+    assert nonces.available_nonce == 6
+    assert nonces.reserve() == 6
+    assert nonces.gaps() == []
+    assert nonces.reserve() == 8
+
+    # Once the transactions after a gap fail too, the gap is closed
+    fifth = nonces.reserve()
+    assert fifth == 9
+    assert nonces.release(fourth)
+    assert nonces.gaps() == [7]
+    nonces.release(Nonce(8))
+    nonces.release(fifth)
+    assert nonces.gaps() == []
+    assert nonces.available_nonce == 7
+    assert nonces.pending == 1
+
+    # A gap is reserved only while it was not used by another transaction
+    sixth, seventh = nonces.reserve(), nonces.reserve()
+    assert nonces.release(sixth)
+    assert nonces.reserve_gap() == sixth
+    assert nonces.reserve_gap() is None
+    nonces.confirm(sixth)
+    nonces.confirm(seventh)
+    assert nonces.pending == 1
@@ -0,0 +1,409 @@
+from unittest.mock import Mock, patch
+
+import pytest
+from eth_abi import encode_abi
+from eth_utils import keccak, to_bytes, to_hex
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from web3 import Web3
+from web3.gas_strategies.time_based import construct_time_based_gas_price_strategy
+from web3.providers.base import BaseProvider
+from web3.types import RPCEndpoint, RPCResponse, Wei
+
+from raiden.network.rpc.middleware import (
+    RPC_REQUEST_DURATION,
+    BlockHashCallCacheMiddleware,
+    GasPriceOracle,
+    is_block_hash,
+    rpc_latency_middleware,
+)
+from raiden.tests.utils.factories import make_address, make_block_hash, make_checksum_address
+from raiden.utils.typing import Any, Dict, List, Tuple
+
+
+class RecordingProvider(BaseProvider):
+    """ Answers every request with a fixed result and records the requests. """
+
+    def __init__(self) -> None:
+        self.requests: List[Tuple[RPCEndpoint, Any]] = list()
+
+    def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        self.requests.append((method, params))
+        return {"jsonrpc": "2.0", "id": len(self.requests), "result": "0x01"}
+
+    def isConnected(self) -> bool:
+        return True
+
+
+def test_is_block_hash():
+    block_hash = make_block_hash()
+
+    assert is_block_hash(block_hash)
+    assert is_block_hash(to_hex(block_hash))
+    assert not is_block_hash("latest")
+    assert not is_block_hash("0x10")
+    assert not is_block_hash(16)
+    assert not is_block_hash(block_hash[:20])
+    assert not is_block_hash("0x" + "z" * 64)
+
+
+def test_block_hash_call_cache_middleware():
+    provider = RecordingProvider()
+    web3 = Web3(provider, middlewares=[])
+    cache = BlockHashCallCacheMiddleware(size=2)
+    web3.middleware_onion.add(cache)
+
+    block_hash = to_hex(make_block_hash())
+    transaction = {"to": "0x" + "11" * 20, "data": "0x70a08231"}
+
+    for _ in range(3):
+        web3.manager.request_blocking(RPCEndpoint("eth_call"), [transaction, block_hash])
+    assert len(provider.requests) == 1
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    web3.manager.request_blocking(RPCEndpoint("eth_getBalance"), [transaction["to"], block_hash])
+    web3.manager.request_blocking(RPCEndpoint("eth_getBalance"), [transaction["to"], block_hash])
+    assert len(provider.requests) == 2
+    assert (cache.hits, cache.misses) == (3, 2)
+
+    # requests which are not pinned to a block hash may be affected by reorgs
+    web3.manager.request_blocking(RPCEndpoint("eth_call"), [transaction, "latest"])
+    web3.manager.request_blocking(RPCEndpoint("eth_call"), [transaction, "0x10"])
+    assert len(provider.requests) == 4
+    assert (cache.hits, cache.misses) == (3, 2)
+
+    # only whitelisted methods are cached
+    web3.manager.request_blocking(RPCEndpoint("eth_getTransactionCount"), ["0x00", block_hash])
+    web3.manager.request_blocking(RPCEndpoint("eth_getTransactionCount"), ["0x00", block_hash])
+    assert len(provider.requests) == 6
+
+    # the cache is bounded, the least recently used entry is evicted
+    web3.manager.request_blocking(RPCEndpoint("eth_getCode"), [transaction["to"], block_hash])
+    assert len(cache.cache) == 2
+    web3.manager.request_blocking(RPCEndpoint("eth_call"), [transaction, block_hash])
+    assert len(provider.requests) == 8
+
+    assert cache.generate_report() == {"size": 2, "hits": 3, "misses": 4}
+
+
+def test_block_hash_call_cache_middleware_does_not_cache_errors():
+    class FailingProvider(RecordingProvider):
+        def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+            self.requests.append((method, params))
+            return {"jsonrpc": "2.0", "id": 1, "error": {"code": -32000, "message": "missing"}}
+
+    provider = FailingProvider()
+    cache = BlockHashCallCacheMiddleware()
+    middleware = cache(provider.make_request, Web3(provider, middlewares=[]))
+
+    params = ["0x" + "11" * 20, to_hex(make_block_hash())]
+    middleware(RPCEndpoint("eth_getCode"), params)
+    middleware(RPCEndpoint("eth_getCode"), params)
+
+    assert len(provider.requests) == 2
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+GETH_VERSION = "Geth/v1.9.11-stable-6a62fe39/linux-amd64/go1.13.8"
+PARITY_VERSION = (
+    "Parity-Ethereum//v2.7.2-stable-2662d19-20200206/x86_64-unknown-linux-gnu/rustc1.41.0"
+)
+
+
+class BlockProvider(RecordingProvider):
+    """ Answers the contract calls with a balance of 10, for the block number 16
+    and the given canonical hash.
+    """
+
+    def __init__(self, client_version: str, block_hash: str) -> None:
+        super().__init__()
+        self.client_version = client_version
+        self.block_hash = block_hash
+        self.canonical_hash = block_hash
+
+    def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        self.requests.append((method, params))
+        result: Any
+        if method == "web3_clientVersion":
+            result = self.client_version
+        elif method == "eth_getBlockByHash":
+            result = {"number": "0x10", "hash": self.block_hash}
+        elif method == "eth_getBlockByNumber":
+            result = {"number": "0x10", "hash": self.canonical_hash}
+        else:
+            result = to_hex(encode_abi(["uint256"], [10]))
+        return {"jsonrpc": "2.0", "id": len(self.requests), "result": result}
+
+
+def make_balance_of_call(web3: Web3) -> Any:
+    abi = [
+        {
+            "constant": True,
+            "inputs": [{"name": "owner", "type": "address"}],
+            "name": "balanceOf",
+            "outputs": [{"name": "", "type": "uint256"}],
+            "stateMutability": "view",
+            "type": "function",
+        }
+    ]
+    proxy = web3.eth.contract(address=make_address(), abi=abi)
+    return proxy.functions.balanceOf(make_checksum_address())
+
+
+@pytest.mark.parametrize("client_version", [GETH_VERSION, PARITY_VERSION])
+def test_block_hash_call_cache_middleware_caches_contract_calls(client_version):
+    """ The contract proxies resolve the block hash to a number, the call must
+    be cached by the hash nonetheless. The call is done at the hash if the
+    client supports it.
+    """
+    block_hash = to_hex(make_block_hash())
+    provider = BlockProvider(client_version, block_hash)
+    web3 = Web3(provider)
+    cache = BlockHashCallCacheMiddleware()
+    web3.middleware_onion.add(cache)
+    balance_of = make_balance_of_call(web3)
+
+    assert balance_of.call(block_identifier=block_hash) == 10
+    assert balance_of.call(block_identifier=block_hash) == 10
+    calls = [params for method, params in provider.requests if method == "eth_call"]
+    block_param = {"blockHash": block_hash} if client_version == GETH_VERSION else "0x10"
+    assert calls == [[calls[0][0], block_param]]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # the block number itself may be affected by reorgs
+    assert balance_of.call(block_identifier=16) == 10
+    assert provider.requests[-1] == ("eth_call", [calls[0][0], "0x10"])
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_block_hash_call_cache_middleware_does_not_cache_reorged_calls():
+    """ Without support for block hashes, a call at the number which was
+    reorged away from the hash must not be cached.
+    """
+    block_hash = to_hex(make_block_hash())
+    provider = BlockProvider(PARITY_VERSION, block_hash)
+    provider.canonical_hash = to_hex(make_block_hash())
+    web3 = Web3(provider)
+    cache = BlockHashCallCacheMiddleware()
+    web3.middleware_onion.add(cache)
+    balance_of = make_balance_of_call(web3)
+
+    assert balance_of.call(block_identifier=block_hash) == 10
+    assert balance_of.call(block_identifier=block_hash) == 10
+    calls = [params for method, params in provider.requests if method == "eth_call"]
+    assert len(calls) == 2
+    assert cache.generate_report() == {"size": 0, "hits": 0, "misses": 2}
+
+
+class FakeChain:
+    """ Implements the `getBlock` calls used by the gas price strategies. """
+
+    def __init__(self) -> None:
+        self.blocks: List[Dict[str, Any]] = list()
+        self.requests = 0
+
+    def mine(self, gas_prices: List[int], miner: str, fork: str = "") -> Dict[str, Any]:
+        number = len(self.blocks)
+        block = {
+            "number": number,
+            "hash": keccak(text=f"{fork}{number}"),
+            "parentHash": self.blocks[-1]["hash"] if self.blocks else b"\x00" * 32,
+            "timestamp": number * 15,
+            "miner": miner,
+            "transactions": [{"gasPrice": gas_price} for gas_price in gas_prices],
+        }
+        self.blocks.append(block)
+        return block
+
+    def getBlock(  # pylint: disable=unused-argument
+        self, block_identifier: Any, full_transactions: bool = False
+    ) -> Dict[str, Any]:
+        self.requests += 1
+        if block_identifier == "latest":
+            return self.blocks[-1]
+        if isinstance(block_identifier, int):
+            return self.blocks[block_identifier]
+        block_hash = block_identifier
+        if isinstance(block_hash, str):
+            block_hash = to_bytes(hexstr=block_hash)
+        return next(block for block in self.blocks if block["hash"] == block_hash)
+
+
+def make_fake_web3(chain: FakeChain) -> Web3:
+    web3 = Mock()
+    web3.eth = chain
+    return web3
+
+
+def test_rpc_latency_middleware_observes_requests_reaching_the_provider():
+    provider = RecordingProvider()
+    web3 = Web3(provider, middlewares=[])
+    web3.middleware_onion.inject(rpc_latency_middleware, layer=0)
+    web3.middleware_onion.add(BlockHashCallCacheMiddleware())
+
+    get_code = RPC_REQUEST_DURATION.labels("eth_getCode")
+    get_balance = RPC_REQUEST_DURATION.labels("eth_getBalance")
+    code_requests = get_code.count
+    balance_requests = get_balance.count
+
+    block_hash = to_hex(make_block_hash())
+    web3.manager.request_blocking(RPCEndpoint("eth_getCode"), ["0x" + "11" * 20, block_hash])
+    web3.manager.request_blocking(RPCEndpoint("eth_getCode"), ["0x" + "11" * 20, block_hash])
+    web3.manager.request_blocking(RPCEndpoint("eth_getBalance"), ["0x" + "11" * 20, "latest"])
+
+    # the cache hit did not reach the provider
+    assert get_code.count == code_requests + 1
+    assert get_balance.count == balance_requests + 1
+
+
+def test_gas_price_oracle_matches_time_based_strategy():
+    chain = FakeChain()
+    web3 = make_fake_web3(chain)
+    oracle = GasPriceOracle(max_wait_seconds=60, sample_size=10, probability=98)
+
+    miners = ["0x" + "11" * 20, "0x" + "22" * 20, "0x" + "33" * 20]
+    for number in range(15):
+        chain.mine([number * 10 + 1, number * 20 + 5], miner=miners[number % len(miners)])
+        oracle.ingest(web3, chain.blocks[-1])
+
+    assert len(oracle.window) == 10
+    expected = construct_time_based_gas_price_strategy(
+        max_wait_seconds=60, sample_size=10, probability=98
+    )(web3, {})
+    assert oracle.gas_price == expected
+
+    # The price is computed once per block, the queries do not fetch blocks
+    requests = chain.requests
+    assert oracle(web3, {}) == expected
+    assert chain.requests == requests
+
+
+def test_gas_price_oracle_ingests_each_block_once():
+    chain = FakeChain()
+    web3 = make_fake_web3(chain)
+    oracle = GasPriceOracle(max_wait_seconds=60, sample_size=5)
+
+    for _ in range(3):
+        chain.mine([10], miner="0x" + "11" * 20)
+    oracle.ingest(web3, chain.blocks[-1])
+    assert chain.requests == 3
+
+    # Missed blocks are fetched by walking back the parent hashes
+    chain.mine([20], miner="0x" + "11" * 20)
+    chain.mine([30], miner="0x" + "11" * 20)
+    oracle.ingest(web3, chain.blocks[-1])
+    assert chain.requests == 5
+    assert [block.number for block in oracle.window] == [0, 1, 2, 3, 4]
+
+    oracle.ingest(web3, chain.blocks[-1])
+    assert chain.requests == 5
+
+    # Reorged blocks are replaced
+    del chain.blocks[3:]
+    chain.mine([40], miner="0x" + "22" * 20, fork="fork")
+    oracle.ingest(web3, chain.blocks[-1])
+    assert [block.number for block in oracle.window] == [0, 1, 2, 3]
+    assert oracle.window[-1].gas_prices == (40,)
+
+
+def test_gas_price_oracle_fills_the_window_over_several_blocks():
+    chain = FakeChain()
+    web3 = make_fake_web3(chain)
+    oracle = GasPriceOracle(max_wait_seconds=60, sample_size=5, blocks_per_ingest=2)
+
+    for _ in range(8):
+        chain.mine([10], miner="0x" + "11" * 20)
+
+    oracle.ingest(web3, chain.blocks[-1])
+    assert chain.requests == 2
+    assert [block.number for block in oracle.window] == [6, 7]
+
+    oracle.ingest(web3, chain.blocks[-1])
+    assert chain.requests == 4
+    assert [block.number for block in oracle.window] == [4, 5, 6, 7]
+
+    chain.mine([20], miner="0x" + "11" * 20)
+    oracle.ingest(web3, chain.blocks[-1])
+    assert chain.requests == 5
+    assert [block.number for block in oracle.window] == [4, 5, 6, 7, 8]
+
+    # The window is full, only the new blocks are fetched
+    oracle.ingest(web3, chain.blocks[-1])
+    assert chain.requests == 5
+
+    # After a gap larger than a call can fetch, the missed blocks are
+    # backfilled over the next calls and the previous window is kept meanwhile
+    gas_price = oracle.gas_price
+    for _ in range(3):
+        chain.mine([30], miner="0x" + "11" * 20)
+    oracle.ingest(web3, chain.blocks[-1])
+    assert [block.number for block in oracle.window] == [4, 5, 6, 7, 8]
+    assert oracle.gas_price == gas_price
+
+    oracle.ingest(web3, chain.blocks[-1])
+    assert [block.number for block in oracle.window] == [7, 8, 9, 10, 11]
+
+    # The backfill stops once it fills the window, the older blocks are not
+    # fetched
+    for _ in range(10):
+        chain.mine([40], miner="0x" + "11" * 20)
+    requests = chain.requests
+    for _ in range(3):
+        oracle.ingest(web3, chain.blocks[-1])
+    assert [block.number for block in oracle.window] == [17, 18, 19, 20, 21]
+    assert chain.requests == requests + 5
+
+
+def test_gas_price_oracle_falls_back_to_the_time_based_strategy():
+    chain = FakeChain()
+    web3 = make_fake_web3(chain)
+    oracle = GasPriceOracle(max_wait_seconds=60, sample_size=10, probability=98)
+
+    chain.mine([10], miner="0x" + "11" * 20)
+    chain.mine([20], miner="0x" + "22" * 20)
+    chain.mine([30], miner="0x" + "33" * 20)
+    assert oracle.gas_price is None
+
+    expected = construct_time_based_gas_price_strategy(
+        max_wait_seconds=60, sample_size=10, probability=98
+    )(web3, {})
+    assert oracle(web3, {}) == expected
+
+
+def test_gas_price_oracle_logs_failed_requests():
+    chain = FakeChain()
+    chain.mine([10], miner="0x" + "11" * 20)
+    web3 = make_fake_web3(chain)
+    oracle = GasPriceOracle(max_wait_seconds=60, fallback=lambda _web3, _params: Wei(7))
+
+    with patch.object(chain, "getBlock", side_effect=RequestsConnectionError("node is down")):
+        oracle.ingest(web3, chain.blocks[-1])
+    assert oracle.window == []
+
+    oracle.ingest(web3, chain.blocks[-1])
+    assert [block.number for block in oracle.window] == [0]
+
+
+def test_gas_price_oracle_fallback_and_persistence(tmp_path):
+    chain = FakeChain()
+    web3 = make_fake_web3(chain)
+    oracle = GasPriceOracle(max_wait_seconds=60, fallback=lambda _web3, _params: Wei(7))
+
+    oracle.load(tmp_path / "window.json")
+    assert oracle(web3, {}) == 7, "without blocks the fallback must be used"
+
+    for _ in range(3):
+        chain.mine([10, 20], miner="0x" + "11" * 20)
+        oracle.ingest(web3, chain.blocks[-1])
+    gas_price = oracle(web3, {})
+    assert gas_price != 7
+
+    oracle.save()
+    restored = GasPriceOracle(max_wait_seconds=60, fallback=lambda _web3, _params: Wei(7))
+    restored.load(tmp_path / "window.json")
+    assert restored.window == oracle.window
+    assert restored(web3, {}) == gas_price
+
+    (tmp_path / "window.json").write_text("{")
+    corrupted = GasPriceOracle(max_wait_seconds=60, fallback=lambda _web3, _params: Wei(7))
+    corrupted.load(tmp_path / "window.json")
+    assert corrupted(web3, {}) == 7
@@ -775,14 +775,15 @@ def test_interwoven_transfers():
         lock_secrethash = sha256(lock_secret).digest()
         lock = HashTimeLockState(lock_amount, lock_expiration, lock_secrethash)
 
-        pending_locks = PendingLocksState(list(partner_model_current.pending_locks))
-        pending_locks.locks.append(bytes(lock.encoded))
+        pending_locks = PendingLocksState(
+            (*partner_model_current.pending_locks, bytes(lock.encoded))
+        )
 
         partner_model_current = partner_model_current._replace(
             distributable=partner_model_current.distributable - lock_amount,
             amount_locked=partner_model_current.amount_locked + lock_amount,
             next_nonce=partner_model_current.next_nonce + 1,
-            pending_locks=pending_locks.locks,
+            pending_locks=list(pending_locks.locks),
         )
 
         receive_lockedtransfer = make_receive_transfer_mediated(
@@ -1228,11 +1229,12 @@ def test_channelstate_unlock_without_locks():
 
 def pending_locks_from_packed_data(packed: bytes) -> PendingLocksState:
     number_of_bytes = len(packed)
-    locks = make_empty_pending_locks_state()
-    for i in range(0, number_of_bytes, 96):
-        lock = Lock.from_bytes(packed[i : i + 96])
-        locks.locks.append(EncodedData(lock.as_bytes))  # pylint: disable=E1101
-    return locks
+    return PendingLocksState(
+        tuple(
+            EncodedData(Lock.from_bytes(packed[i : i + 96]).as_bytes)
+            for i in range(0, number_of_bytes, 96)
+        )
+    )
 
 
 def test_channelstate_get_unlock_proof():
@@ -1255,7 +1257,7 @@ def test_channelstate_get_unlock_proof():
         lock_secrethash = sha256(lock_secret).digest()
         lock = HashTimeLockState(lock_amount, lock_expiration, lock_secrethash)
 
-        pending_locks.locks.append(bytes(lock.encoded))  # pylint: disable=E1101
+        pending_locks = PendingLocksState((*pending_locks.locks, bytes(lock.encoded)))
         if random.randint(0, 1) == 0:
             locked_locks[lock_secrethash] = lock
         else:
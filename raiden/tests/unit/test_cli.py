@@ -1,4 +1,6 @@
 import json
+import subprocess
+import sys
 from functools import partial
 from unittest.mock import patch
 
@@ -44,6 +46,42 @@ def test_cli_version(cli_runner):
     assert result.exit_code == 0
 
 
+def test_cli_import_time():
+    """ The node, the REST API and the transport are imported only to run
+    the node, not to show the help or to run the other subcommands.
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import raiden.ui.cli"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=True,
+        universal_newlines=True,
+    )
+    imported_modules = {
+        line.rsplit("|", 1)[1].strip()
+        for line in process.stderr.splitlines()
+        if line.startswith("import time:")
+    }
+    assert "raiden.ui.cli" in imported_modules
+
+    lazily_imported_modules = {
+        "flask",
+        "marshmallow",
+        "matrix_client",
+        "networkx",
+        "raiden.accounts",
+        "raiden.api.rest",
+        "raiden.network.pathfinding",
+        "raiden.network.rpc.client",
+        "raiden.network.transport.matrix",
+        "raiden.raiden_service",
+        "raiden.ui.app",
+        "raiden.ui.runners",
+        "raiden.utils.profiling.sampler",
+    }
+    assert not imported_modules & lazily_imported_modules
+
+
 def mock_raises(exception):
     def f(*_, **__):
         raise exception
@@ -68,7 +106,7 @@ def test_run_error_reporting(cli_runner, monkeypatch):
     }
 
     for exception, code in caught_exceptions.items():
-        monkeypatch.setattr(cli, "run_services", mock_raises(exception))
+        monkeypatch.setattr("raiden.ui.runners.run_services", mock_raises(exception))
         result = cli_runner(cli.run, "--accept-disclaimer")
         assert result.exception.code == code
 
@@ -1,13 +1,22 @@
+import json
+import threading
+import time
 from itertools import cycle
-from typing import List
-from unittest.mock import Mock, create_autospec
+from typing import Any, Dict, List
+from unittest.mock import Mock, create_autospec, patch
 from urllib.parse import urlparse
 
 import gevent
 import pytest
 import requests
 import responses
-from eth_utils import decode_hex, encode_hex, to_canonical_address, to_normalized_address
+from eth_utils import (
+    decode_hex,
+    encode_hex,
+    to_canonical_address,
+    to_checksum_address,
+    to_normalized_address,
+)
 from matrix_client.errors import MatrixRequestError
 from matrix_client.user import User
 
@@ -16,8 +25,13 @@
 from raiden.exceptions import TransportError
 from raiden.messages.synchronization import Processed
 from raiden.messages.transfers import RevealSecret
+from raiden.network.transport.matrix.client import SYNC_HANDLING_DURATION, decode_sync_response
+from raiden.network.transport.matrix.transport import _RetryQueue
 from raiden.network.transport.matrix.utils import (
+    DisplayNameCache,
     MessageAckTimingKeeper,
+    MessageBatchStatistics,
+    UserDirectoryResolver,
     login,
     make_client,
     make_message_batches,
@@ -26,7 +40,7 @@
     sort_servers_closest,
     validate_userid_signature,
 )
-from raiden.tests.utils.factories import make_secret, make_signature, make_signer
+from raiden.tests.utils.factories import make_address, make_secret, make_signature, make_signer
 from raiden.tests.utils.transport import ignore_member_join, ignore_messages
 from raiden.utils.signer import recover
 from raiden.utils.typing import MessageID
@@ -291,3 +305,228 @@ def test_message_ack_timing_keeper():
     report = matk.generate_report()
     assert len(report) == 1
     assert report == [0.05]
+
+
+def test_message_batch_statistics():
+    statistics = MessageBatchStatistics()
+
+    # No batches sent -> no division by zero
+    assert statistics.messages_per_batch == 0
+
+    statistics.add_batch(1)
+    statistics.add_batch(3)
+
+    report = statistics.generate_report()
+    assert report["batches"] == 2
+    assert report["messages"] == 4
+    assert report["messages_per_batch"] == 2
+    assert report["batches_per_second"] > 0
+
+
+def test_retry_queue_coalesces_bursts():
+    transport = Mock()
+    transport._config.send_coalesce_interval = 0.1
+    retry_queue = _RetryQueue(transport=transport, receiver=make_address())
+
+    # The first message after a quiet period is sent immediately
+    with gevent.Timeout(0.05):
+        retry_queue._wait_for_batch()
+
+    # Messages right after a batch are held back for the coalesce interval
+    retry_queue._last_batch_sent_at = time.monotonic()
+    before = time.monotonic()
+    retry_queue._wait_for_batch()
+    assert time.monotonic() - before >= 0.09
+
+    # ... unless there are enough messages for a full batch
+    retry_queue._last_batch_sent_at = time.monotonic()
+    retry_queue._batch_full_event.set()
+    with gevent.Timeout(0.05):
+        retry_queue._wait_for_batch()
+
+
+def make_sync_response(room_count: int) -> Dict[str, Any]:
+    def make_room(room_index: int) -> Dict[str, Any]:
+        message = {
+            "type": "m.room.message",
+            "sender": f"@user{room_index}:server",
+            "content": {"msgtype": "m.text", "body": "message"},
+        }
+        return {
+            "summary": {},
+            "state": {"events": []},
+            "timeline": {"events": [message], "prev_batch": "prev"},
+            "ephemeral": {"events": []},
+            "account_data": {"events": []},
+        }
+
+    return {
+        "next_batch": "next",
+        "presence": {"events": []},
+        "to_device": {"events": []},
+        "rooms": {
+            "invite": {},
+            "leave": {},
+            "join": {f"!room{i}:server": make_room(i) for i in range(room_count)},
+        },
+    }
+
+
+@pytest.mark.parametrize("sync_offload_threshold", [None, 0])
+def test_handle_responses(requests_responses, sync_offload_threshold):
+    received_messages = []
+
+    def handle_messages(all_messages):
+        received_messages.extend(all_messages)
+        return True
+
+    server = "http://server.xyz"
+    client = raiden.network.transport.matrix.client.GMatrixClient(
+        handle_messages, ignore_member_join, server, sync_offload_threshold=sync_offload_threshold
+    )
+
+    sync_response = make_sync_response(room_count=100)
+    requests_responses.add(
+        responses.GET, f"{server}/_matrix/client/r0/sync", body=json.dumps(sync_response)
+    )
+    decoding_threads = []
+
+    def decode(content):
+        decoding_threads.append(threading.get_ident())
+        return decode_sync_response(content)
+
+    with patch.object(raiden.network.transport.matrix.client, "decode_sync_response", decode):
+        response = client.api.sync()
+
+    # Only large responses are decoded, and their events extracted, in a thread
+    if sync_offload_threshold is None:
+        assert decoding_threads == []
+    else:
+        assert len(decoding_threads) == 1
+        assert decoding_threads[0] != threading.get_ident()
+
+    assert response.next_batch == "next"
+    assert len(response.joined_rooms) == 100
+
+    # Avoid `_mkroom`, it fetches the room aliases from the server
+    for room_id in sync_response["rooms"]["join"]:
+        client.rooms[room_id] = raiden.network.transport.matrix.client.Room(client, room_id)
+
+    handled_before = SYNC_HANDLING_DURATION.count
+    client._handle_responses([response])
+
+    assert len(received_messages) == 100
+    for room, messages in received_messages:
+        assert len(messages) == 1
+        assert messages[0]["room_id"] == room.room_id
+        assert room.prev_batch == "prev"
+
+    assert SYNC_HANDLING_DURATION.count == handled_before + 1
+
+
+def test_client_dump_and_load_rooms():
+    client = raiden.network.transport.matrix.client.GMatrixClient(
+        ignore_messages, ignore_member_join, "http://server.xyz"
+    )
+    room = raiden.network.transport.matrix.client.Room(client, "!room:server.xyz")
+    room.aliases = ["#alias:server.xyz"]
+    room._mkmembers(User(client.api, "@0x1234:server.xyz", "signature"))
+    client.rooms[room.room_id] = room
+
+    rooms = client.dump_rooms()
+    assert rooms == {
+        "!room:server.xyz": {
+            "aliases": ["#alias:server.xyz"],
+            "members": {"@0x1234:server.xyz": "signature"},
+        }
+    }
+
+    # Loading must not query the server, there is no mocked response
+    restored_client = raiden.network.transport.matrix.client.GMatrixClient(
+        ignore_messages, ignore_member_join, "http://server.xyz"
+    )
+    restored_client.load_rooms(json.loads(json.dumps(rooms)))
+
+    restored_room = restored_client.rooms["!room:server.xyz"]
+    assert restored_room.aliases == ["#alias:server.xyz"]
+    members = restored_room.get_joined_members()
+    assert [(user.user_id, user.displayname) for user in members] == [
+        ("@0x1234:server.xyz", "signature")
+    ]
+    assert restored_client.dump_rooms() == rooms
+
+
+def test_user_directory_resolver():
+    signer = make_signer()
+    user_id = f"@{to_normalized_address(signer.address)}:server.xyz"
+    user = User(Mock(), user_id, encode_hex(signer.sign(user_id.encode())))
+    impostor_id = f"@{to_normalized_address(make_address())}:server.xyz"
+    impostor = User(Mock(), impostor_id, encode_hex(signer.sign(impostor_id.encode())))
+
+    def search_user_directory(term):
+        gevent.sleep(0.01)
+        if term == to_normalized_address(signer.address):
+            return [user, impostor]
+        return []
+
+    client = Mock()
+    client.search_user_directory = Mock(side_effect=search_user_directory)
+    resolver = UserDirectoryResolver(client, DisplayNameCache(), ttl=0.1)
+
+    # Concurrent lookups of the same address share the request
+    greenlets = [gevent.spawn(resolver.get_user_ids, signer.address) for _ in range(3)]
+    gevent.joinall(set(greenlets), raise_error=True)
+    assert all(greenlet.get() == {user_id} for greenlet in greenlets)
+    assert client.search_user_directory.call_count == 1
+
+    # Cached addresses are not looked up again
+    unknown_address = make_address()
+    resolver.prefetch([signer.address, signer.address, unknown_address])
+    assert client.search_user_directory.call_count == 2
+
+    # Empty results are not cached
+    assert resolver.get_users(unknown_address) == []
+    assert client.search_user_directory.call_count == 3
+
+    # A new user of the address drops the cached users
+    resolver.user_seen(signer.address, user_id)
+    assert resolver.get_users(signer.address) == [user]
+    assert client.search_user_directory.call_count == 3
+    resolver.user_seen(signer.address, f"{user_id}.new")
+    assert resolver.get_users(signer.address) == [user]
+    assert client.search_user_directory.call_count == 4
+
+    # The cached users expire
+    gevent.sleep(0.1)
+    assert resolver.get_users(signer.address) == [user]
+    assert client.search_user_directory.call_count == 5
+
+
+def test_user_directory_resolver_dump_and_load_users():
+    signer = make_signer()
+    user_id = f"@{to_normalized_address(signer.address)}:server.xyz"
+    user = User(Mock(), user_id, encode_hex(signer.sign(user_id.encode())))
+
+    client = Mock()
+    client.search_user_directory = Mock(return_value=[user])
+    resolver = UserDirectoryResolver(client, DisplayNameCache())
+    assert resolver.get_users(signer.address) == [user]
+
+    users = resolver.dump_users()
+    assert list(users) == [to_checksum_address(signer.address)]
+
+    # Loading must not query the server
+    restored_client = Mock()
+    restored_resolver = UserDirectoryResolver(restored_client, DisplayNameCache())
+    restored_resolver.load_users(json.loads(json.dumps(users)))
+    restored_users = restored_resolver.get_users(signer.address)
+    assert [(restored.user_id, restored.displayname) for restored in restored_users] == [
+        (user.user_id, user.displayname)
+    ]
+    assert restored_client.search_user_directory.call_count == 0
+
+    # Expired users are not restored
+    users[to_checksum_address(signer.address)]["expires_at"] = time.time() - 1
+    expired_resolver = UserDirectoryResolver(Mock(), DisplayNameCache())
+    expired_resolver.load_users(users)
+    assert expired_resolver.dump_users() == {}
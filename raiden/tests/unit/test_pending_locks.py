@@ -1,8 +1,81 @@
+from unittest.mock import patch
+
+from eth_utils import keccak
+
 from raiden.constants import LOCKSROOT_OF_NO_LOCKS
-from raiden.transfer.channel import compute_locksroot
+from raiden.storage.serialization.serializer import DictSerializer
+from raiden.tests.utils.factories import make_lock
+from raiden.transfer.channel import compute_locks_with, compute_locks_without, compute_locksroot
 from raiden.transfer.state import PendingLocksState
+from raiden.utils.copy import deepcopy
 
 
 def test_empty():
-    locks = PendingLocksState(list())
+    locks = PendingLocksState(tuple())
     assert compute_locksroot(locks) == LOCKSROOT_OF_NO_LOCKS
+
+
+def test_locksroot_is_incremental():
+    locks = [make_lock() for _ in range(5)]
+
+    pending_locks = PendingLocksState(tuple())
+    for lock in locks:
+        new_pending_locks = compute_locks_with(pending_locks, lock)
+        assert new_pending_locks is not None
+        pending_locks = new_pending_locks
+        assert compute_locksroot(pending_locks) == keccak(b"".join(pending_locks.locks))
+
+    assert compute_locks_with(pending_locks, locks[0]) is None, "duplicated lock must be rejected"
+
+    pending_locks = compute_locks_without(pending_locks, locks[2].encoded)
+    assert pending_locks is not None
+    assert compute_locksroot(pending_locks) == keccak(b"".join(pending_locks.locks))
+    assert compute_locks_without(pending_locks, locks[2].encoded) is None
+
+    # Replacing the locks must not use stale caches
+    pending_locks.locks = (*pending_locks.locks, locks[2].encoded)
+    assert compute_locksroot(pending_locks) == keccak(b"".join(pending_locks.locks))
+    assert compute_locks_with(pending_locks, locks[2]) is None
+
+    pending_locks.locks = tuple(reversed(pending_locks.locks))
+    assert compute_locksroot(pending_locks) == keccak(b"".join(pending_locks.locks))
+
+
+def test_pending_locks_are_not_changed_by_copies():
+    locks = [make_lock() for _ in range(3)]
+    pending_locks = PendingLocksState((locks[0].encoded, locks[1].encoded))
+    locksroot = compute_locksroot(pending_locks)
+    assert locks[0].encoded in pending_locks.index()
+
+    with_lock = compute_locks_with(pending_locks, locks[2])
+    without_lock = compute_locks_without(pending_locks, locks[0].encoded)
+    assert with_lock is not None
+    assert without_lock is not None
+
+    assert pending_locks.locks == (locks[0].encoded, locks[1].encoded)
+    assert pending_locks.index() == {locks[0].encoded, locks[1].encoded}
+    assert compute_locksroot(pending_locks) == locksroot
+    assert with_lock.index() == {lock.encoded for lock in locks}
+    assert without_lock.index() == {locks[1].encoded}
+    assert compute_locksroot(without_lock) == keccak(locks[1].encoded)
+
+
+def test_pending_locks_caches_are_not_stored():
+    locks = PendingLocksState(tuple())
+    for _ in range(3):
+        locks = compute_locks_with(locks, make_lock())
+    locksroot = compute_locksroot(locks)
+
+    copied_locks = deepcopy(locks)
+    assert copied_locks == locks
+    assert compute_locksroot(copied_locks) == locksroot
+
+    # The copy made for every dispatch keeps the locksroot
+    with patch("sha3.keccak_256", side_effect=AssertionError("locks hashed again")):
+        assert compute_locksroot(deepcopy(locks)) == locksroot
+
+    serialized = DictSerializer.serialize(locks)
+    assert set(serialized) == {"_type", "locks"}
+    restored_locks = DictSerializer.deserialize(serialized)
+    assert restored_locks == locks
+    assert compute_locksroot(restored_locks) == locksroot
@@ -15,6 +15,7 @@
 from raiden.network.pathfinding import (
     IOU,
     MAX_PATHS_QUERY_ATTEMPTS,
+    IOUAllocator,
     PFSConfig,
     PFSError,
     PFSInfo,
@@ -24,10 +25,10 @@
     query_paths,
     update_iou,
 )
-from raiden.routing import get_best_routes
+from raiden.routing import ROUTE_CACHE_HITS, ROUTE_CACHE_MISSES, RouteCache, get_best_routes
 from raiden.tests.utils import factories
 from raiden.tests.utils.mocks import mocked_failed_response, mocked_json_response
-from raiden.transfer.state import NettingChannelState, NetworkState, TokenNetworkState
+from raiden.transfer.state import NettingChannelState, NetworkState, RouteState, TokenNetworkState
 from raiden.utils import typing
 from raiden.utils.formatting import to_checksum_address
 from raiden.utils.keys import privatekey_to_address
@@ -38,6 +39,7 @@
     BlockTimeout,
     ChainID,
     Dict,
+    FeeAmount,
     PaymentAmount,
     TokenAmount,
     TokenNetworkAddress,
@@ -124,6 +126,12 @@ def create_square_network_topology(
 PRIVKEY = b"privkeyprivkeyprivkeyprivkeypriv"
 
 
+@pytest.fixture(autouse=True)
+def clear_iou_allocator():
+    """ The IOU allocator is global, don't leak IOUs from one test to the next. """
+    pathfinding.iou_allocator.clear()
+
+
 def get_best_routes_with_iou_request_mocked(
     chain_state,
     token_network_state,
@@ -632,6 +640,9 @@ def assert_failed_pfs_request(
     expected_success: bool = False,
     exception_type: typing.Type = ServiceRequestFailed,
 ):
+    # Every call is an independent scenario, don't reuse IOUs of earlier calls
+    pathfinding.iou_allocator.clear()
+
     while len(responses) < MAX_PATHS_QUERY_ATTEMPTS:
         responses.append(responses[0])
     for response in responses:
@@ -700,6 +711,123 @@ def test_routing_in_direct_channel(happy_path_fixture, our_address, one_to_n_add
         assert pfs_request.called
 
 
+def test_routing_with_route_cache(happy_path_fixture, one_to_n_address, our_address):
+    """ Repeated payments to the same target reuse the routes of the PFS """
+    addresses, chain_state, channel_states, response, token_network_state = happy_path_fixture
+    _, _, _, address4 = addresses
+    _, channel_state2 = channel_states
+    route_cache = RouteCache(ttl=60)
+
+    def best_routes(amount):
+        _, routes, feedback_token = get_best_routes(
+            chain_state=chain_state,
+            token_network_address=token_network_state.address,
+            one_to_n_address=one_to_n_address,
+            from_address=our_address,
+            to_address=address4,
+            amount=PaymentAmount(amount),
+            previous_address=None,
+            pfs_config=PFS_CONFIG,
+            privkey=PRIVKEY,
+            route_cache=route_cache,
+        )
+        return routes, feedback_token
+
+    with patch("raiden.network.pathfinding.get_pfs_info", return_value=PFS_CONFIG.info):
+        with patch.object(requests, "get", return_value=mocked_json_response()):
+            with patch.object(requests, "post", return_value=response) as post_paths:
+                hits = ROUTE_CACHE_HITS.value
+                misses = ROUTE_CACHE_MISSES.value
+
+                routes, feedback_token = best_routes(50)
+                assert post_paths.call_count == 1
+                assert feedback_token == DEFAULT_FEEDBACK_TOKEN
+                assert route_cache.misses == 1
+                assert ROUTE_CACHE_MISSES.value == misses + 1
+
+                # Same amount bucket, the PFS is not queried again. The
+                # feedback token is only used for the payment which requested
+                # the routes.
+                cached_routes, cached_feedback_token = best_routes(40)
+                assert post_paths.call_count == 1
+                assert cached_routes == routes
+                assert cached_feedback_token is None
+                assert cached_routes[0].forward_channel_id == channel_state2.identifier
+                assert route_cache.hits == 1
+                assert route_cache.hit_rate == 0.5
+                assert route_cache.saved_pfs_fees == PFS_CONFIG.info.price
+                assert ROUTE_CACHE_HITS.value == hits + 1
+
+                # Different amount bucket
+                best_routes(100)
+                assert post_paths.call_count == 2
+
+                # A failed route invalidates the cached entries using it
+                route_cache.invalidate_route(token_network_state.address, routes[0].route)
+                best_routes(50)
+                assert post_paths.call_count == 3
+
+                # A change to the forward channel invalidates the cached entries
+                route_cache.invalidate_channel(
+                    replace(
+                        channel_state2.canonical_identifier,
+                        token_network_address=token_network_state.address,
+                    )
+                )
+                best_routes(50)
+                assert post_paths.call_count == 4
+
+
+def test_route_cache_revalidates_channel(happy_path_fixture, our_address):
+    """ Cached routes are only used if the forward channel can carry the payment """
+    addresses, chain_state, channel_states, _, token_network_state = happy_path_fixture
+    _, address2, _, address4 = addresses
+    _, channel_state2 = channel_states
+
+    route = RouteState(
+        route=[our_address, address2, address4],
+        forward_channel_id=channel_state2.identifier,
+        estimated_fee=FeeAmount(2),
+    )
+    route_cache = RouteCache(ttl=60)
+    route_cache.put(
+        token_network_address=token_network_state.address,
+        to_address=address4,
+        amount=PaymentAmount(65),
+        routes=[route],
+        pfs_fee=TokenAmount(0),
+    )
+
+    # The estimated fee is scaled for larger payments
+    cached_routes = route_cache.get(chain_state, token_network_state.address, address4, 96)
+    assert cached_routes is not None
+    assert cached_routes[0].estimated_fee == 3
+
+    # Not enough capacity in the forward channel for the payment and the fees,
+    # the routes are still used for smaller payments
+    assert route_cache.get(chain_state, token_network_state.address, address4, 99) is None
+    assert route_cache.get(chain_state, token_network_state.address, address4, 65) is not None
+
+    # The partner of the forward channel must be reachable
+    chain_state.nodeaddresses_to_networkstates[address2] = NetworkState.UNREACHABLE
+    assert route_cache.get(chain_state, token_network_state.address, address4, 65) is None
+    chain_state.nodeaddresses_to_networkstates[address2] = NetworkState.REACHABLE
+    assert route_cache.get(chain_state, token_network_state.address, address4, 65) is not None
+
+    route_cache.invalidate_node(address2)
+    assert route_cache.get(chain_state, token_network_state.address, address4, 65) is None
+
+    route_cache = RouteCache(ttl=0)
+    route_cache.put(
+        token_network_address=token_network_state.address,
+        to_address=address4,
+        amount=PaymentAmount(65),
+        routes=[route],
+        pfs_fee=TokenAmount(0),
+    )
+    assert route_cache.get(chain_state, token_network_state.address, address4, 65) is None
+
+
 @pytest.fixture
 def query_paths_args(
     chain_id, token_network_state, one_to_n_address, our_address
@@ -782,12 +910,16 @@ def test_query_paths_with_unrecoverable_pfs_error(query_paths_args):
 
 
 def test_insufficient_payment(query_paths_args, valid_response_json):
-    """ When the PFS complains about insufficient fees, the client must update it's fee info """
+    """ When the PFS complains about insufficient fees, the client must update it's fee info
+
+    The retry is rebased on the locally known latest IOU, so the last IOU is
+    only fetched from the PFS once.
+    """
     insufficient_response = dict(error_code=PFSError.INSUFFICIENT_SERVICE_PAYMENT.value)
 
     # PFS fails to return info
     assert_failed_pfs_request(
-        query_paths_args, [insufficient_response], expected_requests=2, expected_get_iou_requests=2
+        query_paths_args, [insufficient_response], expected_requests=2, expected_get_iou_requests=1
     )
 
     # PFS has increased fees
@@ -799,7 +931,7 @@ def test_insufficient_payment(query_paths_args, valid_response_json):
             [insufficient_response, valid_response_json],
             status_codes=[400, 200],
             expected_requests=2,
-            expected_get_iou_requests=2,
+            expected_get_iou_requests=1,
             expected_success=True,
         )
 
@@ -811,7 +943,7 @@ def test_insufficient_payment(query_paths_args, valid_response_json):
             query_paths_args,
             [insufficient_response],
             expected_requests=2,
-            expected_get_iou_requests=2,
+            expected_get_iou_requests=1,
         )
 
 
@@ -936,7 +1068,8 @@ def test_no_iou_when_pfs_price_0(query_paths_args):
 
 
 def test_two_parallel_queries(query_paths_args):
-    """ Test that only one IOU is being processed at a time. """
+    """ Test that parallel queries don't wait for each other and use distinct IOUs. """
+    pathfinding.iou_allocator.clear()
 
     # We mock one query to last at least 0.2s
     def mocked_json_response_with_sleep(**kwargs):  # pylint: disable=unused-argument
@@ -947,11 +1080,11 @@ def mocked_json_response_with_sleep(**kwargs):  # pylint: disable=unused-argumen
     with patch("raiden.network.pathfinding.get_pfs_info") as mocked_pfs_info:
         mocked_pfs_info.return_value = PFS_CONFIG.info
 
-        with patch.object(pathfinding, "create_current_iou"):
+        with patch.object(pathfinding, "get_last_iou", return_value=None):
 
             with patch.object(
                 pathfinding, "post_pfs_paths", side_effect=mocked_json_response_with_sleep
-            ):
+            ) as post_paths:
 
                 query_1 = gevent.spawn(query_paths, **query_paths_args)
                 query_2 = gevent.spawn(query_paths, **query_paths_args)
@@ -960,7 +1093,54 @@ def mocked_json_response_with_sleep(**kwargs):  # pylint: disable=unused-argumen
                 gevent.joinall({query_1, query_2}, raise_error=True)
                 duration = time.monotonic() - before
 
-                # We expect the calls to happen sequentially, so one greenlet must wait for
-                # the other. If semaphore in raiden.network.pathfinding is bound to 2,
-                # the test fails
-                assert duration >= 0.4
+                # The IOUs are reserved before the requests are sent, so the
+                # requests to the PFS must overlap
+                assert duration < 0.4
+
+                amounts = sorted(
+                    call_args[1]["payload"]["iou"]["amount"]
+                    for call_args in post_paths.call_args_list
+                )
+                price = PFS_CONFIG.info.price
+                assert amounts == [price, 2 * price]
+
+
+def test_iou_allocator_is_per_node(chain_id, one_to_n_address):
+    """ The IOUs of two nodes in the same process are independent, and a node
+    does not wait for the IOU of the other node to be fetched.
+    """
+    allocator = IOUAllocator()
+    slow_node, fast_node = factories.make_address(), factories.make_address()
+    finished = list()
+
+    def get_last_iou(sender, **kwargs):  # pylint: disable=unused-argument
+        if sender == slow_node:
+            gevent.sleep(0.2)
+        return None
+
+    def reserve(our_address):
+        iou = allocator.reserve(
+            pfs_config=PFS_CONFIG,
+            token_network_address=factories.make_token_network_address(),
+            one_to_n_address=one_to_n_address,
+            our_address=our_address,
+            privkey=PRIVKEY,
+            block_number=BlockNumber(10),
+            chain_id=chain_id,
+            offered_fee=TokenAmount(5),
+        )
+        finished.append(our_address)
+        return iou
+
+    with patch.object(pathfinding, "get_last_iou", side_effect=get_last_iou):
+        slow = gevent.spawn(reserve, slow_node)
+        fast = gevent.spawn(reserve, fast_node)
+        gevent.joinall({slow, fast}, raise_error=True, timeout=1)
+
+        assert finished == [fast_node, slow_node]
+        assert slow.get().sender == slow_node
+        assert fast.get().sender == fast_node
+        assert slow.get().amount == fast.get().amount == 5
+
+        assert reserve(fast_node).amount == 10
+        assert reserve(slow_node).amount == 10
@@ -0,0 +1,131 @@
+from eth_utils import to_hex
+from web3 import Web3
+from web3.providers.base import BaseProvider
+from web3.types import RPCEndpoint, RPCResponse
+
+from raiden.blockchain.secret_registry import SecretRegistryMirror
+from raiden.tests.utils import factories
+from raiden.utils.typing import (
+    Any,
+    BlockNumber,
+    BlockTimeout,
+    Dict,
+    List,
+    SecretHash,
+    SecretRegistryAddress,
+)
+
+
+class SecretRevealedProvider(BaseProvider):
+    """ Answers `eth_getLogs` with the `SecretRevealed` events of `blocks`. """
+
+    def __init__(self, latest_block_number: int) -> None:
+        self.latest_block_number = latest_block_number
+        self.blocks: Dict[int, List[SecretHash]] = dict()
+        self.requests: List[RPCEndpoint] = list()
+
+    def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        self.requests.append(method)
+
+        if method == "eth_blockNumber":
+            return {"jsonrpc": "2.0", "id": 1, "result": hex(self.latest_block_number)}
+
+        assert method == "eth_getLogs"
+        from_block = int(params[0]["fromBlock"], 16)
+        to_block = int(params[0]["toBlock"], 16)
+        logs = [
+            {"blockNumber": hex(number), "topics": [params[0]["topics"][0], to_hex(secrethash)]}
+            for number in range(from_block, to_block + 1)
+            for secrethash in self.blocks.get(number, [])
+        ]
+        return {"jsonrpc": "2.0", "id": 1, "result": logs}
+
+    def isConnected(self) -> bool:
+        return True
+
+
+def make_mirror(
+    provider: SecretRevealedProvider,
+    contract_manager,
+    max_staleness: float,
+    retention_blocks: int = 100,
+):
+    return SecretRegistryMirror(
+        web3=Web3(provider),
+        contract_manager=contract_manager,
+        secret_registry_address=SecretRegistryAddress(factories.make_address()),
+        start_block=BlockNumber(1),
+        confirmation_blocks=BlockTimeout(2),
+        max_staleness=max_staleness,
+        batch_size=BlockNumber(3),
+        retention_blocks=BlockTimeout(retention_blocks),
+    )
+
+
+def test_secret_registry_mirror_follows_the_latest_block(contract_manager):
+    registered, forked, unknown = (factories.make_secret_hash() for _ in range(3))
+
+    provider = SecretRevealedProvider(latest_block_number=7)
+    provider.blocks[2] = [registered]
+    mirror = make_mirror(provider, contract_manager, max_staleness=60)
+
+    assert mirror.is_stale()
+    mirror.synchronize()
+    assert provider.requests.count("eth_getLogs") == 3, "the backfill is done in batches"
+    assert not mirror.is_stale()
+    assert mirror.synced_block_number == 7
+
+    provider.requests.clear()
+    assert mirror.is_secret_registered(registered)
+    assert not mirror.is_secret_registered(unknown)
+    assert not provider.requests, "lookups must be local while the mirror is fresh"
+
+    # A fork replaced the already polled block 6 with one that registers a
+    # secret, it is found because the unconfirmed blocks are polled again
+    provider.blocks[6] = [forked]
+    provider.latest_block_number = 8
+    mirror.on_new_block({"number": BlockNumber(8)})
+    assert mirror.is_secret_registered(forked)
+
+    # Secrets revealed in a block which was forked away are still known
+    del provider.blocks[6]
+    mirror.on_new_block({"number": BlockNumber(9)})
+    assert mirror.is_secret_registered(forked)
+
+
+def test_secret_registry_mirror_synchronizes_when_stale(contract_manager):
+    secrethash = factories.make_secret_hash()
+
+    provider = SecretRevealedProvider(latest_block_number=2)
+    mirror = make_mirror(provider, contract_manager, max_staleness=0)
+    mirror.synchronize()
+    assert not mirror.is_secret_registered(secrethash)
+
+    provider.blocks[3] = [secrethash]
+    provider.latest_block_number = 3
+    provider.requests.clear()
+    assert mirror.is_secret_registered(secrethash)
+    assert provider.requests == ["eth_blockNumber", "eth_getLogs"]
+
+
+def test_secret_registry_mirror_keeps_the_retention_window(contract_manager):
+    old, recent = (factories.make_secret_hash() for _ in range(2))
+
+    provider = SecretRevealedProvider(latest_block_number=20)
+    provider.blocks[5] = [old]
+    provider.blocks[15] = [recent]
+    mirror = make_mirror(provider, contract_manager, max_staleness=60, retention_blocks=10)
+
+    # The first synchronization starts at the retention window, not at the
+    # start block
+    mirror.synchronize()
+    assert provider.requests.count("eth_getLogs") == 4
+    assert mirror.registered_secrethashes == {recent: 15}
+
+    # The secrets which leave the window are forgotten
+    provider.latest_block_number = 25
+    mirror.on_new_block({"number": BlockNumber(24)})
+    assert mirror.is_secret_registered(recent)
+
+    mirror.on_new_block({"number": BlockNumber(25)})
+    assert not mirror.is_secret_registered(recent)
@@ -2,12 +2,13 @@
 import json
 from datetime import datetime, timedelta
 from pathlib import Path
-from unittest.mock import patch
+from unittest.mock import Mock, patch
 
 import pytest
 from eth_utils import keccak
 
 from raiden.messages.transfers import Lock
+from raiden.storage import sqlite
 from raiden.storage.restore import (
     get_event_with_balance_proof_by_balance_hash,
     get_event_with_balance_proof_by_locksroot,
@@ -23,6 +24,7 @@
     SQLiteStorage,
 )
 from raiden.tests.utils import factories
+from raiden.transfer.events import EventPaymentSentFailed
 from raiden.transfer.mediated_transfer.events import (
     SendLockedTransfer,
     SendLockExpired,
@@ -45,6 +47,7 @@
     BlockNumber,
     Locksroot,
     MessageID,
+    PaymentID,
     TokenAmount,
 )
 
@@ -433,6 +436,30 @@ def test_log_run():
     store.close()
 
 
+def test_matrix_sync_state():
+    store = SerializedSQLiteStorage(":memory:", JSONSerializer())
+    user_id = "@0x1234:server"
+    sync_state = {
+        "sync_token": "s1_2_3",
+        "rooms": {"!room:server": {"aliases": [], "members": {user_id: "signature"}}},
+    }
+
+    assert store.get_matrix_sync_state(user_id) is None
+
+    store.write_matrix_sync_state(user_id, sync_state)
+    assert store.get_matrix_sync_state(user_id) == sync_state
+    assert store.get_matrix_sync_state("@0x5678:server") is None
+
+    sync_state["sync_token"] = "s4_5_6"
+    store.write_matrix_sync_state(user_id, sync_state)
+    assert store.get_matrix_sync_state(user_id) == sync_state
+
+    store.delete_matrix_sync_state(user_id)
+    assert store.get_matrix_sync_state(user_id) is None
+
+    store.close()
+
+
 @pytest.fixture
 def storage():
     state_changes_file = Path(__file__).parent / "test_data" / "db_statechanges.json"
@@ -563,3 +590,131 @@ def test_storage_close():
     storage.close()
     with pytest.raises(RuntimeError):  # attempt to close an already closed database
         storage.close()
+
+
+def test_archive_before_latest_snapshot(tmp_path, chain_state):
+    storage = SerializedSQLiteStorage(tmp_path / "v1_log.db", JSONSerializer())
+    storage.attach_archive(tmp_path / "v1_archive.db")
+    counter = itertools.count(1)
+
+    def block():
+        return Block(
+            block_number=BlockNumber(next(counter)),
+            gas_limit=BlockGasLimit(1),
+            block_hash=factories.make_block_hash(),
+        )
+
+    balance_proof = make_signed_balance_proof_from_counter(counter)
+    unlock = ReceiveUnlock(
+        sender=balance_proof.sender,
+        message_identifier=MessageID(next(counter)),
+        secret=factories.make_secret(next(counter)),
+        balance_proof=balance_proof,
+    )
+    payment = EventPaymentSentFailed(
+        token_network_registry_address=factories.make_token_network_registry_address(),
+        token_network_address=factories.make_token_network_address(),
+        identifier=PaymentID(1),
+        target=factories.make_target_address(),
+        reason="no route",
+    )
+
+    unlock_id, first_id = storage.write_state_changes([unlock, block()])
+    storage.write_events([(unlock_id, payment)])
+    storage.write_state_snapshot(chain_state, first_id, 2)
+    second_id, latest_id = storage.write_state_changes([block(), block()])
+    storage.write_state_snapshot(chain_state, latest_id, 4)
+    new_id, = storage.write_state_changes([block()])
+
+    # The state changes after the latest snapshot are kept
+    assert storage.archive_before_latest_snapshot(limit=1) == 1
+    assert storage.archive_before_latest_snapshot(limit=10) == 2
+    assert storage.archive_before_latest_snapshot(limit=10) == 0
+    assert storage.count_state_changes() == 2
+
+    # The older state is restored from the archive
+    snapshot = storage.get_snapshot_before_state_change(second_id)
+    assert snapshot.state_change_identifier == first_id
+    assert snapshot.data == chain_state
+    records = storage.get_statechanges_records_by_range(Range(first_id, new_id))
+    assert [record.state_change_identifier for record in records] == [
+        first_id,
+        second_id,
+        latest_id,
+        new_id,
+    ]
+    assert storage.get_snapshot_before_state_change(new_id).state_change_identifier == latest_id
+
+    # The balance proofs and the payment history are found in the archive
+    record = get_state_change_with_balance_proof_by_locksroot(
+        storage=storage,
+        canonical_identifier=balance_proof.canonical_identifier,
+        locksroot=balance_proof.locksroot,
+        sender=balance_proof.sender,
+    )
+    assert record.state_change_identifier == unlock_id
+    assert record.data == unlock
+    assert [event.wrapped_event for event in storage.get_events_with_timestamps()] == [payment]
+
+    storage.close()
+
+
+def test_archive_filtered_lookups_do_not_decompress(tmp_path, chain_state):
+    """ The state changes and events of the archive are filtered by their JSON
+    data, this must not decompress every archived row.
+    """
+    decompress = Mock(wraps=sqlite._decompress)
+    with patch.object(sqlite, "_decompress", decompress):
+        storage = SerializedSQLiteStorage(tmp_path / "v1_log.db", JSONSerializer())
+        storage.attach_archive(tmp_path / "v1_archive.db")
+
+    counter = itertools.count(1)
+    balance_proof = make_signed_balance_proof_from_counter(counter)
+    unlock = ReceiveUnlock(
+        sender=balance_proof.sender,
+        message_identifier=MessageID(next(counter)),
+        secret=factories.make_secret(next(counter)),
+        balance_proof=balance_proof,
+    )
+    payment = EventPaymentSentFailed(
+        token_network_registry_address=factories.make_token_network_registry_address(),
+        token_network_address=factories.make_token_network_address(),
+        identifier=PaymentID(1),
+        target=factories.make_target_address(),
+        reason="no route",
+    )
+    block = Block(
+        block_number=BlockNumber(next(counter)),
+        gas_limit=BlockGasLimit(1),
+        block_hash=factories.make_block_hash(),
+    )
+
+    unlock_id, block_id = storage.write_state_changes([unlock, block])
+    storage.write_events([(unlock_id, payment)])
+    storage.write_state_snapshot(chain_state, unlock_id, 1)
+    storage.write_state_snapshot(chain_state, block_id, 2)
+    assert storage.archive_before_latest_snapshot(limit=10) == 1
+
+    record = get_state_change_with_balance_proof_by_locksroot(
+        storage=storage,
+        canonical_identifier=balance_proof.canonical_identifier,
+        locksroot=balance_proof.locksroot,
+        sender=balance_proof.sender,
+    )
+    assert record.state_change_identifier == unlock_id
+    events = storage.get_events_with_timestamps(
+        filters=[("_type", "raiden.transfer.events.EventPaymentSentFailed")]
+    )
+    assert [event.wrapped_event for event in events] == [payment]
+    assert decompress.call_count == 0
+
+    # Only the archived snapshot which is restored is decompressed
+    snapshot = storage.get_snapshot_before_state_change(block_id)
+    assert snapshot.state_change_identifier == block_id
+    assert decompress.call_count == 0
+    snapshot = storage.get_snapshot_before_state_change(unlock_id)
+    assert snapshot.state_change_identifier == unlock_id
+    assert snapshot.data == chain_state
+    assert decompress.call_count == 1
+
+    storage.close()
@@ -1,4 +1,11 @@
-from raiden.transfer.state import TransactionChannelDeposit
+from raiden.tests.utils import factories
+from raiden.transfer.state import (
+    TransactionChannelDeposit,
+    TransactionExecutionStatus,
+    UnlockPartialProofState,
+)
+from raiden.utils.compact import _INTERNED_ADDRESSES, INTERNED_ADDRESSES_SIZE, intern_address
+from raiden.utils.copy import deepcopy
 
 
 def test_transaction_channel_new_balance_ordering():
@@ -19,3 +26,45 @@ def test_transaction_channel_new_balance_ordering():
     assert a == b
     assert not a > b
     assert not b > a
+
+
+def test_slotted_states_are_copied_and_share_addresses():
+    address = factories.make_address()
+    canonical_identifier = factories.make_canonical_identifier()
+    balance_proof = factories.create(
+        factories.BalanceProofSignedStateProperties(
+            sender=bytes(address), canonical_identifier=canonical_identifier
+        )
+    )
+    unlock = UnlockPartialProofState(lock=factories.make_lock(), secret=factories.make_secret())
+
+    for state in (balance_proof, unlock, canonical_identifier, TransactionExecutionStatus()):
+        assert not hasattr(state, "__dict__")
+        assert deepcopy(state) == state
+
+    # The frozen identifier is copied without calling `__setattr__`
+    assert deepcopy(canonical_identifier) is not canonical_identifier
+
+    # The states created from a copy of an address use the interned one, and
+    # the copies of the chain state keep sharing it
+    other_balance_proof = factories.create(
+        factories.BalanceProofSignedStateProperties(sender=bytes(address))
+    )
+    assert balance_proof.sender is other_balance_proof.sender
+    first, second = deepcopy([balance_proof, other_balance_proof])
+    assert first.sender is second.sender
+
+
+def test_interned_addresses_are_bounded():
+    address = factories.make_address()
+    assert intern_address(bytes(bytearray(address))) is intern_address(address)
+
+    # Other values are not interned
+    value = bytes(32)
+    assert intern_address(value) is value
+    assert value not in _INTERNED_ADDRESSES
+
+    for _ in range(INTERNED_ADDRESSES_SIZE + 1):
+        intern_address(factories.make_address())
+    assert len(_INTERNED_ADDRESSES) == INTERNED_ADDRESSES_SIZE
+    assert address not in _INTERNED_ADDRESSES
@@ -202,6 +202,8 @@ def test_channel_data_removed_after_unlock(
         block_hash=open_block_hash,
         pseudo_random_generator=pseudo_random_generator,
     )
+    # The token network is updated directly, index the channel like the node
+    chain_state.index_channel(channel_state)
 
     lock_amount = 30
     lock_expiration = 20
@@ -326,6 +328,8 @@ def test_mediator_clear_pairs_after_batch_unlock(
         block_hash=open_block_hash,
         pseudo_random_generator=pseudo_random_generator,
     )
+    # The token network is updated directly, index the channel like the node
+    chain_state.index_channel(channel_state)
 
     lock_amount = 30
     lock_expiration = 20
@@ -451,6 +455,8 @@ def test_multiple_channel_states(chain_state, token_network_state, channel_prope
         block_hash=open_block_hash,
         pseudo_random_generator=pseudo_random_generator,
     )
+    # The token network is updated directly, index the channel like the node
+    chain_state.index_channel(channel_state)
 
     lock_amount = 30
     lock_expiration = 20
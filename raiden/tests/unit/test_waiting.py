@@ -0,0 +1,115 @@
+import gevent
+import pytest
+
+from raiden.tests.utils import factories
+from raiden.transfer.architecture import StateChange
+from raiden.transfer.state_change import (
+    Block,
+    ContractReceiveChannelClosed,
+    ContractReceiveStateChange,
+    ReceiveUnlock,
+)
+from raiden.utils.typing import BlockGasLimit, BlockNumber, MessageID
+from raiden.waiting import StateChangeNotifier, wait_for_block
+
+
+def make_block(block_number: int) -> Block:
+    return Block(
+        block_number=BlockNumber(block_number),
+        gas_limit=BlockGasLimit(1),
+        block_hash=factories.make_block_hash(),
+    )
+
+
+def test_state_change_notifier_keys():
+    notifier = StateChangeNotifier()
+    canonical_identifier = factories.make_canonical_identifier()
+
+    closed = ContractReceiveChannelClosed(
+        transaction_hash=factories.make_transaction_hash(),
+        transaction_from=factories.make_address(),
+        canonical_identifier=canonical_identifier,
+        block_number=BlockNumber(1),
+        block_hash=factories.make_block_hash(),
+    )
+    balance_proof = factories.create(
+        factories.BalanceProofSignedStateProperties(canonical_identifier=canonical_identifier)
+    )
+    unlock = ReceiveUnlock(
+        message_identifier=MessageID(1),
+        secret=factories.make_secret(),
+        balance_proof=balance_proof,
+        sender=balance_proof.sender,
+    )
+
+    by_type = notifier.subscribe([Block])
+    by_base_class = notifier.subscribe([ContractReceiveStateChange])
+    by_channel = notifier.subscribe([canonical_identifier])
+    by_any = notifier.subscribe([StateChange])
+    subscriptions = [by_type, by_base_class, by_channel, by_any]
+
+    def woken_up():
+        result = [subscription.event.is_set() for subscription in subscriptions]
+        for subscription in subscriptions:
+            subscription.event.clear()
+        return result
+
+    notifier.notify([make_block(1)])
+    assert woken_up() == [True, False, False, True]
+
+    notifier.notify([closed])
+    assert woken_up() == [False, True, True, True]
+
+    # balance proof state changes are matched by the channel of the balance proof
+    notifier.notify([unlock])
+    assert woken_up() == [False, False, True, True]
+
+    for subscription in subscriptions:
+        with subscription:
+            pass
+    assert not notifier.subscriptions
+
+
+class BlockNumberNode:
+    """ The attributes of the `RaidenService` used by `wait_for_block`. """
+
+    def __init__(self) -> None:
+        self.address = factories.make_address()
+        self.alarm = True
+        self.block_number = 1
+        self.state_change_notifier = StateChangeNotifier()
+
+    def get_block_number(self) -> BlockNumber:
+        return BlockNumber(self.block_number)
+
+    def new_block(self) -> None:
+        self.block_number += 1
+        self.state_change_notifier.notify([make_block(self.block_number)])
+
+
+def test_wait_for_block_is_woken_up_by_the_block_state_change():
+    node = BlockNumberNode()
+    waiter = gevent.spawn(wait_for_block, node, BlockNumber(3), retry_timeout=60)
+
+    for _ in range(2):
+        gevent.sleep(0)
+        assert not waiter.ready()
+        node.new_block()
+
+    # Much faster than the retry timeout
+    waiter.get(timeout=1)
+    assert not node.state_change_notifier.subscriptions
+
+
+def test_waiters_fall_back_to_the_retry_timeout():
+    node = BlockNumberNode()
+    waiter = gevent.spawn(wait_for_block, node, BlockNumber(2), retry_timeout=0.01)
+    gevent.sleep(0)
+
+    # the block number changed without a state change
+    node.block_number = 2
+    waiter.get(timeout=1)
+
+    with pytest.raises(gevent.Timeout):
+        with gevent.Timeout(0.05):
+            wait_for_block(node, BlockNumber(3), retry_timeout=60)
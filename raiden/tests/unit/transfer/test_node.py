@@ -3,6 +3,7 @@
 import raiden.transfer.node
 from raiden.constants import LOCKSROOT_OF_NO_LOCKS
 from raiden.settings import GAS_LIMIT
+from raiden.storage.serialization import JSONSerializer
 from raiden.tests.unit.test_channelstate import create_channel_from_models, create_model
 from raiden.tests.utils import factories
 from raiden.tests.utils.factories import (
@@ -13,6 +14,7 @@
     UNIT_SECRETHASH,
     make_block_hash,
 )
+from raiden.transfer import views
 from raiden.transfer.architecture import SendMessageEvent, TransitionResult
 from raiden.transfer.channel import get_status
 from raiden.transfer.events import (
@@ -38,6 +40,7 @@
     is_transaction_effect_satisfied,
     is_transaction_expired,
     maybe_add_tokennetwork,
+    sanity_check,
     state_transition,
     subdispatch_by_canonical_id,
     subdispatch_initiatortask,
@@ -60,13 +63,14 @@
     ActionChannelClose,
     Block,
     ContractReceiveChannelBatchUnlock,
+    ContractReceiveChannelNew,
     ContractReceiveChannelSettled,
     ContractReceiveNewTokenNetwork,
     ContractReceiveNewTokenNetworkRegistry,
     ReceiveDelivered,
     ReceiveProcessed,
 )
-from raiden.transfer.views import get_networks
+from raiden.transfer.views import get_networks, get_token_network_by_address
 from raiden.utils.copy import deepcopy
 
 
@@ -301,6 +305,28 @@ def test_is_transaction_expired():
     assert not is_transaction_expired(transaction, block_number)
 
 
+def test_expired_transactions_are_removed_with_blocks(chain_state):
+    block_number = chain_state.block_number
+    expiring = ContractSendSecretReveal(
+        expiration=block_number + 1,
+        secret=factories.UNIT_SECRET,
+        triggered_by_block_hash=factories.make_block_hash(),
+    )
+    pending = ContractSendSecretReveal(
+        expiration=block_number + 2,
+        secret=factories.make_secret(),
+        triggered_by_block_hash=factories.make_block_hash(),
+    )
+    chain_state.pending_transactions = [expiring, pending]
+
+    block = Block(
+        block_number=block_number + 2, gas_limit=GAS_LIMIT, block_hash=factories.make_block_hash()
+    )
+    iteration = state_transition(chain_state, block)
+
+    assert iteration.new_state.pending_transactions == [pending]
+
+
 def test_subdispatch_by_canonical_id(chain_state):
     our_model, _ = create_model(balance=10, num_pending_locks=1)
     partner_model, _ = create_model(balance=0, num_pending_locks=0)
@@ -432,6 +458,106 @@ def test_handle_new_token_network_registry(chain_state, token_network_address):
     msg = "handle_new_token_network_registry did not add to chain_state mapping"
     assert token_network_registry.address in chain_state.identifiers_to_tokennetworkregistries, msg
 
+    # The token networks of the registry are indexed too
+    assert get_token_network_by_address(chain_state, token_network_address) == token_network
+    sanity_check(chain_state)
+
+
+def test_sanity_check_finds_outdated_indexes(chain_state, token_network_state):
+    sanity_check(chain_state)
+
+    # A channel which is not indexed by partner
+    channel_state = factories.create(
+        factories.NettingChannelStateProperties(
+            canonical_identifier=factories.make_canonical_identifier(
+                token_network_address=token_network_state.address
+            )
+        )
+    )
+    token_network_state.channelidentifiers_to_channels[channel_state.identifier] = channel_state
+    with pytest.raises(AssertionError):
+        sanity_check(chain_state)
+
+    partner_address = channel_state.partner_state.address
+    token_network_state.partneraddresses_to_channelidentifiers[partner_address].append(
+        channel_state.identifier
+    )
+    with pytest.raises(AssertionError):
+        sanity_check(chain_state)
+
+    chain_state.index_channel(channel_state)
+    sanity_check(chain_state)
+
+    # A token network which is not indexed with its registry
+    del chain_state.tokennetworkaddresses_to_tokennetworkregistryaddresses[
+        token_network_state.address
+    ]
+    with pytest.raises(AssertionError):
+        sanity_check(chain_state)
+
+
+def test_partner_index_follows_the_channels(
+    chain_state, token_network_registry_state, token_network_state, netting_channel_state
+):
+    partner_address = netting_channel_state.partner_state.address
+    assert views.all_neighbour_nodes(chain_state) == {partner_address}
+    assert views.list_channelstate_for_partner(chain_state, partner_address) == [
+        netting_channel_state
+    ]
+
+    # A new channel with the same partner is indexed
+    new_channel_state = factories.create(
+        factories.NettingChannelStateProperties(
+            canonical_identifier=factories.make_canonical_identifier(
+                token_network_address=token_network_state.address
+            ),
+            our_state=factories.NettingChannelEndStateProperties(address=chain_state.our_address),
+            partner_state=factories.NettingChannelEndStateProperties(address=partner_address),
+            token_address=token_network_state.token_address,
+            token_network_registry_address=token_network_registry_state.address,
+        )
+    )
+    state_transition(
+        chain_state,
+        ContractReceiveChannelNew(
+            transaction_hash=factories.make_transaction_hash(),
+            channel_state=new_channel_state,
+            block_number=chain_state.block_number,
+            block_hash=chain_state.block_hash,
+        ),
+    )
+    channels = views.list_channelstate_for_partner(chain_state, partner_address)
+    assert {channel_state.identifier for channel_state in channels} == {
+        netting_channel_state.identifier,
+        new_channel_state.identifier,
+    }
+
+    # The index is not serialized, it is rebuilt when the state is restored
+    restored = JSONSerializer.deserialize(JSONSerializer.serialize(chain_state))
+    assert "partneraddresses_to_canonical_identifiers" not in JSONSerializer.serialize(chain_state)
+    assert (
+        restored.partneraddresses_to_canonical_identifiers
+        == chain_state.partneraddresses_to_canonical_identifiers
+    )
+    sanity_check(restored)
+
+    # A settled channel is removed from the index, and so is a partner
+    # without channels
+    for channel_state in channels:
+        state_transition(
+            chain_state,
+            ContractReceiveChannelSettled(
+                transaction_hash=factories.make_transaction_hash(),
+                canonical_identifier=channel_state.canonical_identifier,
+                our_onchain_locksroot=LOCKSROOT_OF_NO_LOCKS,
+                partner_onchain_locksroot=LOCKSROOT_OF_NO_LOCKS,
+                block_number=chain_state.block_number,
+                block_hash=chain_state.block_hash,
+            ),
+        )
+    assert views.list_channelstate_for_partner(chain_state, partner_address) == []
+    assert views.all_neighbour_nodes(chain_state) == set()
+
 
 def test_inplace_delete_message_queue(chain_state):
     sender = factories.make_address()
@@ -0,0 +1,131 @@
+import time
+
+import gevent
+import greenlet
+import pytest
+
+from raiden.utils.metrics import (
+    GREENLET_RUN_DURATION,
+    REGISTRY,
+    GreenletSwitchTracking,
+    MetricsRegistry,
+    track_greenlet_switches,
+)
+
+
+def test_metrics_registry_renders_prometheus_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests", "Requests handled", ["method"])
+    queued = registry.gauge("queued", "Messages queued")
+    duration = registry.histogram("duration_seconds", "Request duration", buckets=(0.1, 1.0))
+
+    requests.labels("eth_call").inc()
+    requests.labels("eth_call").inc(2)
+    requests.labels('a"b\\c').inc()
+    queued.set(3)
+    duration.observe(0.05)
+    duration.observe(0.1)
+    duration.observe(0.5)
+    duration.observe(2)
+
+    assert registry.render() == (
+        "# HELP duration_seconds Request duration\n"
+        "# TYPE duration_seconds histogram\n"
+        'duration_seconds_bucket{le="0.1"} 2.0\n'
+        'duration_seconds_bucket{le="1.0"} 3.0\n'
+        'duration_seconds_bucket{le="+Inf"} 4.0\n'
+        "duration_seconds_sum 2.65\n"
+        "duration_seconds_count 4.0\n"
+        "# HELP queued Messages queued\n"
+        "# TYPE queued gauge\n"
+        "queued 3.0\n"
+        "# HELP requests Requests handled\n"
+        "# TYPE requests counter\n"
+        'requests_total{method="a\\"b\\\\c"} 1.0\n'
+        'requests_total{method="eth_call"} 3.0\n'
+    )
+
+
+def test_metrics_registry_validation():
+    registry = MetricsRegistry()
+    counter = registry.counter("requests", "Requests handled", ["method"])
+
+    with pytest.raises(ValueError):
+        registry.gauge("requests", "Duplicated name")
+
+    with pytest.raises(ValueError):
+        counter.labels()
+
+    with pytest.raises(ValueError):
+        counter.labels("eth_call").inc(-1)
+
+    with pytest.raises(ValueError):
+        registry.histogram("unsorted", "Unsorted buckets", buckets=(1.0, 0.1))
+
+
+def test_gauge_function_is_called_on_render():
+    registry = MetricsRegistry()
+    queue = [1, 2]
+    registry.gauge("queued", "Messages queued").set_function(lambda: len(queue))
+
+    assert "queued 2" in registry.render()
+    queue.append(3)
+    assert "queued 3" in registry.render()
+
+
+def test_hot_path_metrics_are_registered():
+    # Importing the modules registers the metrics
+    import raiden.api.rest  # noqa: F401 pylint: disable=unused-import,import-outside-toplevel
+
+    assert {
+        "raiden_state_manager_dispatch_seconds",
+        "raiden_wal_write_seconds",
+        "raiden_wal_snapshot_seconds",
+        "raiden_eth_get_logs_seconds",
+        "raiden_rpc_request_seconds",
+        "raiden_matrix_sync_lag_seconds",
+        "raiden_matrix_retry_queue_messages",
+        "raiden_greenlet_run_seconds",
+        "raiden_route_cache_lookups",
+        "raiden_route_cache_saved_pfs_fees",
+    }.issubset(REGISTRY.metrics)
+
+
+def test_track_greenlet_switches():
+    def observations_longer_than(seconds):
+        counts = GREENLET_RUN_DURATION.counts
+        upper_bounds = GREENLET_RUN_DURATION.buckets + (float("inf"),)
+        return sum(
+            count for upper_bound, count in zip(upper_bounds, counts) if upper_bound > seconds
+        )
+
+    def block_the_loop():
+        # `time.sleep` is monkey patched, busy wait to block the event loop
+        blocked_until = time.monotonic() + 0.03
+        while time.monotonic() < blocked_until:
+            pass
+
+    previous_callback = greenlet.gettrace()
+    try:
+        assert track_greenlet_switches() is previous_callback
+
+        blocked = observations_longer_than(0.025)
+        gevent.spawn(block_the_loop).join()
+        assert observations_longer_than(0.025) > blocked
+    finally:
+        greenlet.settrace(previous_callback)
+
+
+def test_greenlet_switch_tracking_restores_the_previous_callback():
+    def previous_callback(event, args):  # pylint: disable=unused-argument
+        pass
+
+    original_callback = greenlet.settrace(previous_callback)
+    try:
+        tracking = GreenletSwitchTracking()
+        assert greenlet.gettrace() is not previous_callback
+
+        tracking.stop()
+        assert greenlet.gettrace() is previous_callback
+    finally:
+        greenlet.settrace(original_callback)
@@ -0,0 +1,149 @@
+import gevent
+import pytest
+from gevent.event import Event
+
+from raiden.raiden_service import event_priority
+from raiden.tests.utils import factories
+from raiden.transfer.events import ContractSendChannelSettle, EventPaymentSentFailed, SendProcessed
+from raiden.transfer.mediated_transfer.events import EventRouteFailed
+from raiden.utils.scheduler import QUEUED_TASKS, WAIT_DURATION, Priority, Scheduler
+from raiden.utils.typing import BlockHash, List, MessageID, PaymentID
+
+
+def pool_sizes(size):
+    return {priority: size for priority in Priority}
+
+
+def test_scheduler_bounds_the_running_greenlets():
+    scheduler = Scheduler(pool_sizes(1))
+    release = Event()
+    finished: List[int] = list()
+
+    def task(number):
+        release.wait()
+        finished.append(number)
+
+    queued_before = QUEUED_TASKS.labels("protocol").value
+    waits_before = WAIT_DURATION.labels("protocol").count
+
+    greenlets = [scheduler.spawn(Priority.PROTOCOL, "task", task, number) for number in range(3)]
+    gevent.sleep(0)
+    assert scheduler.running[Priority.PROTOCOL] == 1
+    assert scheduler.queue_depth(Priority.PROTOCOL) == 2
+    assert QUEUED_TASKS.labels("protocol").value == queued_before + 2
+
+    # The priority classes have their own slots
+    other = scheduler.spawn(Priority.BOOKKEEPING, "other", lambda: "done")
+    assert other.get(timeout=1) == "done"
+
+    release.set()
+    gevent.joinall(set(greenlets), raise_error=True, timeout=1)
+    assert finished == [0, 1, 2]
+
+    # The queued greenlets were linked by `joinall` before the scheduler
+    gevent.sleep(0)
+    assert scheduler.running[Priority.PROTOCOL] == 0
+    assert QUEUED_TASKS.labels("protocol").value == queued_before
+    assert WAIT_DURATION.labels("protocol").count == waits_before + 2
+
+
+def test_scheduler_starts_the_earliest_deadline_first():
+    scheduler = Scheduler(pool_sizes(1), reserved_slots={})
+    release = Event()
+    started: List[float] = list()
+
+    blocker = scheduler.spawn(Priority.SAFETY, "blocker", release.wait)
+    greenlets = [
+        scheduler.spawn(Priority.SAFETY, "task", started.append, deadline, deadline=deadline)
+        for deadline in (30, float("inf"), 10, 20)
+    ]
+
+    release.set()
+    gevent.joinall(set([blocker] + greenlets), raise_error=True, timeout=1)
+    assert started == [10, 20, 30, float("inf")]
+
+
+def test_scheduler_reserves_slots_for_greenlets_with_a_deadline():
+    scheduler = Scheduler(pool_sizes(1), {Priority.SAFETY: 1})
+    release_blocker = Event()
+    release_expirable = Event()
+    started: List[str] = list()
+
+    def task(name, release):
+        started.append(name)
+        release.wait()
+
+    blocker = scheduler.spawn(Priority.SAFETY, "blocker", task, "blocker", release_blocker)
+    queued = scheduler.spawn(Priority.SAFETY, "queued", task, "queued", release_blocker)
+
+    # The pool is full, the task with a deadline still starts
+    expirable = scheduler.spawn(
+        Priority.SAFETY, "expirable", task, "expirable", release_expirable, deadline=10
+    )
+    gevent.sleep(0)
+    assert started == ["blocker", "expirable"]
+    assert scheduler.queue_depth(Priority.SAFETY) == 1
+
+    # The reserved slot is not used by the task without a deadline
+    release_expirable.set()
+    expirable.join(timeout=1)
+    gevent.sleep(0)
+    assert started == ["blocker", "expirable"]
+    assert scheduler.queue_depth(Priority.SAFETY) == 1
+
+    release_blocker.set()
+    gevent.joinall({blocker, queued}, raise_error=True, timeout=1)
+    assert started == ["blocker", "expirable", "queued"]
+
+
+def test_scheduler_kills_the_queued_greenlets():
+    scheduler = Scheduler(pool_sizes(1))
+    release = Event()
+    errors: List[gevent.Greenlet] = list()
+
+    running = scheduler.spawn(Priority.SERVICES, "running", release.wait)
+    queued = scheduler.spawn(Priority.SERVICES, "queued", lambda: "not run")
+    queued.link_exception(errors.append)
+
+    scheduler.kill_queued()
+    assert queued.ready()
+    assert isinstance(queued.value, gevent.GreenletExit)
+    assert scheduler.queue_depth(Priority.SERVICES) == 0
+
+    release.set()
+    running.join(timeout=1)
+    assert running.successful()
+    assert not errors
+
+    with pytest.raises(ValueError):
+        Scheduler({Priority.SAFETY: 1})
+
+
+def test_event_priority():
+    canonical_identifier = factories.make_canonical_identifier()
+    settle = ContractSendChannelSettle(
+        canonical_identifier=canonical_identifier,
+        triggered_by_block_hash=BlockHash(factories.make_block_hash()),
+    )
+    processed = SendProcessed(
+        recipient=factories.make_address(),
+        canonical_identifier=canonical_identifier,
+        message_identifier=MessageID(1),
+    )
+    route_failed = EventRouteFailed(
+        secrethash=factories.make_secret_hash(),
+        route=[factories.make_address()],
+        token_network_address=factories.make_token_network_address(),
+    )
+    payment_failed = EventPaymentSentFailed(
+        token_network_registry_address=factories.make_token_network_registry_address(),
+        token_network_address=factories.make_token_network_address(),
+        identifier=PaymentID(1),
+        target=factories.make_target_address(),
+        reason="no route",
+    )
+
+    assert event_priority(settle) == Priority.SAFETY
+    assert event_priority(processed) == Priority.PROTOCOL
+    assert event_priority(route_failed) == Priority.SERVICES
+    assert event_priority(payment_failed) == Priority.BOOKKEEPING
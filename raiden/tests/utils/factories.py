@@ -62,6 +62,7 @@
     ChannelID,
     ClassVar,
     Dict,
+    EncodedData,
     FeeAmount,
     InitiatorAddress,
     List,
@@ -391,10 +392,7 @@ def make_hop_to_channel(channel_state: NettingChannelState = EMPTY) -> HopState:
 
 
 def make_pending_locks(locks: List[HashTimeLockState]) -> PendingLocksState:
-    ret = PendingLocksState(list())
-    for lock in locks:
-        ret.locks.append(bytes(lock.encoded))
-    return ret
+    return PendingLocksState(tuple(EncodedData(bytes(lock.encoded)) for lock in locks))
 
 
 @singledispatch
@@ -1436,6 +1434,8 @@ def make_chain_state(
     chain_state.tokennetworkaddresses_to_tokennetworkregistryaddresses[
         token_network_address
     ] = token_network_registry_address
+    for netting_channel in channel_set.channels:
+        chain_state.index_channel(netting_channel)
 
     chain_state.nodeaddresses_to_networkstates = make_node_availability_map(
         [channel.partner_state.address for channel in channel_set.channels]
@@ -4,6 +4,7 @@
 from unittest.mock import Mock, PropertyMock
 
 from raiden.constants import Environment, RoutingMode
+from raiden.routing import RouteCache
 from raiden.settings import RaidenConfig
 from raiden.storage.serialization import JSONSerializer
 from raiden.storage.sqlite import SerializedSQLiteStorage
@@ -15,6 +16,7 @@
 from raiden.transfer.state import NettingChannelState
 from raiden.transfer.state_change import ActionInitChain
 from raiden.utils.keys import privatekey_to_address
+from raiden.utils.scheduler import Scheduler
 from raiden.utils.signer import LocalSigner
 from raiden.utils.typing import (
     Address,
@@ -166,6 +168,7 @@ class MockChainState:
     def __init__(self):
         self.block_hash = factories.make_block_hash()
         self.identifiers_to_tokennetworkregistries: dict = {}
+        self.tokennetworkaddresses_to_tokennetworkregistryaddresses: dict = {}
 
 
 class MockRaidenService:
@@ -181,6 +184,7 @@ def __init__(self, message_handler=None, state_transition=None, private_key=None
         self.signer = LocalSigner(self.privkey)
 
         self.message_handler = message_handler
+        self.scheduler = Scheduler()
         self.routing_mode = RoutingMode.PRIVATE
         self.config = RaidenConfig(
             chain_id=self.rpc_client.chain_id, environment_type=Environment.DEVELOPMENT
@@ -194,6 +198,7 @@ def __init__(self, message_handler=None, state_transition=None, private_key=None
 
         self.targets_to_identifiers_to_statuses: Dict[Address, dict] = defaultdict(dict)
         self.route_to_feedback_token: dict = {}
+        self.route_cache = RouteCache(ttl=self.config.services.route_cache_ttl)
 
         if state_transition is None:
             state_transition = node.state_transition
@@ -259,6 +264,9 @@ def make_raiden_service_mock(
     chain_state.identifiers_to_tokennetworkregistries = {
         token_network_registry_address: token_network_registry
     }
+    chain_state.tokennetworkaddresses_to_tokennetworkregistryaddresses = {
+        token_network_address: token_network_registry_address
+    }
 
     return raiden_service
 
@@ -945,8 +945,7 @@ def make_receive_transfer_mediated(
         raise ValueError("Private key does not match any of the participants.")
 
     if pending_locks is None:
-        locks = make_empty_pending_locks_state()
-        locks.locks.append(lock.encoded)
+        locks = PendingLocksState((lock.encoded,))
     else:
         assert bytes(lock.encoded) in pending_locks.locks
         locks = pending_locks
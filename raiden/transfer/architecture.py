@@ -8,8 +8,10 @@
 from raiden.constants import EMPTY_BALANCE_HASH, UINT64_MAX, UINT256_MAX
 from raiden.transfer.identifiers import CanonicalIdentifier, QueueIdentifier
 from raiden.transfer.utils import hash_balance_data
+from raiden.utils.compact import intern_address, slotted
 from raiden.utils.copy import deepcopy
 from raiden.utils.formatting import to_checksum_address
+from raiden.utils.metrics import REGISTRY
 from raiden.utils.typing import (
     AdditionalHash,
     Address,
@@ -46,6 +48,11 @@
 
 log = structlog.get_logger(__name__)
 
+DISPATCH_DURATION = REGISTRY.histogram(
+    "raiden_state_manager_dispatch_seconds",
+    "Time to copy the state and apply a batch of state changes",
+)
+
 # Quick overview
 # --------------
 #
@@ -85,7 +92,8 @@ class State:
     - This class is used as a marker for states.
     """
 
-    pass
+    # Allows the subclasses to be `slotted`
+    __slots__ = ()
 
 
 @dataclass
@@ -261,9 +269,11 @@ def dispatch(self, state_changes: List[StateChange]) -> Tuple[ST, List[List[Even
 
         # The state objects must be treated as immutable, so make a copy of the
         # current state and pass the copy to the state machine to be modified.
-        before_copy = time.time()
+        before_copy = time.monotonic()
         next_state = deepcopy(self.current_state)
-        log.debug("Copied state before applying state changes", duration=time.time() - before_copy)
+        log.debug(
+            "Copied state before applying state changes", duration=time.monotonic() - before_copy
+        )
 
         # Update the current state by applying the state changes
         events: List[List[Event]] = list()
@@ -282,6 +292,8 @@ def dispatch(self, state_changes: List[StateChange]) -> Tuple[ST, List[List[Even
         assert next_state is not None, "State transition did not yield new state"
         self.current_state = next_state
 
+        DISPATCH_DURATION.observe(time.monotonic() - before_copy)
+
         return iteration.new_state, events
 
     def __eq__(self, other: Any) -> bool:
@@ -295,6 +307,7 @@ def __ne__(self, other: Any) -> bool:
         return not self.__eq__(other)
 
 
+@slotted
 @dataclass
 class BalanceProofUnsignedState(State):
     """ Balance proof from the local node without the signature. """
@@ -348,6 +361,7 @@ def channel_identifier(self) -> ChannelID:
         return self.canonical_identifier.channel_identifier
 
 
+@slotted
 @dataclass
 class BalanceProofSignedState(State):
     """ Proof of a channel balance that can be used on-chain to resolve
@@ -373,6 +387,8 @@ def __post_init__(self) -> None:
         typecheck(self.signature, T_Signature)
         typecheck(self.sender, T_Address)
 
+        self.sender = intern_address(self.sender)
+
         if self.nonce <= 0:
             raise ValueError("nonce cannot be zero or negative")
 
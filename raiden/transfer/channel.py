@@ -3,7 +3,7 @@
 from enum import Enum
 from typing import TYPE_CHECKING
 
-from eth_utils import encode_hex, keccak, to_hex
+from eth_utils import encode_hex, to_hex
 
 from raiden.constants import LOCKSROOT_OF_NO_LOCKS, MAXIMUM_PENDING_TRANSFERS, UINT256_MAX
 from raiden.settings import DEFAULT_NUMBER_OF_BLOCK_CONFIRMATIONS, MediationFeeConfig
@@ -1362,10 +1362,9 @@ def compute_locks_with(
     locks: PendingLocksState, lock: Union[HashTimeLockState, UnlockPartialProofState]
 ) -> Optional[PendingLocksState]:
     """Register the given lock with as a pending locks."""
-    if bytes(lock.encoded) not in locks.locks:
-        locks = PendingLocksState(list(locks.locks))
-        locks.locks.append(EncodedData(bytes(lock.encoded)))  # pylint: disable=E1101
-        return locks
+    lock_encoded = EncodedData(bytes(lock.encoded))
+    if lock_encoded not in locks.index():
+        return locks.with_lock(lock_encoded)
     else:
         return None
 
@@ -1374,10 +1373,8 @@ def compute_locks_without(
     locks: PendingLocksState, lock_encoded: EncodedData
 ) -> Optional[PendingLocksState]:
     # Use None to inform the caller the lock is unknown
-    if lock_encoded in locks.locks:
-        locks = PendingLocksState(list(locks.locks))
-        locks.locks.remove(lock_encoded)
-        return locks
+    if lock_encoded in locks.index():
+        return locks.without_lock(lock_encoded)
     else:
         return None
 
@@ -1386,7 +1383,7 @@ def compute_locksroot(locks: PendingLocksState) -> Locksroot:
     """ Compute the hash representing all pending locks
     The hash is submitted in TokenNetwork.settleChannel() call.
     """
-    return Locksroot(keccak(b"".join(locks.locks)))
+    return locks.locksroot()
 
 
 def create_sendlockedtransfer(
@@ -2534,22 +2531,22 @@ def sanity_check(channel_state: NettingChannelState) -> None:
 
     msg = "The lock mappings and the pending locks must be synchronized, otherwise there is a bug"
     for lock in partner_state.secrethashes_to_lockedlocks.values():
-        assert lock.encoded in partner_state.pending_locks.locks, msg
+        assert lock.encoded in partner_state.pending_locks.index(), msg
 
     for partial_unlock in partner_state.secrethashes_to_unlockedlocks.values():
-        assert partial_unlock.encoded in partner_state.pending_locks.locks, msg
+        assert partial_unlock.encoded in partner_state.pending_locks.index(), msg
 
     for partial_unlock in partner_state.secrethashes_to_onchain_unlockedlocks.values():
-        assert partial_unlock.encoded in partner_state.pending_locks.locks, msg
+        assert partial_unlock.encoded in partner_state.pending_locks.index(), msg
 
     for lock in our_state.secrethashes_to_lockedlocks.values():
-        assert lock.encoded in our_state.pending_locks.locks, msg
+        assert lock.encoded in our_state.pending_locks.index(), msg
 
     for partial_unlock in our_state.secrethashes_to_unlockedlocks.values():
-        assert partial_unlock.encoded in our_state.pending_locks.locks, msg
+        assert partial_unlock.encoded in our_state.pending_locks.index(), msg
 
     for partial_unlock in our_state.secrethashes_to_onchain_unlockedlocks.values():
-        assert partial_unlock.encoded in our_state.pending_locks.locks, msg
+        assert partial_unlock.encoded in our_state.pending_locks.index(), msg
 
 
 def state_transition(
@@ -1,6 +1,7 @@
 from dataclasses import dataclass
 
 from raiden.constants import EMPTY_ADDRESS, UINT256_MAX
+from raiden.utils.compact import intern_address, slotted
 from raiden.utils.formatting import to_checksum_address
 from raiden.utils.typing import (
     Address,
@@ -14,12 +15,18 @@
 )
 
 
+@slotted
 @dataclass(frozen=True, order=True)
 class CanonicalIdentifier:
     chain_identifier: ChainID
     token_network_address: TokenNetworkAddress
     channel_identifier: ChannelID
 
+    def __post_init__(self) -> None:
+        object.__setattr__(
+            self, "token_network_address", intern_address(self.token_network_address)
+        )
+
     def validate(self) -> None:
         typecheck(self.chain_identifier, T_ChainID)
         typecheck(self.token_network_address, T_Address)
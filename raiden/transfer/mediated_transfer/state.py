@@ -10,6 +10,7 @@
     HopState,
     RouteState,
 )
+from raiden.utils.compact import intern_address
 from raiden.utils.secrethash import sha256_secrethash
 from raiden.utils.typing import (
     TYPE_CHECKING,
@@ -51,6 +52,10 @@ def __post_init__(self) -> None:
         if not isinstance(self.lock, HashTimeLockState):
             raise ValueError("lock must be a HashTimeLockState instance")
 
+        self.token = intern_address(self.token)
+        self.initiator = intern_address(self.initiator)
+        self.target = intern_address(self.target)
+
 
 @dataclass
 class LockedTransferUnsignedState(LockedTransferState):
@@ -84,6 +89,8 @@ class LockedTransferSignedState(LockedTransferState):
     routes: List[List[Address]]
 
     def __post_init__(self) -> None:
+        super().__post_init__()
+
         typecheck(self.lock, HashTimeLockState)
         typecheck(self.balance_proof, BalanceProofSignedState)
 
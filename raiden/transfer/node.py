@@ -1,3 +1,5 @@
+from collections import defaultdict
+
 from raiden.transfer import channel, token_network, views
 from raiden.transfer.architecture import (
     ContractReceiveStateChange,
@@ -39,7 +41,12 @@
     ReceiveTransferRefund,
 )
 from raiden.transfer.mediated_transfer.tasks import InitiatorTask, MediatorTask, TargetTask
-from raiden.transfer.state import ChainState, TokenNetworkRegistryState, TokenNetworkState
+from raiden.transfer.state import (
+    ChainState,
+    NettingChannelState,
+    TokenNetworkRegistryState,
+    TokenNetworkState,
+)
 from raiden.transfer.state_change import (
     ActionChangeNodeNetworkState,
     ActionChannelClose,
@@ -69,12 +76,15 @@
 from raiden.utils.copy import deepcopy
 from raiden.utils.typing import (
     MYPY_ANNOTATION,
+    Address,
     BlockHash,
     BlockNumber,
     ChannelID,
+    Dict,
     List,
     Optional,
     SecretHash,
+    Set,
     TokenNetworkAddress,
     TokenNetworkRegistryAddress,
     Union,
@@ -95,6 +105,10 @@
     ContractReceiveChannelWithdraw,
 ]
 
+# Runs `sanity_check` after every state transition. The check scans the whole
+# chain state, so it is only enabled by the tests.
+CHECK_INDEXES = False
+
 
 def get_token_network_by_address(
     chain_state: ChainState, token_network_address: TokenNetworkAddress
@@ -143,6 +157,20 @@ def subdispatch_to_all_channels(
     return TransitionResult(chain_state, events)
 
 
+def update_partner_index(
+    chain_state: ChainState,
+    channel_before: Optional[NettingChannelState],
+    channel_after: Optional[NettingChannelState],
+) -> None:
+    """ Update the partner index of the chain state with a channel which was
+    added or removed by its token network.
+    """
+    if channel_before is None and channel_after is not None:
+        chain_state.index_channel(channel_after)
+    elif channel_before is not None and channel_after is None:
+        chain_state.unindex_channel(channel_before)
+
+
 def subdispatch_by_canonical_id(
     chain_state: ChainState, canonical_identifier: CanonicalIdentifier, state_change: StateChange
 ) -> TransitionResult[ChainState]:
@@ -152,6 +180,9 @@ def subdispatch_by_canonical_id(
 
     events: List[Event] = list()
     if token_network_state:
+        channels = token_network_state.channelidentifiers_to_channels
+        channel_before = channels.get(canonical_identifier.channel_identifier)
+
         iteration = token_network.state_transition(
             token_network_state=token_network_state,
             state_change=state_change,
@@ -161,6 +192,9 @@ def subdispatch_by_canonical_id(
         )
         assert iteration.new_state, "No token network state transition can lead to None"
 
+        update_partner_index(
+            chain_state, channel_before, channels.get(canonical_identifier.channel_identifier)
+        )
         events = iteration.events
 
     return TransitionResult(chain_state, events)
@@ -436,6 +470,9 @@ def maybe_add_tokennetwork(
         mapping = chain_state.tokennetworkaddresses_to_tokennetworkregistryaddresses
         mapping[token_network_address] = token_network_registry_address
 
+        for channel_state in token_network_state.channelidentifiers_to_channels.values():
+            chain_state.index_channel(channel_state)
+
 
 def inplace_delete_message_queue(
     chain_state: ChainState,
@@ -523,6 +560,10 @@ def handle_token_network_action(
 
     events: List[Event] = list()
     if token_network_state:
+        channels = token_network_state.channelidentifiers_to_channels
+        channel_identifier = state_change.canonical_identifier.channel_identifier
+        channel_before = channels.get(channel_identifier)
+
         iteration = token_network.state_transition(
             token_network_state=token_network_state,
             state_change=state_change,
@@ -532,6 +573,7 @@ def handle_token_network_action(
         )
         assert iteration.new_state, "No token network state transition leads to None"
 
+        update_partner_index(chain_state, channel_before, channels.get(channel_identifier))
         events = iteration.events
 
     return TransitionResult(chain_state, events)
@@ -605,6 +647,14 @@ def handle_contract_receive_new_token_network_registry(
             token_network_registry_address
         ] = token_network_registry
 
+        mapping = chain_state.tokennetworkaddresses_to_tokennetworkregistryaddresses
+        token_networks = token_network_registry.tokennetworkaddresses_to_tokennetworks
+        for token_network_address, token_network_state in token_networks.items():
+            mapping[token_network_address] = token_network_registry_address
+
+            for channel_state in token_network_state.channelidentifiers_to_channels.values():
+                chain_state.index_channel(channel_state)
+
     return TransitionResult(chain_state, events)
 
 
@@ -1121,7 +1171,9 @@ def update_queues(iteration: TransitionResult[ChainState], state_change: StateCh
     chain_state = iteration.new_state
     assert chain_state is not None, "chain_state must be set"
 
-    if isinstance(state_change, ContractReceiveStateChange):
+    # The expired transactions are removed with the new blocks, otherwise
+    # they are kept until the next blockchain event
+    if isinstance(state_change, (ContractReceiveStateChange, Block)):
         pending_transactions = [
             transaction
             for transaction in chain_state.pending_transactions
@@ -1138,6 +1190,66 @@ def update_queues(iteration: TransitionResult[ChainState], state_change: StateCh
             chain_state.pending_transactions.append(event)
 
 
+def sanity_check(chain_state: ChainState) -> None:
+    """ Check that the indexes of the chain state match the token networks
+    and channels they index.
+
+    The views use the indexes instead of scanning the registries, so an index
+    which is not updated with the state would return wrong results.
+    """
+    mapping = chain_state.tokennetworkaddresses_to_tokennetworkregistryaddresses
+    indexed_token_networks = 0
+
+    for registry_address, registry in chain_state.identifiers_to_tokennetworkregistries.items():
+        token_networks = registry.tokennetworkaddresses_to_tokennetworks
+        indexed_token_networks += len(token_networks)
+
+        msg = "The token addresses of the registry must match its token networks"
+        assert registry.tokenaddresses_to_tokennetworkaddresses == {
+            token_network_state.token_address: token_network_address
+            for token_network_address, token_network_state in token_networks.items()
+        }, msg
+
+        for token_network_address, token_network_state in token_networks.items():
+            msg = "The token network must be indexed with its registry"
+            assert mapping.get(token_network_address) == registry_address, msg
+
+            channels = token_network_state.channelidentifiers_to_channels
+            partners_to_channels: Dict[Address, List[ChannelID]] = defaultdict(list)
+            for channel_identifier, channel_state in channels.items():
+                partner_address = channel_state.partner_state.address
+                partners_to_channels[partner_address].append(channel_identifier)
+
+            msg = "The channels of the token network must be indexed by partner"
+            assert {
+                partner_address: sorted(channel_identifiers)
+                for partner_address, channel_identifiers in (
+                    token_network_state.partneraddresses_to_channelidentifiers.items()
+                )
+                if channel_identifiers
+            } == {
+                partner_address: sorted(channel_identifiers)
+                for partner_address, channel_identifiers in partners_to_channels.items()
+            }, msg
+
+    msg = "Only the token networks of the registries can be indexed"
+    assert len(mapping) == indexed_token_networks, msg
+
+    partners_to_canonical_identifiers: Dict[Address, Set[CanonicalIdentifier]] = defaultdict(set)
+    for registry in chain_state.identifiers_to_tokennetworkregistries.values():
+        for token_network_state in registry.tokennetworkaddresses_to_tokennetworks.values():
+            for channel_state in token_network_state.channelidentifiers_to_channels.values():
+                partner_address = channel_state.partner_state.address
+                partners_to_canonical_identifiers[partner_address].add(
+                    channel_state.canonical_identifier
+                )
+
+    msg = "The channels of all token networks must be indexed by partner"
+    assert chain_state.partneraddresses_to_canonical_identifiers == dict(
+        partners_to_canonical_identifiers
+    ), msg
+
+
 def state_transition(
     chain_state: Optional[ChainState], state_change: StateChange
 ) -> TransitionResult[ChainState]:
@@ -1148,4 +1260,7 @@ def state_transition(
     update_queues(iteration, state_change)
     typecheck(iteration.new_state, ChainState)
 
+    if CHECK_INDEXES:
+        sanity_check(iteration.new_state)
+
     return iteration
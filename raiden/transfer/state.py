@@ -6,6 +6,7 @@
 from random import Random
 
 import networkx
+import sha3
 from eth_utils import to_hex
 
 from raiden.constants import (
@@ -25,6 +26,7 @@
 )
 from raiden.transfer.identifiers import CanonicalIdentifier, QueueIdentifier
 from raiden.transfer.mediated_transfer.mediation_fee import FeeScheduleState
+from raiden.utils.compact import intern_address, slotted
 from raiden.utils.formatting import lpex, to_checksum_address
 from raiden.utils.typing import (
     Address,
@@ -39,6 +41,7 @@
     Dict,
     EncodedData,
     FeeAmount,
+    FrozenSet,
     List,
     Locksroot,
     MessageID,
@@ -47,6 +50,7 @@
     PaymentWithFeeAmount,
     Secret,
     SecretHash,
+    Set,
     T_Address,
     T_BlockHash,
     T_BlockNumber,
@@ -156,6 +160,7 @@ class HopState(State):
 
     def __post_init__(self) -> None:
         typecheck(self.node_address, T_Address)
+        self.node_address = intern_address(self.node_address)
 
 
 @dataclass
@@ -180,6 +185,7 @@ def __repr__(self) -> str:
         )
 
 
+@slotted
 @dataclass
 class HashTimeLockState(State):
     """ Represents a hash time lock. """
@@ -200,6 +206,7 @@ def __post_init__(self) -> None:
         self.encoded = EncodedData(lock.as_bytes)
 
 
+@slotted
 @dataclass
 class UnlockPartialProofState(State):
     """ Stores the lock along with its unlocking secret. """
@@ -221,6 +228,7 @@ def __post_init__(self) -> None:
         self.encoded = self.lock.encoded
 
 
+@slotted
 @dataclass
 class TransactionExecutionStatus(State):
     """ Represents the status of a transaction. """
@@ -275,11 +283,105 @@ def __post_init__(self) -> None:
 
 @dataclass
 class PendingLocksState(State):
-    locks: List[EncodedData]
+    """ The encoded pending locks of a channel end, in insertion order.
+
+    `locks` is immutable, every change creates a new object. The set of the
+    locks and the keccak state of their concatenation are caches for the
+    `locks` object they were computed from, used to avoid a linear scan for
+    membership and re-hashing every lock for the locksroot. The caches are not
+    serialized. The pickle based `deepcopy` of every dispatch keeps the
+    locksroot, the keccak state can not be pickled and is rebuilt when the
+    next lock is added.
+    """
+
+    locks: Tuple[EncodedData, ...]
+
+    def __post_init__(self) -> None:
+        self.locks = tuple(self.locks)
+        self._cached_for: Tuple[EncodedData, ...] = self.locks
+        self._index: Optional[FrozenSet[EncodedData]] = None
+        self._hasher: Optional[Any] = None
+        self._locksroot: Optional[Locksroot] = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        if self._caches_are_fresh() and self._locksroot is not None:
+            return {"locks": self.locks, "locksroot": self._locksroot}
+        return {"locks": self.locks}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.locks = state["locks"]
+        self.__post_init__()
+        self._locksroot = state.get("locksroot")
+
+    def _caches_are_fresh(self) -> bool:
+        return self._cached_for is self.locks
+
+    def _refresh_caches(self) -> None:
+        if not self._caches_are_fresh():
+            self._cached_for = self.locks
+            self._index = None
+            self._hasher = None
+            self._locksroot = None
+
+    def _set_hasher(self, hasher: Any) -> None:
+        self._hasher = hasher
+        self._locksroot = Locksroot(hasher.digest())
+
+    def index(self) -> FrozenSet[EncodedData]:
+        """ The set of the pending locks, for constant time membership tests. """
+        self._refresh_caches()
+        if self._index is None:
+            self._index = frozenset(self.locks)
+        return self._index
+
+    def locksroot(self) -> Locksroot:
+        """ The keccak of the concatenation of all locks. """
+        self._refresh_caches()
+        if self._locksroot is None:
+            self._set_hasher(sha3.keccak_256(b"".join(self.locks)))
+
+        assert self._locksroot is not None, "set by _set_hasher"
+        return self._locksroot
+
+    def with_lock(self, lock_encoded: EncodedData) -> "PendingLocksState":
+        """ A copy of the pending locks with `lock_encoded` appended.
+
+        The locks are append-only, so the keccak state is cloned and only the
+        new lock is hashed.
+        """
+        self._refresh_caches()
+        hasher = self._hasher
+        if hasher is None:
+            hasher = sha3.keccak_256(b"".join(self.locks))
+            self._set_hasher(hasher)
+
+        new_locks = PendingLocksState(self.locks + (lock_encoded,))
+
+        if self._index is not None:
+            new_locks._index = self._index | {lock_encoded}
+
+        new_hasher = hasher.copy()
+        new_hasher.update(lock_encoded)
+        new_locks._set_hasher(new_hasher)
+
+        return new_locks
+
+    def without_lock(self, lock_encoded: EncodedData) -> "PendingLocksState":
+        """ A copy of the pending locks with `lock_encoded` removed. """
+        self._refresh_caches()
+
+        locks = list(self.locks)
+        locks.remove(lock_encoded)
+        new_locks = PendingLocksState(tuple(locks))
+
+        if self._index is not None:
+            new_locks._index = self._index - {lock_encoded}
+
+        return new_locks
 
 
 def make_empty_pending_locks_state() -> PendingLocksState:
-    return PendingLocksState(list())
+    return PendingLocksState(tuple())
 
 
 @dataclass(order=True)
@@ -351,6 +453,8 @@ def __post_init__(self) -> None:
         if self.address == NULL_ADDRESS_BYTES:
             raise ValueError("address cannot be null.")
 
+        self.address = intern_address(self.address)
+
         if self.contract_balance < 0:
             raise ValueError("contract_balance cannot be negative.")
 
@@ -545,6 +649,38 @@ def __post_init__(self) -> None:
         typecheck(self.block_hash, T_BlockHash)
         typecheck(self.chain_id, T_ChainID)
 
+        # The channels of all token networks by partner. This is not a field,
+        # it is not serialized and is rebuilt from the token networks when the
+        # state is restored. The channel status is not indexed, it is derived
+        # from the channel state.
+        self.partneraddresses_to_canonical_identifiers: Dict[
+            Address, Set[CanonicalIdentifier]
+        ] = dict()
+        # pylint: disable=E1101
+        for token_network_registry in self.identifiers_to_tokennetworkregistries.values():
+            token_networks = token_network_registry.tokennetworkaddresses_to_tokennetworks
+            for token_network in token_networks.values():
+                for channel_state in token_network.channelidentifiers_to_channels.values():
+                    self.index_channel(channel_state)
+
+    def index_channel(self, channel_state: NettingChannelState) -> None:
+        partner_address = channel_state.partner_state.address
+        canonical_identifiers = self.partneraddresses_to_canonical_identifiers.setdefault(
+            partner_address, set()
+        )
+        canonical_identifiers.add(channel_state.canonical_identifier)
+
+    def unindex_channel(self, channel_state: NettingChannelState) -> None:
+        """ Remove the channel from the partner index, the partners without
+        channels are removed as well.
+        """
+        partner_address = channel_state.partner_state.address
+        canonical_identifiers = self.partneraddresses_to_canonical_identifiers.get(partner_address)
+        if canonical_identifiers is not None:
+            canonical_identifiers.discard(channel_state.canonical_identifier)
+            if not canonical_identifiers:
+                del self.partneraddresses_to_canonical_identifiers[partner_address]
+
     def __repr__(self) -> str:
         return (
             "ChainState(block_number={} block_hash={} networks={} qty_transfers={} chain_id={})"
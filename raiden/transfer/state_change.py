@@ -122,6 +122,10 @@ class ContractReceiveChannelNew(ContractReceiveStateChange):
 
     channel_state: NettingChannelState
 
+    @property
+    def canonical_identifier(self) -> CanonicalIdentifier:
+        return self.channel_state.canonical_identifier
+
     @property
     def token_network_address(self) -> TokenNetworkAddress:
         return self.channel_state.canonical_identifier.token_network_address
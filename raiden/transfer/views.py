@@ -42,17 +42,7 @@ def all_neighbour_nodes(chain_state: ChainState) -> Set[Address]:
     """ Return the identifiers for all nodes accross all token network registries which
     have a channel open with this one.
     """
-    addresses = set()
-
-    for token_network_registry in chain_state.identifiers_to_tokennetworkregistries.values():
-        for (
-            token_network
-        ) in token_network_registry.tokennetworkaddresses_to_tokennetworks.values():
-            channel_states = token_network.channelidentifiers_to_channels.values()
-            for channel_state in channel_states:
-                addresses.add(channel_state.partner_state.address)
-
-    return addresses
+    return set(chain_state.partneraddresses_to_canonical_identifiers)
 
 
 def block_number(chain_state: ChainState) -> BlockNumber:
@@ -144,11 +134,12 @@ def get_token_network_registry_address(
 def get_token_network_registry_by_token_network_address(
     chain_state: ChainState, token_network_address: TokenNetworkAddress
 ) -> Optional[TokenNetworkRegistryState]:
-    for token_network_registry in chain_state.identifiers_to_tokennetworkregistries.values():
-        if token_network_address in token_network_registry.tokennetworkaddresses_to_tokennetworks:
-            return token_network_registry
+    mapping = chain_state.tokennetworkaddresses_to_tokennetworkregistryaddresses
+    token_network_registry_address = mapping.get(token_network_address)
+    if token_network_registry_address is None:
+        return None
 
-    return None
+    return chain_state.identifiers_to_tokennetworkregistries.get(token_network_registry_address)
 
 
 def get_token_network_address_by_token_address(
@@ -239,14 +230,13 @@ def get_token_network_by_address(
     chain_state: ChainState, token_network_address: TokenNetworkAddress
 ) -> Optional[TokenNetworkState]:
 
-    token_network_state = None
-    for token_network_registry_state in chain_state.identifiers_to_tokennetworkregistries.values():
-        networks_by_address = token_network_registry_state.tokennetworkaddresses_to_tokennetworks
-        token_network_state = networks_by_address.get(token_network_address)
-        if token_network_state:
-            return token_network_state
+    token_network_registry = get_token_network_registry_by_token_network_address(
+        chain_state, token_network_address
+    )
+    if token_network_registry is None:
+        return None
 
-    return token_network_state
+    return token_network_registry.tokennetworkaddresses_to_tokennetworks.get(token_network_address)
 
 
 def get_channelstate_for(
@@ -482,6 +472,25 @@ def list_all_channelstate(chain_state: ChainState) -> List[NettingChannelState]:
     return result
 
 
+def list_channelstate_for_partner(
+    chain_state: ChainState, partner_address: Address
+) -> List[NettingChannelState]:
+    """ Return the channels with `partner_address` across all token networks,
+    without scanning the channels with the other partners.
+    """
+    canonical_identifiers = chain_state.partneraddresses_to_canonical_identifiers.get(
+        partner_address, ()
+    )
+
+    result: List[NettingChannelState] = []
+    for canonical_identifier in sorted(canonical_identifiers):
+        channel_state = get_channelstate_by_canonical_identifier(chain_state, canonical_identifier)
+        if channel_state is not None:
+            result.append(channel_state)
+
+    return result
+
+
 def filter_channels_by_partneraddress(
     chain_state: ChainState,
     token_network_registry_address: TokenNetworkRegistryAddress,
@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from typing import Any, Callable, TextIO
+from typing import Any, TextIO
 from urllib.parse import urlparse
 
 import click
@@ -8,6 +8,7 @@
 from eth_typing import URI
 from eth_utils import is_address, to_canonical_address
 from web3 import HTTPProvider, Web3
+from web3.types import GasPriceStrategy
 
 from raiden.accounts import AccountManager
 from raiden.api.rest import APIServer, RestAPI
@@ -33,6 +34,7 @@
 from raiden.message_handler import MessageHandler
 from raiden.network.proxies.proxy_manager import ProxyManager, ProxyManagerMetadata
 from raiden.network.rpc.client import JSONRPCClient
+from raiden.network.rpc.middleware import GasPriceOracle
 from raiden.network.transport import MatrixTransport
 from raiden.raiden_event_handler import EventHandler, PFSFeedbackEventHandler, RaidenEventHandler
 from raiden.settings import (
@@ -190,7 +192,7 @@ def start_api_server(
 def run_app(
     address: Address,
     keystore_path: str,
-    gas_price: Callable,
+    gas_price: GasPriceStrategy,
     eth_rpc_endpoint: str,
     user_deposit_contract_address: Optional[UserDepositAddress],
     api_address: Endpoint,
@@ -217,6 +219,8 @@ def run_app(
     proportional_imbalance_fee: Tuple[Tuple[TokenAddress, ProportionalFeeAmount], ...],
     blockchain_query_interval: float,
     cap_mediation_fees: bool,
+    persist_gas_price_window: bool = False,
+    archive_database: bool = False,
     **kwargs: Any,  # FIXME: not used here, but still receives stuff in smoketest
 ) -> App:
     # pylint: disable=too-many-locals,too-many-branches,too-many-statements,unused-argument
@@ -374,6 +378,11 @@ def run_app(
         )
     )
     config.database_path = database_path
+    if archive_database:
+        config.archive_database_path = database_path.parent / f"v{RAIDEN_DB_VERSION}_archive.db"
+
+    if persist_gas_price_window and isinstance(gas_price, GasPriceOracle):
+        gas_price.load(database_path.parent / "gas_price_window.json")
 
     print(f"Raiden is running in {environment_type.value.lower()} mode")
     print(
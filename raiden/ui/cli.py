@@ -13,10 +13,7 @@
 import filelock
 import structlog
 from click import Context
-from requests.exceptions import ConnectionError as RequestsConnectionError, ConnectTimeout
-from urllib3.exceptions import ReadTimeoutError
 
-from raiden.accounts import KeystoreAuthenticationError, KeystoreFileNotFound
 from raiden.constants import (
     FLAT_MED_FEE_MIN,
     IMBALANCE_MED_FEE_MAX,
@@ -39,7 +36,6 @@
     ReplacementTransactionUnderpriced,
 )
 from raiden.log_config import configure_logging
-from raiden.network.utils import get_free_port
 from raiden.settings import (
     DEFAULT_BLOCKCHAIN_QUERY_INTERVAL,
     DEFAULT_HTTP_SERVER_PORT,
@@ -49,7 +45,6 @@
     DEFAULT_REVEAL_TIMEOUT,
     DEFAULT_SETTLE_TIMEOUT,
 )
-from raiden.ui.runners import run_services
 from raiden.utils.cli import (
     ADDRESS_TYPE,
     LOG_LEVEL_CONFIG_TYPE,
@@ -65,9 +60,6 @@
 )
 from raiden.utils.debugging import IDLE, enable_gevent_monitoring_signal
 from raiden.utils.formatting import to_checksum_address
-from raiden.utils.profiling.greenlets import SwitchMonitoring
-from raiden.utils.profiling.memory import MemoryLogger
-from raiden.utils.profiling.sampler import FlameGraphCollector, TraceSampler
 from raiden.utils.system import get_system_spec
 from raiden.utils.typing import MYPY_ANNOTATION
 from raiden_contracts.constants import ID_TO_CHAINNAME
@@ -260,6 +252,25 @@ def options(func: Callable) -> Callable:
                 default="fast",
                 show_default=True,
             ),
+            option(
+                "--archive-database/--no-archive-database",
+                help=(
+                    "Move the state changes and events older than the latest snapshot "
+                    "to a compressed archive database next to the database, to keep "
+                    "the size of the database bounded."
+                ),
+                default=False,
+                show_default=True,
+            ),
+            option(
+                "--persist-gas-price-window/--no-persist-gas-price-window",
+                help=(
+                    "Store the recent blocks used to compute the gas price in the data "
+                    "directory, so they don't have to be fetched again after a restart."
+                ),
+                default=False,
+                show_default=True,
+            ),
             option(
                 ETH_RPC_CONFIG_OPTION,
                 help=(
@@ -427,6 +438,16 @@ def options(func: Callable) -> Callable:
                 default=None,
             ),
             option("--switch-tracing", help="Enable switch tracing", is_flag=True, default=False),
+            option(
+                "--track-greenlet-switches",
+                help=(
+                    "Observe how long every greenlet runs before switching, exported as "
+                    "raiden_greenlet_run_seconds by the /metrics endpoint. This adds about "
+                    "1.5us to every greenlet switch."
+                ),
+                is_flag=True,
+                default=False,
+            ),
             option(
                 "--unrecoverable-error-should-crash",
                 help=(
@@ -529,12 +550,16 @@ def run(ctx: Context, **kwargs: Any) -> None:
 
     flamegraph = kwargs.pop("flamegraph", None)
     switch_tracing = kwargs.pop("switch_tracing", None)
+    track_greenlet_switches = kwargs.pop("track_greenlet_switches", False)
     profiler = None
     switch_monitor = None
+    greenlet_switch_tracking = None
 
     enable_gevent_monitoring_signal()
 
     if flamegraph:  # pragma: no cover
+        from raiden.utils.profiling.sampler import FlameGraphCollector, TraceSampler
+
         os.makedirs(flamegraph, exist_ok=True)
 
         now = datetime.datetime.now().isoformat()
@@ -545,6 +570,8 @@ def run(ctx: Context, **kwargs: Any) -> None:
         profiler = TraceSampler(flame)
 
     if switch_tracing is True:  # pragma: no cover
+        from raiden.utils.profiling.greenlets import SwitchMonitoring
+
         switch_monitor = SwitchMonitoring()
 
     if kwargs["environment_type"] == Environment.DEVELOPMENT:
@@ -553,6 +580,8 @@ def run(ctx: Context, **kwargs: Any) -> None:
     memory_logger = None
     log_memory_usage_interval = kwargs.pop("log_memory_usage_interval", 0)
     if log_memory_usage_interval > 0:  # pragma: no cover
+        from raiden.utils.profiling.memory import MemoryLogger
+
         memory_logger = MemoryLogger(log_memory_usage_interval)
         memory_logger.start()
 
@@ -561,6 +590,19 @@ def run(ctx: Context, **kwargs: Any) -> None:
         ctx.obj = kwargs
         return
 
+    # The node and its dependencies are imported only to run it, so that the
+    # subcommands and the help start quickly. `test_cli_import_time` makes
+    # sure they are not imported with this module.
+    from requests.exceptions import ConnectionError as RequestsConnectionError, ConnectTimeout
+    from urllib3.exceptions import ReadTimeoutError
+
+    from raiden.accounts import KeystoreAuthenticationError, KeystoreFileNotFound
+    from raiden.ui.runners import run_services
+    from raiden.utils.metrics import GreenletSwitchTracking
+
+    if track_greenlet_switches:
+        greenlet_switch_tracking = GreenletSwitchTracking()
+
     raiden_version = get_system_spec()["raiden"]
     click.secho(f"Welcome to Raiden, version {raiden_version}!", fg="green")
 
@@ -676,6 +718,8 @@ def run(ctx: Context, **kwargs: Any) -> None:
         # switch_monitor and profiler could use the tracing api, for the
         # teardown code to work correctly the teardown has to be done in the
         # reverse order of the initialization.
+        if greenlet_switch_tracking is not None:
+            greenlet_switch_tracking.stop()
         if switch_monitor is not None:
             switch_monitor.stop()
         if memory_logger is not None:
@@ -719,6 +763,7 @@ def smoketest(
     ctx: Context, debug: bool, eth_client: EthClient, report_path: Optional[str]
 ) -> None:  # pragma: no cover
     """ Test, that the raiden installation is sane. """
+    from raiden.network.utils import get_free_port
     from raiden.tests.utils.smoketest import run_smoketest, setup_smoketest, step_printer
 
     raiden_stdout = StringIO()
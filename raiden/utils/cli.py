@@ -9,15 +9,12 @@
 from typing import Any, Callable, Dict, List, Union
 
 import click
-import requests
 from click import Choice, MissingParameter
 from click._compat import term_len
 from click.formatting import iter_rows, measure_table, wrap_text
 from pytoml import TomlError, load
-from web3.gas_strategies.time_based import fast_gas_price_strategy
 
 from raiden.exceptions import ConfigurationError, InvalidChecksummedAddress
-from raiden.network.rpc.middleware import faster_gas_price_strategy
 from raiden.utils.formatting import address_checksum_and_decode
 from raiden_contracts.constants import CHAINNAME_TO_ID
 
@@ -301,11 +298,13 @@ def fixed_gas_price_strategy(_web3, _transaction_params):
             except ValueError:
                 self.fail(f"invalid numeric gas price: {value}", param, ctx)
         else:
+            from raiden.network.rpc.middleware import GasPriceOracle
+
             gas_price_string = super().convert(value, param, ctx)
             if gas_price_string == "fast":
-                return faster_gas_price_strategy
+                return GasPriceOracle(max_wait_seconds=15, sample_size=120, probability=99)
             else:
-                return fast_gas_price_strategy
+                return GasPriceOracle(max_wait_seconds=60, sample_size=120, probability=98)
 
 
 class MatrixServerType(click.Choice):
@@ -431,6 +430,8 @@ def get_matrix_servers(url: str) -> List[str]:
     url: url of a text file
     returns: list of urls, default schema is https
     """
+    import requests
+
     try:
         response = requests.get(url)
         if response.status_code != 200:
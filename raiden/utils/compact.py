@@ -0,0 +1,101 @@
+""" Helpers to reduce the memory used by the objects which a large node keeps
+in the chain state by the hundreds of thousands, e.g. the locks and the
+balance proofs.
+"""
+from dataclasses import fields
+from itertools import chain
+
+from cachetools import LRUCache
+
+from raiden.utils.typing import Any, Dict, Tuple, Type, TypeVar
+
+T = TypeVar("T")
+B = TypeVar("B", bound=bytes)
+
+ADDRESS_LENGTH = 20
+INTERNED_ADDRESSES_SIZE = 8192
+
+# The addresses of the token networks and of the nodes repeat in every
+# channel, lock and balance proof. The addresses also come from received
+# messages, so the table is bounded and the least recently used address is
+# evicted, after which new copies of it are interned again.
+_INTERNED_ADDRESSES: LRUCache = LRUCache(maxsize=INTERNED_ADDRESSES_SIZE)
+
+
+def intern_address(address: B) -> B:
+    """ Return the interned copy of `address`.
+
+    The objects restored from a snapshot, or received in messages, have their
+    own copy of every address. Interning them keeps a single copy in memory,
+    which is also preserved by the pickle based `deepcopy`. Values which are
+    not addresses are returned unchanged.
+    """
+    if len(address) != ADDRESS_LENGTH:
+        return address
+
+    interned = _INTERNED_ADDRESSES.get(address)
+    if interned is None:
+        _INTERNED_ADDRESSES[address] = interned = address
+    return interned
+
+
+def _pickle_methods(field_names: Tuple[str, ...], frozen: bool) -> Dict[str, Any]:
+    """ `__getstate__` and `__setstate__` which pickle the values of the fields
+    as a tuple.
+
+    The default state of slotted objects is a dictionary, which is slower to
+    pickle than the `__dict__` of the objects it replaces, and it is restored
+    with `setattr`, which fails for frozen dataclasses. The functions are
+    generated, as done by `dataclasses`, since loops over the fields are
+    noticeably slower.
+    """
+    values = "".join(f"self.{name}, " for name in field_names)
+    if frozen:
+        assignments = "".join(
+            f"    __setattr(self, {name!r}, state[{position}])\n"
+            for position, name in enumerate(field_names)
+        )
+    else:
+        assignments = f"    {values}= state\n"
+
+    source = (
+        f"def __getstate__(self):\n"
+        f"    return ({values})\n"
+        f"def __setstate__(self, state):\n"
+        f"{assignments}"
+    )
+    methods: Dict[str, Any] = dict()
+    exec(source, {"__setattr": object.__setattr__}, methods)  # pylint: disable=exec-used
+    return methods
+
+
+def slotted(cls: Type[T]) -> Type[T]:
+    """ Class decorator which recreates the dataclass `cls` with `__slots__`
+    for its fields, so that its instances have no `__dict__`.
+
+    It must be applied after `@dataclass`. The defaults of the fields are
+    class attributes, which conflict with `__slots__` and can only be removed
+    by creating a new class. The base classes must have `__slots__` too,
+    otherwise the instances still have a `__dict__`.
+
+    Methods which use the argument-less `super()` refer to the original class,
+    they must not be used in `cls`.
+    """
+    field_names = tuple(field.name for field in fields(cls))
+    inherited_slots = set(
+        chain.from_iterable(getattr(base, "__slots__", ()) for base in cls.__mro__[1:])
+    )
+
+    namespace = dict(cls.__dict__)
+    namespace["__slots__"] = tuple(name for name in field_names if name not in inherited_slots)
+    for name in field_names:
+        namespace.pop(name, None)
+    namespace.pop("__dict__", None)
+    namespace.pop("__weakref__", None)
+
+    namespace.update(_pickle_methods(field_names, cls.__dataclass_params__.frozen))  # type: ignore
+
+    metaclass: Any = type(cls)
+    slotted_cls = metaclass(cls.__name__, cls.__bases__, namespace)
+    slotted_cls.__qualname__ = cls.__qualname__
+    return slotted_cls
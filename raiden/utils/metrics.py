@@ -0,0 +1,276 @@
+""" Counters, gauges and histograms for the hot paths of the node.
+
+The metrics are always enabled, so updating them must be cheap: an update is
+an arithmetic operation on a float, or for histograms a bisection over the
+bucket boundaries. The metrics are exported in the Prometheus text format by
+the `/metrics` endpoint of the REST API.
+"""
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+import gevent
+import greenlet
+
+LabelValues = Tuple[str, ...]
+M = TypeVar("M", bound="Metric")
+
+# Upper bounds in seconds, from half a millisecond to ten seconds
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value == float("-inf"):
+        return "-Inf"
+    return repr(float(value))
+
+
+def format_labels(labelnames: Sequence[str], labelvalues: Sequence[str]) -> str:
+    if not labelnames:
+        return ""
+
+    pairs = []
+    for name, value in zip(labelnames, labelvalues):
+        escaped = value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[LabelValues, "Metric"] = dict()
+
+    def labels(self: M, *labelvalues: str) -> M:
+        """ Return the metric for the given label values, creating it on first use. """
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects the labels {self.labelnames}, got {labelvalues}"
+            )
+
+        child = self._children.get(labelvalues)
+        if child is None:
+            child = self._new_child()
+            self._children[labelvalues] = child
+        return child  # type: ignore
+
+    def _new_child(self) -> "Metric":
+        return type(self)(self.name, self.documentation)
+
+    def _samples(self) -> Iterable[Tuple[str, Sequence[str], Sequence[str], float]]:
+        """ Return the (suffix, labelnames, labelvalues, value) of the samples. """
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+        if self.labelnames:
+            series = sorted(self._children.items())
+        else:
+            series = [((), self)]
+
+        for labelvalues, metric in series:
+            for suffix, extra_names, extra_values, value in metric._samples():
+                labels = format_labels(
+                    self.labelnames + tuple(extra_names), labelvalues + tuple(extra_values)
+                )
+                lines.append(f"{self.name}{suffix}{labels} {format_value(value)}")
+
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only be incremented")
+        self.value += amount
+
+    def _samples(self) -> Iterable[Tuple[str, Sequence[str], Sequence[str], float]]:
+        return [("_total", (), (), self.value)]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set_function(self, function: Optional[Callable[[], float]]) -> None:
+        """ Compute the value with `function` when the metrics are exported,
+        for values which are expensive to keep up-to-date.
+        """
+        self._function = function
+
+    def _samples(self) -> Iterable[Tuple[str, Sequence[str], Sequence[str], float]]:
+        value = self._function() if self._function is not None else self.value
+        return [("", (), (), value)]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+
+        if list(buckets) != sorted(buckets):
+            raise ValueError("Buckets must be sorted")
+
+        self.buckets = tuple(buckets)
+        # The last position counts the observations larger than every bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+
+    def _new_child(self) -> "Metric":
+        return Histogram(self.name, self.documentation, buckets=self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def _samples(self) -> Iterable[Tuple[str, Sequence[str], Sequence[str], float]]:
+        samples: List[Tuple[str, Sequence[str], Sequence[str], float]] = list()
+
+        cumulative = 0
+        for upper_bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            samples.append(("_bucket", ("le",), (format_value(upper_bound),), cumulative))
+
+        samples.append(("_sum", (), (), self.sum))
+        samples.append(("_count", (), (), cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self.metrics: Dict[str, Metric] = dict()
+
+    def register(self, metric: M) -> M:
+        if metric.name in self.metrics:
+            raise ValueError(f"A metric named {metric.name} is already registered")
+
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """ Export the metrics in the Prometheus text format. """
+        lines: List[str] = list()
+        for name in sorted(self.metrics):
+            lines.extend(self.metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+GREENLET_RUN_DURATION = REGISTRY.histogram(
+    "raiden_greenlet_run_seconds",
+    "Time a greenlet ran before switching, during which every other greenlet was blocked",
+)
+
+
+def track_greenlet_switches() -> Callable:
+    """ Observe how long each greenlet ran before switching into
+    `GREENLET_RUN_DURATION`.
+
+    The time spent in the hub is not observed, since it includes waiting for
+    IO. The previously installed tracing function is called as well, and it
+    is returned so that it can be restored.
+    """
+    previous_callback = greenlet.gettrace()
+    hub = gevent.get_hub()
+    last_switch = time.monotonic()
+
+    def observe_switch(event: str, args: Any) -> None:
+        nonlocal last_switch
+
+        if event in ("switch", "throw"):
+            now = time.monotonic()
+            origin, _ = args
+            if origin is not hub:
+                GREENLET_RUN_DURATION.observe(now - last_switch)
+            last_switch = now
+
+        if previous_callback is not None:
+            return previous_callback(event, args)
+
+        return None
+
+    greenlet.settrace(observe_switch)
+
+    return previous_callback
+
+
+class GreenletSwitchTracking:
+    """ Tracks the greenlet switches with `track_greenlet_switches` until it
+    is stopped.
+    """
+
+    def __init__(self) -> None:
+        self.previous_callback = track_greenlet_switches()
+
+    def stop(self) -> None:
+        # Best effort only, like `SwitchMonitoring.stop`, a tracing function
+        # installed afterwards is overwritten.
+        greenlet.settrace(self.previous_callback)
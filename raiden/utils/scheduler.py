@@ -0,0 +1,170 @@
+""" Bounded scheduling of the greenlets which handle the events and messages of
+the node.
+
+Under a burst of state changes a greenlet is needed for every transaction and
+for every received message, and all of them compete with the alarm task and
+the transport for the hub. The `Scheduler` runs a bounded number of greenlets
+of each priority class, the others are queued and started as the running ones
+finish. Every class has its own slots, so the safety critical transactions are
+never queued behind the work of the lower priorities. Some slots of a class are
+reserved for the greenlets with a deadline, so that e.g. a secret registration
+in the danger zone is not queued behind transactions which can wait.
+"""
+import heapq
+import math
+import time
+from enum import IntEnum
+from functools import partial
+from itertools import count
+
+import gevent
+from gevent import Greenlet
+
+from raiden.utils.metrics import REGISTRY
+from raiden.utils.typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class Priority(IntEnum):
+    """ Priority classes of the scheduled greenlets, lower values first. """
+
+    # On-chain transactions, some of which must be mined before a deadline,
+    # e.g. the registration of a secret in the danger zone
+    SAFETY = 0
+    # Handling of the received messages and sending of the protocol messages
+    PROTOCOL = 1
+    # Requests to the services, e.g. the feedback about failed routes to the
+    # pathfinding service
+    SERVICES = 2
+    # Payment results and the events which are only logged
+    BOOKKEEPING = 3
+
+
+DEFAULT_POOL_SIZES = {
+    Priority.SAFETY: 32,
+    Priority.PROTOCOL: 32,
+    Priority.SERVICES: 8,
+    Priority.BOOKKEEPING: 4,
+}
+
+# Slots on top of the pool size, only used by the greenlets with a deadline
+DEFAULT_RESERVED_SLOTS = {Priority.SAFETY: 16}
+
+QUEUED_TASKS = REGISTRY.gauge(
+    "raiden_scheduler_queued_tasks",
+    "Greenlets waiting for a free slot of their priority class",
+    labelnames=("priority",),
+)
+RUNNING_TASKS = REGISTRY.gauge(
+    "raiden_scheduler_running_tasks",
+    "Scheduled greenlets which are running",
+    labelnames=("priority",),
+)
+WAIT_DURATION = REGISTRY.histogram(
+    "raiden_scheduler_wait_seconds",
+    "Time a greenlet waited for a free slot of its priority class",
+    labelnames=("priority",),
+)
+
+# The queued greenlets are ordered by deadline, then by the order they were
+# spawned. The time they were queued at is kept for `WAIT_DURATION`.
+QueuedGreenlet = Tuple[float, int, float, Greenlet]
+
+
+class Scheduler:
+    def __init__(
+        self,
+        pool_sizes: Optional[Dict[Priority, int]] = None,
+        reserved_slots: Optional[Dict[Priority, int]] = None,
+    ) -> None:
+        if pool_sizes is None:
+            pool_sizes = DEFAULT_POOL_SIZES
+        if reserved_slots is None:
+            reserved_slots = DEFAULT_RESERVED_SLOTS
+
+        missing = set(Priority) - pool_sizes.keys()
+        if missing:
+            raise ValueError(f"The pool sizes of {sorted(missing)} are missing")
+
+        self.pool_sizes = dict(pool_sizes)
+        self.reserved_slots = {priority: reserved_slots.get(priority, 0) for priority in Priority}
+        self.running: Dict[Priority, int] = {priority: 0 for priority in Priority}
+        self.queues: Dict[Priority, List[QueuedGreenlet]] = {
+            priority: list() for priority in Priority
+        }
+        self._sequence = count()
+
+    def queue_depth(self, priority: Priority) -> int:
+        return len(self.queues[priority])
+
+    def spawn(
+        self, priority: Priority, name: str, task: Callable, *args: Any, deadline: float = math.inf
+    ) -> Greenlet:
+        """ Run `task` in a greenlet, once a slot of `priority` is free.
+
+        This never blocks, the returned greenlet is started later if the pool
+        of `priority` is full. A greenlet with a `deadline` may also use the
+        reserved slots of `priority`. The queued greenlets of a class are
+        started by earliest `deadline`, and in the order they were spawned for
+        the same deadline.
+        """
+        greenlet = Greenlet(task, *args)
+        greenlet.name = name
+
+        if self._has_free_slot(priority, deadline):
+            self._start(priority, greenlet)
+        else:
+            queued = (deadline, next(self._sequence), time.monotonic(), greenlet)
+            heapq.heappush(self.queues[priority], queued)
+            QUEUED_TASKS.labels(priority.name.lower()).inc()
+
+        return greenlet
+
+    def kill_queued(self) -> None:
+        """ Kill the greenlets which were not started.
+
+        Killing a greenlet which was not started does not raise, its value is
+        the `GreenletExit`.
+        """
+        for priority, queue in self.queues.items():
+            QUEUED_TASKS.labels(priority.name.lower()).dec(len(queue))
+            greenlets = [greenlet for _, _, _, greenlet in queue]
+            queue.clear()
+            gevent.killall(greenlets)
+
+    def _has_free_slot(self, priority: Priority, deadline: float) -> bool:
+        slots = self.pool_sizes[priority]
+        if deadline != math.inf:
+            slots += self.reserved_slots[priority]
+        return self.running[priority] < slots
+
+    def _start(self, priority: Priority, greenlet: Greenlet) -> None:
+        self.running[priority] += 1
+        RUNNING_TASKS.labels(priority.name.lower()).inc()
+
+        greenlet.rawlink(partial(self._finished, priority))
+        greenlet.start()
+
+    def _finished(self, priority: Priority, _: Greenlet) -> None:
+        self.running[priority] -= 1
+        label = priority.name.lower()
+        RUNNING_TASKS.labels(label).dec()
+
+        queue = self.queues[priority]
+        while queue:
+            deadline, _, queued_at, greenlet = queue[0]
+
+            # The queue is ordered by deadline, if the first greenlet can not
+            # use the free slot, which is a reserved one, none of them can
+            if not greenlet.ready() and not self._has_free_slot(priority, deadline):
+                return
+
+            heapq.heappop(queue)
+            QUEUED_TASKS.labels(label).dec()
+
+            # The greenlet was killed while it was queued
+            if greenlet.ready():
+                continue
+
+            WAIT_DURATION.labels(label).observe(time.monotonic() - queued_at)
+            self._start(priority, greenlet)
+            return
@@ -1,8 +1,30 @@
 import os
 import random
+from typing import NamedTuple
 
 from raiden import constants
-from raiden.utils.typing import PaymentID, Secret
+from raiden.utils.typing import (
+    BlockTimeout,
+    Optional,
+    PaymentAmount,
+    PaymentID,
+    Secret,
+    SecretHash,
+    TargetAddress,
+    TokenNetworkAddress,
+)
+
+
+class TransferRequest(NamedTuple):
+    """ A transfer of a batch for `RaidenService.mediated_transfers_async`. """
+
+    token_network_address: TokenNetworkAddress
+    amount: PaymentAmount
+    target: TargetAddress
+    identifier: PaymentID
+    secret: Optional[Secret] = None
+    secrethash: Optional[SecretHash] = None
+    lock_timeout: Optional[BlockTimeout] = None
 
 
 def random_secret() -> Secret:
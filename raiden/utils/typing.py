@@ -1,6 +1,6 @@
 from pathlib import Path
 from typing import *  # NOQA pylint:disable=wildcard-import,unused-wildcard-import
-from typing import TYPE_CHECKING, Any, Dict, NewType, Tuple, Type, Union
+from typing import TYPE_CHECKING, Any, Dict, NewType, Sequence, Tuple, Type, Union
 
 from eth_typing import (  # NOQA pylint:disable=unused-import
     Address,
@@ -9,16 +9,30 @@
     HexAddress,
 )
 from typing_extensions import Literal
-from web3.types import ABI, BlockIdentifier, Nonce  # NOQA pylint:disable=unused-import
-
-from raiden_contracts.contract_manager import CompiledContract  # NOQA pylint:disable=unused-import
-from raiden_contracts.utils.type_aliases import (  # NOQA pylint:disable=unused-import
-    ChainID,
-    T_ChainID,
-)
 
 from eth_typing import ChecksumAddress  # noqa: F401; pylint: disable=unused-import
 
+if TYPE_CHECKING:
+    # `web3.types` and the `raiden_contracts` modules import all of web3,
+    # which makes the import of this module, and of the command line
+    # interface, noticeably slower. The aliases below are equivalent at
+    # runtime.
+    from web3.types import ABI, BlockIdentifier, Nonce  # NOQA pylint:disable=unused-import
+    from raiden_contracts.contract_manager import (  # NOQA pylint:disable=unused-import
+        CompiledContract,
+    )
+    from raiden_contracts.utils.type_aliases import (  # NOQA pylint:disable=unused-import
+        ChainID,
+        T_ChainID,
+    )
+else:
+    T_ChainID = int
+    ChainID = NewType("ChainID", T_ChainID)
+    ABI = Sequence[Dict[str, Any]]
+    BlockIdentifier = Union[str, BlockNumber, Hash32]
+    Nonce = NewType("Nonce", int)
+    CompiledContract = Dict[str, Any]
+
 if TYPE_CHECKING:
     # pylint: disable=unused-import
     from raiden.transfer.state import (  # noqa: F401
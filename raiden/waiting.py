@@ -1,12 +1,15 @@
 import time
+from collections import defaultdict
 from enum import Enum
 from typing import TYPE_CHECKING, List
 
 import gevent
 import structlog
+from gevent.event import Event
 
 from raiden.storage.restore import get_state_change_with_transfer_by_secrethash
 from raiden.transfer import channel, views
+from raiden.transfer.architecture import StateChange
 from raiden.transfer.events import EventPaymentReceivedSuccess
 from raiden.transfer.identifiers import CanonicalIdentifier
 from raiden.transfer.mediated_transfer.events import EventUnlockClaimFailed
@@ -18,7 +21,12 @@
     NetworkState,
 )
 from raiden.transfer.state_change import (
+    ActionChangeNodeNetworkState,
+    BalanceProofStateChange,
+    Block,
+    ContractReceiveChannelNew,
     ContractReceiveChannelWithdraw,
+    ContractReceiveNewTokenNetwork,
     ContractReceiveSecretReveal,
 )
 from raiden.utils.formatting import to_checksum_address
@@ -28,10 +36,15 @@
     BlockNumber,
     Callable,
     ChannelID,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
     PaymentAmount,
     PaymentID,
     SecretHash,
     Sequence,
+    Set,
     TokenAddress,
     TokenAmount,
     TokenNetworkRegistryAddress,
@@ -48,6 +61,80 @@
 TRANSPORT_ERROR_MSG = "Waiting for protocol messages requires a running transport."
 
 
+def state_change_keys(state_change: StateChange) -> Iterator[Hashable]:
+    """ The keys under which waiters subscribe to `state_change`: its classes
+    and the canonical identifier of the channel it affects.
+    """
+    yield from type(state_change).__mro__
+
+    canonical_identifier = getattr(state_change, "canonical_identifier", None)
+    if canonical_identifier is not None:
+        yield canonical_identifier
+
+    if isinstance(state_change, BalanceProofStateChange):
+        yield state_change.balance_proof.canonical_identifier
+
+
+class StateChangeSubscription:
+    def __init__(self, notifier: "StateChangeNotifier", keys: Iterable[Hashable]) -> None:
+        self.notifier = notifier
+        self.keys = tuple(keys)
+        self.event = Event()
+
+    def wait(self, timeout: float) -> None:
+        """ Wait until a state change with one of the keys is applied, or for
+        at most `timeout` seconds.
+        """
+        self.event.wait(timeout)
+        self.event.clear()
+
+    def __enter__(self) -> "StateChangeSubscription":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.notifier.unsubscribe(self)
+
+
+class StateChangeNotifier:
+    """ Wakes up the waiters when a relevant state change is applied.
+
+    A waiter subscribes with keys, which are either a state change class,
+    matching the instances of its subclasses as well, or a canonical
+    identifier, matching the state changes of that channel. The waiters
+    check their condition against the node state every time they are woken
+    up, or after `retry_timeout` if no relevant state change was applied.
+    """
+
+    def __init__(self) -> None:
+        self.subscriptions: Dict[Hashable, Set[StateChangeSubscription]] = defaultdict(set)
+
+    def subscribe(self, keys: Iterable[Hashable]) -> StateChangeSubscription:
+        subscription = StateChangeSubscription(self, keys)
+        for key in subscription.keys:
+            self.subscriptions[key].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: StateChangeSubscription) -> None:
+        for key in subscription.keys:
+            subscribers = self.subscriptions.get(key)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.subscriptions[key]
+
+    def notify(self, state_changes: List[StateChange]) -> None:
+        """ Wake up the waiters subscribed to `state_changes`, this must be
+        called after the state changes are applied.
+        """
+        if not self.subscriptions:
+            return
+
+        for state_change in state_changes:
+            for key in state_change_keys(state_change):
+                for subscription in self.subscriptions.get(key, ()):
+                    subscription.event.set()
+
+
 def wait_until(func: Callable, wait_for: float = None, sleep_for: float = 0.5) -> Any:
     """Test for a function and wait for it to return a truth value or to timeout.
     Returns the value or None if a timeout is given and the function didn't return
@@ -86,13 +173,14 @@ def wait_for_block(
         "node": to_checksum_address(raiden.address),
         "target_block_number": block_number,
     }
-    while current < block_number:
-        assert raiden, ALARM_TASK_ERROR_MSG
-        assert raiden.alarm, ALARM_TASK_ERROR_MSG
+    with raiden.state_change_notifier.subscribe([Block]) as subscription:
+        while current < block_number:
+            assert raiden, ALARM_TASK_ERROR_MSG
+            assert raiden.alarm, ALARM_TASK_ERROR_MSG
 
-        log.debug("wait_for_block", current_block_number=current, **log_details)
-        gevent.sleep(retry_timeout)
-        current = raiden.get_block_number()
+            log.debug("wait_for_block", current_block_number=current, **log_details)
+            subscription.wait(retry_timeout)
+            current = raiden.get_block_number()
 
 
 def wait_for_newchannel(
@@ -120,18 +208,19 @@ def wait_for_newchannel(
         "token_address": to_checksum_address(token_address),
         "partner_address": to_checksum_address(partner_address),
     }
-    while channel_state is None:
-        assert raiden, ALARM_TASK_ERROR_MSG
-        assert raiden.alarm, ALARM_TASK_ERROR_MSG
-
-        log.debug("wait_for_newchannel", **log_details)
-        gevent.sleep(retry_timeout)
-        channel_state = views.get_channelstate_for(
-            views.state_from_raiden(raiden),
-            token_network_registry_address,
-            token_address,
-            partner_address,
-        )
+    with raiden.state_change_notifier.subscribe([ContractReceiveChannelNew]) as subscription:
+        while channel_state is None:
+            assert raiden, ALARM_TASK_ERROR_MSG
+            assert raiden.alarm, ALARM_TASK_ERROR_MSG
+
+            log.debug("wait_for_newchannel", **log_details)
+            subscription.wait(retry_timeout)
+            channel_state = views.get_channelstate_for(
+                views.state_from_raiden(raiden),
+                token_network_registry_address,
+                token_address,
+                partner_address,
+            )
 
 
 def wait_for_participant_deposit(
@@ -172,19 +261,23 @@ def wait_for_participant_deposit(
         "target_address": to_checksum_address(target_address),
         "target_balance": target_balance,
     }
-    while current_balance < target_balance:
-        assert raiden, ALARM_TASK_ERROR_MSG
-        assert raiden.alarm, ALARM_TASK_ERROR_MSG
-
-        log.debug("wait_for_participant_deposit", current_balance=current_balance, **log_details)
-        gevent.sleep(retry_timeout)
-        channel_state = views.get_channelstate_for(
-            views.state_from_raiden(raiden),
-            token_network_registry_address,
-            token_address,
-            partner_address,
-        )
-        current_balance = balance(channel_state)
+    subscription = raiden.state_change_notifier.subscribe([channel_state.canonical_identifier])
+    with subscription:
+        while current_balance < target_balance:
+            assert raiden, ALARM_TASK_ERROR_MSG
+            assert raiden.alarm, ALARM_TASK_ERROR_MSG
+
+            log.debug(
+                "wait_for_participant_deposit", current_balance=current_balance, **log_details
+            )
+            subscription.wait(retry_timeout)
+            channel_state = views.get_channelstate_for(
+                views.state_from_raiden(raiden),
+                token_network_registry_address,
+                token_address,
+                partner_address,
+            )
+            current_balance = balance(channel_state)
 
 
 def wait_single_channel_deposit(
@@ -286,19 +379,24 @@ def get_balance(end_state: NettingChannelEndState) -> TokenAmount:
         "target_address": to_checksum_address(target_address),
         "target_balance": target_balance,
     }
-    while current_balance < target_balance:
-        assert raiden, ALARM_TASK_ERROR_MSG
-        assert raiden.alarm, ALARM_TASK_ERROR_MSG
-
-        log.critical("wait_for_payment_balance", current_balance=current_balance, **log_details)
-        gevent.sleep(retry_timeout)
-        channel_state = views.get_channelstate_for(
-            views.state_from_raiden(raiden),
-            token_network_registry_address,
-            token_address,
-            partner_address,
-        )
-        current_balance = balance(channel_state)
+    # Our balance proof is also updated by state changes which are not for
+    # this channel, e.g. a secret reveal, so every state change is relevant.
+    with raiden.state_change_notifier.subscribe([StateChange]) as subscription:
+        while current_balance < target_balance:
+            assert raiden, ALARM_TASK_ERROR_MSG
+            assert raiden.alarm, ALARM_TASK_ERROR_MSG
+
+            log.critical(
+                "wait_for_payment_balance", current_balance=current_balance, **log_details
+            )
+            subscription.wait(retry_timeout)
+            channel_state = views.get_channelstate_for(
+                views.state_from_raiden(raiden),
+                token_network_registry_address,
+                token_address,
+                partner_address,
+            )
+            current_balance = balance(channel_state)
 
 
 def wait_for_channel_in_states(
@@ -349,26 +447,27 @@ def wait_for_channel_in_states(
         "target_states": target_states,
     }
 
-    while list_cannonical_ids:
-        assert raiden, ALARM_TASK_ERROR_MSG
-        assert raiden.alarm, ALARM_TASK_ERROR_MSG
+    with raiden.state_change_notifier.subscribe(list_cannonical_ids) as subscription:
+        while list_cannonical_ids:
+            assert raiden, ALARM_TASK_ERROR_MSG
+            assert raiden.alarm, ALARM_TASK_ERROR_MSG
 
-        canonical_id = list_cannonical_ids[-1]
-        chain_state = views.state_from_raiden(raiden)
+            canonical_id = list_cannonical_ids[-1]
+            chain_state = views.state_from_raiden(raiden)
 
-        channel_state = views.get_channelstate_by_canonical_identifier(
-            chain_state=chain_state, canonical_identifier=canonical_id
-        )
+            channel_state = views.get_channelstate_by_canonical_identifier(
+                chain_state=chain_state, canonical_identifier=canonical_id
+            )
 
-        channel_is_settled = (
-            channel_state is None or channel.get_status(channel_state) in target_states
-        )
+            channel_is_settled = (
+                channel_state is None or channel.get_status(channel_state) in target_states
+            )
 
-        if channel_is_settled:
-            list_cannonical_ids.pop()
-        else:
-            log.debug("wait_for_channel_in_states", **log_details)
-            gevent.sleep(retry_timeout)
+            if channel_is_settled:
+                list_cannonical_ids.pop()
+            else:
+                log.debug("wait_for_channel_in_states", **log_details)
+                subscription.wait(retry_timeout)
 
 
 def wait_for_close(
@@ -411,15 +510,16 @@ def wait_for_token_network(
         "token_network_registry_address": to_checksum_address(token_network_registry_address),
         "token_address": to_checksum_address(token_address),
     }
-    while token_network is None:
-        assert raiden, ALARM_TASK_ERROR_MSG
-        assert raiden.alarm, ALARM_TASK_ERROR_MSG
-
-        log.debug("wait_for_token_network", **log_details)
-        gevent.sleep(retry_timeout)
-        token_network = views.get_token_network_by_token_address(
-            views.state_from_raiden(raiden), token_network_registry_address, token_address
-        )
+    with raiden.state_change_notifier.subscribe([ContractReceiveNewTokenNetwork]) as subscription:
+        while token_network is None:
+            assert raiden, ALARM_TASK_ERROR_MSG
+            assert raiden.alarm, ALARM_TASK_ERROR_MSG
+
+            log.debug("wait_for_token_network", **log_details)
+            subscription.wait(retry_timeout)
+            token_network = views.get_token_network_by_token_address(
+                views.state_from_raiden(raiden), token_network_registry_address, token_address
+            )
 
 
 def wait_for_settle(
@@ -462,14 +562,15 @@ def wait_for_network_state(
         "node_address": to_checksum_address(node_address),
         "target_network_state": network_state,
     }
-    while current != network_state:
-        assert raiden, TRANSPORT_ERROR_MSG
-        assert raiden.transport, TRANSPORT_ERROR_MSG
+    with raiden.state_change_notifier.subscribe([ActionChangeNodeNetworkState]) as subscription:
+        while current != network_state:
+            assert raiden, TRANSPORT_ERROR_MSG
+            assert raiden.transport, TRANSPORT_ERROR_MSG
 
-        log.debug("wait_for_network_state", current_network_state=current, **log_details)
-        gevent.sleep(retry_timeout)
-        network_statuses = views.get_networkstatuses(views.state_from_raiden(raiden))
-        current = network_statuses.get(node_address)
+            log.debug("wait_for_network_state", current_network_state=current, **log_details)
+            subscription.wait(retry_timeout)
+            network_statuses = views.get_networkstatuses(views.state_from_raiden(raiden))
+            current = network_statuses.get(node_address)
 
 
 def wait_for_healthy(
@@ -510,56 +611,66 @@ def wait_for_received_transfer_result(
     assert raiden, TRANSPORT_ERROR_MSG
     assert raiden.wal, TRANSPORT_ERROR_MSG
     assert raiden.transport, TRANSPORT_ERROR_MSG
-    stream = raiden.wal.storage.get_state_changes_stream(retry_timeout=retry_timeout)
-
-    result = None
-    while result is None:
-
-        state_events = raiden.wal.storage.get_events()
-        for event in state_events:
-            unlocked = (
-                isinstance(event, EventPaymentReceivedSuccess)
-                and event.identifier == payment_identifier
-                and PaymentAmount(event.amount) == amount
-            )
-            if unlocked:
-                result = TransferWaitResult.UNLOCKED
-                break
-            claim_failed = (
-                isinstance(event, EventUnlockClaimFailed)
-                and event.identifier == payment_identifier
-                and event.secrethash == secrethash
-            )
-            if claim_failed:
-                result = TransferWaitResult.UNLOCK_FAILED
-                break
-
-        state_changes = next(stream)
-        for state_change in state_changes:
-            registered_onchain = (
-                isinstance(state_change, ContractReceiveSecretReveal)
-                and state_change.secrethash == secrethash
-            )
-            if registered_onchain:
-                state_change_record = get_state_change_with_transfer_by_secrethash(
-                    raiden.wal.storage, secrethash
+    stream = raiden.wal.storage.get_state_changes_stream(retry_timeout=0)
+
+    # The events of the payment are produced by state changes of different
+    # types and channels, so every state change is relevant
+    with raiden.state_change_notifier.subscribe([StateChange]) as subscription:
+        result = None
+        while result is None:
+
+            state_events = raiden.wal.storage.get_events()
+            for event in state_events:
+                unlocked = (
+                    isinstance(event, EventPaymentReceivedSuccess)
+                    and event.identifier == payment_identifier
+                    and PaymentAmount(event.amount) == amount
                 )
-                assert state_change_record is not None, "Could not find state change for screthash"
-                msg = "Expected ActionInitMediator/ActionInitTarget not found in state changes."
-                expected_types = (ActionInitMediator, ActionInitTarget)
-                assert isinstance(state_change_record.data, expected_types), msg
-
-                transfer = None
-                if isinstance(state_change_record.data, ActionInitMediator):
-                    transfer = state_change_record.data.from_transfer
-                if isinstance(state_change_record.data, ActionInitTarget):
-                    transfer = state_change_record.data.transfer
-
-                if transfer is not None and raiden.get_block_number() <= transfer.lock.expiration:
-                    return TransferWaitResult.SECRET_REGISTERED_ONCHAIN
-
-        log.debug("wait_for_transfer_result", **log_details)
-        gevent.sleep(retry_timeout)
+                if unlocked:
+                    result = TransferWaitResult.UNLOCKED
+                    break
+                claim_failed = (
+                    isinstance(event, EventUnlockClaimFailed)
+                    and event.identifier == payment_identifier
+                    and event.secrethash == secrethash
+                )
+                if claim_failed:
+                    result = TransferWaitResult.UNLOCK_FAILED
+                    break
+
+            state_changes = next(stream)
+            for state_change in state_changes:
+                registered_onchain = (
+                    isinstance(state_change, ContractReceiveSecretReveal)
+                    and state_change.secrethash == secrethash
+                )
+                if registered_onchain:
+                    state_change_record = get_state_change_with_transfer_by_secrethash(
+                        raiden.wal.storage, secrethash
+                    )
+                    assert (
+                        state_change_record is not None
+                    ), "Could not find state change for screthash"
+                    msg = (
+                        "Expected ActionInitMediator/ActionInitTarget not found in state changes."
+                    )
+                    expected_types = (ActionInitMediator, ActionInitTarget)
+                    assert isinstance(state_change_record.data, expected_types), msg
+
+                    transfer = None
+                    if isinstance(state_change_record.data, ActionInitMediator):
+                        transfer = state_change_record.data.from_transfer
+                    if isinstance(state_change_record.data, ActionInitTarget):
+                        transfer = state_change_record.data.transfer
+
+                    if (
+                        transfer is not None
+                        and raiden.get_block_number() <= transfer.lock.expiration
+                    ):
+                        return TransferWaitResult.SECRET_REGISTERED_ONCHAIN
+
+            log.debug("wait_for_transfer_result", **log_details)
+            subscription.wait(retry_timeout)
 
     return result  # type: ignore
 
@@ -583,20 +694,21 @@ def wait_for_withdraw_complete(
     assert raiden, TRANSPORT_ERROR_MSG
     assert raiden.wal, TRANSPORT_ERROR_MSG
     assert raiden.transport, TRANSPORT_ERROR_MSG
-    stream = raiden.wal.storage.get_state_changes_stream(retry_timeout=retry_timeout)
+    stream = raiden.wal.storage.get_state_changes_stream(retry_timeout=0)
 
-    while True:
-        state_changes = next(stream)
+    with raiden.state_change_notifier.subscribe([canonical_identifier]) as subscription:
+        while True:
+            state_changes = next(stream)
 
-        for state_change in state_changes:
-            found = (
-                isinstance(state_change, ContractReceiveChannelWithdraw)
-                and state_change.total_withdraw == total_withdraw
-                and state_change.canonical_identifier == canonical_identifier
-            )
+            for state_change in state_changes:
+                found = (
+                    isinstance(state_change, ContractReceiveChannelWithdraw)
+                    and state_change.total_withdraw == total_withdraw
+                    and state_change.canonical_identifier == canonical_identifier
+                )
 
-            if found:
-                return
+                if found:
+                    return
 
-        log.debug("wait_for_withdraw_complete", **log_details)
-        gevent.sleep(retry_timeout)
+            log.debug("wait_for_withdraw_complete", **log_details)
+            subscription.wait(retry_timeout)